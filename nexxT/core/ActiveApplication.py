@@ -9,12 +9,16 @@ This module contains the class definition of ActiveApplication
 """
 
 import logging
+import math
+import time
+from nexxT import useCImpl
 from nexxT.Qt.QtCore import QObject, Slot, Signal, Qt, QCoreApplication
-from nexxT.interface import FilterState, OutputPortInterface, InputPortInterface
+from nexxT.interface import FilterState, OutputPortInterface, InputPortInterface, MemoryGovernor
 from nexxT.core.Exceptions import FilterStateMachineError, NexTInternalError, PossibleDeadlock
 from nexxT.core.CompositeFilter import CompositeFilter
 from nexxT.core.Utils import Barrier, assertMainThread, mainThread, MethodInvoker
 from nexxT.core.Thread import NexTThread
+from nexxT.core.ProcessThread import NexTProcessThread, isProcessThread
 from nexxT.core.PropertyCollectionImpl import PropertyCollectionProxy
 from nexxT.core.Variables import Variables
 
@@ -31,6 +35,7 @@ class ActiveApplication(QObject):
     aboutToClose = Signal()                 # Signal is emitted before stop operation takes place
 
     singleThreaded = False
+    METRICS_RATE_TAU = 2.0
 
     def __init__(self, graph):
         super().__init__()
@@ -39,12 +44,16 @@ class ActiveApplication(QObject):
         self._threads = {}
         self._filters2threads = {}
         self._composite2graphs = {}
+        self._memoryGoverned = []
         self._traverseAndSetup(graph)
         # initialize private variables
         self._numThreadsSynced = 0
         self._state = FilterState.CONSTRUCTING
         self._graphConnected = False
         self._interThreadConns = []
+        self._directConns = []
+        self._receivingPorts = {}
+        self._metricsRates = {}
         self._operationInProgress = False
         self._shutdownInProgress = False
         # connect signals and slots
@@ -94,12 +103,20 @@ class ActiveApplication(QObject):
                 nexTprops = props.getChildCollection("_nexxT")
                 threadName = nexTprops.getProperty("thread")
                 threadName = props.getVariables().subst(threadName)
+                workerThreads = nexTprops.getProperty("workerThreads")
+                workerProcesses = nexTprops.getProperty("workerProcesses")
+                if nexTprops.getProperty("memoryGoverned"):
+                    self._memoryGoverned.append(filtername)
                 if self.singleThreaded:
                     threadName = "main"
                 if threadName not in self._threads:
                     # create threads as needed
-                    self._threads[threadName] = NexTThread(threadName)
-                self._threads[threadName].addMockup(filtername, mockup, props)
+                    settings = self._graph.getSubConfig().getConfiguration().threadSettings(threadName)
+                    if isProcessThread(threadName):
+                        self._threads[threadName] = NexTProcessThread(threadName, settings)
+                    else:
+                        self._threads[threadName] = NexTThread(threadName, settings)
+                self._threads[threadName].addMockup(filtername, mockup, props, workerThreads, workerProcesses)
                 self._filters2threads[filtername] = threadName
 
     def __del__(self):
@@ -121,7 +138,66 @@ class ActiveApplication(QObject):
         self._composite2graphs = {}
         # initialize private variables
         self._numThreadsSynced = 0
+        if not useCImpl:
+            # the C++ connections remove their samples from the main-thread queue in the destructor
+            for itc in self._interThreadConns:
+                itc.cleanup()
         self._interThreadConns = []
+        self._directConns = []
+        self._receivingPorts = {}
+        self._metricsRates = {}
+
+    def getDroppedSamples(self):
+        """
+        Return the number of samples which have been discarded by the overflow policies of the inter-thread
+        connections.
+
+        :return: a dict mapping connection names ("<from filter>.<port> -> <to filter>.<port>") to integers
+        """
+        return {itc.objectName(): itc.droppedSamples() for itc in self._interThreadConns}
+
+    def getConnectionMetrics(self):
+        """
+        Return the transport metrics of all connections. The sample rate is a moving average (time constant
+        METRICS_RATE_TAU seconds) updated on each call of this function. See
+        :py:meth:`nexxT.core.PortConnections.InterThreadConnection.metrics` for the other items. For direct
+        (intra-thread) connections, the backlog, the blocking time and the drop counters are always 0 and the width is
+        -1.
+        Inter-thread connections which have been combined into a multicast channel are reported as a single entry. The
+        item "stale" is the number of samples dropped by the receiving input port(s) because they exceeded the maximum
+        sample age (see :py:meth:`nexxT.interface.Ports.InputPortInterface.setMaxSampleAge`).
+
+        :return: a dict mapping connection names ("<from filter>.<port> -> <to filter>.<port>") to metric dicts
+        """
+        res = {}
+        for name, port in self._directConns:
+            res[name] = port.metrics()
+        for itc in self._interThreadConns:
+            res[itc.objectName()] = itc.metrics()
+        for name, metrics in res.items():
+            metrics["stale"] = sum(p.staleSamples() for p in self._receivingPorts.get(name, []))
+        now = time.perf_counter()
+        for name, metrics in res.items():
+            if name in self._metricsRates:
+                lastTime, lastSamples, rate = self._metricsRates[name]
+                dt = now - lastTime
+                if dt > 0:
+                    alpha = 1 - math.exp(-dt/self.METRICS_RATE_TAU)
+                    rate += alpha*((metrics["samples"] - lastSamples)/dt - rate)
+            else:
+                rate = 0.0
+            self._metricsRates[name] = (now, metrics["samples"], rate)
+            metrics["rate"] = rate
+        return res
+
+    def getThreadSettings(self):
+        """
+        Return the effective settings (CPU affinity, priority, scheduling policy and OS-level name) of all threads.
+
+        :return: a dict mapping thread names to dicts as returned by
+                 :py:meth:`nexxT.core.Thread.NexTThread.effectiveSettings`
+        """
+        return {name: thread.effectiveSettings() for name, thread in self._threads.items()}
 
     def getState(self):
         """
@@ -184,13 +260,13 @@ class ActiveApplication(QObject):
                 for idx in range(len(proxy[compName, fromPort])):
                     if proxy[compName, fromPort][idx] is None:
                         continue
-                    proxyNode, proxyPort, w = proxy[compName, fromPort][idx]
+                    proxyNode, proxyPort, p = proxy[compName, fromPort][idx]
                     # if fromNode is itself a composite node, resolve it
                     if (proxyNode, proxyPort) in proxy:
                         changed = True
                         proxy[compName, fromPort][idx] = None
-                        for _, _, widths in proxy[proxyNode, proxyPort]:
-                            widths.extend(w)
+                        for _, _, props in proxy[proxyNode, proxyPort]:
+                            props.extend(p)
                         proxy[compName, fromPort].extend(proxy[proxyNode, proxyPort])
         # remove None's
         for compName, fromPort in proxy:
@@ -214,20 +290,54 @@ class ActiveApplication(QObject):
             for fromPort in subgraph.allOutputPorts(cin_node):
                 proxyInputPorts[compName, fromPort] = []
                 for _, _, toNode, toPort in subgraph.allConnectionsFromOutputPort(cin_node, fromPort):
-                    width = subgraph.getConnectionProperties(cin_node, fromPort, toNode, toPort)["width"]
-                    proxyInputPorts[compName, fromPort].append((compName + "/" + toNode, toPort, [width]))
+                    props = subgraph.getConnectionProperties(cin_node, fromPort, toNode, toPort)
+                    proxyInputPorts[compName, fromPort].append((compName + "/" + toNode, toPort, [props]))
                 proxyOutputPorts[compName + "/" + cin_node, fromPort] = []
             cout_node = "CompositeOutput"
             for toPort in subgraph.allInputPorts(cout_node):
                 proxyOutputPorts[compName, toPort] = []
                 for fromNode, fromPort, _, _ in subgraph.allConnectionsToInputPort(cout_node, toPort):
-                    width = subgraph.getConnectionProperties(fromNode, fromPort, cout_node, toPort)["width"]
-                    proxyOutputPorts[compName, toPort].append((compName + "/" + fromNode, fromPort, [width]))
+                    props = subgraph.getConnectionProperties(fromNode, fromPort, cout_node, toPort)
+                    proxyOutputPorts[compName, toPort].append((compName + "/" + fromNode, fromPort, [props]))
                 proxyInputPorts[compName + "/" + cout_node, toPort] = []
 
         return self._compress(proxyInputPorts), self._compress(proxyOutputPorts)
 
 
+    @staticmethod
+    def _mergeConnectionProperties(propList):
+        """
+        merge the properties of connection segments which are joined through composite filters into the properties of
+        the resulting connection.
+
+        :param propList: a list of connection property dicts
+        :return: a connection property dict
+        """
+        widths = set(p["width"] for p in propList)
+        transports = set(p.get("transport", "qt") for p in propList)
+        overflows = set(p.get("overflow", "block") for p in propList)
+        # a non-blocking policy of any segment wins, the most lossy policy is used in case of conflicts
+        overflow = ([o for o in ["keep-latest", "drop-newest", "timeout"] if o in overflows] + ["block"])[0]
+        timeouts = [p.get("overflowTimeout", 0.1) for p in propList if p.get("overflow", "block") == "timeout"]
+        # the strictest max. age of all segments is used
+        maxAges = [p.get("maxAge", 0.0) for p in propList if p.get("maxAge", 0.0) > 0]
+        # the automatic width of any segment wins, the narrowest bounds and the strictest target latency are used
+        autos = [p for p in propList if p.get("autoWidth", False)]
+        minWidth = max((p.get("minWidth", 1) for p in autos), default=1)
+        maxWidth = max(minWidth, min((p.get("maxWidth", 64) for p in autos), default=64))
+        latencies = [p.get("targetLatency", 0.0) for p in autos if p.get("targetLatency", 0.0) > 0]
+        return dict(width=0 if 0 in widths else max(widths),
+                    batched=any(p.get("batched", False) for p in propList),
+                    transport="spsc" if "spsc" in transports else "qt",
+                    overflow=overflow,
+                    overflowTimeout=min(timeouts) if len(timeouts) > 0 else 0.1,
+                    maxAge=min(maxAges) if len(maxAges) > 0 else 0.0,
+                    priority="high" if any(p.get("priority", "normal") == "high" for p in propList) else "normal",
+                    autoWidth=len(autos) > 0,
+                    minWidth=minWidth,
+                    maxWidth=maxWidth,
+                    targetLatency=min(latencies) if len(latencies) > 0 else 0.0)
+
     def _allConnections(self):
         """
         return all connections of this application including the connections from and to composite nodes
@@ -238,26 +348,44 @@ class ActiveApplication(QObject):
 
         for namePrefix, graph in allGraphs:
             for fromNode, fromPort, toNode, toPort in graph.allConnections():
-                width = graph.getConnectionProperties(fromNode, fromPort, toNode, toPort)["width"]
+                props = graph.getConnectionProperties(fromNode, fromPort, toNode, toPort)
                 fromName = namePrefix + "/" + fromNode
                 toName = namePrefix + "/" + toNode
 
                 if (fromName, fromPort) in proxyOutputPorts:
                     src = proxyOutputPorts[fromName, fromPort]
                 else:
-                    src = [(fromName, fromPort, [width])]
+                    src = [(fromName, fromPort, [props])]
 
                 if (toName, toPort) in proxyInputPorts:
                     dest = proxyInputPorts[toName, toPort]
                 else:
-                    dest = [(toName, toPort, [width])]
+                    dest = [(toName, toPort, [props])]
 
                 for s in src:
                     for d in dest:
-                        widths = set(s[2] + d[2] + [width])
-                        res.append((s[:2] + d[:2], 0 if 0 in widths else max(widths)))
+                        res.append((s[:2] + d[:2], self._mergeConnectionProperties(s[2] + d[2] + [props])))
         return res
 
+    @staticmethod
+    def _applyMaxAge(inputPort, maxAge):
+        """
+        Apply the connection property maxAge to the receiving input port (related to the arrival time of the
+        samples). A maximum age set by the filter itself takes precedence; in case of multiple connections to the same
+        port, the smallest maximum age is used.
+
+        :param inputPort: the receiving input port instance
+        :param maxAge: the maximum age of the samples in seconds (0 disables the check)
+        :return: None
+        """
+        if maxAge <= 0:
+            return
+        current = inputPort.maxSampleAge()
+        if current is None or current <= 0:
+            inputPort.setMaxSampleAge(maxAge, "arrival")
+        elif inputPort.maxSampleAgeReference() == "arrival" and maxAge < current:
+            inputPort.setMaxSampleAge(maxAge, "arrival")
+
     def _setupConnections(self):
         """
         Setup the connections for actual datasample transport. It is assumed that connections are fixed during the
@@ -268,18 +396,47 @@ class ActiveApplication(QObject):
         graph = {}
         if self._graphConnected:
             return
-        for (fromNode, fromPort, toNode, toPort), width in self._allConnections():
+        limits = self._graph.getSubConfig().getConfiguration().memoryGovernorSettings()
+        if len(limits) > 0:
+            MemoryGovernor.setLimits(**limits)
+        for name in self._memoryGoverned:
+            for port in self._threads[self._filters2threads[name]].getFilter(name).getAllOutputPorts():
+                port.setMemoryGoverned(True)
+        # inter-thread connections from the same output port to the same thread are grouped into multicast
+        # connections, so that the samples are transported only once to the destination thread
+        multicastGroups = {}
+        for (fromNode, fromPort, toNode, toPort), props in self._allConnections():
+            width = props["width"]
+            if props["autoWidth"]:
+                # the initial width is clamped to the bounds, connections with automatic width are never infinite
+                width = min(max(width, props["minWidth"]), props["maxWidth"])
             fromThread = self._filters2threads[fromNode]
             toThread = self._filters2threads[toNode]
             t0 = self._threads[fromThread]
             p0 = t0.getFilter(fromNode).getPort(fromPort, OutputPortInterface)
             t1 = self._threads[toThread]
             p1 = t1.getFilter(toNode).getPort(toPort, InputPortInterface)
-            if toThread == fromThread:
+            self._applyMaxAge(p1, props["maxAge"])
+            if toThread == fromThread and isProcessThread(fromThread):
+                # both filters are executed in the worker process of the thread
+                t0.setupDirectConnection(fromNode, fromPort, toNode, toPort)
+            elif toThread == fromThread:
                 OutputPortInterface.setupDirectConnection(p0, p1)
+                self._directConns.append((f"{fromNode}.{fromPort} -> {toNode}.{toPort}", p0))
+                self._receivingPorts[f"{fromNode}.{fromPort} -> {toNode}.{toPort}"] = [p1]
             else:
-                itc = OutputPortInterface.setupInterThreadConnection(p0, p1, self._threads[fromThread].qthread(), width)
-                self._interThreadConns.append(itc)
+                if isProcessThread(fromThread):
+                    # the samples of the worker process are transmitted by the proxy filter
+                    t0.exportOutputPort(fromNode, fromPort)
+                if (props["overflow"] == "block" or width == 0) and not props["autoWidth"]:
+                    # the samples are transmitted to all input ports of a multicast connection, so connections
+                    # which might drop samples or change their width are not grouped
+                    key = (fromNode, fromPort, toThread, props["batched"], props["transport"], props["priority"])
+                else:
+                    key = (fromNode, fromPort, toNode, toPort)
+                if key not in multicastGroups:
+                    multicastGroups[key] = (p0, fromThread, toThread, props, [])
+                multicastGroups[key][-1].append((toNode, toPort, p1, width))
                 if not fromThread in graph:
                     graph[fromThread] = set()
                 if not toThread in graph:
@@ -287,6 +444,27 @@ class ActiveApplication(QObject):
                 if width > 0:
                     graph[fromThread].add(toThread)
 
+        for (fromNode, fromPort, *_), (p0, fromThread, toThread, props, receivers) in multicastGroups.items():
+            if len(receivers) == 1:
+                toNode, toPort, p1, width = receivers[0]
+                itc = OutputPortInterface.setupInterThreadConnection(p0, p1, self._threads[fromThread].qthread(),
+                                                                     width)
+            else:
+                itc = OutputPortInterface.setupInterThreadMulticast(p0, self._threads[fromThread].qthread(),
+                                                                    self._threads[toThread].qthread())
+                for _, _, p1, width in receivers:
+                    itc.addMulticastReceiver(p1, width)
+            itc.setBatched(props["batched"])
+            itc.setTransport(props["transport"])
+            itc.setOverflowPolicy(props["overflow"], props["overflowTimeout"])
+            itc.setPriority(props["priority"])
+            if props["autoWidth"]:
+                itc.setAutoWidth(props["minWidth"], props["maxWidth"], props["targetLatency"])
+            itc.setObjectName(f"{fromNode}.{fromPort} -> " +
+                              ", ".join(f"{toNode}.{toPort}" for toNode, toPort, _, _ in receivers))
+            self._interThreadConns.append(itc)
+            self._receivingPorts[itc.objectName()] = [p1 for _, _, p1, _ in receivers]
+
         def _checkCycle(thread, cycleInfo):
             if thread in cycleInfo:
                 cycle = "->".join(cycleInfo[cycleInfo.index(thread):] + [thread])
@@ -439,6 +617,17 @@ class ActiveApplication(QObject):
         for itc in self._interThreadConns:
             # set connections in active mode.
             itc.setStopped(True)
+        for name, dropped in self.getDroppedSamples().items():
+            if dropped > 0:
+                logger.warning("Inter-thread connection %s: %d samples dropped by overflow policy.", name, dropped)
+        for itc in self._interThreadConns:
+            if itc.autoWidth():
+                logger.info("Inter-thread connection %s: automatic width settled at %d.", itc.objectName(), itc.width())
+        if len(self._memoryGoverned) > 0:
+            stats = MemoryGovernor.statistics()
+            if stats["throttleEvents"] > 0:
+                logger.warning("Memory governor: throttled %d times, %d samples dropped, blocked for %.3f s.",
+                               stats["throttleEvents"], stats["dropped"], stats["blockingTime"])
         self.performOperation.emit("stop", Barrier(len(self._threads)))
         while self._state == FilterState.STOPPING:
             logger.internal("stopping ... %s", FilterState.state2str(self._state))
@@ -32,7 +32,7 @@ from nexxT.services.ConsoleLogger import ConsoleLogger
 from nexxT.services.SrvConfiguration import MVCConfigurationBase
 from nexxT.services.SrvPlaybackControl import PlaybackControlConsole
 from nexxT.services.SrvRecordingControl import MVCRecordingControlBase
-from nexxT.services.SrvProfiling import ProfilingServiceDummy
+from nexxT.services.SrvProfiling import ProfilingServiceDummy, ProfilingService
 from nexxT.services.gui.GuiLogger import GuiLogger
 from nexxT.services.gui.MainWindow import MainWindow
 from nexxT.services.gui.Configuration import MVCConfigurationGUI
@@ -42,17 +42,21 @@ from nexxT.services.gui.Profiling import Profiling
 
 logger = logging.getLogger(__name__)
 
-def setupConsoleServices(config):
+def setupConsoleServices(config, enableProfiling=False):
     """
     Adds services available in console mode.
     :param config: a nexxT.core.Configuration instance
+    :param enableProfiling: if True, the profiling service is used instead of the dummy replacement
     :return: None
     """
     Services.addService("Logging", ConsoleLogger())
     Services.addService("PlaybackControl", PlaybackControlConsole(config))
     Services.addService("RecordingControl", MVCRecordingControlBase(config))
     Services.addService("Configuration", MVCConfigurationBase(config))
-    Services.addService("Profiling", ProfilingServiceDummy())
+    if enableProfiling:
+        Services.addService("Profiling", ProfilingService())
+    else:
+        Services.addService("Profiling", ProfilingServiceDummy())
 
 def setupGuiServices(config, disableProfiling=False):
     """
@@ -71,12 +75,41 @@ def setupGuiServices(config, disableProfiling=False):
     else:
         Services.addService("Profiling", ProfilingServiceDummy())
 
+def logPortStatisticsOnStop(config):
+    """
+    Enables port profiling and logs the port statistics of the profiling service each time the active application has
+    been stopped.
+    :param config: a nexxT.core.Configuration instance
+    :return: None
+    """
+    srvprof = Services.getService("Profiling")
+    srvprof.setPortProfilingEnabled(True)
+    active = False
+
+    def stateChanged(state):
+        nonlocal active
+        if state == FilterState.ACTIVE:
+            active = True
+        elif state == FilterState.OPENED and active:
+            active = False
+            srvprof.logPortStatistics()
+            srvprof.resetPortStatistics()
+
+    def appActivated(name, app): # pylint: disable=unused-argument
+        if app is not None:
+            app.stateChanged.connect(stateChanged)
+
+    config.appActivated.connect(appActivated)
+
 def startNexT(cfgfile, active, execScripts, execCode, withGui, singleThreaded=False, disableUnloadHeuristic=False,
-              disableProfiling=False, saveMemory=False):
+              disableProfiling=False, saveMemory=False, traceFile=None, portStatistics=False):
     """
     Starts next with the given config file and activates the given application.
     :param cfgfile: path to config file
     :param active: active application (if None, the first application in the config will be used)
+    :param traceFile: if not None, profiling data is captured from startup until exit and written to this file in the
+                      Chrome Trace Event format
+    :param portStatistics: if True, the port statistics are logged when the active application is stopped
     :return: None
     """
     logger.debug("Starting nexxT...")
@@ -94,7 +127,12 @@ def startNexT(cfgfile, active, execScripts, execCode, withGui, singleThreaded=Fa
         app = QCoreApplication() if QCoreApplication.instance() is None else QCoreApplication.instance()
         app.setOrganizationName("nexxT")
         app.setApplicationName("nexxT")
-        setupConsoleServices(config)
+        setupConsoleServices(config, enableProfiling=traceFile is not None or portStatistics)
+
+    if traceFile is not None:
+        Services.getService("Profiling").startTraceCapture()
+    if portStatistics:
+        logPortStatisticsOnStop(config)
 
     ActiveApplication.singleThreaded = singleThreaded
     PythonLibrary.disableUnloadHeuristic = disableUnloadHeuristic
@@ -148,6 +186,8 @@ def startNexT(cfgfile, active, execScripts, execCode, withGui, singleThreaded=Fa
     res = nexxT.Qt.call_exec(app)
     logger.debug("closing config")
     config.close()
+    if traceFile is not None:
+        Services.getService("Profiling").stopTraceCapture(traceFile)
     cleanup()
 
     logger.internal("app.exec returned")
@@ -200,6 +240,12 @@ NEXXT_BLACKLISTED_PACKAGES:
     parser.add_argument("-sm", "--save-memory", action="store_true",
                         help="only meaningful with a given .json configuration and an selected application (--active): "
                              "discard all other applications from the configuration and load only the given one.")
+    parser.add_argument("-tr", "--trace", default=None, type=str,
+                        help="capture profiling data until exit and write it to the given file in the Chrome Trace "
+                             "Event format (viewable in chrome://tracing or https://ui.perfetto.dev).")
+    parser.add_argument("-ps", "--port-statistics", action="store_true", default=False,
+                        help="log the service time, inter-arrival time and queue wait statistics of the input ports "
+                             "when the application is stopped.")
 
     def str2bool(value):
         if isinstance(value, bool):
@@ -232,10 +278,13 @@ NEXXT_BLACKLISTED_PACKAGES:
 
     if args.save_memory and (args.cfg is None or args.active is None):
         raise RuntimeError("saveMemory needs a configuration file and an active application given on command line.")
+    if (args.trace is not None or args.port_statistics) and args.gui and args.no_profiling:
+        parser.error("Trace capture and port statistics need profiling support.")
 
     startNexT(args.cfg, args.active, args.execscript, args.execpython, withGui=args.gui,
               singleThreaded=args.single_threaded, disableUnloadHeuristic=args.disable_unload_heuristic,
-              disableProfiling=args.no_profiling, saveMemory=args.save_memory)
+              disableProfiling=args.no_profiling, saveMemory=args.save_memory, traceFile=args.trace,
+              portStatistics=args.port_statistics)
 
 def mainConsole():
     """
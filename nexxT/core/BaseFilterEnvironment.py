@@ -13,6 +13,7 @@ from nexxT.Qt.QtCore import QObject, QThread
 from nexxT import useCImpl
 from nexxT.interface import FilterState
 from nexxT.core.Exceptions import NexTInternalError, UnexpectedFilterState
+from nexxT.core.WorkerPool import WorkerTask, WorkerPool
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +30,10 @@ else:
         """
         def _assertMyThread(self):
             if QThread.currentThread() is not self._thread:
-                raise NexTInternalError("Function is called from unexpected thread")
+                # worker threads of stateless filters act on behalf of the filter's thread
+                task = WorkerTask.current()
+                if task is None or task.environment is not self:
+                    raise NexTInternalError("Function is called from unexpected thread")
 
         def __init__(self, propertyCollection):
             super().__init__()
@@ -38,6 +42,8 @@ else:
             self._propertyCollection = propertyCollection
             self._dynamicInputPortsSupported = False
             self._dynamicOutputPortsSupported = False
+            self._workers = None
+            self._dispatcher = None
 
         def setPlugin(self, plugin):
             """
@@ -117,12 +123,57 @@ else:
                     raise UnexpectedFilterState(self._state, "portDataChanged")
                 logger.info("DataSample discarded because application has been stopped already.")
                 return
+            if self._workers is not None:
+                self._workers.dispatch(inputPort)
+                return
+            if self._dispatcher is not None:
+                self._dispatcher.dispatch(inputPort)
+                return
             try:
                 self._plugin.onPortDataChanged(inputPort)
             except Exception: # pylint: disable=broad-except
                 # catching a general exception is exactly what is wanted here
                 logger.exception("Uncaught exception")
 
+        def setWorkerThreads(self, numThreads):
+            """
+            Declares the filter as stateless (reentrant) and executes its onPortDataChanged(...) method in a pool of
+            numThreads worker threads. The samples transmitted by the filter are re-sequenced into input order. Must be
+            called in the filter's thread while the filter is not active.
+            :param numThreads: the number of worker threads (0 disables the worker pool)
+            :return: None
+            """
+            if self._workers is not None:
+                self._workers.shutdown()
+                self._workers = None
+            if numThreads > 0:
+                self._workers = WorkerPool(self, numThreads)
+
+        def workerThreads(self):
+            """
+            Return the number of worker threads.
+            :return: an integer (0 if the worker pool is disabled)
+            """
+            return 0 if self._workers is None else self._workers.numThreads()
+
+        def waitForWorkers(self):
+            """
+            Wait until all pending onPortDataChanged(...) calls of the worker threads are finished and transmit their
+            outputs.
+            :return: None
+            """
+            if self._workers is not None:
+                self._workers.waitForDone()
+
+        def setPortDataDispatcher(self, dispatcher):
+            """
+            Installs an object whose dispatch(inputPort) method is called instead of the filter's onPortDataChanged(...)
+            (used for the process pools of python filters).
+            :param dispatcher: a QObject instance with a dispatch(QObject) slot or None to call the filter again
+            :return: None
+            """
+            self._dispatcher = dispatcher
+
         def getFullQualifiedName(self):
             """
             Returns the fully qualified name of this filter.
@@ -377,9 +377,18 @@ class BaseGraph(QObject):
             raise ConnectionNotFound(nodeFrom, portFrom, nodeTo, portTo)
         return self._connectionProps[nodeFrom, portFrom, nodeTo, portTo].copy()
 
+    def getDefaultConnectionProperties(self):
+        """
+        Return the default properties of new connections
+
+        :return: a copy of the default property dict
+        """
+        return self._defaultConnProp.copy()
+
     def setConnectionProperties(self, nodeFrom, portFrom, nodeTo, portTo, properties):
         """
-        Set the connection properties of the specified connection to the given dict.
+        Set the connection properties of the specified connection to the given dict. Properties which are not
+        contained in the dict are set to their default values.
 
         :param nodeFrom: name of the output node
         :param portFrom: name of the output port
@@ -389,7 +398,9 @@ class BaseGraph(QObject):
         """
         if (nodeFrom, portFrom, nodeTo, portTo) not in self._connectionProps:
             raise ConnectionNotFound(nodeFrom, portFrom, nodeTo, portTo)
-        self._connectionProps[nodeFrom, portFrom, nodeTo, portTo] = properties
+        props = self._defaultConnProp.copy()
+        props.update(properties)
+        self._connectionProps[nodeFrom, portFrom, nodeTo, portTo] = props
         self.dirtyChanged.emit()
 
     def allInputPorts(self, node):
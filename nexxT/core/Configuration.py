@@ -72,6 +72,8 @@ class Configuration(QObject):
         self._applications = []
         self._propertyCollection = self._defaultRootPropColl()
         self._guiState = PropertyCollectionImpl("_guiState", self._propertyCollection)
+        self._threadSettings = {}
+        self._memoryGovernorSettings = {}
         self._dirty = False
 
     @Slot(bool)
@@ -110,6 +112,8 @@ class Configuration(QObject):
         for a in self._applications:
             self.subConfigRemoved.emit(a.getName(), self.CONFIG_TYPE_APPLICATION)
         self._applications = []
+        self._threadSettings = {}
+        self._memoryGovernorSettings = {}
         self._propertyCollection.deleteLater()
         self._propertyCollection = self._defaultRootPropColl()
         self.configNameChanged.emit(None)
@@ -163,6 +167,8 @@ class Configuration(QObject):
             if "variables" in cfg:
                 for k in cfg["variables"]:
                     variables[k] = cfg["variables"][k]
+            self._threadSettings = {name: dict(settings) for name, settings in cfg.get("threads", {}).items()}
+            self._memoryGovernorSettings = dict(cfg.get("memoryGovernor", {}))
             for cfg_cf in cfg["composite_filters"]:
                 compositeLookup(cfg_cf["name"])
             for cfg_app in cfg["applications"]:
@@ -199,6 +205,10 @@ class Configuration(QObject):
                 k: variables.getraw(k)
                 for k in variables.keys() if not variables.isReadonly(k)
             }
+        if len(self._threadSettings) > 0:
+            cfg["threads"] = {name: dict(settings) for name, settings in self._threadSettings.items()}
+        if len(self._memoryGovernorSettings) > 0:
+            cfg["memoryGovernor"] = dict(self._memoryGovernorSettings)
         cfg["composite_filters"] = [cf.save() for cf in self._compositeFilters]
         cfg["applications"] = [app.save() for app in self._applications]
         self.configNameChanged.emit(cfg["CFGFILE"])
@@ -222,6 +232,46 @@ class Configuration(QObject):
         """
         return self._propertyCollection
 
+    def threadSettings(self, threadName):
+        """
+        Return the settings of a thread (CPU affinity, priority, scheduling policy and OS-level name).
+        :param threadName: the name of the thread
+        :return: a dict (see :py:func:`nexxT.core.Thread.applyThreadSettings`), empty if there are no settings
+        """
+        return dict(self._threadSettings.get(threadName, {}))
+
+    def setThreadSettings(self, threadName, settings):
+        """
+        Set the settings of a thread. The settings are applied when the application is activated the next time.
+        :param threadName: the name of the thread
+        :param settings: a dict (see :py:func:`nexxT.core.Thread.applyThreadSettings`), empty or None to remove the
+                         settings
+        :return: None
+        """
+        if settings:
+            self._threadSettings[threadName] = dict(settings)
+        else:
+            self._threadSettings.pop(threadName, None)
+        self.setDirty()
+
+    def memoryGovernorSettings(self):
+        """
+        Return the limits of the memory governor.
+        :return: a dict with the arguments of :py:meth:`nexxT.interface.DataSamples.MemoryGovernor.setLimits`, empty if
+                 the governor is not configured
+        """
+        return dict(self._memoryGovernorSettings)
+
+    def setMemoryGovernorSettings(self, settings):
+        """
+        Set the limits of the memory governor. The limits are applied when the application is activated the next time.
+        :param settings: a dict with the arguments of :py:meth:`nexxT.interface.DataSamples.MemoryGovernor.setLimits`,
+                         empty or None to remove the settings
+        :return: None
+        """
+        self._memoryGovernorSettings = dict(settings) if settings else {}
+        self.setDirty()
+
     def guiState(self):
         """
         Return the per-config gui state.
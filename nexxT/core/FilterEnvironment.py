@@ -11,7 +11,7 @@ This module defines the class FilterEnvironment.
 import copy
 import logging
 from nexxT.Qt.QtCore import Signal, QRecursiveMutex, QMutexLocker
-from nexxT.interface import FilterState, InputPortInterface, OutputPortInterface
+from nexxT.interface import FilterState, InputPortInterface, OutputPortInterface, Services
 from nexxT import useCImpl
 from nexxT.core.BaseFilterEnvironment import BaseFilterEnvironment
 from nexxT.core.PluginManager import PluginManager
@@ -35,6 +35,7 @@ class FilterEnvironment(BaseFilterEnvironment): # pylint: disable=too-many-publi
         self._portMutex = QRecursiveMutex()
         self._ports = []
         self._mockup = mockup
+        self._processPool = None
         self._state = FilterState.CONSTRUCTING
         if library is not None:
             plugin = PluginManager.singleton().create(library, factoryFunction, self)
@@ -66,11 +67,53 @@ class FilterEnvironment(BaseFilterEnvironment): # pylint: disable=too-many-publi
                 self.close()
             if self._state == FilterState.INITIALIZED:
                 self.deinit()
+            self.setWorkerThreads(0)
+            self.setWorkerProcesses(0)
             if not self._state in [FilterState.CONSTRUCTED, FilterState.DESTRUCTING]:
                 raise FilterStateMachineError(self._state, FilterState.DESTRUCTING)
             self._state = FilterState.DESTRUCTING
         self.resetPlugin()
 
+    def setWorkerProcesses(self, numProcesses, spec=None):
+        """
+        Executes the onPortDataChanged(...) method of this python filter in a pool of numProcesses worker processes,
+        each having its own instance of the filter. The samples transmitted by the worker processes are re-sequenced
+        into input order. Must be called in the filter's thread while the filter is not active.
+        :param numProcesses: the number of worker processes (0 disables the process pool)
+        :param spec: the filter information returned by nexxT.core.ProcessThread.filterSpec(...)
+        :return: None
+        """
+        # pylint: disable=import-outside-toplevel
+        # pylint: disable=cyclic-import
+        from nexxT.core.ProcessPool import ProcessPool
+        plugin = self.getPlugin()
+        if useCImpl and plugin is not None:
+            plugin = plugin.data()
+        if self._processPool is not None:
+            self.setPortDataDispatcher(None)
+            self._processPool.shutdown()
+            self._processPool = None
+        if numProcesses > 0 and plugin is not None:
+            self._processPool = ProcessPool(self, numProcesses, spec)
+            self.setPortDataDispatcher(self._processPool)
+
+    def workerProcesses(self):
+        """
+        Return the number of worker processes.
+        :return: an integer (0 if the process pool is disabled)
+        """
+        return 0 if self._processPool is None else self._processPool.numProcesses()
+
+    def waitForWorkers(self):
+        """
+        Wait until all pending onPortDataChanged(...) calls of the worker threads and processes are finished and
+        transmit their outputs.
+        :return: None
+        """
+        super().waitForWorkers()
+        if self._processPool is not None:
+            self._processPool.waitForDone()
+
     def __enter__(self):
         return self
 
@@ -279,6 +322,9 @@ class FilterEnvironment(BaseFilterEnvironment): # pylint: disable=too-many-publi
         fromState, _, _ = operations[operation]
         if self._state != fromState:
             raise FilterStateMachineError(self._state, operation)
+        if operation == FilterState.STOPPING:
+            # finish the pending calls of stateless filters while the filter is still active
+            self.waitForWorkers()
         self._state = operation
 
     def _stateTransition(self, operation):
@@ -305,9 +351,11 @@ class FilterEnvironment(BaseFilterEnvironment): # pylint: disable=too-many-publi
         # filters must be either in fromState or already in operation state (if preStateTransition has been used)
         if self._state not in (fromState, operation):
             raise FilterStateMachineError(self._state, operation)
+        if operation == FilterState.STOPPING:
+            self.waitForWorkers()
         self._state = operation
         try:
-            function()
+            self._profiledCall(function)
         except Exception: # pylint: disable=broad-except
             # What should be done on errors?
             #    1. inhibit state transition to higher state
@@ -324,6 +372,31 @@ class FilterEnvironment(BaseFilterEnvironment): # pylint: disable=too-many-publi
                              FilterState.state2str(operation),
                              self.propertyCollection().objectName())
         self._state = toState
+        if self._processPool is not None:
+            self._processPool.transition(operation)
+
+    def _profiledCall(self, function):
+        """
+        Call the given lifecycle callback of the filter, the call is recorded by the profiling service if port
+        profiling is enabled.
+        :param function: the bound callback
+        :return: None
+        """
+        try:
+            srvprof = Services.getService("Profiling")
+            if hasattr(srvprof, "data") and srvprof.data() is None:
+                srvprof = None
+        except KeyError:
+            srvprof = None
+        if srvprof is None or not srvprof.portProfilingEnabled:
+            function()
+            return
+        name = self.getFullQualifiedName() + "/" + function.__name__
+        srvprof.beforeLifecycleCallback(name)
+        try:
+            function()
+        finally:
+            srvprof.afterLifecycleCallback(name)
 
     def init(self):
         """
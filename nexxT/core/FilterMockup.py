@@ -36,13 +36,23 @@ class FilterMockup(FilterEnvironment):
         tmpPc = PropertyCollectionImpl("__temp", propertyCollection)
         with FilterEnvironment(self._library, self._factoryFunction, tmpPc, self) as tmpEnv:
             self.updatePortInformation(tmpEnv)
+        # delete the temporary collection here in the main thread instead of leaving it to the garbage collector
         del tmpPc
+        propertyCollection.deleteChild("__temp")
         try:
             # add also a child collection for the nexxT internals
             pc = PropertyCollectionImpl("_nexxT", propertyCollection)
         except PropertyCollectionChildExists:
             pc = propertyCollection.getChildCollection("_nexxT")
         pc.defineProperty("thread", "main", "The thread this filter belongs to.")
+        pc.defineProperty("workerThreads", 0, "The number of worker threads executing onPortDataChanged(...) of this "
+                          "filter concurrently; values > 0 are only allowed for stateless (reentrant) filters.",
+                          options=dict(min=0, max=256))
+        pc.defineProperty("workerProcesses", 0, "The number of worker processes executing onPortDataChanged(...) of "
+                          "this filter in parallel; values > 0 are only allowed for stateless python filters.",
+                          options=dict(min=0, max=64))
+        pc.defineProperty("memoryGoverned", False, "Whether the output ports of this filter are throttled by the "
+                          "memory governor when the memory held by the data samples exceeds the configured limits.")
 
     def getGraph(self):
         """
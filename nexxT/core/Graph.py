@@ -32,7 +32,10 @@ class FilterGraph(BaseGraph):
     dynOutputPortDeleted = Signal(str, str)
 
     def __init__(self, subConfig):
-        super().__init__(defaultConnProp=dict(width=1))
+        super().__init__(defaultConnProp=dict(width=1, batched=False, transport="qt", overflow="block",
+                                              overflowTimeout=0.1, maxAge=0.0,
+                                              priority="normal", autoWidth=False, minWidth=1, maxWidth=64,
+                                              targetLatency=0.0))
         assertMainThread()
         self._parent = subConfig
         self._filters = {}
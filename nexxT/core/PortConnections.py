@@ -0,0 +1,898 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+"""
+This module contains the sample queues of the input ports and the connections transporting data samples between
+threads, which are used by the port implementations in nexxT.core.PortImpl
+"""
+
+from collections import deque
+import logging
+import math
+import time
+from nexxT.Qt.QtCore import QThread, QSemaphore, Signal, QObject, Qt, QMutex, QMutexLocker, QEvent, QCoreApplication
+from nexxT.core.Utils import handleException
+from nexxT.core.Exceptions import NexTRuntimeError, NexTInternalError
+
+logger = logging.getLogger(__name__)
+
+class SampleQueue:
+    """
+    Ring buffer holding the most recent data samples of an input port. Index 0 relates to the most recent sample,
+    larger indices relate to older samples. Adding a sample and evicting the oldest sample are O(1) operations.
+    If no maximum number of samples is given, the capacity grows on demand (amortized O(1)). The sum of the content
+    sizes of the stored samples is tracked incrementally.
+    """
+
+    def __init__(self, maxSamples=None):
+        self._maxSamples = None
+        self._buffer = [None]
+        self._head = 0 # index of the most recent sample in _buffer
+        self._size = 0
+        self._bytes = 0
+        self.setMaxSamples(maxSamples)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self._size
+        if idx < 0 or idx >= self._size:
+            raise IndexError("SampleQueue index out of range")
+        return self._buffer[(self._head - idx) % len(self._buffer)]
+
+    def _reallocate(self, capacity):
+        items = [self[i] for i in range(min(self._size, capacity))]
+        items.reverse()
+        self._buffer = items + [None]*(capacity - len(items))
+        self._size = len(items)
+        self._bytes = sum(item.getContentSize() for item in items)
+        self._head = self._size - 1 if self._size > 0 else 0
+
+    def setMaxSamples(self, maxSamples):
+        """
+        Set the maximum number of samples stored. When the queue is shrinked, the oldest samples are dropped.
+
+        :param maxSamples: an integer > 0 or None for an unlimited number of samples
+        :return: None
+        """
+        if maxSamples is not None and maxSamples <= 0:
+            maxSamples = None
+        self._maxSamples = maxSamples
+        if maxSamples is not None:
+            self._reallocate(maxSamples)
+
+    def push(self, dataSample):
+        """
+        Add a new sample as the most recent item. If the queue is full, the oldest sample is dropped.
+
+        :param dataSample: a DataSample instance
+        :return: None
+        """
+        if self._size == len(self._buffer):
+            if self._maxSamples is None:
+                self._reallocate(2*len(self._buffer))
+            else:
+                self.popOldest()
+        self._head = (self._head + 1) % len(self._buffer)
+        self._buffer[self._head] = dataSample
+        self._size += 1
+        self._bytes += dataSample.getContentSize()
+
+    def snapshot(self):
+        """
+        Return a copy of this queue, which is not affected by subsequent modifications.
+
+        :return: a SampleQueue instance
+        """
+        res = SampleQueue.__new__(SampleQueue)
+        res._maxSamples = self._maxSamples # pylint: disable=protected-access
+        res._buffer = list(self._buffer) # pylint: disable=protected-access
+        res._head = self._head # pylint: disable=protected-access
+        res._size = self._size # pylint: disable=protected-access
+        res._bytes = self._bytes # pylint: disable=protected-access
+        return res
+
+    def contentBytes(self):
+        """
+        Return the sum of the content sizes of the stored samples.
+
+        :return: an integer
+        """
+        return self._bytes
+
+    def popOldest(self):
+        """
+        Remove the oldest sample.
+
+        :return: None
+        """
+        if self._size <= 0:
+            raise IndexError("pop from empty SampleQueue")
+        idx = (self._head - self._size + 1) % len(self._buffer)
+        self._bytes -= self._buffer[idx].getContentSize()
+        self._buffer[idx] = None
+        self._size -= 1
+
+    def evictOlderThan(self, maxAge):
+        """
+        Remove the oldest samples as long as the timestamp difference between the most recent and the oldest
+        sample is larger than maxAge.
+
+        :param maxAge: the maximum timestamp difference in units of DataSample.TIMESTAMP_RES
+        :return: None
+        """
+        if self._size > 0:
+            newest = self[0].getTimestamp()
+            while self._size > 0 and newest - self[self._size-1].getTimestamp() > maxAge:
+                self.popOldest()
+
+    def evictBytes(self, maxBytes):
+        """
+        Remove the oldest samples as long as the sum of the content sizes is larger than maxBytes. The most recent
+        sample is always kept.
+
+        :param maxBytes: the maximum number of content bytes
+        :return: None
+        """
+        while self._size > 1 and self._bytes > maxBytes:
+            self.popOldest()
+
+    def indexOfDelay(self, delayTime):
+        """
+        Return the smallest index i such that the timestamp of sample i is at least delayTime older than the
+        most recent sample. The timestamps are assumed to be monotonically increasing with arrival order, so a
+        binary search is used.
+
+        :param delayTime: the delay in units of DataSample.TIMESTAMP_RES
+        :return: an index which might be len(self) if there is no such sample
+        """
+        if self._size == 0:
+            return 0
+        newest = self[0].getTimestamp()
+        lo = 0
+        hi = self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if newest - self[mid].getTimestamp() < delayTime:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+class InterThreadWakeupEvent(QEvent):
+    """
+    Event posted to the receiving input port by inter-thread connections using the "spsc" transport.
+    """
+    registeredType = QEvent.Type(QEvent.registerEventType())
+
+    def __init__(self, itc):
+        super().__init__(self.registeredType)
+        self.itc = itc
+
+class MainThreadDispatcher(QObject):
+    """
+    Schedules the delivery of inter-thread samples to input ports living in the main thread. Samples are delivered
+    directly as long as the current time slice has budget left. Otherwise they are queued and drained in time-sliced
+    batches by low-priority posted events, so that GUI events are processed in between. Samples arriving while the
+    queue is not empty or while a delivery is in progress (i.e. from nested event loops) are queued as well, so that
+    the sample order is preserved. Samples of high-priority connections are queued in front of the samples of normal
+    connections.
+    """
+    drainEventType = QEvent.Type(QEvent.registerEventType())
+    budget = 0.02
+    _instance = None
+
+    def __init__(self):
+        super().__init__()
+        # items are (port, deliveries, semaphore, enqueueTime, priorityConnection, serviceConnection)
+        self._queue = deque()
+        # number of items of high-priority connections at the front of the queue
+        self._numPriority = 0
+        self._queuedSamples = 0
+        self._busy = 0
+        self._drainPosted = False
+        self._drainRequested = False
+        self._sliceStart = 0.0
+        self._lastDelivery = None
+
+    @staticmethod
+    def instance(create=True):
+        """
+        Returns the dispatcher instance, which is created on first use in the main thread.
+
+        :param create: if False, None is returned in case the instance has not been created yet
+        :return: a MainThreadDispatcher instance or None
+        """
+        if MainThreadDispatcher._instance is None and create:
+            MainThreadDispatcher._instance = MainThreadDispatcher()
+        return MainThreadDispatcher._instance
+
+    def dispatch(self, inputPort, deliveries, semaphore, priorityConnection=None, serviceConnection=None):
+        """
+        Deliver the samples to the given input port either directly or queue them for a later time slice.
+
+        :param inputPort: an InputPortImpl instance living in the main thread
+        :param deliveries: a list of (DataSample instance, enqueue time) tuples, see InterThreadConnection.takePending
+        :param semaphore: a QSemaphore instance or None
+        :param priorityConnection: the InterThreadConnection instance for samples of high-priority connections, None
+                                   otherwise
+        :param serviceConnection: the InterThreadConnection instance to be informed about the processing time of the
+                                  samples (see InterThreadConnection.serviceFinished) or None
+        :return: None
+        """
+        now = time.perf_counter()
+        priority = priorityConnection is not None
+        if self._busy == 0 and (self._numPriority == 0 if priority else len(self._queue) == 0):
+            if self._lastDelivery is None or now - self._lastDelivery > self.budget:
+                # the main thread has been idle in between, start a new time slice
+                self._sliceStart = now
+            if self.budget <= 0 or now - self._sliceStart <= self.budget:
+                self._deliver(inputPort, deliveries, semaphore, serviceConnection)
+                return
+        item = (inputPort, list(deliveries), semaphore, now, priorityConnection, serviceConnection)
+        if priority:
+            self._queue.insert(self._numPriority, item)
+            self._numPriority += 1
+        else:
+            self._queue.append(item)
+        self._queuedSamples += len(deliveries)
+        self._scheduleDrain()
+
+    def purge(self, inputPort, semaphore):
+        """
+        Remove all queued items of a connection, identified by the receiving input port and the semaphore of the
+        connection. For connections without semaphore, all queued items of the input port without semaphore are
+        removed. Called before the connection is discarded.
+
+        :param inputPort: the receiving InputPortImpl instance
+        :param semaphore: a QSemaphore instance or None
+        :return: None
+        """
+        queue = deque()
+        numPriority = self._numPriority
+        for idx, item in enumerate(self._queue):
+            if item[0] is not inputPort or item[2] is not semaphore:
+                queue.append(item)
+            else:
+                self._queuedSamples -= len(item[1])
+                if idx < numPriority:
+                    self._numPriority -= 1
+        self._queue = queue
+
+    def _deliver(self, inputPort, deliveries, semaphore, serviceConnection):
+        self._busy += 1
+        try:
+            inputPort._deliverSamples(deliveries, semaphore, serviceConnection) # pylint: disable=protected-access
+        finally:
+            self._busy -= 1
+            self._lastDelivery = time.perf_counter()
+            if self._busy == 0 and self._drainRequested:
+                self._drainRequested = False
+                self._scheduleDrain()
+
+    def _scheduleDrain(self):
+        if not self._drainPosted:
+            self._drainPosted = True
+            QCoreApplication.postEvent(self, QEvent(self.drainEventType), Qt.LowEventPriority.value)
+
+    def backlog(self):
+        """
+        Returns the current backlog of the main thread.
+
+        :return: a dict with the number of queued samples ("samples") and the age of the oldest queued item in
+                 seconds ("lag")
+        """
+        lag = time.perf_counter() - min(item[3] for item in self._queue) if len(self._queue) > 0 else 0.0
+        return dict(samples=self._queuedSamples, lag=lag)
+
+    def event(self, event):
+        """
+        Overwritten from QObject to drain the queue in time slices.
+
+        :param event: a QEvent instance
+        :return: a boolean
+        """
+        if event.type() != self.drainEventType:
+            return super().event(event)
+        self._drainPosted = False
+        if self._busy > 0:
+            # a nested event loop inside a delivery, continue draining after the delivery has finished
+            self._drainRequested = True
+            return True
+        self._sliceStart = time.perf_counter()
+        while len(self._queue) > 0:
+            if 0 < self.budget < time.perf_counter() - self._sliceStart:
+                break
+            inputPort, deliveries, semaphore, _, priorityConnection, serviceConnection = self._queue.popleft()
+            self._numPriority = max(0, self._numPriority - 1)
+            self._queuedSamples -= len(deliveries)
+            self._busy += 1
+            t0 = time.perf_counter_ns()
+            try:
+                # pylint: disable=protected-access
+                inputPort._receiveAsyncSamples(deliveries, semaphore, True, serviceConnection=serviceConnection)
+            finally:
+                self._busy -= 1
+                self._lastDelivery = time.perf_counter()
+                if priorityConnection is not None:
+                    priorityConnection.priorityDeliveryFinished(t0, time.perf_counter_ns())
+        if len(self._queue) > 0:
+            # yield to the event loop and continue with the next time slice afterwards
+            self._scheduleDrain()
+        return True
+
+class InterThreadConnection(QObject):
+    """
+    Helper class for transmitting data samples between threads.
+
+    In batched mode, samples are collected in a pending list and the consumer is notified with a single queued event
+    for all samples which arrived while the consumer was busy. Each sample still occupies one slot of the connection's
+    width until it has been processed by the consumer.
+
+    The "spsc" transport uses a single producer / single consumer queue instead of the Qt signal/slot mechanism and
+    wakes up the receiving port with a posted event only if there is no wakeup pending already. In the C++
+    implementation the queue is lock-free, here a deque is used. Samples are always delivered in batches.
+
+    The overflow policy controls the behaviour when all slots of a width-limited connection are occupied:
+
+    - "block": the producer waits until a slot is free (default)
+    - "drop-newest": the new sample is discarded
+    - "timeout": the producer waits at most overflowTimeout seconds for a free slot, otherwise the new sample is
+      discarded
+    - "keep-latest": the oldest pending sample is replaced by the new sample, so that the producer never blocks. In
+      this mode, the samples are collected in the pending list of the batched mode (independent of the transport)
+      and the pending list is limited by the width of the connection instead of the semaphore.
+
+    The number of discarded samples is counted per connection (see droppedSamples()). Additional transport metrics
+    are available through metrics().
+
+    Connections with "high" priority wake up the receiving port with events posted with high priority, so that their
+    samples are delivered before the pending deliveries of normal connections in the receiving thread's event queue.
+    As a starvation protection, the wakeup is posted with normal priority if the high-priority deliveries of this
+    connection have occupied the receiving thread more than PRIORITY_SHARE of the time, measured as exponentially
+    decaying average with a time constant of PRIORITY_WINDOW seconds.
+
+    In automatic width mode (see setAutoWidth()), the capacity of the semaphore is adjusted by the producer every
+    AUTO_WIDTH_INTERVAL seconds within the given bounds. The samples of such connections are delivered through the
+    pending list, and the receiving input port reports the time spent for processing them (see serviceFinished()).
+    With a target latency, the width is set to the number of samples the consumer processes within the target
+    latency, so that a full connection doesn't add more latency. This number is measured as the throughput of the
+    connection, limited by the service rate of the consumer (the processed samples per second of processing time).
+    Otherwise the width is doubled whenever the producer had to wait for
+    a free slot or samples were dropped, and it is reduced by one if less than half of the slots have been used.
+    """
+    transmitInterThread = Signal(object, QSemaphore, object)
+    transmitInterThreadBatch = Signal(object, QSemaphore)
+
+    PRIORITY_WINDOW = 0.1
+    PRIORITY_SHARE = 0.5
+    AUTO_WIDTH_INTERVAL = 0.25
+
+    def __init__(self, qthreadFrom, width, receiver=None):
+        super().__init__()
+        self.moveToThread(qthreadFrom)
+        self._width = width
+        self._semaphore = QSemaphore(width) if width > 0 else None
+        self._stopped = True
+        self._batched = False
+        self._pendingMutex = QMutex()
+        self._pending = []
+        self._batchPosted = False
+        self._transport = "qt"
+        self._receiver = receiver
+        self._spscQueue = deque()
+        self._wakeupPending = False
+        self._overflow = "block"
+        self._overflowTimeoutMs = 100
+        self._keepLatest = False
+        self._dropped = 0
+        self._discarded = 0
+        self._samples = 0
+        self._bytes = 0
+        self._blockingNs = 0
+        self._multicastSemaphores = []
+        self._priority = "normal"
+        self._promoted = 0
+        self._demoted = 0
+        self._priorityLastNs = 0
+        self._priorityBusyNs = 0.0
+        self._autoWidth = None
+        self._tuneStart = None
+        self._peakBacklog = 0
+        # written by the consumer's thread, see serviceFinished
+        self._served = 0
+        self._serviceNs = 0
+
+    def receiveSample(self, dataSample):
+        """
+        Receive a sample, called in the source's thread. Uses a semaphore to avoid buffering infinitely.
+        :param dataSample: the sample to be received
+        :return: None
+        """
+        self._receiveSample(dataSample)
+
+    @handleException
+    def _receiveSample(self, dataSample):
+        assert QThread.currentThread() is self.thread()
+        while True:
+            if self._stopped:
+                logger.info("The inter-thread connection is set to stopped mode; data sample discarded.")
+                self._discarded += 1
+                break
+            if self._semaphore is None:
+                if not self._multicastSemaphores or self._acquireMulticast():
+                    self._deliver(dataSample)
+            elif self._keepLatest:
+                self._deliverKeepLatest(dataSample)
+            elif self._overflow == "block":
+                if not self._tryAcquire(self._semaphore, 500):
+                    continue
+                self._deliver(dataSample)
+            elif self._tryAcquire(self._semaphore, self._overflowTimeoutMs if self._overflow == "timeout" else 0):
+                self._deliver(dataSample)
+            else:
+                self._dropped += 1
+            break
+        if self._autoWidth is not None:
+            self._tuneWidth()
+
+    def _tuneWidth(self):
+        # called in the producer's thread after each sample
+        backlog = len(self._pending) if self._keepLatest else self._width - self._semaphore.available()
+        self._peakBacklog = max(self._peakBacklog, backlog)
+        now = time.perf_counter_ns()
+        if self._tuneStart is None:
+            self._tuneStart = (now, self._samples, self._blockingNs, self._dropped, self._served, self._serviceNs)
+            return
+        t0, samples0, blockingNs0, dropped0, served0, serviceNs0 = self._tuneStart
+        if now - t0 < self.AUTO_WIDTH_INTERVAL*1e9:
+            return
+        minWidth, maxWidth, targetLatency = self._autoWidth
+        if targetLatency > 0:
+            rate = (self._samples - samples0)/((now - t0)*1e-9)
+            if self._serviceNs > serviceNs0:
+                # the consumer can't process more samples within the target latency than its service rate allows
+                rate = min(rate, (self._served - served0)/((self._serviceNs - serviceNs0)*1e-9))
+            width = math.ceil(rate*targetLatency)
+        elif self._blockingNs > blockingNs0 or self._dropped > dropped0:
+            width = 2*self._width
+        elif 2*self._peakBacklog < self._width:
+            width = self._width - 1
+        else:
+            width = self._width
+        width = min(max(width, minWidth), maxWidth)
+        if width != self._width:
+            oldWidth = self._width
+            self._resize(width)
+            if self._width != oldWidth:
+                logger.info("Inter-thread connection %s: width %d -> %d", self.objectName(), oldWidth, self._width)
+        self._tuneStart = (now, self._samples, self._blockingNs, self._dropped, self._served, self._serviceNs)
+        self._peakBacklog = 0
+
+    def _resize(self, width):
+        # called in the producer's thread; slots in use can't be removed, so the width might be reduced only partially
+        if width > self._width:
+            self._semaphore.release(width - self._width)
+            self._width = width
+        while self._width > width and self._semaphore.tryAcquire(1):
+            self._width -= 1
+
+    def _tryAcquire(self, semaphore, timeoutMs):
+        # the blocking time is only measured if the slot is not immediately available
+        if semaphore.tryAcquire(1):
+            return True
+        if timeoutMs <= 0:
+            return False
+        t0 = time.perf_counter_ns()
+        res = semaphore.tryAcquire(1, timeoutMs)
+        self._blockingNs += time.perf_counter_ns() - t0
+        return res
+
+    def _acquireMulticast(self):
+        acquired = []
+        for semaphore, _ in self._multicastSemaphores:
+            while not self._tryAcquire(semaphore, 500):
+                if self._stopped:
+                    logger.info("The inter-thread connection is set to stopped mode; data sample discarded.")
+                    self._discarded += 1
+                    for s in acquired:
+                        s.release(1)
+                    return False
+            acquired.append(semaphore)
+        return True
+
+    def _wakeupPriority(self):
+        if self._priority != "high":
+            return Qt.NormalEventPriority.value
+        decay = math.exp(-(time.perf_counter_ns() - self._priorityLastNs)*1e-9/self.PRIORITY_WINDOW)
+        if self._priorityBusyNs*decay < self.PRIORITY_SHARE*self.PRIORITY_WINDOW*1e9:
+            self._promoted += 1
+            return Qt.HighEventPriority.value
+        # starvation protection: the connection has used up its share of the receiving thread
+        self._demoted += 1
+        return Qt.NormalEventPriority.value
+
+    def _deliver(self, dataSample):
+        self._samples += 1
+        self._bytes += dataSample.getContentSize()
+        # the enqueue time is the reference of the queue wait measured by the profiling of the receiving port
+        enqueueNs = time.perf_counter_ns()
+        if self._transport == "spsc":
+            self._spscQueue.append((dataSample, enqueueNs))
+            # only wake up the consumer if there is no wakeup pending
+            if not self._wakeupPending:
+                self._wakeupPending = True
+                QCoreApplication.postEvent(self._receiver, InterThreadWakeupEvent(self), self._wakeupPriority())
+        elif self._batched or self._priority == "high" or self._autoWidth is not None:
+            # the receiving port reports the processing time of auto width connections, so they use the pending list
+            with QMutexLocker(self._pendingMutex):
+                self._pending.append((dataSample, enqueueNs))
+                post = not self._batchPosted
+                self._batchPosted = True
+            if post:
+                if self._priority == "high":
+                    QCoreApplication.postEvent(self._receiver, InterThreadWakeupEvent(self), self._wakeupPriority())
+                else:
+                    self.transmitInterThreadBatch.emit(self, self._semaphore)
+        else:
+            self.transmitInterThread.emit(dataSample, self._semaphore, enqueueNs)
+
+    def _deliverKeepLatest(self, dataSample):
+        self._samples += 1
+        self._bytes += dataSample.getContentSize()
+        with QMutexLocker(self._pendingMutex):
+            if len(self._pending) >= self._width:
+                self._pending.pop(0)
+                self._dropped += 1
+            self._pending.append((dataSample, time.perf_counter_ns()))
+            post = not self._batchPosted
+            self._batchPosted = True
+        if post:
+            if self._priority == "high":
+                QCoreApplication.postEvent(self._receiver, InterThreadWakeupEvent(self), self._wakeupPriority())
+            else:
+                # the pending list is limited by the width, the semaphore is not used
+                self.transmitInterThreadBatch.emit(self, None)
+
+    def takePending(self):
+        """
+        Return and clear the list of pending samples in batched mode. Called in the consumer's thread. Samples
+        arriving afterwards will cause a new batch event.
+
+        :return: a list of (DataSample instance, enqueue time) tuples (oldest first), the enqueue time is the
+                 time.perf_counter_ns() when the sample has been passed to this connection
+        """
+        if self._transport == "spsc" and not self._keepLatest:
+            # reset the flag before draining, samples appended afterwards will cause a new wakeup
+            self._wakeupPending = False
+            res = []
+            while len(self._spscQueue) > 0:
+                res.append(self._spscQueue.popleft())
+            return res
+        with QMutexLocker(self._pendingMutex):
+            res = self._pending
+            self._pending = []
+            self._batchPosted = False
+        return res
+
+    def setBatched(self, batched):
+        """
+        Enable or disable the batched delivery mode. This shall be called before the connection is started.
+
+        :param batched: a boolean
+        :return: None
+        """
+        self._batched = batched
+
+    def batched(self):
+        """
+        Return whether the batched delivery mode is enabled.
+
+        :return: a boolean
+        """
+        return self._batched
+
+    def semaphore(self):
+        """
+        Return the semaphore used for limiting the number of pending samples.
+
+        :return: a QSemaphore instance or None for non-blocking connections
+        """
+        # in keep-latest mode, the pending list is limited by the width, the semaphore is not used
+        return self._semaphore if not self._keepLatest else None
+
+    def setTransport(self, transport):
+        """
+        Set the transport used by this connection. This shall be called before the connection is started.
+
+        :param transport: either "qt" (Qt signal/slot mechanism) or "spsc" (single producer / single consumer queue)
+        :return: None
+        """
+        if transport not in ["qt", "spsc"]:
+            raise NexTRuntimeError(f"Unknown inter-thread transport '{transport}'.")
+        if transport == "spsc" and self._receiver is None:
+            raise NexTRuntimeError("The spsc transport needs a receiver object.")
+        self._transport = transport
+
+    def transport(self):
+        """
+        Return the transport used by this connection.
+
+        :return: a string
+        """
+        return self._transport
+
+    def setPriority(self, priority):
+        """
+        Set the delivery priority of this connection in the receiving thread. This shall be called before the
+        connection is started.
+
+        :param priority: either "normal" or "high"
+        :return: None
+        """
+        if priority not in ["normal", "high"]:
+            raise NexTRuntimeError(f"Unknown connection priority '{priority}'.")
+        if priority == "high" and self._receiver is None:
+            raise NexTRuntimeError("The high priority needs a receiver object.")
+        self._priority = priority
+
+    def priority(self):
+        """
+        Return the delivery priority of this connection.
+
+        :return: a string
+        """
+        return self._priority
+
+    def priorityDeliveryFinished(self, startNs, endNs):
+        """
+        Account the time the receiving thread spent for a delivery of this connection, used for the starvation
+        protection of high-priority connections. Called in the consumer's thread.
+
+        :param startNs: start time of the delivery (time.perf_counter_ns())
+        :param endNs: end time of the delivery (time.perf_counter_ns())
+        :return: None
+        """
+        decay = math.exp(-(endNs - self._priorityLastNs)*1e-9/self.PRIORITY_WINDOW)
+        self._priorityBusyNs = self._priorityBusyNs*decay + (endNs - startNs)
+        self._priorityLastNs = endNs
+
+    def serviceFinished(self, numSamples, startNs, endNs):
+        """
+        Account the time the receiving input port spent for processing samples of this connection, used for the
+        automatic width. Called in the consumer's thread.
+
+        :param numSamples: the number of processed samples
+        :param startNs: start time of the processing (time.perf_counter_ns())
+        :param endNs: end time of the processing (time.perf_counter_ns())
+        :return: None
+        """
+        self._served += numSamples
+        self._serviceNs += endNs - startNs
+
+    def setAutoWidth(self, minWidth, maxWidth, targetLatency=0.0):
+        """
+        Enable the automatic width mode, the width of the connection is adjusted within the given bounds depending on
+        the measured throughput, service time of the consumer, blocking time and backlog. This shall be called before
+        the connection is started and is only possible for width-limited connections to a single input port.
+
+        :param minWidth: the minimum width in DataSamples (>= 1)
+        :param maxWidth: the maximum width in DataSamples (>= minWidth)
+        :param targetLatency: the target latency in seconds; 0 adjusts the width such that the producer neither
+                              blocks nor drops samples
+        :return: None
+        """
+        if self._semaphore is None:
+            raise NexTRuntimeError("The automatic width needs a width-limited connection.")
+        if minWidth < 1 or maxWidth < minWidth:
+            raise NexTRuntimeError(f"Invalid bounds of the automatic width: [{minWidth}, {maxWidth}].")
+        self._autoWidth = (minWidth, maxWidth, max(0.0, targetLatency))
+        self._tuneStart = None
+        self._resize(min(max(self._width, minWidth), maxWidth))
+
+    def autoWidth(self):
+        """
+        Return whether the automatic width mode is enabled.
+
+        :return: a boolean
+        """
+        return self._autoWidth is not None
+
+    def width(self):
+        """
+        Return the current width of the connection.
+
+        :return: the width in DataSamples (0: infinite)
+        """
+        return self._width
+
+    def addMulticastReceiver(self, inputPort, width):
+        """
+        Add an input port to a multicast connection (see OutputPortImpl.setupInterThreadMulticast). This shall be
+        called before the connection is started.
+
+        :param inputPort: the input port instance
+        :param width: the width of the connection to this input port in DataSamples (0: infinite)
+        :return: None
+        """
+        if not isinstance(self._receiver, InterThreadMulticast):
+            raise NexTInternalError("addMulticastReceiver called for a non-multicast connection.")
+        semaphore = self._receiver.addReceiver(inputPort, width)
+        if semaphore is not None:
+            self._multicastSemaphores.append((semaphore, width))
+
+    def setOverflowPolicy(self, policy, timeout=0.1):
+        """
+        Set the behaviour in case all slots of a width-limited connection are occupied. This shall be called before
+        the connection is started.
+
+        :param policy: one of "block", "drop-newest", "keep-latest" or "timeout"
+        :param timeout: the maximum waiting time in seconds for the "timeout" policy
+        :return: None
+        """
+        if policy not in ["block", "drop-newest", "keep-latest", "timeout"]:
+            raise NexTRuntimeError(f"Unknown overflow policy '{policy}'.")
+        self._overflow = policy
+        self._overflowTimeoutMs = max(0, round(timeout*1000))
+        self._keepLatest = policy == "keep-latest" and self._semaphore is not None
+
+    def overflowPolicy(self):
+        """
+        Return the overflow policy of this connection.
+
+        :return: a string
+        """
+        return self._overflow
+
+    def droppedSamples(self):
+        """
+        Return the number of samples which have been discarded by the overflow policy of this connection.
+
+        :return: an integer
+        """
+        return self._dropped
+
+    def metrics(self):
+        """
+        Return the transport metrics of this connection. Note: This method may be called from any thread, the values
+        are not synchronized with each other.
+
+        The returned dict contains the following items:
+
+        - "samples": the number of samples transmitted
+        - "bytes": the number of content bytes transmitted
+        - "backlog": the number of samples transmitted but not yet processed by the consumer (for width-limited
+          connections) or the number of pending samples (non-blocking connections with batched delivery or spsc
+          transport); -1 if not available
+        - "blockingTime": the cumulative time in seconds the producer has been blocked waiting for free slots
+        - "dropped": the number of samples discarded by the overflow policy
+        - "discarded": the number of samples discarded because the connection was stopped
+        - "priority": the delivery priority ("normal" or "high")
+        - "promoted": the number of wakeups of the consumer posted with high priority
+        - "demoted": the number of wakeups of a high-priority connection posted with normal priority by the
+          starvation protection
+        - "width": the current width (the largest width for multicast connections)
+        - "autoWidth": whether the automatic width mode is enabled
+
+        :return: a dict
+        """
+        if self._keepLatest:
+            backlog = len(self._pending)
+        elif self._semaphore is not None:
+            backlog = max(0, self._width - self._semaphore.available())
+        elif len(self._multicastSemaphores) > 0:
+            backlog = max(w - s.available() for s, w in self._multicastSemaphores)
+        elif self._transport == "spsc":
+            backlog = len(self._spscQueue)
+        elif self._batched or self._priority == "high":
+            backlog = len(self._pending)
+        else:
+            backlog = -1
+        return dict(samples=self._samples, bytes=self._bytes, backlog=backlog, blockingTime=self._blockingNs*1e-9,
+                    dropped=self._dropped, discarded=self._discarded, priority=self._priority,
+                    promoted=self._promoted, demoted=self._demoted,
+                    width=max([self._width] + [w for _, w in self._multicastSemaphores]),
+                    autoWidth=self._autoWidth is not None)
+
+    def setStopped(self, stopped):
+        """
+        When the connection is stopped (the default), acquire will not deadlock and there is a warning when samples are
+        transmitted, samples are not forwarded to the input port in this case. Note: This method is thread safe and
+        may be called from any thread.
+        :return:
+        """
+        self._stopped = stopped
+
+    def cleanup(self):
+        """
+        Remove the samples of this connection still waiting for delivery in the main thread. This shall be called
+        before the connection is discarded (the C++ implementation does this in the destructor).
+
+        :return: None
+        """
+        dispatcher = MainThreadDispatcher.instance(create=False)
+        if dispatcher is None:
+            return
+        if isinstance(self._receiver, InterThreadMulticast):
+            for inputPort, semaphore in self._receiver.receivers():
+                dispatcher.purge(inputPort, semaphore)
+        elif self._receiver is not None:
+            dispatcher.purge(self._receiver, self.semaphore())
+
+class InterThreadMulticast(QObject):
+    """
+    Receiving side of an inter-thread connection from one output port to multiple input ports living in the same
+    thread. The samples are transported once and dispatched locally to the input ports. Each input port has its own
+    semaphore, so that the width of the individual connections is preserved; the producer acquires a slot of every
+    width-limited connection before transmitting a sample.
+    """
+
+    def __init__(self, qthreadTo):
+        super().__init__()
+        self.moveToThread(qthreadTo)
+        self._receivers = []
+
+    def addReceiver(self, inputPort, width):
+        """
+        Add an input port to this multicast.
+
+        :param inputPort: the input port instance
+        :param width: the width of the connection in DataSamples (0: infinite)
+        :return: the QSemaphore instance of this connection or None for non-blocking connections
+        """
+        semaphore = QSemaphore(width) if width > 0 else None
+        self._receivers.append((inputPort, semaphore))
+        return semaphore
+
+    def receivers(self):
+        """
+        Return the input ports of this multicast.
+
+        :return: a list of (input port instance, QSemaphore instance or None) tuples
+        """
+        return list(self._receivers)
+
+    def receiveAsync(self, dataSample, semaphore, enqueueNs=None): # pylint: disable=unused-argument
+        """
+        Slot called through the transmitInterThread signal of the inter-thread connection.
+
+        :param dataSample: the transmitted DataSample instance
+        :param semaphore: ignored, the semaphores of the individual connections are used
+        :param enqueueNs: the time.perf_counter_ns() when the sample has been passed to the connection
+        :return: None
+        """
+        for inputPort, portSemaphore in self._receivers:
+            inputPort.receiveAsync(dataSample, portSemaphore, enqueueNs)
+
+    def receiveAsyncBatch(self, interThreadConnection, semaphore): # pylint: disable=unused-argument
+        """
+        Slot called through the transmitInterThreadBatch signal of the inter-thread connection.
+
+        :param interThreadConnection: the InterThreadConnection instance holding the pending samples
+        :param semaphore: ignored, the semaphores of the individual connections are used
+        :return: None
+        """
+        deliveries = interThreadConnection.takePending()
+        itc = interThreadConnection if interThreadConnection.priority() == "high" else None
+        for inputPort, portSemaphore in self._receivers:
+            # pylint: disable=protected-access
+            inputPort._receiveAsyncSamples(deliveries, portSemaphore, priorityConnection=itc)
+
+    def event(self, event):
+        """
+        Overwritten from QObject to handle wakeup events of inter-thread connections.
+
+        :param event: a QEvent instance
+        :return: a boolean
+        """
+        if event.type() == InterThreadWakeupEvent.registeredType:
+            t0 = time.perf_counter_ns()
+            self.receiveAsyncBatch(event.itc, None)
+            event.itc.priorityDeliveryFinished(t0, time.perf_counter_ns())
+            return True
+        return super().event(event)
@@ -9,54 +9,26 @@ This module contains implementations for abstract classes InputPort and OutputPo
 """
 
 import logging
-from nexxT.Qt.QtCore import QThread, QSemaphore, Signal, QObject, Qt
+import time
+from nexxT.Qt.QtCore import QThread, Qt, QCoreApplication
 from nexxT.interface.Ports import InputPortInterface, OutputPortInterface
-from nexxT.interface.DataSamples import DataSample
+from nexxT.interface.DataSamples import DataSample, MemoryGovernor, LatencyTracer
 from nexxT.interface.Services import Services
 from nexxT.core.Utils import handleException
+from nexxT.core.WorkerPool import WorkerTask
 from nexxT.core.Exceptions import NexTRuntimeError, NexTInternalError
+from nexxT.core.PortConnections import (SampleQueue, InterThreadWakeupEvent, MainThreadDispatcher,
+                                        InterThreadConnection, InterThreadMulticast)
 
 logger = logging.getLogger(__name__)
 
-class InterThreadConnection(QObject):
+def _traceName(port):
     """
-    Helper class for transmitting data samples between threads
+    Return the name of the port used in the paths of the LatencyTracer.
     """
-    transmitInterThread = Signal(object, QSemaphore)
-
-    def __init__(self, qthreadFrom, width):
-        super().__init__()
-        self.moveToThread(qthreadFrom)
-        self.semaphore = QSemaphore(width) if width > 0 else None
-        self._stopped = True
-
-    def receiveSample(self, dataSample):
-        """
-        Receive a sample, called in the source's thread. Uses a semaphore to avoid buffering infinitely.
-        :param dataSample: the sample to be received
-        :return: None
-        """
-        self._receiveSample(dataSample)
-
-    @handleException
-    def _receiveSample(self, dataSample):
-        assert QThread.currentThread() is self.thread()
-        while True:
-            if self._stopped:
-                logger.info("The inter-thread connection is set to stopped mode; data sample discarded.")
-                break
-            if self.semaphore is None or self.semaphore.tryAcquire(1, 500):
-                self.transmitInterThread.emit(dataSample, self.semaphore)
-                break
-
-    def setStopped(self, stopped):
-        """
-        When the connection is stopped (the default), acquire will not deadlock and there is a warning when samples are
-        transmitted, samples are not forwarded to the input port in this case. Note: This method is thread safe and
-        may be called from any thread.
-        :return:
-        """
-        self._stopped = stopped
+    if port.environment() is None:
+        return port.name()
+    return port.environment().getFullQualifiedName() + "." + port.name()
 
 class OutputPortImpl(OutputPortInterface):
     """
@@ -66,7 +38,29 @@ class OutputPortImpl(OutputPortInterface):
     # pylint: disable=abstract-method
     # the Factory function is static and will be assigned later in this module
 
-    # constructor inherited from OutputPort
+    def __init__(self, dynamic, name, environment):
+        super().__init__(dynamic, name, environment)
+        self._samples = 0
+        self._bytes = 0
+        self._memoryGoverned = False
+        self._traceName = None
+
+    def setMemoryGoverned(self, memoryGoverned):
+        """
+        See :py:meth:`nexxT.interface.Ports.OutputPortInterface.setMemoryGoverned`
+
+        :param memoryGoverned: a boolean
+        :return: None
+        """
+        self._memoryGoverned = bool(memoryGoverned)
+
+    def memoryGoverned(self):
+        """
+        See :py:meth:`nexxT.interface.Ports.OutputPortInterface.memoryGoverned`
+
+        :return: a boolean
+        """
+        return self._memoryGoverned
 
     def transmit(self, dataSample):
         """
@@ -75,9 +69,37 @@ class OutputPortImpl(OutputPortInterface):
         :param dataSample: sample to transmit
         """
         if not QThread.currentThread() is self.thread():
+            task = WorkerTask.current()
+            if task is not None and task.environment is self.environment():
+                # called by a worker thread of a stateless filter, the filter's thread transmits the samples in order
+                task.outputs.append((self, dataSample))
+                return
             raise NexTRuntimeError("OutputPort.transmit has been called from an unexpected thread.")
+        if self._memoryGoverned and not MemoryGovernor.admit():
+            return
+        self._samples += 1
+        self._bytes += dataSample.getContentSize()
+        # pylint: disable=protected-access
+        first = dataSample._transmitTime is None
+        if first:
+            # reference time of the sample age for the "arrival" reference (see InputPortImpl.setMaxSampleAge)
+            dataSample._transmitTime = DataSample.currentTime()
+        if LatencyTracer._enabled:
+            if self._traceName is None:
+                self._traceName = _traceName(self)
+            dataSample = LatencyTracer._transmitted(dataSample, self._traceName, first)
         self.transmitSample.emit(dataSample)
 
+    def metrics(self):
+        """
+        Return the transport metrics of this port, used for the direct (intra-thread) connections of this port. Note:
+        This method may be called from any thread.
+
+        :return: a dict with the same items as InterThreadConnection.metrics()
+        """
+        return dict(samples=self._samples, bytes=self._bytes, backlog=0, blockingTime=0.0, dropped=0, discarded=0,
+                    priority="normal", promoted=0, demoted=0, width=-1, autoWidth=False)
+
     def clone(self, newEnvironment):
         """
         Return a copy of this port attached to a new environment.
@@ -85,7 +107,9 @@ class OutputPortImpl(OutputPortInterface):
         :param newEnvironment: the new FilterEnvironment instance
         :return: a new Port instance
         """
-        return OutputPortImpl(self.dynamic(), self.name(), newEnvironment)
+        res = OutputPortImpl(self.dynamic(), self.name(), newEnvironment)
+        res.setMemoryGoverned(self._memoryGoverned)
+        return res
 
     @staticmethod
     def setupDirectConnection(outputPort, inputPort):
@@ -113,9 +137,30 @@ class OutputPortImpl(OutputPortInterface):
                  to survive until connections is deleted)
         """
         logger.info("setup inter thread connection between %s -> %s", outputPort.name(), inputPort.name())
-        itc = InterThreadConnection(outputPortThread, width)
+        itc = InterThreadConnection(outputPortThread, width, inputPort)
         outputPort.transmitSample.connect(itc.receiveSample, Qt.DirectConnection)
         itc.transmitInterThread.connect(inputPort.receiveAsync, Qt.QueuedConnection)
+        itc.transmitInterThreadBatch.connect(inputPort.receiveAsyncBatch, Qt.QueuedConnection)
+        return itc
+
+    @staticmethod
+    def setupInterThreadMulticast(outputPort, outputPortThread, inputPortThread):
+        """
+        Setup an inter thread connection between outputPort and multiple input ports living in inputPortThread. The
+        input ports are added with InterThreadConnection.addMulticastReceiver(...).
+
+        :param outputPort: the output port instance to be connected
+        :param outputPortThread: the QThread instance of the outputPort instance
+        :param inputPortThread: the QThread instance of the input ports
+        :return: an InterThreadConnection instance which manages the connection (has
+                 to survive until connections is deleted)
+        """
+        logger.info("setup inter thread multicast connection from %s", outputPort.name())
+        multicast = InterThreadMulticast(inputPortThread)
+        itc = InterThreadConnection(outputPortThread, 0, multicast)
+        outputPort.transmitSample.connect(itc.receiveSample, Qt.DirectConnection)
+        itc.transmitInterThread.connect(multicast.receiveAsync, Qt.QueuedConnection)
+        itc.transmitInterThreadBatch.connect(multicast.receiveAsyncBatch, Qt.QueuedConnection)
         return itc
 
 class InputPortImpl(InputPortInterface):
@@ -124,7 +169,8 @@ class InputPortImpl(InputPortInterface):
     two new attributes related to automatic buffering of input data samples.
     queueSizeSamples sets the maximum number of samples buffered (it can be None, if queueSizeSeconds is not None)
     queueSizeSeconds sets the maximum time of samples buffered (it can be None, if queueSizeSamples is not None)
-    If both attributes are set, they are and-combined.
+    If both attributes are set, they are and-combined. Additionally, a byte budget can be set with
+    setQueueSizeBytes(...).
     """
 
     # pylint: disable=abstract-method
@@ -134,20 +180,23 @@ class InputPortImpl(InputPortInterface):
         super().__init__(dynamic, name, environment)
         self._queueSizeSamples = queueSizeSamples
         self._queueSizeSeconds = queueSizeSeconds
+        self._queueSizeBytes = None
+        self.queue = None
         self.setQueueSize(queueSizeSamples, queueSizeSeconds)
         self._semaphoreN = {
         }
         self._interthreadDynamicQueue = False
+        self._interthreadBatchNotification = False
+        self._maxSampleAge = None
+        self._maxSampleAgeReference = "timestamp"
+        self._staleSamples = 0
         try:
             self.srvprof = Services.getService("Profiling")
         except KeyError:
             self.srvprof = None
         self.profname = None
-        # the queue is implemented here as a python list, which is implemented as a c array
-        # in cpython. Not the most performant choice, but it is usually not used because
-        # this is just a reference implementation for the more performant C++ implementation
-        # in cnexxT
-        self.queue = []
+        self._traceName = None
+        self.queue = SampleQueue(self._queueSizeSamples)
 
     def getData(self, delaySamples=0, delaySeconds=None):
         """
@@ -159,57 +208,131 @@ class InputPortImpl(InputPortInterface):
                              to historic samples (TODO specify the exact semantics of delaySeconds)
         :return: DataSample instance
         """
+        queue = self.queue
         if not QThread.currentThread() is self.thread():
-            raise NexTRuntimeError("InputPort.getData has been called from an unexpected thread.")
+            task = WorkerTask.current()
+            if task is None or self not in task.inputs:
+                raise NexTRuntimeError("InputPort.getData has been called from an unexpected thread.")
+            # called by a worker thread of a stateless filter, use the snapshot taken at dispatch time
+            queue = task.inputs[self]
         if delaySamples is not None:
             assert delaySeconds is None
-            return self.queue[delaySamples]
+            return queue[delaySamples]
         if delaySeconds is not None:
             assert delaySamples is None
             delayTime = delaySeconds / DataSample.TIMESTAMP_RES
-            i = 0
-            while i < len(self.queue) and self.queue[0].getTimestamp() - self.queue[i].getTimestamp() < delayTime:
-                i += 1
-            return self.queue[i]
+            return queue[queue.indexOfDelay(delayTime)]
         raise RuntimeError("delaySamples and delaySeconds are both None.")
 
     def _addToQueue(self, dataSample):
-        self.queue.insert(0, dataSample)
-        if self._queueSizeSamples is not None and self._queueSizeSamples > 0:
-            if len(self.queue) > self._queueSizeSamples:
-                self.queue = self.queue[:self._queueSizeSamples]
+        # the queue size in samples is enforced by the ring buffer itself
+        self.queue.push(dataSample)
         if self._queueSizeSeconds is not None and self._queueSizeSeconds > 0.0:
-            queueSizeTime = self._queueSizeSeconds / DataSample.TIMESTAMP_RES
-            while len(self.queue) > 0 and self.queue[0].getTimestamp() - self.queue[-1].getTimestamp() > queueSizeTime:
-                self.queue.pop()
-
-    def _transmit(self):
-        if self.srvprof is not None:
+            self.queue.evictOlderThan(self._queueSizeSeconds / DataSample.TIMESTAMP_RES)
+        if self._queueSizeBytes is not None:
+            self.queue.evictBytes(self._queueSizeBytes)
+
+    def _transmit(self, dataSample, enqueueNs=None):
+        # the profiling calls are skipped entirely while port profiling is disabled
+        profiled = self.srvprof is not None and self.srvprof.portProfilingEnabled
+        if profiled:
             if self.profname is None:
-                self.profname = self.environment().getFullQualifiedName() + self.name()
-            self.srvprof.beforePortDataChanged(self.profname)
-        self.environment().portDataChanged(self)
-        if self.srvprof is not None:
+                self.profname = self.environment().getFullQualifiedName() + "/" + self.name()
+            # the queue wait is measured from the time the sample has been passed to the connection of this port,
+            # samples of direct connections are not queued
+            queueWaitNs = 0 if enqueueNs is None else time.perf_counter_ns() - enqueueNs
+            self.srvprof.beforePortDataChanged(self.profname, queueWaitNs)
+        # pylint: disable=protected-access
+        traced = LatencyTracer._enabled
+        if traced:
+            if self._traceName is None:
+                self._traceName = _traceName(self)
+            LatencyTracer._enterPort(dataSample, self._traceName)
+        try:
+            self.environment().portDataChanged(self)
+        finally:
+            if traced:
+                LatencyTracer._exitPort()
+        if profiled:
             self.srvprof.afterPortDataChanged(self.profname)
 
-    def receiveAsync(self, dataSample, semaphore):
+    def receiveAsync(self, dataSample, semaphore, enqueueNs=None):
         """
         Called from framework only and implements the asynchronous receive mechanism using a semaphore.
 
         :param dataSample: the transmitted DataSample instance
         :param semaphore: a QSemaphore instance
+        :param enqueueNs: the time.perf_counter_ns() when the sample has been passed to the connection (or None)
         :return: None
         """
-        return self._receiveAsync(dataSample, semaphore)
+        return self._receiveAsyncSamples([(dataSample, enqueueNs)], semaphore)
+
+    def receiveAsyncBatch(self, interThreadConnection, semaphore):
+        """
+        Called from framework only and implements the asynchronous receive mechanism of batched inter-thread
+        connections.
+
+        :param interThreadConnection: the InterThreadConnection instance holding the pending samples
+        :param semaphore: a QSemaphore instance
+        :return: None
+        """
+        itc = interThreadConnection if interThreadConnection.priority() == "high" else None
+        serviceConnection = interThreadConnection if interThreadConnection.autoWidth() else None
+        return self._receiveAsyncSamples(interThreadConnection.takePending(), semaphore, priorityConnection=itc,
+                                         serviceConnection=serviceConnection)
 
     @handleException
-    def _receiveAsync(self, dataSample, semaphore):
+    def _receiveAsyncSamples(self, deliveries, semaphore, isPending=False, priorityConnection=None,
+                             serviceConnection=None):
+        # deliveries is a list of (DataSample instance, enqueue time) tuples
         if not QThread.currentThread() is self.thread():
             raise NexTInternalError("InputPort.receiveAsync has been called from an unexpected thread.")
+        if not isPending and QThread.currentThread() is QCoreApplication.instance().thread():
+            # deliveries to the main thread are time-sliced to keep the GUI responsive
+            MainThreadDispatcher.instance().dispatch(self, deliveries, semaphore, priorityConnection,
+                                                     serviceConnection)
+        else:
+            self._deliverSamples(deliveries, semaphore, serviceConnection)
+
+    def _isStale(self, dataSample):
+        if self._maxSampleAge is None:
+            return False
+        if self._maxSampleAgeReference == "timestamp":
+            ref = dataSample.getTimestamp()
+        else:
+            ref = dataSample._transmitTime # pylint: disable=protected-access
+            if ref is None:
+                return False
+        if (DataSample.currentTime() - ref)*DataSample.TIMESTAMP_RES <= self._maxSampleAge:
+            return False
+        self._staleSamples += 1
+        return True
+
+    def _deliverSamples(self, deliveries, semaphore, serviceConnection=None):
+        startNs = time.perf_counter_ns() if serviceConnection is not None else None
+        numSamples = len(deliveries)
+        if self._maxSampleAge is not None:
+            fresh = []
+            for delivery in deliveries:
+                if self._isStale(delivery[0]):
+                    # the stale sample is not added to the queue, but it still occupies a slot of the connection
+                    if semaphore is not None:
+                        semaphore.release(1)
+                else:
+                    fresh.append(delivery)
+            deliveries = fresh
+        for i, (dataSample, enqueueNs) in enumerate(deliveries):
+            notify = not self._interthreadBatchNotification or i == len(deliveries) - 1
+            self._receiveAsyncSample(dataSample, semaphore, notify, enqueueNs)
+        if serviceConnection is not None:
+            serviceConnection.serviceFinished(numSamples, startNs, time.perf_counter_ns())
+
+    def _receiveAsyncSample(self, dataSample, semaphore, notify, enqueueNs):
         self._addToQueue(dataSample)
         if not self._interthreadDynamicQueue or semaphore is None:
             # usual behaviour
-            self._transmit()
+            if notify:
+                self._transmit(dataSample, enqueueNs)
             if semaphore is not None:
                 semaphore.release(1)
         else:
@@ -221,7 +344,8 @@ class InputPortImpl(InputPortInterface):
                 semaphore.release(1-delta)
                 self._semaphoreN[semaphore] += -delta
                 logger.internal("delta = %d: semaphoreN = %d", delta, self._semaphoreN[semaphore])
-                self._transmit()
+                if notify:
+                    self._transmit(dataSample, enqueueNs)
             elif delta > 0:
                 # first acquire is done by caller
                 self._semaphoreN[semaphore] -= 1
@@ -232,7 +356,22 @@ class InputPortImpl(InputPortInterface):
                     else:
                         break
                 logger.internal("delta = %d: semaphoreN = %d", delta, self._semaphoreN[semaphore])
-                self._transmit()
+                if notify:
+                    self._transmit(dataSample, enqueueNs)
+
+    def event(self, event):
+        """
+        Overwritten from QObject to handle wakeup events of inter-thread connections.
+
+        :param event: a QEvent instance
+        :return: a boolean
+        """
+        if event.type() == InterThreadWakeupEvent.registeredType:
+            t0 = time.perf_counter_ns()
+            self.receiveAsyncBatch(event.itc, event.itc.semaphore())
+            event.itc.priorityDeliveryFinished(t0, time.perf_counter_ns())
+            return True
+        return super().event(event)
 
     def receiveSync(self, dataSample):
         """
@@ -247,8 +386,10 @@ class InputPortImpl(InputPortInterface):
     def _receiveSync(self, dataSample):
         if not QThread.currentThread() is self.thread():
             raise NexTInternalError("InputPort.receiveSync has been called from an unexpected thread.")
+        if self._isStale(dataSample):
+            return
         self._addToQueue(dataSample)
-        self._transmit()
+        self._transmit(dataSample)
 
     def clone(self, newEnvironment):
         """
@@ -257,8 +398,10 @@ class InputPortImpl(InputPortInterface):
         :param newEnvironment: the new FilterEnvironment instance
         :return: a new Port instance
         """
-        return InputPortImpl(self.dynamic(), self.name(), newEnvironment, self._queueSizeSamples,
-                             self._queueSizeSeconds)
+        res = InputPortImpl(self.dynamic(), self.name(), newEnvironment, self._queueSizeSamples,
+                            self._queueSizeSeconds)
+        res.setQueueSizeBytes(self._queueSizeBytes)
+        return res
 
     def setQueueSize(self, queueSizeSamples, queueSizeSeconds):
         """
@@ -276,6 +419,8 @@ class InputPortImpl(InputPortInterface):
             queueSizeSamples = 1
         self._queueSizeSamples = queueSizeSamples
         self._queueSizeSeconds = queueSizeSeconds
+        if self.queue is not None:
+            self.queue.setMaxSamples(queueSizeSamples)
 
     def queueSizeSamples(self):
         """
@@ -293,6 +438,36 @@ class InputPortImpl(InputPortInterface):
         """
         return self._queueSizeSeconds
 
+    def setQueueSizeBytes(self, queueSizeBytes):
+        """
+        Set the byte budget of the queue of this port.
+
+        :param queueSizeBytes: the maximum sum of the content sizes of the queued samples, None or a value <= 0 disables
+                               the budget
+        :return: None
+        """
+        if queueSizeBytes is not None and queueSizeBytes <= 0:
+            queueSizeBytes = None
+        self._queueSizeBytes = queueSizeBytes
+        if queueSizeBytes is not None:
+            self.queue.evictBytes(queueSizeBytes)
+
+    def queueSizeBytes(self):
+        """
+        return the current byte budget of the queue
+
+        :return: an integer or None if the budget is disabled
+        """
+        return self._queueSizeBytes
+
+    def queuedBytes(self):
+        """
+        return the sum of the content sizes of the samples currently stored in the queue
+
+        :return: an integer
+        """
+        return self.queue.contentBytes()
+
     def setInterthreadDynamicQueue(self, enabled):
         """
         If enabled is True, inter thread connections to this input port are dynamically queued for non-blocking
@@ -322,3 +497,107 @@ class InputPortImpl(InputPortInterface):
         :return: a boolean
         """
         return self._interthreadDynamicQueue
+
+    def setInterthreadBatchNotification(self, enabled):
+        """
+        If enabled is True, the filter is notified only once per batch of samples received via a batched inter-thread
+        connection (see the connection property "batched"). All samples of the batch are added to the queue before
+        onPortDataChanged is called, so the queue size should be large enough to hold them. This method can be called
+        only during constructor or the onInit() method of a filter.
+
+        :param enabled: whether the batch notification feature is enabled or not.
+        :return:
+        """
+        if enabled != self._interthreadBatchNotification:
+            state = self.environment().state()
+            # pylint: disable=import-outside-toplevel
+            # pylint: disable=cyclic-import
+            # needed to avoid recursive import
+            from nexxT.interface.Filters import FilterState # avoid recursive import
+            if state not in [FilterState.CONSTRUCTING, FilterState.CONSTRUCTED,
+                             FilterState.INITIALIZING, FilterState.INITIALIZED]:
+                logger.error("Cannot change the interthreadBatchNotification setting in state %s.",
+                             FilterState.state2str(state))
+            else:
+                self._interthreadBatchNotification = enabled
+
+    def interthreadBatchNotification(self):
+        """
+        Return the interthread batch notification setting.
+
+        :return: a boolean
+        """
+        return self._interthreadBatchNotification
+
+    def setMaxSampleAge(self, seconds, reference="timestamp"):
+        """
+        Set the maximum age of samples received by this port. Older samples are dropped before they are added to the
+        queue and counted in staleSamples().
+
+        :param seconds: the maximum age in seconds, None or a value <= 0 disables the check
+        :param reference: either "timestamp" (related to the sample's timestamp) or "arrival" (related to the time of
+                          the sample's transmission)
+        :return: None
+        """
+        if reference not in ["timestamp", "arrival"]:
+            raise NexTRuntimeError(f"Unknown sample age reference '{reference}'.")
+        self._maxSampleAge = seconds if seconds is not None and seconds > 0 else None
+        self._maxSampleAgeReference = reference
+
+    def maxSampleAge(self):
+        """
+        Return the maximum age of samples received by this port.
+
+        :return: the age in seconds or None if the check is disabled
+        """
+        return self._maxSampleAge
+
+    def maxSampleAgeReference(self):
+        """
+        Return the reference of the sample age.
+
+        :return: either "timestamp" or "arrival"
+        """
+        return self._maxSampleAgeReference
+
+    def staleSamples(self):
+        """
+        Return the number of samples dropped because they exceeded the maximum age.
+
+        :return: an integer
+        """
+        return self._staleSamples
+
+    @staticmethod
+    def setMainThreadBudget(seconds):
+        """
+        Set the time budget for delivering inter-thread samples to input ports in the main thread. After the budget
+        of a time slice is exhausted, further samples are queued and delivered after pending GUI events have been
+        processed. The order of samples is always preserved. A budget <= 0 disables the time slicing.
+
+        :param seconds: the budget per time slice in seconds (default: 0.02)
+        :return: None
+        """
+        MainThreadDispatcher.budget = seconds
+
+    @staticmethod
+    def mainThreadBudget():
+        """
+        Return the time budget for delivering samples to the main thread.
+
+        :return: the budget in seconds
+        """
+        return MainThreadDispatcher.budget
+
+    @staticmethod
+    def mainThreadBacklog():
+        """
+        Return how far behind the main thread is with delivering inter-thread samples.
+
+        :return: a dict with the number of queued samples ("samples") and the age of the oldest queued sample in
+                 seconds ("lag")
+        """
+        dispatcher = MainThreadDispatcher.instance(create=False)
+        if dispatcher is None:
+            return dict(samples=0, lag=0.0)
+        return dispatcher.backlog()
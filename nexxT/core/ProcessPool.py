@@ -0,0 +1,355 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+"""
+This module defines the class ProcessPool used for executing CPU-bound python filters in multiple worker processes.
+"""
+
+import functools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import threading
+from nexxT.Qt.QtCore import QObject, QEvent, QCoreApplication, Qt, Slot
+from nexxT.interface import FilterState, OutputPort, OutputPortInterface
+from nexxT.core.ProcessThread import (SharedRing, Channel, receiveSample, handleLogRecord, logLevels,
+                                      setupWorkerLogging, createEnvironment, WorkerHost, propertyUpdate,
+                                      applyPropertyUpdate)
+
+logger = logging.getLogger(__name__)
+
+class _Worker:
+    """
+    A worker process of a process pool (nexxT process side).
+    """
+
+    def __init__(self, spec, ringSize, name):
+        self.toChild = SharedRing(ringSize)
+        self.fromChild = SharedRing(ringSize)
+        self.alive = True
+        self.tasks = set()
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, childConn = ctx.Pipe()
+        self.process = ctx.Process(target=_workerMain, name=name, daemon=True,
+                                   args=(childConn, self.toChild.handle(), self.fromChild.handle(), ringSize,
+                                         logLevels(), spec))
+        self.process.start()
+        childConn.close()
+        self.channel = Channel(self.conn, self.toChild, lambda: self.alive)
+
+    def close(self):
+        """
+        Stop the worker process and release the resources.
+
+        :return: None
+        """
+        self.process.join(5)
+        if self.process.is_alive():
+            logger.warning("Worker process %s doesn't terminate, killing it.", self.process.name)
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.toChild.close()
+        self.fromChild.close()
+
+class ProcessPool(QObject):
+    """
+    Executes the onPortDataChanged(...) calls of a python filter in a pool of worker processes, each with its own
+    instance of the filter created from the same library, factory function and property values. The received sample
+    is sent to the worker process with the least pending calls, and the samples transmitted by the worker processes
+    are transmitted by the filter's thread in the order of the received samples. The number of calls in flight is
+    limited to twice the number of processes, afterwards the filter's thread is blocked, so that the inter-thread
+    connections towards the filter provide back pressure as usual.
+
+    Each call only sees the sample which triggered it; the other input ports of the filter instances in the worker
+    processes hold the samples sent to the respective worker process. The lifecycle operations and property changes of
+    the filter are mirrored to the worker processes.
+
+    The object must be created in the filter's thread.
+    """
+    flushEventType = QEvent.Type(QEvent.registerEventType())
+    RING_SIZE = 4*1024*1024
+
+    def __init__(self, environment, numProcesses, spec):
+        """
+        Constructor.
+
+        :param environment: the FilterEnvironment instance of the filter
+        :param numProcesses: the number of worker processes
+        :param spec: the dict returned by nexxT.core.ProcessThread.filterSpec(...)
+        """
+        super().__init__()
+        self._env = environment
+        self._cond = threading.Condition()
+        self._finished = {}
+        self._nextSeq = 0
+        self._nextEmit = 0
+        self._flushPosted = False
+        self._pendingDone = 0
+        self._quitting = False
+        self._maxInFlight = 2*numProcesses
+        spec = dict(spec, workerThreads=0)
+        self._workers = [_Worker(spec, self.RING_SIZE, f"{spec['name']}:{i}") for i in range(numProcesses)]
+        if len(environment.getAllInputPorts()) > 1:
+            logger.warning("Filter %s has multiple input ports, the worker processes only see the samples sent to "
+                           "them.", spec["name"])
+        self._propColl = environment.propertyCollection()
+        self._propColl.propertyChanged.connect(self._propertyChanged)
+        self._reader = threading.Thread(target=self._readerMain, name=spec["name"] + ":pool", daemon=True)
+        self._reader.start()
+
+    def numProcesses(self):
+        """
+        Return the number of worker processes.
+
+        :return: an integer
+        """
+        return len(self._workers)
+
+    def _readerMain(self):
+        conns = {w.conn: w for w in self._workers}
+        while len(conns) > 0:
+            for conn in multiprocessing.connection.wait(list(conns.keys())):
+                w = conns[conn]
+                try:
+                    msg = conn.recv()
+                except (EOFError, OSError):
+                    del conns[conn]
+                    self._workerTerminated(w)
+                    continue
+                if msg[0] == "log":
+                    handleLogRecord(msg[1])
+                elif msg[0] == "done":
+                    with self._cond:
+                        self._pendingDone -= 1
+                        self._cond.notify_all()
+                elif msg[0] == "result":
+                    _, seq, outputs = msg
+                    outputs = [(port, receiveSample(w.fromChild, encoded)) for port, encoded in outputs]
+                    with self._cond:
+                        w.tasks.discard(seq)
+                        self._setFinished(seq, outputs)
+
+    def _workerTerminated(self, worker):
+        if not self._quitting:
+            logger.error("Worker process %s terminated unexpectedly.", worker.process.name)
+        with self._cond:
+            worker.alive = False
+            worker.toChild.wakeup()
+            # the pending calls of the worker are finished without output
+            for seq in worker.tasks:
+                self._setFinished(seq, [])
+            worker.tasks.clear()
+            self._cond.notify_all()
+
+    def _setFinished(self, seq, outputs):
+        # called with the lock held
+        self._finished[seq] = outputs
+        if not self._flushPosted:
+            self._flushPosted = True
+            QCoreApplication.postEvent(self, QEvent(self.flushEventType))
+        self._cond.notify_all()
+
+    @Slot(QObject)
+    def dispatch(self, inputPort):
+        """
+        Dispatch the onPortDataChanged(...) call for the given input port to a worker process. Called by the filter
+        environment in the filter's thread (see BaseFilterEnvironment.setPortDataDispatcher).
+
+        :param inputPort: the InputPort instance where the data arrived
+        :return: None
+        """
+        while self._nextSeq - self._nextEmit >= self._maxInFlight:
+            with self._cond:
+                self._cond.wait_for(lambda: self._nextEmit in self._finished)
+            self.flush()
+        with self._cond:
+            alive = [w for w in self._workers if w.alive]
+            if len(alive) == 0:
+                logger.warning("No worker process alive, discarding sample.")
+                return
+            worker = min(alive, key=lambda w: len(w.tasks))
+            seq = self._nextSeq
+            self._nextSeq += 1
+            worker.tasks.add(seq)
+        try:
+            worker.channel.sendSample(seq, inputPort.name(), inputPort.getData())
+        except OSError:
+            # the reader thread finishes the call when it detects the terminated worker
+            pass
+
+    def flush(self):
+        """
+        Transmit the outputs of all finished calls which are next in order. Called in the filter's thread.
+
+        :return: None
+        """
+        ready = []
+        with self._cond:
+            self._flushPosted = False
+            while self._nextEmit in self._finished:
+                ready.append(self._finished.pop(self._nextEmit))
+                self._nextEmit += 1
+        for outputs in ready:
+            for port, sample in outputs:
+                self._env.getOutputPort(port).transmit(sample)
+
+    def waitForDone(self):
+        """
+        Wait until all dispatched calls are finished and transmit their outputs.
+
+        :return: None
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._nextEmit + len(self._finished) >= self._nextSeq)
+        self.flush()
+
+    def transition(self, operation):
+        """
+        Perform a lifecycle operation on the filter instances of the worker processes and wait until it is finished.
+
+        :param operation: the FilterState operation (e.g. FilterState.INITIALIZING)
+        :return: None
+        """
+        with self._cond:
+            alive = [w for w in self._workers if w.alive]
+            self._pendingDone += len(alive)
+        for w in alive:
+            try:
+                w.channel.send("op", int(operation))
+            except OSError:
+                pass
+        with self._cond:
+            self._cond.wait_for(lambda: self._pendingDone <= 0 or not any(w.alive for w in self._workers))
+            self._pendingDone = 0
+
+    def _propertyChanged(self, propColl, name):
+        update = propertyUpdate(propColl, name)
+        if update is None:
+            return
+        for w in self._workers:
+            if w.alive:
+                try:
+                    w.channel.send("prop", name, *update)
+                except OSError:
+                    pass
+
+    def shutdown(self):
+        """
+        Wait for all calls and stop the worker processes.
+
+        :return: None
+        """
+        self.waitForDone()
+        self._propColl.propertyChanged.disconnect(self._propertyChanged)
+        self._quitting = True
+        for w in self._workers:
+            if w.alive:
+                try:
+                    w.channel.send("quit")
+                except OSError:
+                    pass
+        self._reader.join()
+        for w in self._workers:
+            w.close()
+        self._workers = []
+
+    def event(self, event):
+        """
+        Overwritten from QObject to transmit the outputs of finished calls.
+
+        :param event: a QEvent instance
+        :return: a boolean
+        """
+        if event.type() == self.flushEventType:
+            self.flush()
+            return True
+        return super().event(event)
+
+class _PoolHost(WorkerHost):
+    """
+    Hosts the filter instance of a worker process of a process pool.
+    """
+
+    operations = {
+        FilterState.INITIALIZING: "init",
+        FilterState.OPENING: "open",
+        FilterState.STARTING: "start",
+        FilterState.STOPPING: "stop",
+        FilterState.CLOSING: "close",
+        FilterState.DEINITIALIZING: "deinit",
+    }
+
+    def __init__(self, conn, toChildHandle, fromChildHandle, ringSize):
+        super().__init__(conn, toChildHandle, fromChildHandle, ringSize)
+        self._env = None
+        self._name = None
+        self._outputs = []
+        self._bridges = {}
+
+    def create(self, spec):
+        """
+        Create the filter instance.
+
+        :param spec: the dict returned by nexxT.core.ProcessThread.filterSpec(...)
+        :return: None
+        """
+        self._name = spec["name"]
+        try:
+            self._env = createEnvironment(self._root, spec)
+        except Exception: # pylint: disable=broad-except
+            # catching a general exception is exactly what is wanted here
+            logger.exception("Exception while creating filter %s in worker process", spec["name"])
+            return
+        for p in self._env.getAllOutputPorts():
+            p.transmitSample.connect(functools.partial(lambda name, sample: self._outputs.append((name, sample)),
+                                                       p.name()), Qt.DirectConnection)
+
+    def _handle(self, msg):
+        kind = msg[0]
+        if kind == "op":
+            if self._env is not None:
+                try:
+                    getattr(self._env, self.operations[msg[1]])()
+                except Exception: # pylint: disable=broad-except
+                    # catching a general exception is exactly what is wanted here
+                    logger.exception("Exception while performing operation '%s' on %s", self.operations[msg[1]],
+                                     self._name)
+            self._channel.send("done")
+        elif kind == "sample":
+            _, seq, port, sample = msg
+            if self._env is not None:
+                if port not in self._bridges:
+                    self._bridges[port] = OutputPort(False, port, None)
+                    OutputPortInterface.setupDirectConnection(self._bridges[port], self._env.getInputPort(port))
+                self._bridges[port].transmit(sample)
+            self._channel.sendResult(seq, self._outputs)
+            self._outputs.clear()
+        elif kind == "prop":
+            if self._env is not None:
+                applyPropertyUpdate(self._env.propertyCollection(), *msg[1:])
+        elif kind == "quit":
+            if self._env is not None:
+                self._env.destroy()
+                self._env = None
+            QCoreApplication.instance().quit()
+
+def _workerMain(conn, toChildHandle, fromChildHandle, ringSize, levels, spec):
+    """
+    Entry point of a worker process of a process pool.
+    """
+    # pylint: disable=import-outside-toplevel
+    import nexxT.Qt
+    app = QCoreApplication.instance()
+    if app is None:
+        app = QCoreApplication()
+    host = _PoolHost(conn, toChildHandle, fromChildHandle, ringSize)
+    setupWorkerLogging(host.channel(), levels)
+    host.create(spec)
+    host.start()
+    nexxT.Qt.call_exec(app)
+    logging.getLogger().handlers.clear()
+    host.close()
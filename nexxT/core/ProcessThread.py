@@ -0,0 +1,813 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+"""
+This module defines the class NexTProcessThread, a NexTThread whose filters are executed in a separate OS process.
+
+Threads with a name starting with "process:" are process-backed. In the nexxT process, each filter of such a thread is
+represented by a proxy filter with the same ports, living in a bridge thread. The proxies forward the lifecycle
+operations, the property changes and the received samples to the worker process, which hosts the real filters. The
+samples transmitted by the filters in the worker process are transmitted on the output ports of the proxies, and log
+records are re-emitted in the nexxT process. Sample payloads are transported through single-producer, single-consumer
+byte rings in shared memory, small payloads and control messages are sent through a pipe.
+"""
+
+import functools
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import struct
+import threading
+import types
+from multiprocessing import shared_memory
+from nexxT.Qt.QtCore import QObject, QEvent, QCoreApplication, Signal, Qt
+from nexxT.interface import Filter, FilterState, InputPort, OutputPort, OutputPortInterface, DataSample, PayloadPool
+from nexxT.core.Thread import NexTThread, applyThreadSettings
+from nexxT.core.Exceptions import NexTRuntimeError, PropertyCollectionPropertyNotFound
+
+logger = logging.getLogger(__name__)
+
+PROCESS_PREFIX = "process:"
+
+def isProcessThread(threadName):
+    """
+    Return whether the given thread name denotes a process-backed thread.
+
+    :param threadName: the name of the thread
+    :return: a boolean
+    """
+    return threadName.startswith(PROCESS_PREFIX)
+
+class SharedRing:
+    """
+    A single-producer, single-consumer byte ring in shared memory. The first 8 bytes hold the read position of the
+    consumer, the write position is only known to the producer and transmitted together with each message. Payloads
+    never wrap around the end of the ring; if a payload doesn't fit into the remaining space, the producer skips to
+    the beginning. A full ring blocks the producer on an event which is set by the consumer whenever it has released
+    space.
+    """
+    HEADER = 8
+
+    def __init__(self, capacity, handle=None):
+        """
+        Constructor. Creates a new ring if handle is None, otherwise the existing ring is attached.
+
+        :param capacity: the capacity of the ring in bytes
+        :param handle: the value returned by handle() of the creating instance or None
+        """
+        self._capacity = capacity
+        self._owner = handle is None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=capacity + self.HEADER)
+            struct.pack_into("<Q", self._shm.buf, 0, 0)
+            self._released = multiprocessing.get_context("spawn").Event()
+        else:
+            # the worker process shares the resource tracker of the creating process, which unlinks the block
+            name, self._released = handle
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._buf = self._shm.buf
+        self._wpos = 0
+
+    def handle(self):
+        """
+        Return the information needed to attach to this ring in a worker process. It must be passed to the worker
+        process at creation time.
+
+        :return: a tuple (name of the shared memory block, multiprocessing.Event instance)
+        """
+        return self._shm.name, self._released
+
+    def wakeup(self):
+        """
+        Wake up a producer waiting for space. Called after the consumer has gone, so that the producer notices it.
+
+        :return: None
+        """
+        self._released.set()
+
+    def write(self, data, alive):
+        """
+        Copy data into the ring, waiting for the consumer if the ring is full. Called by the producer.
+
+        :param data: a memoryview of unsigned bytes
+        :param alive: a callable returning False if the consumer has gone
+        :return: a tuple (offset, size, end) to be transmitted to the consumer or None if the data doesn't fit
+        """
+        n = data.nbytes
+        cap = self._capacity
+        if n > cap // 2:
+            return None
+        pos = self._wpos % cap
+        start = self._wpos if pos + n <= cap else self._wpos + cap - pos
+        end = start + n
+        while end - struct.unpack_from("<Q", self._buf, 0)[0] > cap:
+            self._released.clear()
+            # check again after clearing the event, the consumer might have released space in between
+            if end - struct.unpack_from("<Q", self._buf, 0)[0] <= cap:
+                break
+            if not alive():
+                return None
+            self._released.wait()
+        offset = start % cap
+        self._buf[self.HEADER + offset:self.HEADER + offset + n] = data
+        self._wpos = end
+        return offset, n, end
+
+    def read(self, offset, size, end):
+        """
+        Copy a payload out of the ring and release its space. Called by the consumer in message order. The payload
+        is copied into a buffer of the PayloadPool, which is passed to DataSample.fromBuffer without another copy.
+
+        :param offset: the offset given by the producer
+        :param size: the size given by the producer
+        :param end: the write position given by the producer
+        :return: a buffer acquired from the PayloadPool
+        """
+        res = PayloadPool.acquire(size)
+        memoryview(res).cast("B")[:] = self._buf[self.HEADER + offset:self.HEADER + offset + size]
+        struct.pack_into("<Q", self._buf, 0, end)
+        self._released.set()
+        return res
+
+    def close(self):
+        """
+        Detach from the shared memory block and remove it if this instance created it.
+
+        :return: None
+        """
+        if self._shm is not None:
+            self._buf = None
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+            self._shm = None
+
+class Channel:
+    """
+    Sending side of the connection between the nexxT process and the worker process. Samples with large payloads are
+    copied into the shared memory ring, everything else is pickled through the pipe. The send methods are thread safe.
+    """
+    INLINE_SIZE = 4096
+
+    def __init__(self, conn, ring, alive):
+        self._conn = conn
+        self._ring = ring
+        self._alive = alive
+        self._lock = threading.Lock()
+
+    def send(self, *msg):
+        """
+        Send a control message.
+
+        :param msg: the items of the message
+        :return: None
+        """
+        with self._lock:
+            self._conn.send(msg)
+
+    def _encode(self, sample):
+        # the ring must be written in the order of the messages, so this is called with the lock held
+        view = sample.getContentView()
+        payload = None
+        if view.nbytes > self.INLINE_SIZE:
+            payload = self._ring.write(view, self._alive)
+        if payload is None:
+            payload = bytes(view)
+        return sample.getDatatype(), sample.getTimestamp(), payload
+
+    def sendSample(self, node, port, sample):
+        """
+        Send a data sample.
+
+        :param node: the name of the filter
+        :param port: the name of the port
+        :param sample: a DataSample instance
+        :return: None
+        """
+        with self._lock:
+            self._conn.send(("sample", node, port, self._encode(sample)))
+
+    def sendResult(self, seq, outputs):
+        """
+        Send the samples transmitted while processing a sample.
+
+        :param seq: the sequence number of the processed sample
+        :param outputs: a list of (port name, DataSample instance) tuples
+        :return: None
+        """
+        with self._lock:
+            self._conn.send(("result", seq, [(port, self._encode(sample)) for port, sample in outputs]))
+
+def receiveSample(ring, encoded):
+    """
+    Create a DataSample from a received sample.
+
+    :param ring: the SharedRing instance of the connection
+    :param encoded: the tuple (datatype, timestamp, payload) given by the sender
+    :return: a DataSample instance
+    """
+    datatype, timestamp, payload = encoded
+    if not isinstance(payload, bytes):
+        payload = ring.read(*payload)
+    return DataSample.fromBuffer(payload, datatype, timestamp)
+
+def handleLogRecord(recordDict):
+    """
+    Re-emit a log record of a worker process in this process.
+
+    :param recordDict: the attribute dictionary of the record
+    :return: None
+    """
+    record = logging.makeLogRecord(recordDict)
+    recordLogger = logging.getLogger(record.name)
+    if recordLogger.isEnabledFor(record.levelno):
+        recordLogger.handle(record)
+
+def logLevels():
+    """
+    Return the configured log levels of this process, to be applied in the worker processes.
+
+    :return: a dict mapping logger names to levels ("" is the root logger)
+    """
+    res = {n: l.level for n, l in logging.root.manager.loggerDict.items()
+           if isinstance(l, logging.Logger) and l.level != logging.NOTSET}
+    res[""] = logging.getLogger().level
+    return res
+
+def filterSpec(name, mockup, propColl, workerThreads=0):
+    """
+    Return the information needed to create a filter in a worker process.
+
+    :param name: the name of the filter
+    :param mockup: the FilterMockup instance of the filter
+    :param propColl: the property collection used for the filter
+    :param workerThreads: the number of worker threads of the filter
+    :return: a picklable dict
+    """
+    library = mockup.getLibrary()
+    if not isinstance(library, str):
+        raise NexTRuntimeError(f"Filter {name} cannot be executed in a worker process (library is not a string).")
+    return dict(name=name, library=library, factoryFunction=mockup.getFactoryFunction(),
+                properties=mockup.getPropertyCollectionImpl().saveDict(),
+                variables=_flattenVariables(propColl.getVariables()),
+                dynamicInPorts=[p.name() for p in mockup.getDynamicInputPorts()],
+                dynamicOutPorts=[p.name() for p in mockup.getDynamicOutputPorts()],
+                workerThreads=workerThreads)
+
+def createEnvironment(rootPropColl, spec):
+    """
+    Create a filter in a worker process.
+
+    :param rootPropColl: the root property collection of the worker process
+    :param spec: the dict returned by filterSpec(...)
+    :return: a FilterEnvironment instance
+    """
+    # pylint: disable=import-outside-toplevel
+    # pylint: disable=cyclic-import
+    from nexxT.core.PropertyCollectionImpl import PropertyCollectionImpl
+    from nexxT.core.FilterEnvironment import FilterEnvironment
+    pc = PropertyCollectionImpl(spec["name"], rootPropColl, spec["properties"])
+    for k, v in spec["variables"].items():
+        pc.getVariables()[k] = v
+    env = FilterEnvironment(spec["library"], spec["factoryFunction"], pc)
+    for p in spec["dynamicInPorts"]:
+        env.addPort(InputPort(True, p, env))
+    for p in spec["dynamicOutPorts"]:
+        env.addPort(OutputPort(True, p, env))
+    if spec["workerThreads"] > 0:
+        env.setWorkerThreads(spec["workerThreads"])
+    return env
+
+def propertyUpdate(propColl, name):
+    """
+    Return the information needed to mirror a property change to a worker process, see applyPropertyUpdate(...).
+    The value is transferred without substitution, so that the worker process substitutes the variables itself.
+
+    :param propColl: the property collection holding the property
+    :param name: the name of the property
+    :return: a tuple (value, useEnvironment) or None if the property doesn't exist
+    """
+    try:
+        p = propColl.getPropertyDetails(name)
+    except PropertyCollectionPropertyNotFound:
+        return None
+    return p.value, p.useEnvironment
+
+def applyPropertyUpdate(propColl, name, value, useEnvironment):
+    """
+    Apply a property change of the nexxT process in a worker process.
+
+    :param propColl: the property collection of the filter in the worker process
+    :param name: the name of the property
+    :param value: the value returned by propertyUpdate(...)
+    :param useEnvironment: the flag returned by propertyUpdate(...)
+    :return: None
+    """
+    try:
+        if useEnvironment:
+            propColl.setVarProperty(name, value)
+        else:
+            propColl.setProperty(name, value)
+    except PropertyCollectionPropertyNotFound:
+        pass
+
+def _flattenVariables(variables):
+    """
+    Return the substituted values of all variables visible through the given Variables instance.
+
+    :param variables: a Variables instance
+    :return: a dict mapping names to values
+    """
+    names = set()
+    v = variables
+    while v is not None:
+        names.update(v.keys())
+        v = v._parent # pylint: disable=protected-access
+    return {k: variables[k] for k in names}
+
+class ProxyFilter(Filter):
+    """
+    Stand-in of a filter running in a worker process. It has the same ports as the real filter and forwards received
+    samples to the worker process.
+    """
+
+    def __init__(self, environment, processThread, name, inPorts, outPorts):
+        super().__init__(False, False, environment)
+        self._processThread = processThread
+        self._name = name
+        self.outPorts = {}
+        for p in inPorts:
+            self.addStaticPort(InputPort(False, p, environment))
+        for p in outPorts:
+            self.outPorts[p] = OutputPort(False, p, environment)
+            self.addStaticPort(self.outPorts[p])
+
+    def onPortDataChanged(self, inputPort):
+        """
+        Forward the received sample to the worker process.
+
+        :param inputPort: the InputPort instance where the data arrived
+        :return: None
+        """
+        self._processThread.forwardSample(self._name, inputPort.name(), inputPort.getData())
+
+class NexTProcessThread(NexTThread):
+    """
+    A thread of the active application whose filters are executed in a separate worker process. The object lives in
+    a bridge thread holding proxy filters; the lifecycle operations are mirrored to the worker process.
+    """
+    RING_SIZE = 16*1024*1024
+    # number of samples forwarded to the worker process which have not yet been delivered to the filters
+    INPUT_WINDOW = 8
+    inboxEventType = QEvent.Type(QEvent.registerEventType())
+    # the proxies transmit the samples of the worker process also during the start and stop transitions
+    _transmitStates = (FilterState.STARTING, FilterState.ACTIVE, FilterState.STOPPING)
+
+    def __init__(self, name, settings=None):
+        """
+        Creates the bridge thread and starts the worker process.
+
+        :param name: name of the thread, starting with "process:"
+        :param settings: the thread settings of the configuration, applied to the bridge thread and to the main thread
+                         of the worker process
+        """
+        super().__init__(name, settings)
+        self._proxies = {}
+        # the propertyChanged slots of the proxies, disconnected when the proxies are destructed
+        self._propertySlots = {}
+        self._exported = set()
+        self._inbox = queue.SimpleQueue()
+        self._inboxLock = threading.Lock()
+        self._inboxPosted = False
+        self._pendingDone = 0
+        self._window = threading.Condition()
+        self._outstanding = 0
+        self._alive = True
+        self._quitting = False
+        self._toChild = SharedRing(self.RING_SIZE)
+        self._fromChild = SharedRing(self.RING_SIZE)
+        ctx = multiprocessing.get_context("spawn")
+        conn, childConn = ctx.Pipe()
+        self._process = ctx.Process(target=_processMain, name=name, daemon=True,
+                                    args=(childConn, self._toChild.handle(), self._fromChild.handle(), self.RING_SIZE,
+                                          logLevels(), settings if settings is not None else {}))
+        self._process.start()
+        childConn.close()
+        self._conn = conn
+        self._channel = Channel(conn, self._toChild, lambda: self._alive)
+        self._reader = threading.Thread(target=self._readerMain, name=name + ":reader", daemon=True)
+        self._reader.start()
+
+    def cleanup(self):
+        """
+        Stop the bridge thread and the worker process and deallocate all resources.
+        :return:
+        """
+        super().cleanup()
+        if self._process is not None:
+            self._quitting = True
+            if self._alive:
+                try:
+                    self._channel.send("quit")
+                except OSError:
+                    pass
+            self._process.join(5)
+            if self._process.is_alive():
+                logger.warning("Worker process of thread %s doesn't terminate, killing it.", self._name)
+                self._process.kill()
+                self._process.join()
+            self._reader.join()
+            self._conn.close()
+            self._toChild.close()
+            self._fromChild.close()
+            self._process = None
+        self._proxies.clear()
+
+    def setupDirectConnection(self, fromNode, fromPort, toNode, toPort):
+        """
+        Setup a direct connection between two filters in the worker process.
+
+        :param fromNode: the name of the sending filter
+        :param fromPort: the name of the output port
+        :param toNode: the name of the receiving filter
+        :param toPort: the name of the input port
+        :return: None
+        """
+        self._channel.send("connect", fromNode, fromPort, toNode, toPort)
+
+    def exportOutputPort(self, node, port):
+        """
+        Transmit the samples of the given output port in the worker process on the output port of the proxy filter.
+
+        :param node: the name of the filter
+        :param port: the name of the output port
+        :return: None
+        """
+        if (node, port) not in self._exported:
+            self._exported.add((node, port))
+            self._channel.send("export", node, port)
+
+    def forwardSample(self, node, port, sample):
+        """
+        Forward a sample received by a proxy filter to the worker process. Blocks while the worker process has too many
+        pending samples, so that the connections towards the proxy filter provide back pressure. Called in the bridge
+        thread.
+
+        :param node: the name of the filter
+        :param port: the name of the input port
+        :param sample: the DataSample instance
+        :return: None
+        """
+        with self._window:
+            while self._outstanding >= self.INPUT_WINDOW and self._alive:
+                self._window.wait()
+            if not self._alive:
+                return
+            self._outstanding += 1
+        self._channel.sendSample(node, port, sample)
+
+    def _readerMain(self):
+        while True:
+            try:
+                msg = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg[0] == "log":
+                handleLogRecord(msg[1])
+            elif msg[0] == "ack":
+                with self._window:
+                    self._outstanding -= 1
+                    self._window.notify_all()
+            elif msg[0] == "sample":
+                self._post(("sample", msg[1], msg[2], receiveSample(self._fromChild, msg[3])))
+            else:
+                self._post(msg)
+        if not self._quitting:
+            logger.error("The worker process of thread %s terminated unexpectedly.", self._name)
+        with self._window:
+            self._alive = False
+            self._window.notify_all()
+        self._toChild.wakeup()
+        self._post(("eof",))
+
+    def _post(self, msg):
+        self._inbox.put(msg)
+        with self._inboxLock:
+            if not self._inboxPosted:
+                self._inboxPosted = True
+                QCoreApplication.postEvent(self, QEvent(self.inboxEventType))
+
+    def _handleInbox(self, block):
+        """
+        Handle the messages from the worker process in the bridge thread.
+
+        :param block: if true, wait until a message is handled
+        :return: None
+        """
+        while True:
+            try:
+                # the reader thread posts an "eof" message when the worker process has gone
+                msg = self._inbox.get() if block else self._inbox.get_nowait()
+            except queue.Empty:
+                return
+            if msg[0] == "sample":
+                _, node, port, sample = msg
+                proxy = self._proxies.get(node)
+                if proxy is not None and self._filters[node].state() in self._transmitStates:
+                    proxy.outPorts[port].transmit(sample)
+            elif msg[0] == "done":
+                self._pendingDone -= 1
+            if block:
+                return
+
+    def _remote(self, *msg):
+        """
+        Execute an operation in the worker process and wait until it is finished. Samples transmitted by the worker
+        process in the meantime are transmitted by the proxies.
+        """
+        if not self._alive:
+            return
+        self._pendingDone += 1
+        self._channel.send(*msg)
+        while self._pendingDone > 0 and self._alive:
+            self._handleInbox(True)
+
+    def event(self, event):
+        """
+        Overwritten from QObject to handle the messages of the worker process.
+
+        :param event: a QEvent instance
+        :return: a boolean
+        """
+        if event.type() == self.inboxEventType:
+            with self._inboxLock:
+                self._inboxPosted = False
+            self._handleInbox(False)
+            return True
+        return super().event(event)
+
+    def _createProxy(self, name, mockup, propColl):
+        inPorts = [p.name() for p in mockup.getAllInputPorts()]
+        outPorts = [p.name() for p in mockup.getAllOutputPorts()]
+
+        def factory(env):
+            self._proxies[name] = ProxyFilter(env, self, name, inPorts, outPorts)
+            return self._proxies[name]
+
+        # pylint: disable=import-outside-toplevel
+        # pylint: disable=cyclic-import
+        from nexxT.core.FilterEnvironment import FilterEnvironment
+        res = FilterEnvironment(types.SimpleNamespace(ProxyFilter=factory), "ProxyFilter", propColl)
+        slot = functools.partial(self._propertyChanged, name, mockup)
+        propColl.propertyChanged.connect(slot)
+        self._propertySlots[name] = (propColl, slot)
+        return res
+
+    def _propertyChanged(self, name, mockup, _, propName):
+        update = propertyUpdate(mockup.getPropertyCollectionImpl(), propName)
+        if update is not None and self._alive:
+            self._channel.send("prop", name, propName, *update)
+
+    def _localOperation(self, operation):
+        for name, (mockup, propColl) in self._mockups.items():
+            try:
+                if operation == "create":
+                    res = self._createProxy(name, mockup, propColl)
+                    res.setParent(self)
+                    self._filters[name] = res
+                    self._filter2name[res] = name
+                elif operation == "destruct":
+                    if name in self._propertySlots:
+                        propColl, slot = self._propertySlots.pop(name)
+                        propColl.propertyChanged.disconnect(slot)
+                    self._filters[name].destroy()
+                    del self._filters[name]
+                    self._proxies.pop(name, None)
+                else:
+                    getattr(self._filters[name], operation)()
+            except Exception: # pylint: disable=broad-except
+                # catching a general exception is exactly what is wanted here
+                logger.exception("Exception while performing operation '%s' on %s", operation, name)
+
+    def _remoteOperation(self, operation):
+        if operation == "create":
+            specs = []
+            for name, (mockup, propColl) in self._mockups.items():
+                try:
+                    specs.append(filterSpec(name, mockup, propColl, self._workerThreads.get(name, 0)))
+                except Exception: # pylint: disable=broad-except
+                    # catching a general exception is exactly what is wanted here
+                    logger.exception("Exception while performing operation '%s' on %s", operation, name)
+            self._remote("create", specs)
+        else:
+            self._remote("op", operation)
+
+    def _performOperation(self, operation, barrier):
+        """
+        Perform the given operation on all proxy filters and on the filters in the worker process.
+        :param operation: one of "create", "destruct", "init", "open", "start", "stop", "close", "deinit"
+        :param barrier: a barrier object to synchronize threads
+        :return: None
+        """
+        barrier.wait()
+        if operation in self._operations:
+            for name in self._mockups:
+                self._filters[name].preStateTransition(self._operations[operation])
+            self._remote("pre", operation)
+            barrier.wait()
+        # the proxies shall be able to transmit samples as long as the filters in the worker process are active
+        if operation in ("create", "init", "open", "start"):
+            self._localOperation(operation)
+            self._remoteOperation(operation)
+        else:
+            self._remoteOperation(operation)
+            self._localOperation(operation)
+        self.operationFinished.emit()
+        barrier.wait()
+
+class _LogForwarder(logging.handlers.QueueHandler):
+    """
+    Logging handler of the worker process sending the records to the nexxT process.
+    """
+
+    def __init__(self, channel):
+        super().__init__(None)
+        self._channel = channel
+
+    def enqueue(self, record):
+        self._channel.send("log", record.__dict__)
+
+class WorkerHost(QObject):
+    """
+    Base class of the objects hosting filters in a worker process. The messages of the nexxT process are received
+    by a reader thread and handled by _handle(...) in the main thread.
+    """
+    messageReceived = Signal(object)
+
+    def __init__(self, conn, toChildHandle, fromChildHandle, ringSize):
+        super().__init__()
+        # pylint: disable=import-outside-toplevel
+        # pylint: disable=cyclic-import
+        from nexxT.core.PropertyCollectionImpl import PropertyCollectionImpl
+        from nexxT.core.Variables import Variables
+        self._conn = conn
+        self._alive = True
+        self._fromParent = SharedRing(ringSize, toChildHandle)
+        self._toParent = SharedRing(ringSize, fromChildHandle)
+        self._channel = Channel(conn, self._toParent, lambda: self._alive)
+        self._root = PropertyCollectionImpl("root", None, variables=Variables())
+        self.messageReceived.connect(self._handle, Qt.QueuedConnection)
+        self._reader = threading.Thread(target=self._readerMain, daemon=True)
+
+    def channel(self):
+        """
+        Return the channel to the nexxT process.
+
+        :return: a Channel instance
+        """
+        return self._channel
+
+    def start(self):
+        """
+        Start receiving messages.
+
+        :return: None
+        """
+        self._reader.start()
+
+    def _readerMain(self):
+        while True:
+            try:
+                msg = self._conn.recv()
+            except (EOFError, OSError):
+                # the nexxT process has gone, don't wait for it to release space in the ring
+                self._alive = False
+                self._toParent.wakeup()
+                msg = ("quit",)
+            if msg[0] == "sample":
+                msg = msg[:3] + (receiveSample(self._fromParent, msg[3]),)
+            self.messageReceived.emit(msg)
+            if msg[0] == "quit":
+                break
+
+    def _handle(self, msg):
+        raise NotImplementedError()
+
+    def close(self):
+        """
+        Release the shared memory and the connection.
+
+        :return: None
+        """
+        self._reader.join()
+        self._conn.close()
+        self._fromParent.close()
+        self._toParent.close()
+
+class _ProcessHost(WorkerHost):
+    """
+    Hosts the filters in the worker process.
+    """
+
+    def __init__(self, conn, toChildHandle, fromChildHandle, ringSize):
+        super().__init__(conn, toChildHandle, fromChildHandle, ringSize)
+        self._filters = {}
+        self._bridgePorts = {}
+
+    def _create(self, specs):
+        for spec in specs:
+            try:
+                self._filters[spec["name"]] = createEnvironment(self._root, spec)
+            except Exception: # pylint: disable=broad-except
+                # catching a general exception is exactly what is wanted here
+                logger.exception("Exception while creating filter %s in worker process", spec["name"])
+
+    def _operation(self, operation, pre):
+        for name, env in list(self._filters.items()):
+            try:
+                if pre:
+                    env.preStateTransition(NexTThread._operations[operation]) # pylint: disable=protected-access
+                elif operation == "destruct":
+                    env.destroy()
+                    del self._filters[name]
+                else:
+                    getattr(env, operation)()
+            except Exception: # pylint: disable=broad-except
+                # catching a general exception is exactly what is wanted here
+                logger.exception("Exception while performing operation '%s' on %s", operation, name)
+
+    def _export(self, node, port, sample):
+        self._channel.sendSample(node, port, sample)
+
+    def _handle(self, msg):
+        # pylint: disable=too-many-branches
+        kind = msg[0]
+        if kind == "sample":
+            _, node, port, sample = msg
+            bridge = self._bridgePorts.get((node, port))
+            if bridge is None and node in self._filters:
+                bridge = OutputPort(False, node + "." + port, None)
+                OutputPortInterface.setupDirectConnection(bridge, self._filters[node].getInputPort(port))
+                self._bridgePorts[(node, port)] = bridge
+            if bridge is not None:
+                bridge.transmit(sample)
+            self._channel.send("ack")
+        elif kind == "prop":
+            _, node, name, value, useEnvironment = msg
+            if node in self._filters:
+                applyPropertyUpdate(self._filters[node].propertyCollection(), name, value, useEnvironment)
+        elif kind == "connect":
+            _, fromNode, fromPort, toNode, toPort = msg
+            OutputPortInterface.setupDirectConnection(self._filters[fromNode].getOutputPort(fromPort),
+                                             self._filters[toNode].getInputPort(toPort))
+        elif kind == "export":
+            _, node, port = msg
+            self._filters[node].getOutputPort(port).transmitSample.connect(
+                functools.partial(self._export, node, port), Qt.DirectConnection)
+        elif kind == "create":
+            self._create(msg[1])
+            self._channel.send("done")
+        elif kind in ("pre", "op"):
+            self._operation(msg[1], kind == "pre")
+            self._channel.send("done")
+        elif kind == "quit":
+            for env in self._filters.values():
+                env.destroy()
+            self._filters.clear()
+            QCoreApplication.instance().quit()
+
+def setupWorkerLogging(channel, levels):
+    """
+    Forward the log records of a worker process through the given channel.
+
+    :param channel: the Channel instance to the nexxT process
+    :param levels: the dict returned by logLevels() in the nexxT process
+    :return: None
+    """
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_LogForwarder(channel))
+    for n, level in levels.items():
+        logging.getLogger(n if n != "" else None).setLevel(level)
+
+def _processMain(conn, toChildHandle, fromChildHandle, ringSize, levels, settings):
+    """
+    Entry point of the worker process.
+    """
+    # pylint: disable=import-outside-toplevel
+    import nexxT.Qt
+    app = QCoreApplication.instance()
+    if app is None:
+        app = QCoreApplication()
+    host = _ProcessHost(conn, toChildHandle, fromChildHandle, ringSize)
+    setupWorkerLogging(host.channel(), levels)
+    applyThreadSettings(app.thread(), settings)
+    host.start()
+    nexxT.Qt.call_exec(app)
+    logging.getLogger().handlers.clear()
+    host.close()
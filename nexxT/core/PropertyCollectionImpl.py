@@ -425,7 +425,7 @@ class PropertyCollectionProxy(PropertyCollection):
         :param name: the property name
         :return: a Property instance
         """
-        return self._proxiedPropColl.getPropertyDetails(self, name)
+        return self._proxiedPropColl.getPropertyDetails(name)
 
     def getAllPropertyNames(self):
         """
@@ -135,7 +135,9 @@ class SubConfiguration(QObject):
             if not n["library"].startswith("composite://"):
                 p = PropertyCollectionImpl(n["name"], self._propertyCollection, n["properties"])
                 # apply node gui state
-                PropertyCollectionImpl("_nexxT", p, {"thread": n["thread"]})
+                PropertyCollectionImpl("_nexxT", p, {"thread": n["thread"], "workerThreads": n["workerThreads"],
+                                                  "workerProcesses": n["workerProcesses"],
+                                                  "memoryGoverned": n["memoryGoverned"]})
                 logger.debug("loading: subconfig %s / node %s -> thread: %s", self._name, n["name"], n["thread"])
                 tmp = self._graph.addNode(n["library"], n["factoryFunction"], suggestedName=n["name"],
                                           dynamicInputPorts=n["dynamicInputPorts"],
@@ -165,9 +167,14 @@ class SubConfiguration(QObject):
                 for k in n["variables"]:
                     variables[k] = n["variables"][k]
         for c in cfg["connections"]:
+            props = {}
+            if isinstance(c, dict):
+                props.update(c.get("properties", {}))
+                c = c["connection"]
             contuple = self.connectionStringToTuple(c)
+            props["width"] = contuple[-1]
             self._graph.addConnection(*contuple[:-1])
-            self._graph.setConnectionProperties(*contuple[:-1], {"width": contuple[-1]})
+            self._graph.setConnectionProperties(*contuple[:-1], props)
 
     def save(self):
         """
@@ -223,6 +230,14 @@ class SubConfiguration(QObject):
             try:
                 ncfg["thread"] = p.getChildCollection("_nexxT").getProperty("thread")
                 logger.debug("saving: subconfig %s / node %s -> thread: %s", self._name, name, ncfg["thread"])
+                workerThreads = p.getChildCollection("_nexxT").getProperty("workerThreads")
+                if workerThreads > 0:
+                    ncfg["workerThreads"] = workerThreads
+                workerProcesses = p.getChildCollection("_nexxT").getProperty("workerProcesses")
+                if workerProcesses > 0:
+                    ncfg["workerProcesses"] = workerProcesses
+                if p.getChildCollection("_nexxT").getProperty("memoryGoverned"):
+                    ncfg["memoryGoverned"] = True
             except PropertyCollectionChildNotFound:
                 pass
             except PropertyCollectionPropertyNotFound:
@@ -235,9 +250,16 @@ class SubConfiguration(QObject):
             ncfg["properties"] = p.saveDict()
             cfg["nodes"].append(ncfg)
         cfg["connections"] = []
+        defaultProps = self._graph.getDefaultConnectionProperties()
         for c in self._graph.allConnections():
-            ct = c + (self._graph.getConnectionProperties(*c)["width"],)
-            cfg["connections"].append(self.tupleToConnectionString(ct))
+            props = self._graph.getConnectionProperties(*c)
+            ct = c + (props["width"],)
+            # the width is part of the connection string, other non-default properties are saved separately
+            nonDefaultProps = {k: v for k, v in props.items() if k != "width" and defaultProps.get(k, None) != v}
+            if len(nonDefaultProps) > 0:
+                cfg["connections"].append(dict(connection=self.tupleToConnectionString(ct), properties=nonDefaultProps))
+            else:
+                cfg["connections"].append(self.tupleToConnectionString(ct))
         return cfg
 
     @staticmethod
@@ -8,7 +8,11 @@
 This module defines the class NexTThread.
 """
 
+import ctypes
+import ctypes.util
 import logging
+import os
+import platform
 import sys
 import threading
 from nexxT.Qt.QtCore import QObject, Signal, Slot, QCoreApplication, QThread
@@ -18,6 +22,96 @@ from nexxT.core.Utils import handleException
 
 logger = logging.getLogger(__name__)
 
+# names of the QThread priorities usable in the thread settings
+_PRIORITIES = dict(idle="IdlePriority", lowest="LowestPriority", low="LowPriority", normal="NormalPriority",
+                   high="HighPriority", highest="HighestPriority", timecritical="TimeCriticalPriority")
+# names of the OS scheduling policies usable in the thread settings
+_POLICIES = {name: getattr(os, "SCHED_" + name.upper()) for name in ["other", "batch", "idle", "fifo", "rr"]
+             if hasattr(os, "SCHED_" + name.upper())}
+
+def _qtPriority(name):
+    return getattr(QThread.Priority, _PRIORITIES[name])
+
+def _setOsThreadName(name):
+    # the OS thread names are restricted to 15 characters on linux
+    if platform.system() != "Linux":
+        return False
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    PR_SET_NAME = 15 # pylint: disable=invalid-name
+    return libc.prctl(PR_SET_NAME, ctypes.c_char_p(name.encode("utf8")[:15]), 0, 0, 0) == 0
+
+def _osThreadName():
+    try:
+        with open(f"/proc/self/task/{threading.get_native_id()}/comm", "r", encoding="utf8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def applyThreadSettings(qthread, settings):
+    """
+    Apply the thread settings to the calling thread. Settings which are not supported on the platform or which are not
+    permitted (e.g. real-time scheduling policies without the necessary privileges) are reported as warnings.
+
+    :param qthread: the QThread instance of the calling thread
+    :param settings: a dict with the optional items "affinity" (list of CPU indices), "priority" (one of the QThread
+                     priorities "idle", "lowest", "low", "normal", "high", "highest", "timecritical"), "policy" (one of
+                     the OS scheduling policies "other", "batch", "idle", "fifo", "rr"), "schedPriority" (the static
+                     priority used together with the policy) and "osName" (the OS-level thread name)
+    :return: the effective settings as returned by effectiveThreadSettings()
+    """
+    name = qthread.objectName()
+    if "affinity" in settings:
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, settings["affinity"])
+            except (OSError, ValueError) as e:
+                logger.warning("Cannot set CPU affinity %s of thread %s: %s", settings["affinity"], name, e)
+        else:
+            logger.warning("Setting the CPU affinity is not supported on this platform.")
+    if "policy" in settings:
+        policy = settings["policy"]
+        if policy in _POLICIES and hasattr(os, "sched_setscheduler"):
+            try:
+                os.sched_setscheduler(0, _POLICIES[policy], os.sched_param(settings.get("schedPriority", 0)))
+            except PermissionError:
+                logger.warning("Setting the scheduling policy %s of thread %s is not permitted.", policy, name)
+            except OSError as e:
+                logger.warning("Cannot set the scheduling policy %s of thread %s: %s", policy, name, e)
+        else:
+            logger.warning("The scheduling policy %s is not supported on this platform.", policy)
+    if "priority" in settings:
+        if settings["priority"] in _PRIORITIES:
+            qthread.setPriority(_qtPriority(settings["priority"]))
+        else:
+            logger.warning("Unknown thread priority %s of thread %s.", settings["priority"], name)
+    if "osName" in settings:
+        if not _setOsThreadName(settings["osName"]):
+            logger.warning("Cannot set the OS thread name of thread %s.", name)
+    return effectiveThreadSettings(qthread)
+
+def effectiveThreadSettings(qthread):
+    """
+    Return the effective settings of the calling thread. Items which cannot be queried on the platform are None.
+
+    :param qthread: the QThread instance of the calling thread
+    :return: a dict with the items "nativeId", "affinity", "priority", "policy", "schedPriority" and "osName"
+    """
+    res = dict(nativeId=threading.get_native_id(), affinity=None, priority=None, policy=None, schedPriority=None,
+               osName=_osThreadName())
+    if hasattr(os, "sched_getaffinity"):
+        res["affinity"] = sorted(os.sched_getaffinity(0))
+    prio = qthread.priority()
+    for p in _PRIORITIES:
+        if _qtPriority(p) == prio:
+            res["priority"] = p
+    if hasattr(os, "sched_getscheduler"):
+        policy = os.sched_getscheduler(0)
+        for p, v in _POLICIES.items():
+            if v == policy:
+                res["policy"] = p
+        res["schedPriority"] = os.sched_getparam(0).sched_priority
+    return res
+
 class NexTThread(QObject):
     """
     A thread of the active application
@@ -43,12 +137,19 @@ class NexTThread(QObject):
             else:
                 logger.debug("Skip startup hook registration (coverage not enabled).")
 
+        def __init__(self, parent, settings):
+            super().__init__(parent=parent)
+            self._settings = settings
+            self.effectiveSettings = {}
+
         def run(self):
             """
-            Overwritten from QThread, registers the trace hook and proceeds with normal event-loop processing.
+            Overwritten from QThread, registers the trace hook, applies the thread settings and proceeds with normal
+            event-loop processing.
             :return:
             """
             self.startupHook()
+            self.effectiveSettings = applyThreadSettings(self, self._settings)
             super().run()
 
     operationFinished = Signal() # used to synchronize threads from active application
@@ -62,16 +163,19 @@ class NexTThread(QObject):
         deinit=FilterState.DEINITIALIZING,
     )
 
-    def __init__(self, name):
+    def __init__(self, name, settings=None):
         """
         Creates a NexTThread instance with a name. If this is not the main thread, create a corresponding
         QThread and start it (i.e., the event loop).
         :param name: name of the thread
+        :param settings: the thread settings of the configuration (see applyThreadSettings(...)) or None
         """
         super().__init__()
         self._filters = {}
         self._filter2name = {}
         self._mockups = {}
+        self._workerThreads = {}
+        self._workerProcesses = {}
         self._name = name
         try:
             self._profsrv = Services.getService("Profiling")
@@ -81,11 +185,20 @@ class NexTThread(QObject):
             self._profsrv = None
         if not self.thread() is QCoreApplication.instance().thread():
             raise NexTInternalError("unexpected thread")
+        settings = settings if settings is not None else {}
+        self._originalSettings = None
         if name == "main":
             self._qthread = QCoreApplication.instance().thread()
             self._qthread.setObjectName(name)
+            # the main thread outlives the application, the changed settings are restored in cleanup()
+            original = effectiveThreadSettings(self._qthread)
+            keys = [k for k in ("affinity", "priority", "policy", "osName") if k in settings]
+            if "policy" in keys:
+                keys.append("schedPriority")
+            self._originalSettings = {k: original[k] for k in keys if original[k] is not None}
+            self._mainSettings = applyThreadSettings(self._qthread, settings)
         else:
-            self._qthread = self.ThreadWithCoverage(parent=self)
+            self._qthread = self.ThreadWithCoverage(self, settings)
             self._qthread.setObjectName(name)
             self._qthread.start()
         self.moveToThread(self._qthread)
@@ -109,6 +222,10 @@ class NexTThread(QObject):
             self._qthread.quit()
             self._qthread.wait()
             self._qthread = None
+        if self._originalSettings:
+            logger.internal("restoring the settings of thread %s", self._name)
+            applyThreadSettings(self._qthread, self._originalSettings)
+        self._originalSettings = None
         logger.internal("cleanup filters")
         for _, f in self._filters.items():
             f.destroy()
@@ -117,18 +234,24 @@ class NexTThread(QObject):
         logger.internal("cleanup mockups")
         # Note: the mockups are in ownership of the corresponding graph, we don't delete them
         self._mockups.clear()
+        self._workerThreads.clear()
+        self._workerProcesses.clear()
         logger.internal("Thread cleanup done")
 
-    def addMockup(self, name, mockup, propColl):
+    def addMockup(self, name, mockup, propColl, workerThreads=0, workerProcesses=0):
         """
         Add a FilterMockup instance by name.
         :param name: name of the filter
         :param mockup: the corresponding FilterMockup instance
+        :param workerThreads: number of worker threads for stateless filters (0 disables the worker threads)
+        :param workerProcesses: number of worker processes for stateless python filters (0 disables the process pool)
         :return:
         """
         if name in self._mockups:
             raise NodeExistsError(name)
         self._mockups[name] = (mockup, propColl)
+        self._workerThreads[name] = workerThreads
+        self._workerProcesses[name] = workerProcesses
 
     def getFilter(self, name):
         """
@@ -157,6 +280,18 @@ class NexTThread(QObject):
         """
         return self._qthread
 
+    def effectiveSettings(self):
+        """
+        Return the effective settings of the thread, i.e., the CPU affinity, the priority, the scheduling policy and
+        the OS-level name actually in use.
+        :return: a dict as returned by effectiveThreadSettings(...) (empty if the thread has not yet been started)
+        """
+        if self._name == "main":
+            return self._mainSettings
+        if self._qthread is None:
+            return {}
+        return self._qthread.effectiveSettings
+
     @Slot(str, object)
     def performOperation(self, operation, barrier):
         """
@@ -165,6 +300,11 @@ class NexTThread(QObject):
         :param barrier: a barrier object to synchronize threads
         :return: None
         """
+        # the actual implementation is in a plain method, so that it can be overwritten in subclasses without
+        # registering another slot
+        self._performOperation(operation, barrier)
+
+    def _performOperation(self, operation, barrier):
         # wait that all threads are in their event loop.
         inProcessEvents = self._qthread.property("processEventsRunning")
         if inProcessEvents:
@@ -183,8 +323,22 @@ class NexTThread(QObject):
         for name, (mockup, propColl) in self._mockups.items():
             try:
                 if operation == "create":
+                    spec = None
+                    if self._workerProcesses.get(name, 0) > 0:
+                        # pylint: disable=import-outside-toplevel
+                        # pylint: disable=cyclic-import
+                        from nexxT.core.ProcessThread import filterSpec
+                        # validated before the filter is created, so that the filter is still usable in this thread
+                        try:
+                            spec = filterSpec(name, mockup, propColl)
+                        except NexTRuntimeError as e:
+                            logger.error("%s Executing the filter in thread %s instead.", e, self._name)
                     res = mockup.createFilter(propColl)
                     res.setParent(self)
+                    if spec is not None:
+                        res.setWorkerProcesses(self._workerProcesses[name], spec)
+                    elif self._workerThreads.get(name, 0) > 0:
+                        res.setWorkerThreads(self._workerThreads[name])
                     self._filters[name] = res
                     self._filter2name[res] = name
                     logger.internal("Created filter %s in thread %s", name, self._name)
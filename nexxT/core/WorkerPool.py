@@ -0,0 +1,164 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+"""
+This module defines the classes WorkerTask and WorkerPool used for executing stateless filters in multiple threads.
+"""
+
+import functools
+import logging
+import threading
+from nexxT.Qt.QtCore import QObject, QEvent, QCoreApplication, QThreadPool
+from nexxT.interface.DataSamples import LatencyTracer
+
+logger = logging.getLogger(__name__)
+
+class _CurrentTask(threading.local):
+    # the class attribute avoids raising (and allocating) an AttributeError in threads without a task
+    task = None
+
+class WorkerTask:
+    """
+    Context of an onPortDataChanged(...) call executed by a worker thread of a stateless filter. The input ports of the
+    filter read from a snapshot of their queues taken at dispatch time and the output ports collect the transmitted
+    samples, which are transmitted in input order by the filter's thread afterwards.
+    """
+    _current = _CurrentTask()
+
+    def __init__(self, seq, environment, port, inputs):
+        self.seq = seq
+        self.environment = environment
+        self.port = port
+        self.inputs = inputs
+        self.outputs = []
+        # the trace context of the LatencyTracer at dispatch time, inherited by the outputs
+        self.trace = None
+
+    @staticmethod
+    def current():
+        """
+        Return the task executed by the calling thread.
+
+        :return: a WorkerTask instance or None
+        """
+        return WorkerTask._current.task
+
+class WorkerPool(QObject):
+    """
+    Executes the onPortDataChanged(...) calls of a stateless filter in a pool of worker threads. The outputs of the
+    calls are transmitted by the filter's thread in the order of the dispatched calls. The number of calls in flight is
+    limited to twice the number of threads, afterwards the filter's thread is blocked, so that the inter-thread
+    connections towards the filter provide back pressure as usual.
+
+    The object must be created in the filter's thread.
+    """
+    flushEventType = QEvent.Type(QEvent.registerEventType())
+
+    def __init__(self, environment, numThreads):
+        super().__init__()
+        self._env = environment
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(numThreads)
+        self._maxInFlight = 2*numThreads
+        self._cond = threading.Condition()
+        self._finished = {}
+        self._nextSeq = 0
+        self._nextEmit = 0
+        self._flushPosted = False
+
+    def numThreads(self):
+        """
+        Return the number of worker threads.
+
+        :return: an integer
+        """
+        return self._pool.maxThreadCount()
+
+    def dispatch(self, inputPort):
+        """
+        Dispatch the onPortDataChanged(...) call for the given input port to the worker threads. Called in the
+        filter's thread.
+
+        :param inputPort: the InputPort instance where the data arrived
+        :return: None
+        """
+        while self._nextSeq - self._nextEmit >= self._maxInFlight:
+            with self._cond:
+                self._cond.wait_for(lambda: self._nextEmit in self._finished)
+            self.flush()
+        inputs = {p: p.queue.snapshot() for p in self._env.getAllInputPorts()}
+        task = WorkerTask(self._nextSeq, self._env, inputPort, inputs)
+        task.trace = LatencyTracer._currentContext() # pylint: disable=protected-access
+        self._nextSeq += 1
+        self._pool.start(functools.partial(self._run, task))
+
+    def _run(self, task):
+        WorkerTask._current.task = task # pylint: disable=protected-access
+        try:
+            self._env.getPlugin().onPortDataChanged(task.port)
+        except Exception: # pylint: disable=broad-except
+            # catching a general exception is exactly what is wanted here
+            logger.exception("Uncaught exception")
+        finally:
+            WorkerTask._current.task = None # pylint: disable=protected-access
+        with self._cond:
+            self._finished[task.seq] = task
+            if not self._flushPosted:
+                self._flushPosted = True
+                QCoreApplication.postEvent(self, QEvent(self.flushEventType))
+            self._cond.notify_all()
+
+    def flush(self):
+        """
+        Transmit the outputs of all finished calls which are next in order. Called in the filter's thread.
+
+        :return: None
+        """
+        ready = []
+        with self._cond:
+            self._flushPosted = False
+            while self._nextEmit in self._finished:
+                ready.append(self._finished.pop(self._nextEmit))
+                self._nextEmit += 1
+        # pylint: disable=protected-access
+        for task in ready:
+            LatencyTracer._pushContext(task.trace)
+            try:
+                for port, sample in task.outputs:
+                    port.transmit(sample)
+            finally:
+                LatencyTracer._popContext()
+
+    def waitForDone(self):
+        """
+        Wait until all dispatched calls are finished and transmit their outputs.
+
+        :return: None
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._nextEmit + len(self._finished) >= self._nextSeq)
+        self.flush()
+
+    def shutdown(self):
+        """
+        Wait for all calls and stop the worker threads.
+
+        :return: None
+        """
+        self.waitForDone()
+        self._pool.waitForDone()
+
+    def event(self, event):
+        """
+        Overwritten from QObject to transmit the outputs of finished calls.
+
+        :param event: a QEvent instance
+        :return: a boolean
+        """
+        if event.type() == self.flushEventType:
+            self.flush()
+            return True
+        return super().event(event)
@@ -10,7 +10,7 @@ This module defines the filter ImageBlur as a little showcase for a long-running
 
 import numpy as np
 from nexxT.interface import Filter, DataSample
-from nexxT.examples.framework.ImageData import byteArrayToNumpy, numpyToByteArray
+from nexxT.examples.framework.ImageData import sampleToNumpy, numpyToByteArray
 
 class ImageBlur(Filter):
     """
@@ -40,8 +40,8 @@ class ImageBlur(Filter):
             # assert odd kernel size
             ks = (ks//2)*2 + 1
             if ks > 1: # non-trivial size ?
-                # efficient (zero-copy) conversion
-                in_img = byteArrayToNumpy(port.getData().getContent())
+                # efficient (zero-copy) conversion, shared with other consumers of the sample
+                in_img = port.getData().getDecoded(sampleToNumpy)
                 # apply the filter
                 res = boxFilter(in_img, ks)
                 # create a DataSample instance to be transferred over the port
@@ -48,13 +48,13 @@ def byteArrayToNumpy(qByteArray):
     Interpret the input instance as an image and convert that to a numpy array. If the alignment is ok, then this
     operation is a zero-copy operation, otherwise one copy is made.
 
-    :param qByteArray: a QByteArray instance
+    :param qByteArray: a QByteArray instance or another buffer, e.g., a DataSample's content view
     :return: a numpy instance
     """
     # efficient zero-copy cast to a python memoryview instance
     mv = memoryview(qByteArray)
-    # interpret the ImageHeader structure from this buffer (zero-copy)
-    hdr = ImageHeader.from_buffer(mv)
+    # interpret the ImageHeader structure from this buffer (copies only the header, works on read-only buffers)
+    hdr = ImageHeader.from_buffer_copy(mv)
     # convert the format bytes instance to a string
     fmt = hdr.format.decode()
     # sanity check
@@ -79,6 +79,18 @@ def byteArrayToNumpy(qByteArray):
     # reshape to requested dimenstions
     return np.reshape(res, (-1, max(1,hdr.lineInc//bpp), numChannels))
 
+def sampleToNumpy(sample):
+    """
+    Decoder for DataSample.getDecoded(...): interpret the sample's content as an image. The image is decoded only
+    once per sample, even if there are many consumers. The resulting array is read-only.
+
+    :param sample: a DataSample instance
+    :return: a read-only numpy instance
+    """
+    res = byteArrayToNumpy(sample.getContentView())
+    res.flags.writeable = False
+    return res
+
 def numpyToByteArray(img):
     """
     Convert a numpy image to the corresponding QByteArray (and make a copy).
@@ -15,7 +15,7 @@ import numpy as np
 from nexxT.Qt.QtGui import QPainter, QImage
 from nexxT.Qt.QtWidgets import QWidget
 from nexxT.interface import Filter, Services
-from nexxT.examples.framework.ImageData import byteArrayToNumpy
+from nexxT.examples.framework.ImageData import sampleToNumpy
 
 logger = logging.getLogger(__name__)
 
@@ -85,7 +85,7 @@ class ImageView(Filter):
         """
         sample = self.inPort.getData()
         if sample.getDatatype() == "example/image":
-            npa = byteArrayToNumpy(sample.getContent())
+            npa = sample.getDecoded(sampleToNumpy)
             self._widget.setData(npa)
 
     def onPortDataChanged(self, port): # pylint: disable=unused-argument
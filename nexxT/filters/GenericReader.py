@@ -71,7 +71,8 @@ class GenericReaderFile:
 
         :param stream: the stream
         :param idx: the index of the sample in the stream
-        :return: (content: QByteArray, dataType: str, dataTimestamp: int, receiveTimestamp: int)
+        :return: (content: QByteArray or any other contiguous buffer, e.g. a numpy array, dataType: str,
+                  dataTimestamp: int, receiveTimestamp: int)
         """
         raise NotImplementedError()
 
@@ -456,7 +457,7 @@ class GenericReader(Filter):
         else:
             f = round(1/f)
             tsData = dataTimestamp // f
-        sample = DataSample(content, dataType, tsData)
+        sample = DataSample.fromBuffer(content, dataType, tsData)
         res = time.perf_counter_ns()
         # transmit sample over corresponding port
         self._ports[[p.name() for p in self._ports].index(pname)].transmit(sample)
@@ -17,7 +17,7 @@ import os
 import numpy as np
 import h5py
 from nexxT.Qt.QtCore import Signal
-from nexxT.interface import Filter, Services
+from nexxT.interface import Filter, Services, DataSample
 from nexxT.core.Utils import handleException, isMainThread
 from nexxT.filters.GenericReader import GenericReader, GenericReaderFile
 
@@ -65,6 +65,13 @@ class Hdf5Writer(Filter):
             "Note that high numbers might require a lot of memory.",
             options=dict(min=0, max=1000000)
         )
+        self.propertyCollection().defineProperty(
+            "buffer_megabytes",
+            0.0,
+            "The maximum size of the buffered sample contents per input port in megabytes. Older samples are\n"
+            "dropped from the buffer if it is exceeded. Pass 0.0 to disable the limit.",
+            options=dict(min=0.0, max=1048576.0)
+        )
         self.propertyCollection().defineProperty(
             "use_posix_fadvise_if_available",
             True,
@@ -73,6 +80,13 @@ class Hdf5Writer(Filter):
             "Note: You can also try to use echo 0 > /proc/sys/vm/dirty_writeback_centisecs to disable\n"
             "write caching."
         )
+        self.propertyCollection().defineProperty(
+            "compact_datatypes",
+            False,
+            "Store the data types as small integers referencing a per-stream table (attribute 'dataTypes') instead\n"
+            "of storing a string for each sample. This reduces the file size, but older versions of nexxT are\n"
+            "not able to read these files."
+        )
         self.propertyCollection().propertyChanged.connect(self._propertyChanged)
         # create a numpy-style dtype for the contents of a datasample
         type_content = h5py.vlen_dtype(np.dtype(np.uint8))
@@ -83,6 +97,13 @@ class Hdf5Writer(Filter):
                       ('dataTimestamp', type_timestamp),
                       ('rcvTimestamp', type_timestamp),
                       ]
+        self.dtypeCompact = [('content', type_content),
+                             ('dataType', np.uint16),
+                             ('dataTimestamp', type_timestamp),
+                             ('rcvTimestamp', type_timestamp),
+                             ]
+        self._compactDatatypes = False
+        self._streamDatatypes = {}
 
     def onInit(self):
         for p in self.getDynamicInputPorts():
@@ -101,11 +122,13 @@ class Hdf5Writer(Filter):
             logger.warning("Hdf5Writer seems to run in GUI thread. Consider to move it to a seperate thread.")
 
     def _propertyChanged(self, propColl, name):
-        if name in ["buffer_samples", "buffer_period"]:
+        if name in ["buffer_samples", "buffer_period", "buffer_megabytes"]:
             qss = propColl.getProperty("buffer_samples")
             qsp = propColl.getProperty("buffer_period")
+            qsb = round(propColl.getProperty("buffer_megabytes")*1024*1024)
             for p in self.getDynamicInputPorts():
                 p.setQueueSize(qss, qsp)
+                p.setQueueSizeBytes(qsb)
 
     def onStop(self):
         """
@@ -133,9 +156,12 @@ class Hdf5Writer(Filter):
         mode = "w" if self.propertyCollection().getProperty("silent_overwrite") else "x"
         # create a new HDF5 file / truncate an existing file containing a stream for all existing input ports
         self._currentFile = h5py.File(Path(directory) / self._name, mode=mode)
+        self._compactDatatypes = self.propertyCollection().getProperty("compact_datatypes")
+        self._streamDatatypes = {}
         streams = self._currentFile.create_group("streams")
         for port in self.getDynamicInputPorts():
-            streams.create_dataset(port.name(), (0,), chunks=(1,), maxshape=(None,), dtype=self.dtype)
+            streams.create_dataset(port.name(), (0,), chunks=(1,), maxshape=(None,),
+                                   dtype=self.dtypeCompact if self._compactDatatypes else self.dtype)
         # setup variables needed during processing
         self._basetime = time.perf_counter_ns()
         # initial status update
@@ -168,6 +194,26 @@ class Hdf5Writer(Filter):
         """
         self._stopRecording()
 
+    def _fileDatatype(self, stream, sample):
+        """
+        Return the value stored in the dataType column of the given stream.
+
+        :param stream: the HDF5 dataset of the stream
+        :param sample: the DataSample instance
+        :return: either the data type string or an index into the stream's 'dataTypes' attribute
+        """
+        if not self._compactDatatypes:
+            return sample.getDatatype()
+        # map the process-wide datatype ids to file-local indices
+        local = self._streamDatatypes.setdefault(stream.name, {})
+        datatypeId = sample.getDatatypeId()
+        res = local.get(datatypeId)
+        if res is None:
+            res = len(local)
+            local[datatypeId] = res
+            stream.attrs["dataTypes"] = [DataSample.datatypeName(t) for t in local]
+        return res
+
     def onPortDataChanged(self, port):
         """
         Called when new data arrives at a port.
@@ -197,8 +243,8 @@ class Hdf5Writer(Filter):
         self._lastRcvTimestamp = rcvTimestamp
         # append the new data to the existing HDF5 dataset
         s.resize((s.shape[0]+1,))
-        s[-1:] = (np.frombuffer(sample.getContent(), dtype=np.uint8),
-                  sample.getDatatype(),
+        s[-1:] = (np.frombuffer(sample.getContentView(), dtype=np.uint8),
+                  self._fileDatatype(s, sample),
                   np.int64(sample.getTimestamp()),
                   rcvTimestamp)
         self._currentFile.flush()
@@ -217,6 +263,7 @@ class Hdf5File(GenericReaderFile):
     """
     def __init__(self, filename):
         self._file = h5py.File(filename, "r")
+        self._streamDatatypes = {}
 
     def close(self):
         """
@@ -257,13 +304,19 @@ class Hdf5File(GenericReaderFile):
 
         :param stream: the stream
         :param idx: the index of the sample in the stream
-        :return: (content: QByteArray, dataType: str, dataTimestamp: int, receiveTimestamp: int)
+        :return: (content: QByteArray or any other contiguous buffer, e.g. a numpy array, dataType: str,
+                  dataTimestamp: int, receiveTimestamp: int)
         """
         content, dataType, dataTimestamp, receiveTimestamp = self._file["streams"][stream][streamIdx]
-        if isinstance(dataType, bytes):
+        if isinstance(dataType, np.integer):
+            # compact data types, see Hdf5Writer
+            dataType = self._datatypeTable(stream)[dataType]
+        elif isinstance(dataType, bytes):
             # this is happening now with h5py >= 3.x
             dataType = dataType.decode()
-        return content.tobytes(), dataType, dataTimestamp, receiveTimestamp
+        # the uint8 array is freshly allocated by h5py, so it can be passed on without copying (the C++ implementation
+        # copies it once into a buffer of the PayloadPool, see DataSample.fromBuffer)
+        return content, dataType, dataTimestamp, receiveTimestamp
 
     def getRcvTimestamp(self, stream, streamIdx):
         """
@@ -276,6 +329,12 @@ class Hdf5File(GenericReaderFile):
         """
         return self._file["streams"][stream][streamIdx]["rcvTimestamp"]
 
+    def _datatypeTable(self, stream):
+        if stream not in self._streamDatatypes:
+            self._streamDatatypes[stream] = [t.decode() if isinstance(t, bytes) else str(t)
+                                             for t in self._file["streams"][stream].attrs["dataTypes"]]
+        return self._streamDatatypes[stream]
+
 class Hdf5Reader(GenericReader):
     """
     Reader for the nexxT default file format based on hdf5.
@@ -14,9 +14,12 @@
 #define NEXXT_DATA_SAMPLES_HPP
 
 #include <cstdint>
+#include <memory>
 #include <QtCore/QByteArray>
+#include <QtCore/QByteArrayView>
 #include <QtCore/QString>
 #include <QtCore/QSharedPointer>
+#include <QtCore/QVariantMap>
 
 #include "nexxT/NexxTLinkage.hpp"
 #include "nexxT/SharedPointerTypes.hpp"
@@ -24,6 +27,7 @@
 namespace nexxT
 {
     struct DataSampleD;
+    struct TraceContext;
 
     /*!
         This class is the C++ variant of \verbatim embed:rst:inline :py:class:`nexxT.interface.DataSamples.DataSample`
@@ -32,6 +36,20 @@ namespace nexxT
     class DLLEXPORT DataSample
     {
         DataSampleD *d;
+        friend class OutputPortInterface;
+        friend class InputPortInterface;
+        friend class LatencyTracer;
+
+        /* sets the time of the first transmission (reference of the sample age for the "arrival" reference), returns
+           true on the first transmission */
+        bool markTransmitted() const;
+        /* returns the time of the first transmission or -1 if the sample has not been transmitted yet */
+        int64_t transmitTime() const;
+        /* the trace context of the LatencyTracer, set by the framework */
+        std::shared_ptr<const TraceContext> trace() const;
+        void setTrace(const std::shared_ptr<const TraceContext> &trace) const;
+        /* returns a new instance sharing the content and the decoding cache with the given trace context */
+        SharedDataSamplePtr withTrace(const std::shared_ptr<const TraceContext> &trace) const;
       public:
         /*!
             The resolution of the timstamps in [seconds]
@@ -43,6 +61,11 @@ namespace nexxT
             \endverbatim
         */
         DataSample(const QByteArray &content, const QString &datatype, int64_t timestamp);
+        /*!
+            Constructor using an interned datatype id, see \verbatim
+            embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.internDatatype` \endverbatim
+        */
+        DataSample(const QByteArray &content, int32_t datatypeId, int64_t timestamp);
         /*!
             Destructor
         */
@@ -53,6 +76,55 @@ namespace nexxT
         */
         QByteArray getContent() const;
 
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.getContentView` \endverbatim
+
+            The returned view references the sample's memory and is valid as long as the sample exists.
+        */
+        QByteArrayView getContentView() const;
+
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.getContentSize` \endverbatim
+        */
+        int64_t getContentSize() const;
+
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.getTrace` \endverbatim
+        */
+        QVariantMap getTrace() const;
+
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.getDecoded` \endverbatim
+
+            The decoder is identified by the given key, it is called with this sample as argument and returns the
+            decoded object of type T by value. Example:
+
+            \code
+            std::shared_ptr<const QImage> img = sample->getDecoded<QImage>("myformat/qimage", decodeImage);
+            \endcode
+        */
+        template<class T, class Decoder> std::shared_ptr<const T> getDecoded(const QString &key, Decoder decoder) const
+        {
+            std::shared_ptr<const void> res = cachedDecoding(key);
+            if( !res )
+            {
+                /* decode outside of the lock; in case of a race, the first inserted result wins */
+                res = cacheDecoding(key, std::make_shared<const T>(decoder(*this)));
+            }
+            return std::static_pointer_cast<const T>(res);
+        }
+
+        /*!
+            Return the cached decoding with the given key or a null pointer. Usually getDecoded(...) is used instead.
+        */
+        std::shared_ptr<const void> cachedDecoding(const QString &key) const;
+
+        /*!
+            Insert the decoding into the cache unless there is already an entry with this key. Returns the cached
+            entry. Usually getDecoded(...) is used instead.
+        */
+        std::shared_ptr<const void> cacheDecoding(const QString &key, const std::shared_ptr<const void> &decoded) const;
+
         /*!
             See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.getTimestamp` \endverbatim
         */
@@ -62,6 +134,26 @@ namespace nexxT
             See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.getDatatype` \endverbatim
         */
         QString getDatatype() const;
+
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.getDatatypeId` \endverbatim
+        */
+        int32_t getDatatypeId() const;
+
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.hasDatatype` \endverbatim
+        */
+        bool hasDatatype(int32_t datatypeId) const;
+
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.internDatatype` \endverbatim
+        */
+        static int32_t internDatatype(const QString &datatype);
+
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.datatypeName` \endverbatim
+        */
+        static QString datatypeName(int32_t datatypeId);
         
         /*!
             See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.copy` \endverbatim
@@ -79,10 +171,124 @@ namespace nexxT
         */
         static int64_t currentTime();
 
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.numInstances` \endverbatim
+        */
+        static int64_t numInstances();
+
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.DataSample.memoryHeld` \endverbatim
+        */
+        static int64_t memoryHeld();
+
 //! @cond Doxygen_Suppress
         static void registerMetaType();
 //! @endcond
     };
+
+    /*!
+        This class is the C++ variant of \verbatim embed:rst:inline :py:class:`nexxT.interface.DataSamples.PayloadPool`
+        \endverbatim
+
+        The buffers are QByteArray instances. A buffer acquired from the pool is returned to the pool when the
+        DataSample created from it is destroyed. It is reused only after all copies of the QByteArray (e.g., the ones
+        returned by DataSample::getContent()) have been released.
+    */
+    class DLLEXPORT PayloadPool
+    {
+      public:
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.PayloadPool.sizeClass` \endverbatim
+        */
+        static int64_t sizeClass(int64_t size);
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.PayloadPool.acquire` \endverbatim
+        */
+        static QByteArray acquire(int64_t size);
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.PayloadPool.statistics` \endverbatim
+        */
+        static QVariantMap statistics();
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.PayloadPool.setMaxBytes` \endverbatim
+        */
+        static void setMaxBytes(int64_t maxBytes);
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.PayloadPool.maxBytes` \endverbatim
+        */
+        static int64_t maxBytes();
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.PayloadPool.clear` \endverbatim
+        */
+        static void clear();
+    };
+
+    /*!
+        This class is the C++ variant of \verbatim embed:rst:inline
+        :py:class:`nexxT.interface.DataSamples.MemoryGovernor` \endverbatim
+    */
+    class DLLEXPORT MemoryGovernor
+    {
+      public:
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.MemoryGovernor.setLimits` \endverbatim
+
+            A lowWaterMark <= 0 uses 80% of the high-water mark.
+        */
+        static void setLimits(int64_t highWaterMark, int64_t lowWaterMark = -1, const QString &policy = "block",
+                              double timeout = 1.0);
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.MemoryGovernor.limits` \endverbatim
+        */
+        static QVariantMap limits();
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.MemoryGovernor.statistics` \endverbatim
+        */
+        static QVariantMap statistics();
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.MemoryGovernor.admit` \endverbatim
+        */
+        static bool admit();
+    };
+
+    /*!
+        This class is the C++ variant of \verbatim embed:rst:inline
+        :py:class:`nexxT.interface.DataSamples.LatencyTracer` \endverbatim
+    */
+    class DLLEXPORT LatencyTracer
+    {
+        friend class OutputPortInterface;
+        friend class InputPortInterface;
+        friend class WorkerPool;
+
+        /* called by the output ports, returns the sample with the output hop added to its trace context; the context
+           is set in place on the first transmission only, later transmissions use a new instance */
+        static SharedDataSamplePtr transmitted(const SharedDataSamplePtr &sample, const QString &port, bool first);
+        /* called by the input ports before and after onPortDataChanged(...) */
+        static void enterPort(const DataSample &sample, const QString &port);
+        static void exitPort();
+        /* the trace context of the current onPortDataChanged(...) call (used for deferred transmissions) */
+        static std::shared_ptr<const TraceContext> currentContext();
+        static void pushContext(const std::shared_ptr<const TraceContext> &context);
+        static void popContext();
+      public:
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.LatencyTracer.setEnabled` \endverbatim
+        */
+        static void setEnabled(bool enabled);
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.LatencyTracer.enabled` \endverbatim
+        */
+        static bool enabled();
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.LatencyTracer.statistics` \endverbatim
+        */
+        static QVariantMap statistics();
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.DataSamples.LatencyTracer.reset` \endverbatim
+        */
+        static void reset();
+    };
 };
 
 //! @cond Doxygen_Suppress
@@ -37,6 +37,13 @@ namespace nexxT
         void getDynamicPortsSupported(bool &dynInPortsSupported, bool &dynOutPortsSupported);
 
         void portDataChanged(const InputPortInterface &port);
+
+        void setWorkerThreads(int numThreads);
+        int workerThreads() const;
+        void waitForWorkers();
+        /* the dispatch(QObject*) slot of the dispatcher is called instead of the filter's onPortDataChanged(...) (used
+           for the process pools of python filters) */
+        void setPortDataDispatcher(QObject *dispatcher);
         
         PropertyCollection *propertyCollection() const;
 
@@ -15,6 +15,7 @@
 
 #include <QtCore/QObject>
 #include <QtCore/QSemaphore>
+#include <QtCore/QVariantMap>
 #include "nexxT/NexxTLinkage.hpp"
 #include "nexxT/SharedPointerTypes.hpp"
 #include "nexxT/Ports.hpp"
@@ -22,6 +23,7 @@
 namespace nexxT
 {
     class BaseFilterEnvironment;
+    class SampleQueue;
     struct InputPortD;
 
     /*!
@@ -35,6 +37,10 @@ namespace nexxT
         Q_OBJECT
 
         InputPortD *const d;
+        friend class InterThreadMulticast;
+        friend class InterThreadConnection;
+        friend class MainThreadDispatcher;
+        friend class WorkerPool;
 
     public:
         /*!
@@ -75,6 +81,21 @@ namespace nexxT
             \endverbatim.
         */
         double queueSizeSeconds();
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.setQueueSizeBytes`
+            \endverbatim. A value <= 0 disables the budget.
+        */
+        void setQueueSizeBytes(int64_t queueSizeBytes);
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.queueSizeBytes`
+            \endverbatim. Returns -1 if the budget is disabled.
+        */
+        int64_t queueSizeBytes();
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.queuedBytes`
+            \endverbatim.
+        */
+        int64_t queuedBytes();
 
         /*!
             See \verbatim
@@ -89,19 +110,109 @@ namespace nexxT
         */
         bool interthreadDynamicQueue();
 
+        /*!
+            See \verbatim
+            embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.setInterthreadBatchNotification`
+            \endverbatim.
+        */
+        void setInterthreadBatchNotification(bool enabled);
+        /*!
+            See \verbatim
+            embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.interthreadBatchNotification`
+            \endverbatim.
+        */
+        bool interthreadBatchNotification();
+
+        /*!
+            See \verbatim
+            embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.setMaxSampleAge`
+            \endverbatim.
+
+            A value <= 0 disables the check.
+        */
+        void setMaxSampleAge(double seconds, const QString &reference = "timestamp");
+        /*!
+            See \verbatim
+            embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.maxSampleAge`
+            \endverbatim.
+
+            Returns -1.0 if the check is disabled.
+        */
+        double maxSampleAge();
+        /*!
+            See \verbatim
+            embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.maxSampleAgeReference`
+            \endverbatim.
+        */
+        QString maxSampleAgeReference();
+        /*!
+            See \verbatim
+            embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.staleSamples`
+            \endverbatim.
+        */
+        int64_t staleSamples();
+
+        /*!
+            See \verbatim
+            embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.setMainThreadBudget`
+            \endverbatim.
+        */
+        static void setMainThreadBudget(double seconds);
+        /*!
+            See \verbatim
+            embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.mainThreadBudget`
+            \endverbatim.
+        */
+        static double mainThreadBudget();
+        /*!
+            See \verbatim
+            embed:rst:inline :py:meth:`nexxT.interface.Ports.InputPortInterface.mainThreadBacklog`
+            \endverbatim.
+        */
+        static QVariantMap mainThreadBacklog();
+
     public slots:
         /*!
             Called by the nexxT framework, not intended to be used directly.
         */
         void receiveAsync(const QSharedPointer<const nexxT::DataSample> &sample, QSemaphore *semaphore, bool isPending=false);
+        /*!
+            Called by the nexxT framework, not intended to be used directly. The enqueue time is the (steady clock)
+            time when the sample has been passed to the inter-thread connection.
+        */
+        void receiveAsyncEnqueued(const QSharedPointer<const nexxT::DataSample> &sample, QSemaphore *semaphore, qint64 enqueueNs);
+        /*!
+            Called by the nexxT framework, not intended to be used directly.
+        */
+        void receiveAsyncBatch(nexxT::InterThreadConnection *itc, QSemaphore *semaphore);
         /*!
             Called by the nexxT framework, not intended to be used directly.
         */
         void receiveSync (const QSharedPointer<const nexxT::DataSample> &sample);
 
+    protected:
+        /*!
+            Overwritten from QObject to handle wakeup events of inter-thread connections.
+        */
+        virtual bool event(QEvent *e) override;
+
+    private slots:
+        /* called on changes of the portProfilingEnabled property of the profiling service */
+        void setPortProfilingEnabled(bool enabled);
+
     private:
+        void receiveAsyncSamples(const SharedDataSamplePtr *samples, const qint64 *enqueueNs, int numSamples,
+                                 QSemaphore *semaphore, bool isPending,
+                                 nexxT::InterThreadConnection *priorityConnection = nullptr,
+                                 nexxT::InterThreadConnection *serviceConnection = nullptr);
+        void receiveAsyncSample(const SharedDataSamplePtr &sample, QSemaphore *semaphore, bool notify, qint64 enqueueNs);
         void addToQueue(const SharedDataSamplePtr &sample);
-        void transmit();
+        bool isStale(const SharedDataSamplePtr &sample);
+        /* enqueueNs is the time when the sample has been passed to the inter-thread connection, -1 for direct
+           connections */
+        void transmit(const SharedDataSamplePtr &sample, qint64 enqueueNs);
+        static void purgeMainThreadQueue(const InputPortInterface *port, const QSemaphore *semaphore);
+        QSharedPointer<const SampleQueue> snapshotQueue() const;
     };
 
     /*!
@@ -15,6 +15,7 @@
 
 #include <QtCore/QObject>
 #include <QtCore/QSemaphore>
+#include <QtCore/QVariantMap>
 #include "nexxT/NexxTLinkage.hpp"
 #include "nexxT/SharedPointerTypes.hpp"
 #include "nexxT/Ports.hpp"
@@ -22,6 +23,7 @@
 namespace nexxT
 {
     class BaseFilterEnvironment;
+    struct OutputPortD;
  
     /*!
         This class is the C++ variant of \verbatim embed:rst:inline :py:class:`nexxT.interface.Ports.OutputPortInterface`
@@ -32,6 +34,8 @@ namespace nexxT
     class DLLEXPORT OutputPortInterface : public Port
     {
         Q_OBJECT
+
+        OutputPortD *const d;
         
     signals:
         /*!
@@ -51,17 +55,37 @@ namespace nexxT
             \endverbatim.
         */
         OutputPortInterface(bool dynamic, const QString &name, BaseFilterEnvironment *env);
+        /*!
+            Destructor
+        */
+        virtual ~OutputPortInterface();
         /*!
             See \verbatim embed:rst:inline :py:meth:`nexxT.interface.Ports.OutputPortInterface.transmit`
             \endverbatim.
         */
         void transmit(const SharedDataSamplePtr &sample);
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.Ports.OutputPortInterface.setMemoryGoverned`
+            \endverbatim.
+        */
+        void setMemoryGoverned(bool memoryGoverned);
+        /*!
+            See \verbatim embed:rst:inline :py:meth:`nexxT.interface.Ports.OutputPortInterface.memoryGoverned`
+            \endverbatim.
+        */
+        bool memoryGoverned() const;
         /*!
             See \verbatim embed:rst:inline :py:meth:`nexxT.interface.Ports.OutputPortInterface.clone`
             \endverbatim.
         */
         virtual SharedPortPtr clone(BaseFilterEnvironment *) const;
 
+        /*!
+            Called by the nexxT framework, not intended to be used directly. Returns the transport metrics of the
+            direct connections of this port.
+        */
+        QVariantMap metrics() const;
+
         /*!
             Called by the nexxT framework, not intended to be used directly.
         */
@@ -70,6 +94,10 @@ namespace nexxT
             Called by the nexxT framework, not intended to be used directly.
         */
         static QObject *setupInterThreadConnection(const SharedPortPtr &, const SharedPortPtr &, QThread &, int width);
+        /*!
+            Called by the nexxT framework, not intended to be used directly.
+        */
+        static QObject *setupInterThreadMulticast(const SharedPortPtr &, QThread &outputThread, QThread &inputThread);
     };
 
 };
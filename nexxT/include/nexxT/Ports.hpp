@@ -14,13 +14,19 @@
 #define NEXXT_PORTS_HPP
 
 #include <QtCore/QObject>
+#include <QtCore/QEvent>
 #include <QtCore/QSemaphore>
+#include <QtCore/QList>
+#include <QtCore/QPair>
+#include <QtCore/QPointer>
+#include <QtCore/QVariantMap>
 #include "nexxT/NexxTLinkage.hpp"
 #include "nexxT/SharedPointerTypes.hpp"
 
 namespace nexxT
 {
     class BaseFilterEnvironment;
+    class InputPortInterface;
     struct PortD;
     struct InterThreadConnectionD;
 
@@ -89,15 +95,111 @@ namespace nexxT
 
         InterThreadConnectionD *const d;
     public:
-        InterThreadConnection(QThread *qthread_from, int width);
+        InterThreadConnection(QThread *qthread_from, int width, QObject *receiver = nullptr);
         virtual ~InterThreadConnection();
 
+        /* enqueueNs receives the (steady clock) times when the samples have been passed to this connection */
+        QList<SharedDataSamplePtr> takePending(QList<qint64> &enqueueNs);
+        QSemaphore *semaphore();
+        /* the object in the receiving thread the deliveries and wakeups of this connection are posted to */
+        QObject *receiver() const;
+        void addMulticastReceiver(const SharedPortPtr &inputPort, int width);
+
     signals:
-        void transmitInterThread(const QSharedPointer<const nexxT::DataSample> &sample, QSemaphore *semaphore);
+        void transmitInterThread(const QSharedPointer<const nexxT::DataSample> &sample, QSemaphore *semaphore,
+                                 qint64 enqueueNs);
+        void transmitInterThreadBatch(nexxT::InterThreadConnection *itc, QSemaphore *semaphore);
 
     public slots:
         void receiveSample(const QSharedPointer<const nexxT::DataSample> &sample);
         void setStopped(bool stopped);
+        void setBatched(bool batched);
+        bool batched() const;
+        void setTransport(const QString &transport);
+        QString transport() const;
+        void setOverflowPolicy(const QString &policy, double timeout);
+        QString overflowPolicy() const;
+        void setPriority(const QString &priority);
+        QString priority() const;
+        void priorityDeliveryFinished(qint64 startNs, qint64 endNs);
+        void serviceFinished(int numSamples, qint64 startNs, qint64 endNs);
+        void setAutoWidth(int minWidth, int maxWidth, double targetLatency);
+        bool autoWidth() const;
+        int width() const;
+        qint64 droppedSamples() const;
+        QVariantMap metrics() const;
+
+    private:
+        Qt::EventPriority wakeupPriority();
+        void postWakeup();
+        void tuneWidth();
+        void resize(int width);
+        bool tryAcquire(QSemaphore *semaphore, int timeoutMs);
+        bool acquireMulticast();
+        void deliver(const SharedDataSamplePtr &sample);
+        void deliverKeepLatest(const SharedDataSamplePtr &sample);
+    };
+
+    /*
+        Event posted to the receiving input port by inter-thread connections using the "spsc" transport. The
+        connection is tracked with a guarded pointer, connection() returns null if it has been destroyed meanwhile.
+    */
+    class DLLEXPORT InterThreadWakeupEvent : public QEvent
+    {
+        QPointer<InterThreadConnection> itc;
+    public:
+        InterThreadWakeupEvent(InterThreadConnection *itc);
+        InterThreadConnection *connection() const;
+        static QEvent::Type registeredType();
+    };
+
+    /*
+        Receiving side of an inter-thread connection to a single input port. The relay is owned by the connection and
+        lives in the thread of the input port. The deliveries and wakeups of the connection are posted to the relay,
+        so that they can be removed together with the connection without affecting other connections of the port.
+    */
+    class DLLEXPORT InterThreadRelay : public QObject
+    {
+        Q_OBJECT
+
+        QPointer<InputPortInterface> port;
+    public:
+        InterThreadRelay(InputPortInterface *inputPort);
+        virtual ~InterThreadRelay();
+
+        InputPortInterface *inputPort() const;
+
+    public slots:
+        void receiveAsync(const QSharedPointer<const nexxT::DataSample> &sample, QSemaphore *semaphore,
+                          qint64 enqueueNs);
+        void receiveAsyncBatch(nexxT::InterThreadConnection *itc, QSemaphore *semaphore);
+
+    protected:
+        virtual bool event(QEvent *e) override;
+    };
+
+    /*
+        Receiving side of an inter-thread connection from one output port to multiple input ports living in the same
+        thread. The samples are transported once and dispatched locally to the input ports.
+    */
+    class DLLEXPORT InterThreadMulticast : public QObject
+    {
+        Q_OBJECT
+
+        QList<QPair<SharedPortPtr, QSemaphore*> > receivers;
+    public:
+        InterThreadMulticast(QThread *qthread_to);
+        virtual ~InterThreadMulticast();
+
+        QSemaphore *addReceiver(const SharedPortPtr &inputPort, int width);
+
+    public slots:
+        void receiveAsync(const QSharedPointer<const nexxT::DataSample> &sample, QSemaphore *semaphore,
+                          qint64 enqueueNs);
+        void receiveAsyncBatch(nexxT::InterThreadConnection *itc, QSemaphore *semaphore);
+
+    protected:
+        virtual bool event(QEvent *e) override;
     };
 //! @endcond
 };
@@ -5,10 +5,115 @@
 #
 
 """
-This module defines the nexxT interface class DataSample.
+This module defines the nexxT interface classes DataSample, PayloadPool, MemoryGovernor and LatencyTracer.
 """
+from collections import deque
+import ctypes
+import itertools
+import logging
+import threading
 import time
-from nexxT.Qt.QtCore import QByteArray
+import weakref
+import numpy as np
+from nexxT.Qt.QtCore import QByteArray, QThread
+
+logger = logging.getLogger(__name__)
+
+_decodeLock = threading.Lock()
+_datatypeLock = threading.Lock()
+_datatypeIds = {}
+_datatypeNames = []
+
+class _ThreadToken:
+    """
+    Placeholder object stored in the thread-local data, it is released together with the data of a finished thread.
+    """
+
+class _InstanceCounter(threading.local):
+    """
+    Thread-local counters of the alive DataSample instances and the memory held by them. Each thread updates its own
+    counters without locking, the process-wide values are the sums over the counters of all threads. When the
+    thread-local data of a thread is released, its counters are folded into the totals of the finished threads.
+    """
+
+    _lock = threading.RLock()
+    _keys = itertools.count()
+    _counters = {}
+    _finished = [0, 0]
+
+    def __init__(self):
+        super().__init__()
+        # [number of instances, memory held]
+        self.counts = [0, 0]
+        self.token = _ThreadToken()
+        with _InstanceCounter._lock:
+            key = next(_InstanceCounter._keys)
+            _InstanceCounter._counters[key] = self.counts
+        weakref.finalize(self.token, _InstanceCounter._threadFinished, key, self.counts)
+
+    @staticmethod
+    def _threadFinished(key, counts):
+        with _InstanceCounter._lock:
+            del _InstanceCounter._counters[key]
+            _InstanceCounter._finished[0] += counts[0]
+            _InstanceCounter._finished[1] += counts[1]
+
+    @staticmethod
+    def numCounters():
+        """
+        Return the number of counters of threads which have not yet finished.
+
+        :return: an integer
+        """
+        with _InstanceCounter._lock:
+            return len(_InstanceCounter._counters)
+
+    @staticmethod
+    def totals():
+        """
+        Return the process-wide sums of the counters.
+
+        :return: a tuple (number of instances, memory held)
+        """
+        with _InstanceCounter._lock:
+            counters = list(_InstanceCounter._counters.values()) + [_InstanceCounter._finished]
+            return sum(c[0] for c in counters), sum(c[1] for c in counters)
+
+_instanceCounter = _InstanceCounter()
+
+def _trackInstances(instances, memory):
+    counts = _instanceCounter.counts
+    counts[0] += instances
+    counts[1] += memory
+    if memory < 0 and MemoryGovernor._waiting: # pylint: disable=protected-access
+        MemoryGovernor._memoryReleased() # pylint: disable=protected-access
+
+def _readonlyView(buffer):
+    """
+    Return a flat, read-only memoryview of unsigned bytes referencing the given (C-contiguous) buffer.
+
+    :param buffer: an object supporting the buffer protocol
+    :return: a memoryview instance
+    """
+    return memoryview(buffer).cast("B").toreadonly()
+
+def _copyToByteArray(buffer):
+    """
+    Copy the contents of the given buffer into a new QByteArray (exactly one copy is made).
+
+    :param buffer: an object supporting the buffer protocol
+    :return: a QByteArray instance
+    """
+    if isinstance(buffer, (bytes, bytearray)):
+        return QByteArray(buffer)
+    view = memoryview(buffer)
+    if not view.c_contiguous:
+        view = memoryview(view.tobytes())
+    view = view.cast("B")
+    res = QByteArray(view.nbytes, 0)
+    if view.nbytes > 0:
+        memoryview(res)[:] = view
+    return res
 
 class DataSample:
     """
@@ -35,28 +140,172 @@ class DataSample:
         """
         Create a new data sample instance.
 
-        :param content: A QByteArray instance containing the (serialized) content
-        :param datatype: A string instance which uniquely defines the serialized content
+        QByteArray and bytes instances are referenced without copying (the former due to the implicit sharing of
+        QByteArray, the latter because they are immutable). Any other object supporting the buffer protocol (e.g.,
+        bytearray, memoryview, numpy arrays) is copied exactly once. Use :py:meth:`fromBuffer` to avoid this copy.
+
+        :param content: A QByteArray instance (or another buffer) containing the (serialized) content
+        :param datatype: A string instance which uniquely defines the serialized content or a datatype id returned
+                         by :py:meth:`internDatatype`
         :param timestamp: An integer representing the sample's time stamp [µs]
         """
-        self._content = QByteArray(content)
+        if isinstance(content, QByteArray):
+            self._content = QByteArray(content)
+            self._view = None
+        elif isinstance(content, bytes):
+            self._content = None
+            self._view = _readonlyView(content)
+        else:
+            self._content = _copyToByteArray(content)
+            self._view = None
+        if isinstance(datatype, int):
+            self._type = DataSample.datatypeName(datatype)
+            self._typeId = datatype
+        else:
+            self._type = datatype
+            self._typeId = None
         self._timestamp = timestamp
-        self._type = datatype
         self._transmitted = False
+        # time of the first transmission (DataSample.currentTime()), set by the framework
+        self._transmitTime = None
+        self._decoded = None
+        # the trace context (traceId, hops) of the LatencyTracer, set by the framework
+        self._trace = None
+        self._memoryHeld = self.getContentSize()
+        _trackInstances(1, self._memoryHeld)
+
+    def __del__(self):
+        # the attribute is missing if the constructor failed
+        _trackInstances(-1, -getattr(self, "_memoryHeld", 0))
+
+    @staticmethod
+    def fromBuffer(buffer, datatype, timestamp):
+        """
+        Create a new data sample instance which adopts the given buffer without copying it. The buffer might be any
+        object supporting the buffer protocol, e.g., a numpy array, a memoryview, a slice of an mmap or a QByteArray.
+        Non-contiguous buffers are copied once.
+
+        The caller must not modify the buffer's contents afterwards, since the sample may be referenced by any number
+        of receivers in other threads.
+
+        .. note::
+            The C++ implementation (used by default) stores the content in a QByteArray and cannot adopt foreign
+            buffers. There, QByteArray instances are referenced without copying, but any other buffer is copied exactly
+            once; buffers larger than :py:attr:`PayloadPool.MIN_CAPACITY` are copied into a buffer of the pool. Use
+            the buffers of :py:class:`PayloadPool` (which are QByteArray instances in the C++ implementation) to avoid
+            this copy.
+
+        :param buffer: the object holding the (serialized) content
+        :param datatype: A string instance which uniquely defines the serialized content or a datatype id
+        :param timestamp: An integer representing the sample's time stamp [µs]
+        :return: a new DataSample instance
+        """
+        if isinstance(buffer, (QByteArray, bytes)):
+            return DataSample(buffer, datatype, timestamp)
+        view = memoryview(buffer)
+        if not view.c_contiguous:
+            return DataSample(view, datatype, timestamp)
+        res = DataSample(b"", datatype, timestamp)
+        res._view = _readonlyView(view) # pylint: disable=protected-access
+        res._memoryHeld = res.getContentSize() # pylint: disable=protected-access
+        _trackInstances(0, res._memoryHeld) # pylint: disable=protected-access
+        return res
 
     def getContent(self):
         """
         Get the contents of this sample as a QByteArray. Note that this is an efficient operation due to the copy on
         write semantics of QByteArray. It also asserts that the original contents cannot be modified.
 
+        Samples created from a buffer other than a QByteArray create the QByteArray on first usage, which involves
+        a single copy. Consider to use :py:meth:`getContentView` in this case.
+
         In C++, make sure to keep an instance of the QByteArray until done with processing. Moreover, consider to use
         `QByteArray::constData()` for a pointer-to-memory access rather than `QByteArray::data()`, since the latter
         will eventually make an unnecessary deep copy of the encapsulated data.
 
         :return: QByteArray instance copy
         """
+        if self._content is None:
+            self._content = _copyToByteArray(self._view)
         return QByteArray(self._content)
 
+    def getContentView(self):
+        """
+        Get the contents of this sample as a read-only memoryview of unsigned bytes. For samples created with
+        :py:meth:`fromBuffer`, this is a zero-copy operation. For QByteArray based samples, python's buffer protocol
+        of QByteArray might detach the shared data once; the resulting view is cached afterwards.
+
+        In C++, this function returns a QByteArrayView which is valid as long as the sample exists. The python binding
+        of the C++ class returns a memoryview of the same memory, so make sure to keep a reference to the sample while
+        using the view.
+
+        :return: a read-only memoryview instance
+        """
+        if self._view is None:
+            self._view = _readonlyView(self._content)
+        return self._view
+
+    def getContentSize(self):
+        """
+        Return the size of the content in bytes without accessing the content itself.
+
+        :return: the size as an integer
+        """
+        if self._view is not None:
+            return self._view.nbytes
+        return self._content.size()
+
+    def getTrace(self):
+        """
+        Return the trace context of this sample recorded by the :py:class:`LatencyTracer`. The hops are the ports
+        passed from the source of the trace to the last transmission of this sample. Output ports have equal enter and
+        exit times (the time of the transmission), for input ports the enter time is the start of
+        onPortDataChanged(...) and the exit time is the transmission of the derived sample.
+
+        :return: an empty dict if the sample has not been traced, otherwise a dict with the keys "traceId" and "hops",
+                 the latter is a list of [port, thread, enterNs, exitNs] lists.
+        """
+        trace = self._trace
+        if trace is None:
+            return {}
+        return dict(traceId=trace[0], hops=[list(h) for h in trace[1]])
+
+    def _withTrace(self, trace):
+        # returns a new instance sharing the content and the decoding cache of this sample with the given trace
+        # context; the content is accounted to the original sample only
+        res = DataSample.__new__(DataSample)
+        res.__dict__.update(self.__dict__)
+        res._trace = trace # pylint: disable=protected-access
+        res._memoryHeld = 0 # pylint: disable=protected-access
+        _trackInstances(1, 0)
+        return res
+
+    def getDecoded(self, decoder):
+        """
+        Return the decoded content of this sample, using a per-sample cache keyed by the decoder. The first call
+        with a specific decoder calls decoder(sample) and caches the result, later calls (e.g., from other consumers
+        in a fan-out) return the cached object. The cache is thread-safe and it is dropped together with the sample.
+
+        Since the decoded object is shared between all consumers of the sample, it must be treated as read-only.
+        Decoders should return immutable objects where possible (e.g., numpy arrays created from
+        :py:meth:`getContentView` are not writeable).
+
+        In C++, the decoder is identified by a key string and it returns the decoded object by value; the result is
+        a std::shared_ptr<const T>.
+
+        :param decoder: a callable taking the DataSample instance as argument and returning the decoded object
+        :return: the decoded object
+        """
+        cache = self._decoded
+        if cache is not None and decoder in cache:
+            return cache[decoder]
+        # decode outside of the lock; in case of a race, the first inserted result wins
+        value = decoder(self)
+        with _decodeLock:
+            if self._decoded is None:
+                self._decoded = {}
+            return self._decoded.setdefault(decoder, value)
+
     def getTimestamp(self):
         """
         Return the timestamp associated to the data.
@@ -73,6 +322,57 @@ class DataSample:
         """
         return self._type
 
+    def getDatatypeId(self):
+        """
+        Return the interned id of the data type, see :py:meth:`internDatatype`.
+
+        :return: data type id (integer)
+        """
+        if self._typeId is None:
+            self._typeId = DataSample.internDatatype(self._type)
+        return self._typeId
+
+    def hasDatatype(self, datatypeId):
+        """
+        Fast check of the data type using an interned id instead of comparing strings.
+
+        :param datatypeId: a data type id returned by :py:meth:`internDatatype`
+        :return: True if the sample has the given type, False otherwise
+        """
+        return self.getDatatypeId() == datatypeId
+
+    @staticmethod
+    def internDatatype(datatype):
+        """
+        Return the compact integer id of the given data type string. The ids are assigned on first usage and they are
+        valid process-wide for the lifetime of the process, i.e., they must not be stored persistently. Consumers
+        usually intern their data types once and use :py:meth:`hasDatatype` afterwards.
+
+        :param datatype: the data type string
+        :return: data type id (integer)
+        """
+        res = _datatypeIds.get(datatype)
+        if res is None:
+            with _datatypeLock:
+                res = _datatypeIds.get(datatype)
+                if res is None:
+                    res = len(_datatypeNames)
+                    _datatypeNames.append(datatype)
+                    _datatypeIds[datatype] = res
+        return res
+
+    @staticmethod
+    def datatypeName(datatypeId):
+        """
+        Return the data type string for the given interned id.
+
+        :param datatypeId: a data type id returned by :py:meth:`internDatatype`
+        :return: data type string
+        """
+        if not 0 <= datatypeId < len(_datatypeNames):
+            raise RuntimeError(f"Unknown datatype id {datatypeId}")
+        return _datatypeNames[datatypeId]
+
     @staticmethod
     def copy(src):
         """
@@ -83,6 +383,24 @@ class DataSample:
         """
         return DataSample(src.getContent(), src.getDatatype(), src.getTimestamp())
 
+    @staticmethod
+    def numInstances():
+        """
+        Return the number of DataSample instances currently alive in this process.
+
+        :return: an integer
+        """
+        return _InstanceCounter.totals()[0]
+
+    @staticmethod
+    def memoryHeld():
+        """
+        Return the sum of the content sizes of the DataSample instances currently alive in this process.
+
+        :return: the size in bytes
+        """
+        return _InstanceCounter.totals()[1]
+
     @staticmethod
     def currentTime():
         """
@@ -94,3 +412,414 @@ class DataSample:
         """
         factor = round(DataSample.TIMESTAMP_RES / 1e-9)
         return time.time_ns() // factor
+
+class PayloadPool:
+    """
+    .. note::
+        Import this class with :code:`from nexxT.interface import PayloadPool`.
+
+    A process-wide pool of reusable payload buffers for DataSample instances. Producers of large samples (e.g.,
+    images) can use this pool to avoid allocating and freeing memory for every sample. The buffers are organized in
+    size classes (four classes per power of two). A buffer is returned to the pool automatically when the DataSample
+    using it and all views of its content have been destroyed.
+
+    Usage::
+
+        buffer = PayloadPool.acquire(size)
+        np.frombuffer(buffer, dtype=np.uint8)[...] = ... # fill the buffer
+        sample = DataSample.fromBuffer(buffer, "mytype", timestamp)
+
+    The buffer must not be modified after the sample has been created. In python, the returned buffer is a numpy
+    uint8 array, the C++ implementation returns a QByteArray; both support the python buffer protocol.
+
+    .. note::
+        Usually, nexxT is using the wrapped C++ class instead of the python version. The C++ interface is defined in
+        :cpp:class:`nexxT::PayloadPool`
+    """
+
+    MIN_CAPACITY = 4096
+    """the smallest size class in bytes"""
+
+    _lock = threading.RLock()
+    _idle = {}
+    _bytesHeld = 0
+    _maxBytes = 256*1024*1024
+    _hits = 0
+    _misses = 0
+
+    @staticmethod
+    def sizeClass(size):
+        """
+        Return the capacity of the buffers used for the given size.
+
+        :param size: the requested size in bytes
+        :return: the capacity in bytes
+        """
+        if size <= PayloadPool.MIN_CAPACITY:
+            return PayloadPool.MIN_CAPACITY
+        step = (1 << (size - 1).bit_length()) // 8
+        return ((size + step - 1) // step) * step
+
+    @staticmethod
+    def acquire(size):
+        """
+        Acquire a writable buffer of the given size. The contents of the buffer are undefined.
+
+        :param size: the size in bytes
+        :return: a writable buffer (see above)
+        """
+        capacity = PayloadPool.sizeClass(size)
+        storage = None
+        with PayloadPool._lock:
+            idle = PayloadPool._idle.get(capacity)
+            if idle:
+                storage = idle.pop()
+                PayloadPool._bytesHeld -= capacity
+                PayloadPool._hits += 1
+            else:
+                PayloadPool._misses += 1
+        if storage is None:
+            storage = np.empty(capacity, dtype=np.uint8)
+        # numpy collapses the base of derived arrays to the object owning the memory. Using a ctypes array as owner
+        # makes sure that every view (numpy arrays, memoryviews) of the buffer keeps the owner alive, so that
+        # storage is returned to the pool only after the last view has been released.
+        owner = (ctypes.c_uint8 * size).from_buffer(storage)
+        weakref.finalize(owner, PayloadPool._recycle, storage)
+        return np.frombuffer(owner, dtype=np.uint8)
+
+    @staticmethod
+    def _recycle(storage):
+        with PayloadPool._lock:
+            if PayloadPool._bytesHeld + storage.nbytes <= PayloadPool._maxBytes:
+                PayloadPool._idle.setdefault(storage.nbytes, []).append(storage)
+                PayloadPool._bytesHeld += storage.nbytes
+
+    @staticmethod
+    def statistics():
+        """
+        Return the statistics of the pool.
+
+        :return: a dict with the keys "hits", "misses" (number of acquire calls which could reuse a buffer / had to
+                 allocate a new buffer), "buffersHeld" and "bytesHeld" (idle buffers currently held by the pool)
+        """
+        with PayloadPool._lock:
+            return dict(hits=PayloadPool._hits, misses=PayloadPool._misses,
+                        buffersHeld=sum(len(l) for l in PayloadPool._idle.values()),
+                        bytesHeld=PayloadPool._bytesHeld)
+
+    @staticmethod
+    def setMaxBytes(maxBytes):
+        """
+        Set the maximum number of bytes held by idle buffers in the pool. Buffers exceeding this limit are freed.
+
+        :param maxBytes: the limit in bytes
+        :return: None
+        """
+        with PayloadPool._lock:
+            PayloadPool._maxBytes = maxBytes
+
+    @staticmethod
+    def maxBytes():
+        """
+        Return the maximum number of bytes held by idle buffers in the pool.
+
+        :return: the limit in bytes
+        """
+        return PayloadPool._maxBytes
+
+    @staticmethod
+    def clear():
+        """
+        Free all idle buffers and reset the statistics.
+
+        :return: None
+        """
+        with PayloadPool._lock:
+            PayloadPool._idle.clear()
+            PayloadPool._bytesHeld = 0
+            PayloadPool._hits = 0
+            PayloadPool._misses = 0
+
+class MemoryGovernor:
+    """
+    .. note::
+        Import this class with :code:`from nexxT.interface import MemoryGovernor`.
+
+    A process-wide limit of the memory held by DataSample instances (see :py:meth:`DataSample.memoryHeld`). Once the
+    memory exceeds the high-water mark, the output ports of governed filters (see
+    :py:meth:`nexxT.interface.Ports.OutputPortInterface.setMemoryGoverned`, usually the sources of an application)
+    throttle their transmissions until the memory falls below the low-water mark. Depending on the policy, a
+    transmission is either blocked ("block", at most for the given timeout, afterwards the sample is discarded) or
+    the sample is discarded immediately ("drop"). The other output ports are not affected, so that the samples already
+    in flight can be processed and released.
+
+    The governor is disabled by default.
+
+    .. note::
+        Usually, nexxT is using the wrapped C++ class instead of the python version. The C++ interface is defined in
+        :cpp:class:`nexxT::MemoryGovernor`
+    """
+
+    # notified by DataSample when memory is released while governed ports are blocked
+    _condition = threading.Condition()
+    _waiting = 0
+    _highWaterMark = 0
+    _lowWaterMark = 0
+    _policy = "block"
+    _timeout = 1.0
+    _throttled = False
+    _throttleEvents = 0
+    _dropped = 0
+    _blockingNs = 0
+
+    @staticmethod
+    def setLimits(highWaterMark, lowWaterMark=None, policy="block", timeout=1.0):
+        """
+        Set the limits of the governor.
+
+        :param highWaterMark: the memory in bytes above which the governed ports are throttled; 0 disables the governor
+        :param lowWaterMark: the memory in bytes below which the throttling ends; None or a value <= 0 uses 80% of the
+                             high-water mark
+        :param policy: either "block" or "drop"
+        :param timeout: the maximum time in seconds a transmission is blocked in the "block" policy
+        :return: None
+        """
+        if policy not in ["block", "drop"]:
+            raise RuntimeError(f"Unknown memory governor policy '{policy}'.")
+        if lowWaterMark is None or lowWaterMark <= 0 or lowWaterMark > highWaterMark:
+            lowWaterMark = highWaterMark*4//5
+        with MemoryGovernor._condition:
+            MemoryGovernor._highWaterMark = max(0, highWaterMark)
+            MemoryGovernor._lowWaterMark = max(0, lowWaterMark)
+            MemoryGovernor._policy = policy
+            MemoryGovernor._timeout = max(0.0, timeout)
+            MemoryGovernor._throttled = False
+
+    @staticmethod
+    def limits():
+        """
+        Return the limits of the governor.
+
+        :return: a dict with the keys "highWaterMark", "lowWaterMark", "policy" and "timeout"
+        """
+        with MemoryGovernor._condition:
+            return dict(highWaterMark=MemoryGovernor._highWaterMark, lowWaterMark=MemoryGovernor._lowWaterMark,
+                        policy=MemoryGovernor._policy, timeout=MemoryGovernor._timeout)
+
+    @staticmethod
+    def statistics():
+        """
+        Return the statistics of the governor.
+
+        :return: a dict with the keys "memoryHeld" and "numInstances" (see DataSample), "throttled" (whether the
+                 governed ports are currently throttled), "throttleEvents" (number of times the high-water mark has
+                 been exceeded), "dropped" (number of discarded samples) and "blockingTime" (cumulative time in
+                 seconds the governed ports have been blocked)
+        """
+        with MemoryGovernor._condition:
+            return dict(memoryHeld=DataSample.memoryHeld(), numInstances=DataSample.numInstances(),
+                        throttled=MemoryGovernor._throttled, throttleEvents=MemoryGovernor._throttleEvents,
+                        dropped=MemoryGovernor._dropped, blockingTime=MemoryGovernor._blockingNs*1e-9)
+
+    @staticmethod
+    def _memoryReleased():
+        with MemoryGovernor._condition:
+            MemoryGovernor._condition.notify_all()
+
+    @staticmethod
+    def _update():
+        # called with the lock of the condition held, returns whether the governed ports are throttled
+        memory = DataSample.memoryHeld()
+        if not MemoryGovernor._throttled and memory > MemoryGovernor._highWaterMark:
+            MemoryGovernor._throttled = True
+            MemoryGovernor._throttleEvents += 1
+            logger.warning("Memory governor: %.1f MB held by data samples, throttling the governed sources.",
+                           memory/(1024*1024))
+        elif MemoryGovernor._throttled and memory < MemoryGovernor._lowWaterMark:
+            MemoryGovernor._throttled = False
+            logger.info("Memory governor: %.1f MB held by data samples, throttling finished.", memory/(1024*1024))
+        return MemoryGovernor._throttled
+
+    @staticmethod
+    def admit():
+        """
+        Called by governed output ports before a sample is transmitted. Blocks the caller in the "block" policy as
+        long as the ports are throttled.
+
+        :return: True if the sample shall be transmitted, False if it shall be discarded
+        """
+        if MemoryGovernor._highWaterMark <= 0:
+            return True
+        with MemoryGovernor._condition:
+            if not MemoryGovernor._update():
+                return True
+            if MemoryGovernor._policy == "drop":
+                MemoryGovernor._dropped += 1
+                return False
+            t0 = time.perf_counter_ns()
+            MemoryGovernor._waiting += 1
+            try:
+                throttled = not MemoryGovernor._condition.wait_for(lambda: not MemoryGovernor._update(),
+                                                                   MemoryGovernor._timeout)
+            finally:
+                MemoryGovernor._waiting -= 1
+            MemoryGovernor._blockingNs += time.perf_counter_ns() - t0
+            if throttled:
+                MemoryGovernor._dropped += 1
+        return not throttled
+
+class LatencyTracer:
+    """
+    .. note::
+        Import this class with :code:`from nexxT.interface import LatencyTracer`.
+
+    End-to-end latency tracing of the data samples. When enabled, the framework attaches a trace context to each
+    transmitted sample (see :py:meth:`DataSample.getTrace`) holding a trace id and the ports passed since the source
+    of the trace. A sample transmitted during onPortDataChanged(...) inherits the context of the input sample which
+    triggered the call, so that the trace follows derived samples through the filter graph. Samples transmitted
+    outside of onPortDataChanged(...) start a new trace.
+
+    Each finished onPortDataChanged(...) call records the latency from the start of the trace to the end of the call
+    for the path of ports. The statistics of the most recent latencies are available per path.
+
+    The trace context of a sample is never changed once the sample has been transmitted. A sample which is transmitted
+    again (e.g. forwarded by a filter) is transmitted as a new instance sharing the content of the original sample, so
+    that receivers of the original sample are not affected. Samples transmitted from worker processes start a new
+    trace.
+
+    .. note::
+        Usually, nexxT is using the wrapped C++ class instead of the python version. The C++ interface is defined in
+        :cpp:class:`nexxT::LatencyTracer`
+    """
+
+    WINDOW = 1000
+    """the number of recent latencies per path used for the statistics"""
+    MAX_HOPS = 64
+    """traces with more hops (e.g. in feedback loops) are restarted"""
+
+    _enabled = False
+    _lock = threading.Lock()
+    _nextTraceId = 0
+    _paths = {}
+    _local = threading.local()
+
+    @staticmethod
+    def setEnabled(enabled):
+        """
+        Enable or disable the latency tracing.
+
+        :param enabled: a boolean
+        :return: None
+        """
+        LatencyTracer._enabled = bool(enabled)
+
+    @staticmethod
+    def enabled():
+        """
+        Return whether the latency tracing is enabled.
+
+        :return: a boolean
+        """
+        return LatencyTracer._enabled
+
+    @staticmethod
+    def statistics():
+        """
+        Return the latency statistics per path. The paths are given by the names of the passed ports (e.g.
+        "/source.outPort -> /filter.inPort -> /filter.outPort -> /sink.inPort").
+
+        :return: a dict mapping paths to dicts with the keys "count" (number of recorded latencies) and "mean", "min",
+                 "max", "p50", "p90", "p99" (in seconds, calculated from the most recent latencies)
+        """
+        with LatencyTracer._lock:
+            paths = {path: (count, sorted(latencies)) for path, (count, latencies) in LatencyTracer._paths.items()}
+        res = {}
+        for path, (count, latencies) in paths.items():
+            n = len(latencies)
+            # nearest rank percentiles of the sorted latencies
+            p50, p90, p99 = [latencies[min(n - 1, int(q*n))]*1e-9 for q in (0.5, 0.9, 0.99)]
+            res[path] = dict(count=count, mean=sum(latencies)/n*1e-9, min=latencies[0]*1e-9, max=latencies[-1]*1e-9,
+                             p50=p50, p90=p90, p99=p99)
+        return res
+
+    @staticmethod
+    def reset():
+        """
+        Discard the recorded latencies.
+
+        :return: None
+        """
+        with LatencyTracer._lock:
+            LatencyTracer._paths = {}
+
+    @staticmethod
+    def _stack():
+        stack = getattr(LatencyTracer._local, "stack", None)
+        if stack is None:
+            stack = []
+            LatencyTracer._local.stack = stack
+        return stack
+
+    @staticmethod
+    def _transmitted(dataSample, port, first):
+        # called by the output ports, returns the sample with the output hop added to its trace context; the context
+        # is set in place on the first transmission only, later transmissions use a new instance
+        now = time.perf_counter_ns()
+        stack = LatencyTracer._stack()
+        if len(stack) > 0 and stack[-1] is not None:
+            # derived from the input of the current onPortDataChanged(...) call
+            traceId, hops = stack[-1]
+            hops = hops[:-1] + (hops[-1][:3] + (now,),)
+        elif dataSample._trace is not None: # pylint: disable=protected-access
+            traceId, hops = dataSample._trace # pylint: disable=protected-access
+        else:
+            traceId, hops = None, ()
+        if traceId is None or len(hops) >= LatencyTracer.MAX_HOPS:
+            with LatencyTracer._lock:
+                traceId = LatencyTracer._nextTraceId
+                LatencyTracer._nextTraceId += 1
+            hops = ()
+        trace = (traceId, hops + ((port, QThread.currentThread().objectName(), now, now),))
+        if not first:
+            return dataSample._withTrace(trace) # pylint: disable=protected-access
+        dataSample._trace = trace # pylint: disable=protected-access
+        return dataSample
+
+    @staticmethod
+    def _enterPort(dataSample, port):
+        # called by the input ports before onPortDataChanged(...)
+        trace = dataSample._trace # pylint: disable=protected-access
+        if trace is not None:
+            now = time.perf_counter_ns()
+            trace = (trace[0], trace[1] + ((port, QThread.currentThread().objectName(), now, now),))
+        LatencyTracer._stack().append(trace)
+
+    @staticmethod
+    def _exitPort():
+        # called by the input ports after onPortDataChanged(...), records the latency of the path
+        trace = LatencyTracer._stack().pop()
+        if trace is None:
+            return
+        now = time.perf_counter_ns()
+        hops = trace[1]
+        path = " -> ".join(h[0] for h in hops)
+        with LatencyTracer._lock:
+            if path not in LatencyTracer._paths:
+                LatencyTracer._paths[path] = [0, deque(maxlen=LatencyTracer.WINDOW)]
+            entry = LatencyTracer._paths[path]
+            entry[0] += 1
+            entry[1].append(now - hops[0][2])
+
+    @staticmethod
+    def _currentContext():
+        # the trace context of the current onPortDataChanged(...) call (used for deferred transmissions)
+        stack = LatencyTracer._stack()
+        return stack[-1] if len(stack) > 0 else None
+
+    @staticmethod
+    def _pushContext(context):
+        LatencyTracer._stack().append(context)
+
+    @staticmethod
+    def _popContext():
+        LatencyTracer._stack().pop()
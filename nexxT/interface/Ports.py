@@ -135,6 +135,25 @@ class OutputPortInterface(Port):
         """
         raise NotImplementedError()
 
+    def setMemoryGoverned(self, memoryGoverned):
+        """
+        Put this port under the control of the :py:class:`nexxT.interface.DataSamples.MemoryGovernor`. Transmissions
+        of governed ports are blocked or discarded while the memory held by the data samples exceeds the configured
+        limits. The framework sets this flag for all output ports of filters with the memoryGoverned setting.
+
+        :param memoryGoverned: a boolean
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def memoryGoverned(self):
+        """
+        Return whether this port is under the control of the memory governor.
+
+        :return: a boolean
+        """
+        raise NotImplementedError()
+
     def clone(self, newEnvironment):
         """
         Return a copy of this port attached to a new environment.
@@ -168,7 +187,8 @@ class InputPortInterface(Port):
     there are two new attributes related to automatic buffering of input data samples.
     queueSizeSamples sets the maximum number of samples buffered (it can be None, if queueSizeSeconds is not None)
     queueSizeSeconds sets the maximum time of samples buffered (it can be None, if queueSizeSamples is not None)
-    If both attributes are set, they are and-combined.
+    If both attributes are set, they are and-combined. Additionally, a byte budget can be set with
+    setQueueSizeBytes(...).
 
     ..note::
         Usually nexxT is using a wrapped C++ class instead of this pure python version. In python there are no
@@ -188,12 +208,24 @@ class InputPortInterface(Port):
         """
         raise NotImplementedError()
 
-    def receiveAsync(self, dataSample, semaphore):
+    def receiveAsync(self, dataSample, semaphore, enqueueNs=None):
         """
         Called from framework only and implements the asynchronous receive mechanism using a semaphore.
 
         :param dataSample: the transmitted DataSample instance
         :param semaphore: a QSemaphore instance
+        :param enqueueNs: the time.perf_counter_ns() when the sample has been passed to the inter-thread connection
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def receiveAsyncBatch(self, interThreadConnection, semaphore):
+        """
+        Called from framework only and implements the asynchronous receive mechanism of batched inter-thread
+        connections.
+
+        :param interThreadConnection: the InterThreadConnection instance holding the pending samples
+        :param semaphore: a QSemaphore instance
         :return: None
         """
         raise NotImplementedError()
@@ -244,6 +276,36 @@ class InputPortInterface(Port):
         """
         raise NotImplementedError
 
+    def setQueueSizeBytes(self, queueSizeBytes):
+        """
+        Set a byte budget for the queue of this port. In addition to the limits given by setQueueSize(...), the
+        oldest samples are evicted from the queue as long as the sum of the content sizes of the queued samples
+        exceeds the budget. The most recent sample is always kept, even if it exceeds the budget on its own. This is
+        useful for ports with a large queue size in seconds (e.g. recorders) receiving large samples.
+
+        :param queueSizeBytes: the maximum sum of the content sizes in bytes, None or a value <= 0 disables the
+                               budget (default)
+        :return: None
+        """
+        raise NotImplementedError
+
+    def queueSizeBytes(self):
+        """
+        return the current byte budget of the queue
+
+        :return: an integer or None if the budget is disabled
+        """
+        raise NotImplementedError
+
+    def queuedBytes(self):
+        """
+        return the sum of the content sizes of the samples currently stored in the queue. The value is tracked
+        incrementally, so this is a cheap operation.
+
+        :return: an integer
+        """
+        raise NotImplementedError
+
     def setInterthreadDynamicQueue(self, enabled):
         """
         If enabled is True, inter thread connections to this input port are dynamically queued for non-blocking
@@ -268,3 +330,105 @@ class InputPortInterface(Port):
         :return: a boolean
         """
         raise NotImplementedError
+
+    def setInterthreadBatchNotification(self, enabled):
+        """
+        If enabled is True, the filter's onPortDataChanged method is called only once per batch of samples received
+        via a batched inter-thread connection instead of once per sample.
+
+        Batched delivery is enabled per connection using the connection property "batched". All samples of a batch
+        are added to the port's queue before onPortDataChanged is called, so the filter can process them using
+        getData(delaySamples=...). The queue size should therefore be large enough to hold a complete batch. This
+        setting does not affect other connections. This method can be called only during constructor or the
+        onInit() method of a filter.
+
+        :param enabled: whether the batch notification feature is enabled or not.
+        :return:
+        """
+        raise NotImplementedError
+
+    def interthreadBatchNotification(self):
+        """
+        Return the interthread batch notification setting.
+
+        :return: a boolean
+        """
+        raise NotImplementedError
+
+    def setMaxSampleAge(self, seconds, reference="timestamp"):
+        """
+        Set the maximum age of samples received by this port. Samples which are older are dropped before they are
+        added to the queue, i.e., onPortDataChanged is not called for them. A consumer which falls behind then catches
+        up instead of accumulating latency. The dropped samples are counted (see staleSamples()); the
+        transport of the connections (e.g. their width and overflow policy) is not affected.
+
+        The age is checked when the sample is delivered to the port (after it has waited in the inter-thread
+        connection or in the time-sliced delivery of the main thread). It is either related to the sample's timestamp
+        (reference "timestamp", assumes that the timestamps are related to DataSample.currentTime(), e.g. for live
+        data) or to the time when the sample has been transmitted by the output port (reference "arrival", also
+        suitable for data with historic timestamps).
+
+        :param seconds: the maximum age in seconds, None or a value <= 0 disables the check (default)
+        :param reference: either "timestamp" or "arrival"
+        :return: None
+        """
+        raise NotImplementedError
+
+    def maxSampleAge(self):
+        """
+        Return the maximum age of samples received by this port.
+
+        :return: the age in seconds or None if the check is disabled
+        """
+        raise NotImplementedError
+
+    def maxSampleAgeReference(self):
+        """
+        Return the reference of the sample age ("timestamp" or "arrival").
+
+        :return: a string
+        """
+        raise NotImplementedError
+
+    def staleSamples(self):
+        """
+        Return the number of samples which have been dropped because they exceeded the maximum age. Note: This method
+        may be called from any thread.
+
+        :return: an integer
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def setMainThreadBudget(seconds):
+        """
+        Set the time budget for delivering inter-thread samples to input ports living in the main thread.
+
+        Samples are delivered to the main thread in time slices. As soon as the budget of the current time slice is
+        exhausted, further samples are queued and delivered after the pending GUI events have been processed, so that
+        the GUI stays responsive under high load. The order of samples is always preserved. A budget <= 0 disables
+        the time slicing. This setting is global and affects all input ports in the main thread.
+
+        :param seconds: the budget per time slice in seconds (default: 0.02)
+        :return: None
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def mainThreadBudget():
+        """
+        Return the time budget for delivering inter-thread samples to the main thread.
+
+        :return: the budget in seconds
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def mainThreadBacklog():
+        """
+        Return how far behind the main thread is with delivering inter-thread samples.
+
+        :return: a dict with the number of queued samples ("samples") and the age of the oldest queued sample in
+                 seconds ("lag")
+        """
+        raise NotImplementedError
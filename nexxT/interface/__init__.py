@@ -24,9 +24,38 @@ if nexxT.useCImpl:
         return cnexxT.DataSample.make_shared(cnexxT.DataSample(*args, **kw))
     #DataSample = lambda *args, **kw: cnexxT.DataSample.make_shared(cnexxT.DataSample(*args, **kw))
 
+    def _dataSampleFromBuffer(buffer, datatype, timestamp):
+        """
+        See nexxT.interface.DataSamples.DataSample.fromBuffer. The C++ DataSample cannot keep a python object alive,
+        therefore only QByteArray instances (e.g. the buffers returned by PayloadPool.acquire) are referenced without
+        copying, other buffers are copied once. Large buffers are copied into a buffer of the PayloadPool, so that
+        producers like the GenericReader don't allocate a fresh payload for every sample.
+        """
+        # pylint: disable=import-outside-toplevel
+        from nexxT.Qt.QtCore import QByteArray
+        from nexxT.interface.DataSamples import _copyToByteArray, PayloadPool as _PyPayloadPool
+        if not isinstance(buffer, QByteArray):
+            view = memoryview(buffer)
+            if view.nbytes > _PyPayloadPool.MIN_CAPACITY:
+                if not view.c_contiguous:
+                    view = memoryview(view.tobytes())
+                buffer = PayloadPool.acquire(view.nbytes)
+                memoryview(buffer).cast("B")[:] = view.cast("B")
+            else:
+                buffer = _copyToByteArray(view)
+        return DataSample(buffer, datatype, timestamp)
+
     DataSample.TIMESTAMP_RES = cnexxT.DataSample.TIMESTAMP_RES
+    DataSample.fromBuffer = _dataSampleFromBuffer
     DataSample.copy = cnexxT.DataSample.copy
     DataSample.currentTime = cnexxT.DataSample.currentTime
+    DataSample.internDatatype = cnexxT.DataSample.internDatatype
+    DataSample.datatypeName = cnexxT.DataSample.datatypeName
+    DataSample.numInstances = cnexxT.DataSample.numInstances
+    DataSample.memoryHeld = cnexxT.DataSample.memoryHeld
+    PayloadPool = cnexxT.PayloadPool
+    MemoryGovernor = cnexxT.MemoryGovernor
+    LatencyTracer = cnexxT.LatencyTracer
     cnexxT.DataSample.registerMetaType()
     cnexxT.DataSample.registerMetaType()
     Port = cnexxT.Port
@@ -63,14 +92,18 @@ else:
     InputPort = PortImpl.InputPortImpl
     OutputPortInterface.setupDirectConnection = OutputPort.setupDirectConnection
     OutputPortInterface.setupInterThreadConnection = OutputPort.setupInterThreadConnection
+    OutputPortInterface.setupInterThreadMulticast = OutputPort.setupInterThreadMulticast
+    InputPortInterface.setMainThreadBudget = staticmethod(InputPort.setMainThreadBudget)
+    InputPortInterface.mainThreadBudget = staticmethod(InputPort.mainThreadBudget)
+    InputPortInterface.mainThreadBacklog = staticmethod(InputPort.mainThreadBacklog)
     del PortImpl
     from nexxT.interface.Filters import Filter, FilterState, FilterSurrogate
-    from nexxT.interface.DataSamples import DataSample
+    from nexxT.interface.DataSamples import DataSample, PayloadPool, MemoryGovernor, LatencyTracer
     from nexxT.interface.PropertyCollections import PropertyCollection, PropertyHandler
     from nexxT.interface.Services import Services
 
-__all__ = ["Services", "PropertyCollection", "PropertyHandler", "DataSample",
-           "Filter", "FilterState", "FilterSurrogate",
+__all__ = ["Services", "PropertyCollection", "PropertyHandler", "DataSample", "PayloadPool", "MemoryGovernor",
+           "LatencyTracer", "Filter", "FilterState", "FilterSurrogate",
            "Port", "InputPort", "OutputPort", "OutputPortInterface", "InputPortInterface"]
 
 del nexxT
@@ -0,0 +1,524 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+"""
+This module contains the data structures used by the profiling service (see nexxT.services.SrvProfiling) for
+recording and evaluating the profiling measurements.
+"""
+
+import json
+import logging
+import os
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TIMER = time.perf_counter_ns # pylint: disable=invalid-name
+
+class LogHistogram:
+    """
+    Fixed-memory histogram of nanosecond durations with logarithmically spaced buckets (8 buckets per octave between
+    MIN_NS and MIN_NS*2**OCTAVES, i.e. a relative resolution of about 9%). The maximum is tracked exactly.
+    """
+    MIN_NS = 100
+    BUCKETS_PER_OCTAVE = 8
+    OCTAVES = 31
+
+    def __init__(self):
+        self._counts = np.zeros(self.OCTAVES*self.BUCKETS_PER_OCTAVE + 1, dtype=np.int64)
+        self._sum = 0
+        self._max = 0
+
+    def add(self, values):
+        """
+        Add the given durations to the histogram.
+
+        :param values: a numpy int64 array of durations in nanoseconds (negative values are ignored)
+        :return:
+        """
+        values = values[values >= 0]
+        if values.size == 0:
+            return
+        # bucket 0 holds the values below MIN_NS, the last bucket also holds the values above the range
+        idx = np.floor(np.log2(np.maximum(values, self.MIN_NS)/self.MIN_NS)*self.BUCKETS_PER_OCTAVE).astype(np.int64)
+        idx = np.where(values < self.MIN_NS, 0, np.minimum(idx + 1, self._counts.size - 1))
+        self._counts += np.bincount(idx, minlength=self._counts.size)
+        self._sum += int(values.sum())
+        self._max = max(self._max, int(values.max()))
+
+    def count(self):
+        """
+        Return the number of values in the histogram.
+
+        :return: an integer
+        """
+        return int(self._counts.sum())
+
+    def percentile(self, q):
+        """
+        Return the upper bound of the bucket containing the given percentile (nearest rank), limited to the maximum.
+
+        :param q: the percentile as a ratio between 0 and 1
+        :return: the duration in nanoseconds
+        """
+        cum = np.cumsum(self._counts)
+        if cum[-1] == 0:
+            return 0
+        bucket = int(np.searchsorted(cum, max(1, int(np.ceil(q*cum[-1])))))
+        return min(self.MIN_NS*2**(bucket/self.BUCKETS_PER_OCTAVE), self._max)
+
+    def statistics(self):
+        """
+        Return the statistics of the histogram.
+
+        :return: a dict with the items count, mean, p50, p90, p99 and max (durations in seconds)
+        """
+        n = self.count()
+        res = dict(count=n, mean=self._sum/n*1e-9 if n > 0 else 0.0)
+        for key, q in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99)]:
+            res[key] = self.percentile(q)*1e-9
+        res["max"] = self._max*1e-9
+        return res
+
+class PortStatistics:
+    """
+    Service time, CPU time, inter-arrival time and queue wait histograms of an input port or a lifecycle callback of a
+    filter.
+    """
+    def __init__(self, thread, lifecycle=False):
+        self.thread = thread
+        self.lifecycle = lifecycle
+        self.serviceTime = LogHistogram()
+        self.cpuTime = LogHistogram()
+        self.interArrival = LogHistogram()
+        self.queueWait = LogHistogram()
+
+    def add(self, measurements):
+        """
+        Add the given measurements.
+
+        :param measurements: list of 4-tuples (service time, inter-arrival time, queue wait, CPU time) in nanoseconds,
+                             unknown values are given as -1
+        :return:
+        """
+        m = np.array(measurements, dtype=np.int64).reshape(-1, 4)
+        self.serviceTime.add(m[:, 0])
+        self.interArrival.add(m[:, 1])
+        self.queueWait.add(m[:, 2])
+        self.cpuTime.add(m[:, 3])
+
+    def statistics(self):
+        """
+        Return the statistics of the port.
+
+        :return: a dict with the items thread, serviceTime, cpuTime, interArrival and queueWait (see
+                 LogHistogram.statistics)
+        """
+        return dict(thread=self.thread, serviceTime=self.serviceTime.statistics(), cpuTime=self.cpuTime.statistics(),
+                    interArrival=self.interArrival.statistics(), queueWait=self.queueWait.statistics())
+
+class PortProfiling:
+    """
+    Simple helper class for storing profiling time points of a single port.
+    """
+    def __init__(self):
+        self.spans = []
+        self.calls = []
+        self.measurements = []
+        self.currentItem = None
+        self.currentCpu = None
+        self.currentMeasurement = None
+        self.lastStart = None
+        self.lifecycle = False
+
+    def start(self, timeNs, queueWaitNs=-1, cpuNs=-1):
+        """
+        Called when the corresponding item is started.
+
+        :param timeNs: the time point, given in nanoseconds.
+        :param queueWaitNs: the time the sample waited before the call in nanoseconds (-1 if unknown)
+        :param cpuNs: the CPU time of the thread in nanoseconds (-1 if unknown)
+        :return:
+        """
+        self.currentItem = [timeNs]
+        self.currentCpu = [cpuNs]
+        self.currentMeasurement = (timeNs - self.lastStart if self.lastStart is not None else -1, queueWaitNs)
+        self.lastStart = timeNs
+
+    def pause(self, timeNs, cpuNs=-1):
+        """
+        Called when the corresponding item is paused (another item may be started).
+
+        :param timeNs: the time point, given in nanoseconds.
+        :param cpuNs: the CPU time of the thread in nanoseconds (-1 if unknown)
+        :return:
+        """
+        self.currentItem.append(timeNs)
+        self.currentCpu.append(cpuNs)
+
+    def unpause(self, timeNs, cpuNs=-1):
+        """
+        Called when the corresponding item is unpaused.
+
+        :param timeNs: the time point, given in nanoseconds.
+        :param cpuNs: the CPU time of the thread in nanoseconds (-1 if unknown)
+        :return:
+        """
+        self.currentItem.append(timeNs)
+        self.currentCpu.append(cpuNs)
+
+    def stop(self, timeNs, cpuNs=-1):
+        """
+        Called when the corresponding item is finished. The profiling information will be added to the history.
+
+        :param timeNs: the time point, given in nanoseconds.
+        :param cpuNs: the CPU time of the thread in nanoseconds (-1 if unknown)
+        :return:
+        """
+        self.currentItem.append(timeNs)
+        self.currentCpu.append(cpuNs)
+        ci = self.currentItem
+        self.spans.append((ci[0], ci[-1]))
+        self.calls.append((ci[0], ci[-1]))
+        for i in range(0, len(ci), 2):
+            self.spans.append((ci[i], ci[i+1]))
+        # the service time and the CPU time exclude the nested calls
+        cc = self.currentCpu
+        cpu = sum(cc[i+1] - cc[i] for i in range(0, len(cc), 2)) if min(cc) >= 0 else -1
+        self.measurements.append((sum(ci[i+1] - ci[i] for i in range(0, len(ci), 2)),) + self.currentMeasurement +
+                                 (cpu,))
+        self.currentItem = None
+        self.currentCpu = None
+
+    def getSpans(self):
+        """
+        Returns the profiling time points in a list.
+
+        :return: list of tuples containing nanosecond time points.
+        """
+        res = self.spans
+        self.spans = []
+        return res
+
+    def getCalls(self):
+        """
+        Returns the start and end time points of the finished calls (without the sub-spans).
+
+        :return: list of tuples containing nanosecond time points.
+        """
+        res = self.calls
+        self.calls = []
+        return res
+
+    def getMeasurements(self):
+        """
+        Returns the measurements of the finished calls.
+
+        :return: list of 4-tuples (service time, inter-arrival time, queue wait, CPU time) in nanoseconds.
+        """
+        res = self.measurements
+        self.measurements = []
+        return res
+
+class SpanRingBuffer:
+    """
+    Preallocated ring buffer of port events of a single thread. The events are written by the owning thread without
+    locking and read by the collector of the profiling service. Each event is a row of (port index, event kind,
+    nanosecond time point, queue wait, thread CPU time); the port indices are local to the buffer. The lifecycle
+    callbacks of the filters are recorded with separate event kinds.
+    """
+    CAPACITY = 1 << 14
+    EVENT_STARTED = 1
+    EVENT_FINISHED = 2
+    EVENT_CALLBACK_STARTED = 3
+    EVENT_CALLBACK_FINISHED = 4
+
+    def __init__(self):
+        self._events = np.zeros((self.CAPACITY, 5), dtype=np.int64)
+        self._mask = self.CAPACITY - 1
+        self._writeIdx = 0
+        self._readIdx = 0
+        self._portIndices = {}
+        self._portNames = []
+        self.overruns = 0
+
+    def record(self, portname, kind, queueWaitNs=-1):
+        """
+        Append an event to the buffer, called from the owning thread only.
+
+        :param portname: the full-qualified port name
+        :param kind: one of the EVENT_... constants
+        :param queueWaitNs: the queue wait of started events in nanoseconds (-1 if unknown)
+        :return:
+        """
+        idx = self._portIndices.get(portname)
+        if idx is None:
+            # the name must be available before the index is used
+            idx = len(self._portNames)
+            self._portNames.append(portname)
+            self._portIndices[portname] = idx
+        i = self._writeIdx
+        self._events[i & self._mask] = (idx, kind, TIMER(), queueWaitNs, time.thread_time_ns())
+        self._writeIdx = i + 1
+
+    def drain(self):
+        """
+        Return the events written since the last call, called from the collector only. Events overwritten by the
+        writer in the meantime are discarded.
+
+        :return: a tuple (events, complete) where events is a n x 5 int64 array and complete is False if events have
+                 been lost
+        """
+        end = self._writeIdx
+        start = max(self._readIdx, end - self.CAPACITY)
+        idx = np.arange(start, end) & self._mask
+        events = self._events[idx]
+        # the writer might have overwritten the oldest entries during the copy
+        valid = max(start, self._writeIdx - self.CAPACITY)
+        events = events[valid - start:]
+        complete = valid == self._readIdx
+        if not complete:
+            self.overruns += valid - self._readIdx
+        self._readIdx = end
+        return events, complete
+
+    def portName(self, idx):
+        """
+        Return the port name of the given index.
+
+        :param idx: a port index as stored in the events
+        :return: the full-qualified port name
+        """
+        return self._portNames[idx]
+
+class ThreadSpecificProfItem:
+    """
+    This class contains all profiling items of a specific thread. The port events are written to the ring buffer by
+    the thread itself, the spans are reconstructed by the collector.
+    """
+    THREAD_PROFILING_PERIOD_SEC = 0.3
+    THREAD_PROFILING_TOTAL_TIME = 60
+
+    def __init__(self):
+        self._lastThreadTime = time.thread_time_ns()
+        self._lastMonotonicTime = TIMER()
+        self._portProfiling = {}
+        self._portStack = []
+        self._measurements = []
+        self.buffer = SpanRingBuffer()
+
+    def update(self):
+        """
+        Updates the load profiling.
+
+        :return:
+        """
+        thread_time = time.thread_time_ns()
+        monotonic_time = TIMER()
+        if monotonic_time == self._lastMonotonicTime:
+            return
+        load = (thread_time - self._lastThreadTime) / (monotonic_time - self._lastMonotonicTime)
+        self._lastThreadTime = thread_time
+        self._lastMonotonicTime = monotonic_time
+        self._measurements.append((monotonic_time, load))
+
+    def getLoad(self):
+        """
+        Returns the load measurements.
+
+        :return: list of 2-tuples (time_nano_seconds, load_ratio)
+        """
+        res = self._measurements
+        self._measurements = []
+        return res
+
+    def getSpans(self):
+        """
+        Get the current port profiling data.
+
+        :return: dict mapping thread names to lists of tuples with nano-second time points.
+        """
+        self.collect()
+        res = {}
+        for p, pp in self._portProfiling.items():
+            res[p] = pp.getSpans()
+        return res
+
+    def getCalls(self):
+        """
+        Get the finished calls of the ports since the last call, see PortProfiling.getCalls.
+
+        :return: dict mapping port names to lists of tuples with nano-second time points.
+        """
+        self.collect()
+        res = {}
+        for p, pp in self._portProfiling.items():
+            res[p] = pp.getCalls()
+        return res
+
+    def getMeasurements(self):
+        """
+        Get the measurements of the finished calls since the last call, see PortProfiling.getMeasurements.
+
+        :return: dict mapping port names to 2-tuples (lifecycle, measurements) where measurements is a list of 4-tuples
+                 with nano-second durations.
+        """
+        self.collect()
+        res = {}
+        for p, pp in self._portProfiling.items():
+            res[p] = (pp.lifecycle, pp.getMeasurements())
+        return res
+
+    def registerPortChangeStarted(self, portname, timeNs, queueWaitNs=-1, cpuNs=-1, lifecycle=False):
+        """
+        Called when starting the onPortDataChanged function (or a lifecycle callback of a filter).
+
+        :param portname: the full-qualified port name
+        :param timeNs: the time in nano-seconds
+        :param queueWaitNs: the queue wait in nano-seconds (-1 if unknown)
+        :param cpuNs: the CPU time of the thread in nano-seconds (-1 if unknown)
+        :param lifecycle: True for lifecycle callbacks
+        :return:
+        """
+        if len(self._portStack) > 0:
+            self._portProfiling[self._portStack[-1]].pause(timeNs, cpuNs)
+        self._portStack.append(portname)
+        if not portname in self._portProfiling:
+            self._portProfiling[portname] = PortProfiling()
+            self._portProfiling[portname].lifecycle = lifecycle
+        self._portProfiling[portname].start(timeNs, queueWaitNs, cpuNs)
+
+    def registerPortChangeFinished(self, portname, timeNs, cpuNs=-1):
+        """
+        Called when the onPortDataChanged function (or a lifecycle callback of a filter) has finished.
+
+        :param portname: the full-qualified port name
+        :param timeNs: the time in nano-seconds
+        :param cpuNs: the CPU time of the thread in nano-seconds (-1 if unknown)
+        :return:
+        """
+        if len(self._portStack) == 0 or self._portStack[-1] != portname:
+            return # canceled during profiling
+        self._portStack = self._portStack[:-1]
+        self._portProfiling[portname].stop(timeNs, cpuNs)
+        if len(self._portStack) > 0:
+            self._portProfiling[self._portStack[-1]].unpause(timeNs, cpuNs)
+
+    def collect(self):
+        """
+        Drain the ring buffer and reconstruct the spans of the new events.
+
+        :return:
+        """
+        events, complete = self.buffer.drain()
+        if not complete:
+            # the start events of the pending items might be lost
+            self._portStack = []
+        buffer = self.buffer
+        for idx, kind, timeNs, queueWaitNs, cpuNs in events.tolist():
+            if kind in (SpanRingBuffer.EVENT_STARTED, SpanRingBuffer.EVENT_CALLBACK_STARTED):
+                self.registerPortChangeStarted(buffer.portName(idx), timeNs, queueWaitNs, cpuNs,
+                                               lifecycle=kind == SpanRingBuffer.EVENT_CALLBACK_STARTED)
+            else:
+                self.registerPortChangeFinished(buffer.portName(idx), timeNs, cpuNs)
+
+    def cancel(self):
+        """
+        Cancel profiling on user-request and reset the corresponding data.
+
+        :return:
+        """
+        self.collect()
+        self._portProfiling = {}
+        self._portStack = []
+
+class TraceCapture:
+    """
+    Storage of captured profiling data which can be written as a Chrome Trace Event JSON file (to be opened in
+    chrome://tracing or https://ui.perfetto.dev). The port calls are written as complete events of the threads (nested
+    calls are nested in the viewer), the thread loads and the connection metrics as counters.
+    """
+    MAX_EVENTS = 5000000
+
+    def __init__(self):
+        self._calls = []
+        self._load = []
+        self._transport = []
+        self._numEvents = 0
+        self._overflow = False
+
+    def _reserve(self, num):
+        if self._numEvents + num > self.MAX_EVENTS:
+            if not self._overflow:
+                logger.warning("Trace capture is full, discarding further events.")
+                self._overflow = True
+            return False
+        self._numEvents += num
+        return True
+
+    def addThreadData(self, thread, load, calls):
+        """
+        Add the data of a thread.
+
+        :param thread: the thread name
+        :param load: list of 2-tuples (time_nano_seconds, load_ratio)
+        :param calls: dict mapping port names to lists of (start, end) nano-second time points
+        :return:
+        """
+        if self._reserve(len(load) + sum(len(c) for c in calls.values())):
+            self._load.extend((thread, t, l) for t, l in load)
+            for port, portCalls in calls.items():
+                self._calls.extend((thread, port, start, end) for start, end in portCalls)
+
+    def addTransportData(self, timeNs, metrics):
+        """
+        Add a snapshot of the connection metrics.
+
+        :param timeNs: the time point in nano-seconds
+        :param metrics: dict as returned by ProfilingService.getConnectionMetrics
+        :return:
+        """
+        if self._reserve(len(metrics)):
+            self._transport.append((timeNs, metrics))
+
+    def chromeTrace(self):
+        """
+        Return the captured data in the Chrome Trace Event format.
+
+        :return: a json-serializable dict
+        """
+        pid = os.getpid()
+        tids = {}
+        events = [dict(name="process_name", ph="M", pid=pid, tid=0, args=dict(name="nexxT"))]
+        def tid(thread):
+            if thread not in tids:
+                tids[thread] = len(tids) + 1
+                events.append(dict(name="thread_name", ph="M", pid=pid, tid=tids[thread], args=dict(name=thread)))
+            return tids[thread]
+        for thread, port, start, end in self._calls:
+            events.append(dict(name=port, cat="port", ph="X", ts=start*1e-3, dur=(end-start)*1e-3, pid=pid,
+                               tid=tid(thread)))
+        for thread, t, load in self._load:
+            events.append(dict(name="load " + thread, cat="load", ph="C", ts=t*1e-3, pid=pid, tid=tid(thread),
+                               args=dict(load=float(load))))
+        for t, metrics in self._transport:
+            for name, m in metrics.items():
+                events.append(dict(name=name, cat="transport", ph="C", ts=t*1e-3, pid=pid, tid=0,
+                                   args=dict(backlog=m.get("backlog", 0), rate=m.get("rate", 0.0),
+                                             dropped=m.get("dropped", 0))))
+        return dict(traceEvents=events, displayTimeUnit="ms")
+
+    def save(self, filename):
+        """
+        Write the captured data to a Chrome Trace Event JSON file.
+
+        :param filename: the name of the file
+        :return:
+        """
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(self.chromeTrace(), f)
+        logger.info("Written %d trace events to %s", self._numEvents, filename)
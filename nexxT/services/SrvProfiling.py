@@ -9,168 +9,83 @@ This module provides the profiling service for nexxT, responsible for generating
 """
 
 import logging
-import time
-from threading import Lock
+from threading import Lock, local
 import numpy as np
-from nexxT.Qt.QtCore import QObject, Signal, Slot, QThread, QTimer, Qt, QByteArray, QCoreApplication
+from nexxT.Qt.QtCore import QObject, Signal, Slot, QThread, QTimer, Qt, QByteArray, QCoreApplication, Property
 from nexxT.core.Utils import MethodInvoker
+from nexxT.core.Application import Application
+from nexxT.interface import LatencyTracer
+from nexxT.services.ProfilingData import TIMER, PortStatistics, SpanRingBuffer, ThreadSpecificProfItem, TraceCapture
 
 logger = logging.getLogger(__name__)
 
-TIMER = time.perf_counter_ns
+def _connectionMetrics():
+    if Application.activeApplication is None:
+        return {}
+    return Application.activeApplication.getConnectionMetrics()
 
-class PortProfiling:
-    """
-    Simple helper class for storing profiling time points of a single port.
-    """
-    def __init__(self):
-        self.spans = []
-        self.currentItem = None
-
-    def start(self, timeNs):
-        """
-        Called when the corresponding item is started.
-
-        :param timeNs: the time point, given in nanoseconds.
-        :return:
-        """
-        self.currentItem = [timeNs]
-
-    def pause(self, timeNs):
-        """
-        Called when the corresponding item is paused (another item may be started).
-
-        :param timeNs: the time point, given in nanoseconds.
-        :return:
-        """
-        self.currentItem.append(timeNs)
-
-    def unpause(self, timeNs):
-        """
-        Called when the corresponding item is unpaused.
-
-        :param timeNs: the time point, given in nanoseconds.
-        :return:
-        """
-        self.currentItem.append(timeNs)
+def _threadSettings():
+    if Application.activeApplication is None:
+        return {}
+    return Application.activeApplication.getThreadSettings()
 
-    def stop(self, timeNs):
-        """
-        Called when the corresponding item is finished. The profiling information will be added to the history.
-
-        :param timeNs: the time point, given in nanoseconds.
-        :return:
-        """
-        self.currentItem.append(timeNs)
-        ci = self.currentItem
-        self.spans.append((ci[0], ci[-1]))
-        for i in range(0, len(ci), 2):
-            self.spans.append((ci[i], ci[i+1]))
-        self.currentItem = None
-
-    def getSpans(self):
-        """
-        Returns the profiling time points in a list.
-
-        :return: list of tuples containing nanosecond time points.
-        """
-        res = self.spans
-        self.spans = []
-        return res
+def _setLatencyTracingEnabled(enabled):
+    if enabled and not LatencyTracer.enabled():
+        LatencyTracer.reset()
+    LatencyTracer.setEnabled(enabled)
 
-class ThreadSpecificProfItem:
+class ProfilingServiceDummy(QObject):
     """
-    This class contains all profiling items of a specific thread.
+    This class can be used as a replacement for the ProfilingService which provides the same interface.
     """
-    THREAD_PROFILING_PERIOD_SEC = 0.3
-    THREAD_PROFILING_TOTAL_TIME = 60
 
-    def __init__(self):
-        self._lastThreadTime = time.thread_time_ns()
-        self._lastMonotonicTime = TIMER()
-        self._portProfiling = {}
-        self._portStack = []
-        self._measurements = []
-
-    def update(self):
-        """
-        Updates the load profiling.
-
-        :return:
-        """
-        thread_time = time.thread_time_ns()
-        monotonic_time = TIMER()
-        if monotonic_time == self._lastMonotonicTime:
-            return
-        load = (thread_time - self._lastThreadTime) / (monotonic_time - self._lastMonotonicTime)
-        self._lastThreadTime = thread_time
-        self._lastMonotonicTime = monotonic_time
-        self._measurements.append((monotonic_time, load))
+    # never emitted, port profiling is always disabled
+    portProfilingEnabledChanged = Signal(bool)
 
-    def getLoad(self):
+    def getConnectionMetrics(self):
         """
-        Returns the load measurements.
+        Return the transport metrics of the connections of the active application. The connection metrics are also
+        available when the profiling service is disabled.
 
-        :return: list of 2-tuples (time_nano_seconds, load_ratio)
+        :return: a dict mapping connection names to metric dicts (see
+                 :py:meth:`nexxT.core.ActiveApplication.ActiveApplication.getConnectionMetrics`)
         """
-        res = self._measurements
-        self._measurements = []
-        return res
+        return _connectionMetrics()
 
-    def getSpans(self):
+    def getThreadSettings(self):
         """
-        Get the current port profiling data.
+        Return the effective settings of the threads of the active application. The thread settings are also
+        available when the profiling service is disabled.
 
-        :return: dict mapping thread names to lists of tuples with nano-second time points.
+        :return: a dict mapping thread names to settings dicts (see
+                 :py:meth:`nexxT.core.ActiveApplication.ActiveApplication.getThreadSettings`)
         """
-        res = {}
-        for p, pp in self._portProfiling.items():
-            res[p] = pp.getSpans()
-        return res
+        return _threadSettings()
 
-    def registerPortChangeStarted(self, portname, timeNs):
-        """
-        Called when starting the onPortDataChanged function.
+    def _isPortProfilingEnabled(self):
+        return False
 
-        :param portname: the full-qualified port name
-        :param timeNs: the time in nano-seconds
-        :return:
-        """
-        if len(self._portStack) > 0:
-            self._portProfiling[self._portStack[-1]].pause(timeNs)
-        self._portStack.append(portname)
-        if not portname in self._portProfiling:
-            self._portProfiling[portname] = PortProfiling()
-        self._portProfiling[portname].start(timeNs)
+    # the ports cache this property and skip the beforePortDataChanged / afterPortDataChanged calls if it is False
+    portProfilingEnabled = Property(bool, _isPortProfilingEnabled, notify=portProfilingEnabledChanged)
 
-    def registerPortChangeFinished(self, portname, timeNs):
+    def setLatencyTracingEnabled(self, enabled):
         """
-        Called when the onPortDataChanged function has finished.
+        Enables / disables the end-to-end latency tracing (see :py:class:`nexxT.interface.DataSamples.LatencyTracer`).
+        The latency tracing is also available when the profiling service is disabled.
 
-        :param portname: the full-qualified port name
-        :param timeNs: the time in nano-seconds
+        :param enabled: boolean
         :return:
         """
-        if len(self._portStack) == 0 or self._portStack[-1] != portname:
-            return # canceled during profiling
-        self._portStack = self._portStack[:-1]
-        self._portProfiling[portname].stop(timeNs)
-        if len(self._portStack) > 0:
-            self._portProfiling[self._portStack[-1]].unpause(timeNs)
+        _setLatencyTracingEnabled(enabled)
 
-    def cancel(self):
+    def getLatencyStatistics(self):
         """
-        Cancel profiling on user-request and reset the corresponding data.
+        Return the latency statistics per path of the traced samples.
 
-        :return:
+        :return: a dict mapping paths to statistics dicts (see
+                 :py:meth:`nexxT.interface.DataSamples.LatencyTracer.statistics`)
         """
-        self._portProfiling = {}
-        self._portStack = []
-
-class ProfilingServiceDummy(QObject):
-    """
-    This class can be used as a replacement for the ProfilingService which provides the same interface.
-    """
+        return LatencyTracer.statistics()
 
     @Slot()
     def registerThread(self):
@@ -185,11 +100,13 @@ class ProfilingServiceDummy(QObject):
         """
 
     @Slot(str)
-    def beforePortDataChanged(self, portname):
+    @Slot(str, "qint64")
+    def beforePortDataChanged(self, portname, queueWaitNs=-1):
         """
         dummy implementation
 
         :param portname: name of the port
+        :param queueWaitNs: the queue wait of the sample
         """
 
     @Slot(str)
@@ -200,9 +117,29 @@ class ProfilingServiceDummy(QObject):
         :param portname: name of the port
         """
 
+    @Slot(str)
+    def beforeLifecycleCallback(self, name):
+        """
+        dummy implementation
+
+        :param name: name of the callback
+        """
+
+    @Slot(str)
+    def afterLifecycleCallback(self, name):
+        """
+        dummy implementation
+
+        :param name: name of the callback
+        """
+
 class ProfilingService(QObject):
     """
     This class provides a profiling service for the nexxT framework.
+
+    The port profiling events are written to preallocated per-thread ring buffers without locking. A single collector
+    in the main thread drains the buffers periodically and emits the reconstructed spans. The ports skip the profiling
+    calls entirely while port profiling is disabled (see the portProfilingEnabled property).
     """
 
     # this signal is emitted when there is new load data for a thread.
@@ -211,15 +148,45 @@ class ProfilingService(QObject):
     threadDeregistered = Signal(str)
     stopTimers = Signal()
     startTimers = Signal()
+    # this signal is emitted periodically with the transport metrics of the connections (see getConnectionMetrics)
+    connectionMetricsUpdated = Signal(object)
+    # this signal is emitted together with connectionMetricsUpdated with the effective thread settings
+    # (see getThreadSettings)
+    threadSettingsUpdated = Signal(object)
+    # this signal is emitted together with connectionMetricsUpdated with the latency statistics if the latency tracing
+    # is enabled (see getLatencyStatistics)
+    latencyStatisticsUpdated = Signal(object)
+    # this signal is emitted when the portProfilingEnabled property changes
+    portProfilingEnabledChanged = Signal(bool)
+
+    CONNECTION_METRICS_PERIOD_SEC = 1.0
+    COLLECTOR_PERIOD_SEC = 0.1
 
     def __init__(self):
         super().__init__()
+        self._connectionMetricsTimer = QTimer(self)
+        self._connectionMetricsTimer.setInterval(int(self.CONNECTION_METRICS_PERIOD_SEC*1e3))
+        self._connectionMetricsTimer.timeout.connect(self._emitConnectionMetrics)
+        self._connectionMetricsTimer.start()
         self._threadSpecificProfiling = {}
         self._lockThreadSpecific = Lock()
-        self._lastEmitTime = TIMER()
+        self._threadLocal = local()
         self._loadMonitoringEnabled = True
         self._portProfilingEnabled = False
         self._mi = None
+        self._capture = None
+        self._captureRestorePortProfiling = False
+        self._portStatistics = {}
+        self._collectorTimer = QTimer(self)
+        self._collectorTimer.setInterval(int(self.COLLECTOR_PERIOD_SEC*1e3))
+        self._collectorTimer.timeout.connect(self._emitData)
+        self._collectorTimer.start()
+
+    def _isPortProfilingEnabled(self):
+        return self._portProfilingEnabled
+
+    # the ports cache this property and skip the beforePortDataChanged / afterPortDataChanged calls if it is False
+    portProfilingEnabled = Property(bool, _isPortProfilingEnabled, notify=portProfilingEnabledChanged)
 
     @Slot()
     def registerThread(self):
@@ -241,6 +208,7 @@ class ProfilingService(QObject):
                 self.startTimers.connect(self._threadSpecificProfiling[t].timer.start)
                 if self._loadMonitoringEnabled:
                     self._threadSpecificProfiling[t].timer.start()
+                self._threadLocal.buffer = self._threadSpecificProfiling[t].buffer
 
             tmain = QCoreApplication.instance().thread()
             if self._mi is None and not tmain in self._threadSpecificProfiling:
@@ -260,8 +228,6 @@ class ProfilingService(QObject):
                 self.startTimers.emit()
             else:
                 self.stopTimers.emit()
-        if self._portProfilingEnabled and not self._loadMonitoringEnabled:
-            logger.warning("Port profiling works only if load monitoring is enabled.")
 
     def setPortProfilingEnabled(self, enabled):
         """
@@ -272,8 +238,13 @@ class ProfilingService(QObject):
         """
         if enabled != self._portProfilingEnabled:
             self._portProfilingEnabled = enabled
-        if self._portProfilingEnabled and not self._loadMonitoringEnabled:
-            logger.warning("Port profiling works only if load monitoring is enabled.")
+            self.portProfilingEnabledChanged.emit(enabled)
+            if not enabled:
+                # the finished calls are emitted, the calls in progress are discarded
+                self._emitData()
+                with self._lockThreadSpecific:
+                    for tsp in self._threadSpecificProfiling.values():
+                        tsp.cancel()
 
     @Slot()
     def deregisterThread(self):
@@ -289,71 +260,287 @@ class ProfilingService(QObject):
         with self._lockThreadSpecific:
             if t in self._threadSpecificProfiling:
                 self._threadSpecificProfiling[t].timer.stop()
+                self._collect(t.objectName(), self._threadSpecificProfiling[t])
                 todel.append(self._threadSpecificProfiling[t])
                 del self._threadSpecificProfiling[t]
+        self._threadLocal.buffer = None
         del todel
         self.threadDeregistered.emit(t.objectName())
 
     @Slot()
     def _generateRecord(self):
         """
-        This slot is automaticall called periodically
+        This slot is automaticall called periodically in the registered threads
 
         :return:
         """
         t = QThread.currentThread()
         with self._lockThreadSpecific:
-            self._threadSpecificProfiling[t].update()
-            self._emitData()
+            if t in self._threadSpecificProfiling:
+                self._threadSpecificProfiling[t].update()
 
     @Slot(str)
-    def beforePortDataChanged(self, portname):
+    @Slot(str, "qint64")
+    def beforePortDataChanged(self, portname, queueWaitNs=-1):
         """
-        This slot is called before calling onPortDataChanged.
+        This slot is called before calling onPortDataChanged. The event is written to the ring buffer of the current
+        thread without locking.
 
         :param portname: the fully qualified name of the port
-        :param timeNs: the timestamp
+        :param queueWaitNs: the time since the sample has been passed to the connection of the port in nano-seconds
+                            (-1 if unknown)
         :return:
         """
         if not self._portProfilingEnabled:
             return
-        t = QThread.currentThread()
-        timeNs = time.perf_counter_ns()
-        with self._lockThreadSpecific:
-            if t in self._threadSpecificProfiling:
-                self._threadSpecificProfiling[t].registerPortChangeStarted(portname, timeNs)
+        buffer = getattr(self._threadLocal, "buffer", None)
+        if buffer is not None:
+            buffer.record(portname, SpanRingBuffer.EVENT_STARTED, queueWaitNs)
 
     @Slot(str)
     def afterPortDataChanged(self, portname):
         """
-        This slot is called after calling onPortDataChanged.
+        This slot is called after calling onPortDataChanged. The event is written to the ring buffer of the current
+        thread without locking.
 
         :param portname: the fully qualified name of the port
-        :param timeNs: the timestamp
+        :return:
+        """
+        buffer = getattr(self._threadLocal, "buffer", None)
+        if buffer is not None:
+            buffer.record(portname, SpanRingBuffer.EVENT_FINISHED)
+
+    @Slot(str)
+    def beforeLifecycleCallback(self, name):
+        """
+        This slot is called before calling a lifecycle callback of a filter (onInit, onOpen, ...). The callbacks are
+        profiled like the onPortDataChanged calls and accounted to the filter in getFilterStatistics.
+
+        :param name: the fully qualified name of the filter followed by "/" and the name of the callback
         :return:
         """
         if not self._portProfilingEnabled:
             return
-        t = QThread.currentThread()
-        timeNs = time.perf_counter_ns()
+        buffer = getattr(self._threadLocal, "buffer", None)
+        if buffer is not None:
+            buffer.record(name, SpanRingBuffer.EVENT_CALLBACK_STARTED)
+
+    @Slot(str)
+    def afterLifecycleCallback(self, name):
+        """
+        This slot is called after calling a lifecycle callback of a filter.
+
+        :param name: the fully qualified name of the filter followed by "/" and the name of the callback
+        :return:
+        """
+        buffer = getattr(self._threadLocal, "buffer", None)
+        if buffer is not None:
+            buffer.record(name, SpanRingBuffer.EVENT_CALLBACK_FINISHED)
+
+    def getConnectionMetrics(self):
+        """
+        Return the transport metrics of the connections of the active application.
+
+        :return: a dict mapping connection names to metric dicts (see
+                 :py:meth:`nexxT.core.ActiveApplication.ActiveApplication.getConnectionMetrics`)
+        """
+        return _connectionMetrics()
+
+    def getThreadSettings(self):
+        """
+        Return the effective settings (CPU affinity, priority, scheduling policy and OS-level name) of the threads of
+        the active application.
+
+        :return: a dict mapping thread names to settings dicts (see
+                 :py:meth:`nexxT.core.ActiveApplication.ActiveApplication.getThreadSettings`)
+        """
+        return _threadSettings()
+
+    def setLatencyTracingEnabled(self, enabled):
+        """
+        Enables / disables the end-to-end latency tracing (see :py:class:`nexxT.interface.DataSamples.LatencyTracer`).
+        The recorded latencies are discarded when the tracing is enabled.
+
+        :param enabled: boolean
+        :return:
+        """
+        _setLatencyTracingEnabled(enabled)
+
+    def getLatencyStatistics(self):
+        """
+        Return the source-to-port latency statistics per path of the traced samples. The paths ending at input ports of
+        filters without output ports are the source-to-sink latencies.
+
+        :return: a dict mapping paths to statistics dicts (see
+                 :py:meth:`nexxT.interface.DataSamples.LatencyTracer.statistics`)
+        """
+        return LatencyTracer.statistics()
+
+    def startTraceCapture(self):
+        """
+        Start capturing the port calls, thread loads and connection metrics for a trace file. Port profiling is enabled
+        during the capture.
+
+        :return:
+        """
+        if self._capture is not None:
+            return
+        self._emitData()
+        self._capture = TraceCapture()
+        self._captureRestorePortProfiling = self._portProfilingEnabled
+        self.setPortProfilingEnabled(True)
+        logger.info("Trace capture started.")
+
+    def stopTraceCapture(self, filename=None):
+        """
+        Stop capturing and write the captured data as Chrome Trace Event JSON file.
+
+        :param filename: the name of the trace file (if None, the data is discarded)
+        :return:
+        """
+        if self._capture is None:
+            return
+        self._emitData()
+        capture = self._capture
+        self._capture = None
+        self.setPortProfilingEnabled(self._captureRestorePortProfiling)
+        if filename is not None:
+            capture.save(filename)
+
+    def isTraceCaptureActive(self):
+        """
+        Return whether a trace capture is in progress.
+
+        :return: boolean
+        """
+        return self._capture is not None
+
+    def getPortStatistics(self):
+        """
+        Return the statistics of the onPortDataChanged calls of the input ports since port profiling has been enabled
+        (or since the last reset). The service time (wall-clock) and the CPU time of the thread exclude the nested
+        calls of other ports in the same thread, the inter-arrival time is the time between the starts of consecutive
+        calls and the queue wait is the time between passing the sample to the connection of the port and the start of
+        the call.
+        The histograms use a fixed amount of memory, the percentiles have a resolution of about 9%.
+
+        :return: a dict mapping port names to dicts with the items thread, serviceTime, cpuTime, interArrival and
+                 queueWait, each of the latter is a dict with the items count, mean, p50, p90, p99 and max (durations
+                 in seconds)
+        """
+        self._emitData()
         with self._lockThreadSpecific:
-            if t in self._threadSpecificProfiling:
-                self._threadSpecificProfiling[t].registerPortChangeFinished(portname, timeNs)
+            return {port: ps.statistics() for port, ps in self._portStatistics.items() if not ps.lifecycle}
+
+    def getFilterStatistics(self):
+        """
+        Return the accumulated wall-clock and CPU time of the filters since port profiling has been enabled (or since
+        the last reset). The times of the onPortDataChanged calls and of the lifecycle callbacks are reported
+        separately, nested calls of other filters in the same thread are excluded. A CPU ratio well below 1 indicates
+        that the filter is waiting (e.g. for I/O, locks or the python GIL) instead of computing.
+
+        :return: a dict mapping filter names to dicts with the items thread, calls, wallTime, cpuTime, cpuRatio,
+                 lifecycleWallTime and lifecycleCpuTime (times in seconds)
+        """
+        self._emitData()
+        res = {}
+        with self._lockThreadSpecific:
+            for name, ps in self._portStatistics.items():
+                f = res.setdefault(name.rsplit("/", 1)[0], dict(thread=ps.thread, calls=0, wallTime=0., cpuTime=0.,
+                                                                 lifecycleWallTime=0., lifecycleCpuTime=0.))
+                svc = ps.serviceTime.statistics()
+                cpu = ps.cpuTime.statistics()
+                if ps.lifecycle:
+                    f["lifecycleWallTime"] += svc["mean"]*svc["count"]
+                    f["lifecycleCpuTime"] += cpu["mean"]*cpu["count"]
+                else:
+                    f["calls"] += svc["count"]
+                    f["wallTime"] += svc["mean"]*svc["count"]
+                    f["cpuTime"] += cpu["mean"]*cpu["count"]
+        for f in res.values():
+            f["cpuRatio"] = f["cpuTime"]/f["wallTime"] if f["wallTime"] > 0 else 0.0
+        return res
+
+    def resetPortStatistics(self):
+        """
+        Discard the port and filter statistics.
+
+        :return:
+        """
+        with self._lockThreadSpecific:
+            self._portStatistics = {}
+
+    def logPortStatistics(self):
+        """
+        Log summary tables of the port statistics and the filter statistics (see getPortStatistics and
+        getFilterStatistics).
+
+        :return:
+        """
+        statistics = self.getPortStatistics()
+        filterStatistics = self.getFilterStatistics()
+        if len(filterStatistics) == 0:
+            return
+        width = max([len("port")] + [len(port) for port in statistics])
+        lines = ["Port statistics (times in ms):",
+                 f"{'port':{width}s} {'thread':15s} {'calls':>8s} {'svc p50':>9s} {'svc p90':>9s} {'svc p99':>9s} "
+                 f"{'svc max':>9s} {'cpu p50':>9s} {'arr p50':>9s} {'wait p50':>9s} {'wait p99':>9s}"]
+        for port in sorted(statistics):
+            st = statistics[port]
+            svc, cpu, arr, wait = st["serviceTime"], st["cpuTime"], st["interArrival"], st["queueWait"]
+            lines.append(f"{port:{width}s} {st['thread']:15s} {svc['count']:8d} {svc['p50']*1e3:9.3f} "
+                         f"{svc['p90']*1e3:9.3f} {svc['p99']*1e3:9.3f} {svc['max']*1e3:9.3f} {cpu['p50']*1e3:9.3f} "
+                         f"{arr['p50']*1e3:9.3f} {wait['p50']*1e3:9.3f} {wait['p99']*1e3:9.3f}")
+        width = max(len("filter"), max(len(name) for name in filterStatistics))
+        lines += ["Filter statistics (times in s):",
+                  f"{'filter':{width}s} {'thread':15s} {'calls':>8s} {'wall':>9s} {'cpu':>9s} {'cpu/wall':>9s} "
+                  f"{'lc wall':>9s} {'lc cpu':>9s}"]
+        for name in sorted(filterStatistics):
+            st = filterStatistics[name]
+            lines.append(f"{name:{width}s} {st['thread']:15s} {st['calls']:8d} {st['wallTime']:9.3f} "
+                         f"{st['cpuTime']:9.3f} {st['cpuRatio']:9.3f} {st['lifecycleWallTime']:9.3f} "
+                         f"{st['lifecycleCpuTime']:9.3f}")
+        logger.info("\n".join(lines))
+
+    def _emitConnectionMetrics(self):
+        if Application.activeApplication is not None:
+            metrics = self.getConnectionMetrics()
+            if self._capture is not None:
+                self._capture.addTransportData(TIMER(), metrics)
+            self.connectionMetricsUpdated.emit(metrics)
+            self.threadSettingsUpdated.emit(self.getThreadSettings())
+            if LatencyTracer.enabled():
+                self.latencyStatisticsUpdated.emit(self.getLatencyStatistics())
 
     def _emitData(self):
-        t = TIMER()
-        if t - self._lastEmitTime > 1e8:
-            # emit each 100 ms
-            self._lastEmitTime = t
-            for t, tsp in self._threadSpecificProfiling.items():
-                load = tsp.getLoad()
-                atimstamps = np.array([l[0] for l in load], dtype=np.int64)
-                aload = np.array([l[1] for l in load], dtype=np.float32)
-                if aload.size > 0:
-                    self.loadDataUpdated.emit(t.objectName(), QByteArray(atimstamps.tobytes()),
-                                              QByteArray(aload.tobytes()))
-                port_spans = tsp.getSpans()
-                for port, spans in port_spans.items():
-                    spans = np.array(spans, dtype=np.int64)
-                    if spans.size > 0:
-                        self.spanDataUpdated.emit(t.objectName(), port, QByteArray(spans.tobytes()))
+        """
+        The collector, called periodically in the main thread. The lock only protects against concurrent
+        registrations and load updates, the port events are written without it.
+
+        :return:
+        """
+        with self._lockThreadSpecific:
+            items = [self._collect(t.objectName(), tsp) for t, tsp in self._threadSpecificProfiling.items()]
+        for name, load, port_spans in items:
+            atimstamps = np.array([l[0] for l in load], dtype=np.int64)
+            aload = np.array([l[1] for l in load], dtype=np.float32)
+            if aload.size > 0:
+                self.loadDataUpdated.emit(name, QByteArray(atimstamps.tobytes()), QByteArray(aload.tobytes()))
+            for port, spans in port_spans.items():
+                spans = np.array(spans, dtype=np.int64)
+                if spans.size > 0:
+                    self.spanDataUpdated.emit(name, port, QByteArray(spans.tobytes()))
+
+    def _collect(self, name, tsp):
+        # called with the lock held
+        load = tsp.getLoad()
+        spans = tsp.getSpans()
+        calls = tsp.getCalls()
+        for port, (lifecycle, measurements) in tsp.getMeasurements().items():
+            if len(measurements) > 0:
+                if port not in self._portStatistics:
+                    self._portStatistics[port] = PortStatistics(name, lifecycle)
+                self._portStatistics[port].add(measurements)
+        if self._capture is not None:
+            self._capture.addThreadData(name, load, calls)
+        return name, load, spans
@@ -17,7 +17,7 @@ from nexxT.Qt.QtWidgets import (QGraphicsScene, QGraphicsItemGroup, QGraphicsSim
                                QGraphicsPathItem, QGraphicsItem, QMenu, QInputDialog, QMessageBox,
                                QGraphicsLineItem, QFileDialog, QDialog, QGridLayout, QCheckBox, QVBoxLayout, QGroupBox,
                                QDialogButtonBox, QGraphicsView, QStyle, QStyleOptionGraphicsItem)
-from nexxT.Qt.QtGui import QBrush, QPen, QColor, QPainterPath, QImage, QAction
+from nexxT.Qt.QtGui import QBrush, QPen, QColor, QPainterPath, QImage, QAction, QActionGroup
 from nexxT.Qt.QtCore import QPointF, Signal, QObject, QRectF, QSizeF, Qt
 from nexxT.core.BaseGraph import BaseGraph
 from nexxT.core.Graph import FilterGraph
@@ -1031,12 +1031,35 @@ class GraphScene(BaseGraphScene):
         self.actSetNonblockingConnection = QAction("Set non blocking", self)
         self.actSetStandardBlockingConnection = QAction("Set blocking", self)
         self.actSetCustomBlockingConnection = QAction("Set blocking with width ...", self)
+        self.actSetBatchedConnection = QAction("Batched delivery", self)
+        self.actSetBatchedConnection.setCheckable(True)
+        self.actSetSpscConnection = QAction("Lock-free transport (SPSC)", self)
+        self.actSetSpscConnection.setCheckable(True)
+        self.actSetHighPriorityConnection = QAction("High priority delivery", self)
+        self.actSetHighPriorityConnection.setCheckable(True)
+        self.actSetAutoWidthConnection = QAction("Automatic width ...", self)
+        self.actSetAutoWidthConnection.setCheckable(True)
+        self.actGroupOverflow = QActionGroup(self)
+        self.actsOverflow = {}
+        for policy, text in [("block", "Block producer"), ("drop-newest", "Drop newest sample"),
+                             ("keep-latest", "Keep latest sample"), ("timeout", "Block with timeout ...")]:
+            a = QAction(text, self.actGroupOverflow)
+            a.setCheckable(True)
+            a.setData(policy)
+            self.actsOverflow[policy] = a
+        self.actGroupOverflow.triggered.connect(self.onConnSetOverflow)
+        self.actSetMaxAgeConnection = QAction("Set max. sample age ...", self)
+        self.actSetMaxAgeConnection.triggered.connect(self.onConnSetMaxAge)
         self.actRenameNode.triggered.connect(self.renameDialog)
         self.actRemoveNode.triggered.connect(self.removeDialog)
         self.actRemoveConnection.triggered.connect(self.onConnectionRemove)
         self.actSetNonblockingConnection.triggered.connect(self.onConnSetNonBlocking)
         self.actSetStandardBlockingConnection.triggered.connect(self.onConnSetBlocking)
         self.actSetCustomBlockingConnection.triggered.connect(self.onConnSetCustom)
+        self.actSetBatchedConnection.triggered.connect(self.onConnSetBatched)
+        self.actSetSpscConnection.triggered.connect(self.onConnSetSpsc)
+        self.actSetHighPriorityConnection.triggered.connect(self.onConnSetHighPriority)
+        self.actSetAutoWidthConnection.triggered.connect(self.onConnSetAutoWidth)
         self.actAutoLayout.triggered.connect(self.autoLayout)
         if isinstance(self.graph, FilterGraph):
             self.actRenamePort = QAction("Rename dynamic port ...", self)
@@ -1068,11 +1091,18 @@ class GraphScene(BaseGraphScene):
             self.actAddNodeFromMod = QAction("Add filter from python module ...", self)
             self.actAddComposite = QAction("Add filter form composite definition ...", self)
             self.actSetThread = QAction("Set thread ...", self)
+            self.actSetWorkerThreads = QAction("Set worker threads ...", self)
+            self.actSetWorkerProcesses = QAction("Set worker processes ...", self)
+            self.actSetMemoryGoverned = QAction("Memory governed source", self)
+            self.actSetMemoryGoverned.setCheckable(True)
             self.actSuggestDynamicPorts.triggered.connect(self.onSuggestDynamicPorts)
             self.actAddNode.triggered.connect(self.onAddFilterFromFile)
             self.actAddNodeFromMod.triggered.connect(self.onAddFilterFromMod)
             self.actAddComposite.triggered.connect(self.onAddComposite)
             self.actSetThread.triggered.connect(self.setThread)
+            self.actSetWorkerThreads.triggered.connect(self.setWorkerThreads)
+            self.actSetWorkerProcesses.triggered.connect(self.setWorkerProcesses)
+            self.actSetMemoryGoverned.triggered.connect(self.setMemoryGoverned)
         elif isinstance(self.graph, BaseGraph):
             self.actRenamePort = QAction("Rename port ...", self)
             self.actRemovePort = QAction("Remove port ...", self)
@@ -1138,6 +1168,9 @@ class GraphScene(BaseGraphScene):
                           self.actSuggestDynamicPorts])
             if isinstance(self.graph, FilterGraph):
                 m.addAction(self.actSetThread)
+                m.addAction(self.actSetWorkerThreads)
+                m.addAction(self.actSetWorkerProcesses)
+                m.addAction(self.actSetMemoryGoverned)
                 mockup = self.graph.getMockup(item.name)
                 din, dout = mockup.getDynamicPortsSupported()
                 self.actAddInputPort.setEnabled(din)
@@ -1148,8 +1181,17 @@ class GraphScene(BaseGraphScene):
                         issubclass(mockup.getPluginClass(), CompositeFilter.CompositeOutputNode) or
                         issubclass(mockup.getPluginClass(), CompositeFilter.CompositeInputNode)):
                     self.actSetThread.setEnabled(False)
+                    self.actSetWorkerThreads.setEnabled(False)
+                    self.actSetWorkerProcesses.setEnabled(False)
+                    self.actSetMemoryGoverned.setEnabled(False)
+                    self.actSetMemoryGoverned.setChecked(False)
                 else:
                     self.actSetThread.setEnabled(True)
+                    self.actSetWorkerThreads.setEnabled(True)
+                    self.actSetWorkerProcesses.setEnabled(True)
+                    self.actSetMemoryGoverned.setEnabled(True)
+                    self.actSetMemoryGoverned.setChecked(
+                        mockup.propertyCollection().getChildCollection("_nexxT").getProperty("memoryGoverned"))
             nexxT.Qt.call_exec(m, event.screenPos())
         elif isinstance(item, BaseGraphScene.PortItem):
             m = QMenu(self.views()[0])
@@ -1164,8 +1206,20 @@ class GraphScene(BaseGraphScene):
             m = QMenu(self.views()[0])
             m.addActions([self.actSetNonblockingConnection,
                           self.actSetStandardBlockingConnection,
-                          self.actSetCustomBlockingConnection,
-                          self.actRemoveConnection])
+                          self.actSetCustomBlockingConnection])
+            if isinstance(self.graph, FilterGraph):
+                props = self.graph.getConnectionProperties(item.portFrom.nodeItem.name, item.portFrom.name,
+                                                           item.portTo.nodeItem.name, item.portTo.name)
+                self.actSetBatchedConnection.setChecked(props.get("batched", False))
+                self.actSetSpscConnection.setChecked(props.get("transport", "qt") == "spsc")
+                self.actSetHighPriorityConnection.setChecked(props.get("priority", "normal") == "high")
+                self.actSetAutoWidthConnection.setChecked(props.get("autoWidth", False))
+                m.addActions([self.actSetBatchedConnection, self.actSetSpscConnection,
+                              self.actSetHighPriorityConnection, self.actSetAutoWidthConnection])
+                self.actsOverflow[props.get("overflow", "block")].setChecked(True)
+                m.addMenu("Overflow policy").addActions(self.actGroupOverflow.actions())
+                m.addAction(self.actSetMaxAgeConnection)
+            m.addAction(self.actRemoveConnection)
             nexxT.Qt.call_exec(m, event.screenPos())
         else:
             self.itemOfContextMenu = event.scenePos()
@@ -1254,16 +1308,27 @@ class GraphScene(BaseGraphScene):
         self.graph.deleteConnection(item.portFrom.nodeItem.name, item.portFrom.name,
                                     item.portTo.nodeItem.name, item.portTo.name)
 
+    def _updateConnectionProperties(self, item, **kw):
+        """
+        Updates the given connection properties of the connection item, other properties are kept.
+
+        :param item: a ConnectionItem instance
+        :param kw: the properties to be changed
+        :return:
+        """
+        c = item.portFrom.nodeItem.name, item.portFrom.name, item.portTo.nodeItem.name, item.portTo.name
+        props = self.graph.getConnectionProperties(*c)
+        props.update(kw)
+        self.graph.setConnectionProperties(*(c + (props,)))
+        item.sync()
+
     def onConnSetNonBlocking(self):
         """
         Sets the conmnection to non blocking mode.
 
         :return:
         """
-        item = self.itemOfContextMenu
-        self.graph.setConnectionProperties(item.portFrom.nodeItem.name, item.portFrom.name,
-                                           item.portTo.nodeItem.name, item.portTo.name, dict(width=0))
-        item.sync()
+        self._updateConnectionProperties(self.itemOfContextMenu, width=0)
 
     def onConnSetBlocking(self):
         """
@@ -1271,10 +1336,7 @@ class GraphScene(BaseGraphScene):
 
         :return:
         """
-        item = self.itemOfContextMenu
-        self.graph.setConnectionProperties(item.portFrom.nodeItem.name, item.portFrom.name,
-                                           item.portTo.nodeItem.name, item.portTo.name, dict(width=1))
-        item.sync()
+        self._updateConnectionProperties(self.itemOfContextMenu, width=1)
 
     def onConnSetCustom(self):
         """
@@ -1287,8 +1349,87 @@ class GraphScene(BaseGraphScene):
         width = self.graph.getConnectionProperties(*c)["width"]
         width, ok = QInputDialog.getInt(self.views()[0], self.sender().text(), "Enter connection width", width, 1)
         if ok:
-            self.graph.setConnectionProperties(*(c + (dict(width=width),)))
-            item.sync()
+            self._updateConnectionProperties(item, width=width)
+
+    def onConnSetBatched(self, checked):
+        """
+        Enables or disables the batched delivery mode of the connection.
+
+        :param checked: whether batched delivery is enabled
+        :return:
+        """
+        self._updateConnectionProperties(self.itemOfContextMenu, batched=checked)
+
+    def onConnSetSpsc(self, checked):
+        """
+        Switches the transport of the connection between the Qt signal/slot mechanism and the lock-free single
+        producer / single consumer queue.
+
+        :param checked: whether the spsc transport is used
+        :return:
+        """
+        self._updateConnectionProperties(self.itemOfContextMenu, transport="spsc" if checked else "qt")
+
+    def onConnSetHighPriority(self, checked):
+        """
+        Switches the delivery priority of the connection in the receiving thread between normal and high.
+
+        :param checked: whether the connection has high priority
+        :return:
+        """
+        self._updateConnectionProperties(self.itemOfContextMenu, priority="high" if checked else "normal")
+
+    def onConnSetAutoWidth(self, checked):
+        """
+        Enables or disables the automatic width of the connection. When enabled, the target latency is queried.
+
+        :param checked: whether the automatic width is enabled
+        :return:
+        """
+        item = self.itemOfContextMenu
+        if not checked:
+            self._updateConnectionProperties(item, autoWidth=False)
+            return
+        c = item.portFrom.nodeItem.name, item.portFrom.name, item.portTo.nodeItem.name, item.portTo.name
+        targetLatency = self.graph.getConnectionProperties(*c).get("targetLatency", 0.0)
+        targetLatency, ok = QInputDialog.getDouble(self.views()[0], self.sender().text(),
+                                                   "Enter target latency in seconds (0: avoid blocking and drops)",
+                                                   targetLatency, 0.0, 3600.0, 3)
+        if ok:
+            self._updateConnectionProperties(item, autoWidth=True, targetLatency=targetLatency)
+
+    def onConnSetOverflow(self, action):
+        """
+        Sets the overflow policy of the connection (the behaviour when all slots of the connection are occupied).
+
+        :param action: the triggered QAction instance
+        :return:
+        """
+        item = self.itemOfContextMenu
+        policy = action.data()
+        if policy == "timeout":
+            c = item.portFrom.nodeItem.name, item.portFrom.name, item.portTo.nodeItem.name, item.portTo.name
+            timeout = self.graph.getConnectionProperties(*c)["overflowTimeout"]
+            timeout, ok = QInputDialog.getDouble(self.views()[0], action.text(), "Enter timeout in seconds", timeout,
+                                                 0.0, 3600.0, 3)
+            if ok:
+                self._updateConnectionProperties(item, overflow=policy, overflowTimeout=timeout)
+        else:
+            self._updateConnectionProperties(item, overflow=policy)
+
+    def onConnSetMaxAge(self):
+        """
+        Sets the maximum age of the samples of the connection. Older samples are dropped by the receiving input port.
+
+        :return:
+        """
+        item = self.itemOfContextMenu
+        c = item.portFrom.nodeItem.name, item.portFrom.name, item.portTo.nodeItem.name, item.portTo.name
+        maxAge = self.graph.getConnectionProperties(*c).get("maxAge", 0.0)
+        maxAge, ok = QInputDialog.getDouble(self.views()[0], self.sender().text(),
+                                            "Enter maximum sample age in seconds (0: no limit)", maxAge, 0.0, 3600.0, 3)
+        if ok:
+            self._updateConnectionProperties(item, maxAge=maxAge)
 
     def addInputPort(self):
         """
@@ -1343,6 +1484,56 @@ class GraphScene(BaseGraphScene):
         self.graph.getSubConfig().getConfiguration().setDirty(True)
         item.sync()
 
+    def setWorkerThreads(self):
+        """
+        Opens a dialog to enter the number of worker threads of the node. Worker threads shall only be used for
+        stateless (reentrant) filters.
+
+        :return:
+        """
+        item = self.itemOfContextMenu
+        mockup = self.graph.getMockup(item.name)
+        pc = mockup.propertyCollection().getChildCollection("_nexxT")
+        num, ok = QInputDialog.getInt(self.views()[0], self.sender().text(),
+                                      "Number of worker threads of the stateless filter " + item.name +
+                                      " (0 disables the worker threads)",
+                                      pc.getProperty("workerThreads"), 0, 256)
+        if not ok:
+            return
+        pc.setProperty("workerThreads", num)
+        self.graph.getSubConfig().getConfiguration().setDirty(True)
+
+    def setWorkerProcesses(self):
+        """
+        Opens a dialog to enter the number of worker processes of the node. Worker processes shall only be used for
+        stateless python filters.
+
+        :return:
+        """
+        item = self.itemOfContextMenu
+        mockup = self.graph.getMockup(item.name)
+        pc = mockup.propertyCollection().getChildCollection("_nexxT")
+        num, ok = QInputDialog.getInt(self.views()[0], self.sender().text(),
+                                      "Number of worker processes of the stateless python filter " + item.name +
+                                      " (0 disables the worker processes)",
+                                      pc.getProperty("workerProcesses"), 0, 64)
+        if not ok:
+            return
+        pc.setProperty("workerProcesses", num)
+        self.graph.getSubConfig().getConfiguration().setDirty(True)
+
+    def setMemoryGoverned(self, checked):
+        """
+        Puts the output ports of the node under the control of the memory governor (or releases them).
+
+        :param checked: whether the node is governed
+        :return:
+        """
+        item = self.itemOfContextMenu
+        mockup = self.graph.getMockup(item.name)
+        mockup.propertyCollection().getChildCollection("_nexxT").setProperty("memoryGoverned", checked)
+        self.graph.getSubConfig().getConfiguration().setDirty(True)
+
     def onAddNode(self):
         """
         Called when the user wants to add a new node. (Generic variant)
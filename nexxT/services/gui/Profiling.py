@@ -12,7 +12,7 @@ import logging
 import numpy as np
 from nexxT.Qt.QtCore import QByteArray, Slot, Qt, QPointF, QLineF, QRectF, QEvent
 from nexxT.Qt.QtGui import QPainter, QPolygonF, QPen, QColor, QFontMetricsF, QPalette, QAction
-from nexxT.Qt.QtWidgets import QWidget, QToolTip
+from nexxT.Qt.QtWidgets import QWidget, QToolTip, QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog
 from nexxT.core.Utils import ThreadToColor
 from nexxT.interface import Services
 from nexxT.services.SrvProfiling import ProfilingService
@@ -282,6 +282,136 @@ class SpanDisplayWidget(QWidget):
             return True
         return super().event(event)
 
+class ConnectionMetricsWidget(QTableWidget):
+    """
+    This widget displays the transport metrics of the connections.
+    """
+    COLUMNS = [("Connection", None), ("Samples", "samples"), ("Rate [1/s]", "rate"), ("MBytes", "bytes"),
+               ("Width", "width"), ("Backlog", "backlog"), ("Blocking [s]", "blockingTime"), ("Dropped", "dropped"),
+               ("Discarded", "discarded"), ("Stale", "stale"), ("Priority", "priority"), ("Promoted", "promoted"),
+               ("Demoted", "demoted")]
+
+    def __init__(self, parent):
+        super().__init__(0, len(self.COLUMNS), parent)
+        self.setHorizontalHeaderLabels([c[0] for c in self.COLUMNS])
+        self.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.verticalHeader().setVisible(False)
+        self.setEditTriggers(QTableWidget.NoEditTriggers)
+
+    @Slot(object)
+    def newConnectionMetrics(self, metrics):
+        """
+        Slot called when new connection metrics are available
+
+        :param metrics: a dict mapping connection names to metric dicts
+        :return:
+        """
+        names = sorted(metrics.keys())
+        self.setRowCount(len(names))
+        for row, name in enumerate(names):
+            for col, (_, key) in enumerate(self.COLUMNS):
+                if key is None:
+                    text = name
+                elif key == "bytes":
+                    text = f"{metrics[name][key]/(1024*1024):.1f}"
+                elif key in ["rate", "blockingTime"]:
+                    text = f"{metrics[name][key]:.2f}"
+                elif key == "width":
+                    text = str(metrics[name][key]) if metrics[name][key] >= 0 else ""
+                    if metrics[name].get("autoWidth", False):
+                        text += " (auto)"
+                else:
+                    text = str(metrics[name][key])
+                item = self.item(row, col)
+                if item is None:
+                    item = QTableWidgetItem()
+                    if key is not None:
+                        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    self.setItem(row, col, item)
+                item.setText(text)
+
+class ThreadSettingsWidget(QTableWidget):
+    """
+    This widget displays the effective settings of the threads.
+    """
+    COLUMNS = [("Thread", None), ("Native ID", "nativeId"), ("OS Name", "osName"), ("Affinity", "affinity"),
+               ("Priority", "priority"), ("Policy", "policy"), ("Sched. Priority", "schedPriority")]
+
+    def __init__(self, parent):
+        super().__init__(0, len(self.COLUMNS), parent)
+        self.setHorizontalHeaderLabels([c[0] for c in self.COLUMNS])
+        self.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.verticalHeader().setVisible(False)
+        self.setEditTriggers(QTableWidget.NoEditTriggers)
+
+    @Slot(object)
+    def newThreadSettings(self, settings):
+        """
+        Slot called when new thread settings are available
+
+        :param settings: a dict mapping thread names to settings dicts
+        :return:
+        """
+        names = sorted(settings.keys())
+        self.setRowCount(len(names))
+        for row, name in enumerate(names):
+            for col, (_, key) in enumerate(self.COLUMNS):
+                if key is None:
+                    text = name
+                else:
+                    value = settings[name].get(key, None)
+                    if value is None:
+                        text = "-"
+                    elif key == "affinity":
+                        text = ",".join(str(c) for c in value)
+                    else:
+                        text = str(value)
+                item = self.item(row, col)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.setItem(row, col, item)
+                item.setText(text)
+
+class LatencyStatisticsWidget(QTableWidget):
+    """
+    This widget displays the latency statistics per path of the traced samples.
+    """
+    COLUMNS = [("Path", None), ("Count", "count"), ("Mean [ms]", "mean"), ("Min [ms]", "min"), ("P50 [ms]", "p50"),
+               ("P90 [ms]", "p90"), ("P99 [ms]", "p99"), ("Max [ms]", "max")]
+
+    def __init__(self, parent):
+        super().__init__(0, len(self.COLUMNS), parent)
+        self.setHorizontalHeaderLabels([c[0] for c in self.COLUMNS])
+        self.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.verticalHeader().setVisible(False)
+        self.setEditTriggers(QTableWidget.NoEditTriggers)
+
+    @Slot(object)
+    def newLatencyStatistics(self, statistics):
+        """
+        Slot called when new latency statistics are available
+
+        :param statistics: a dict mapping paths to statistics dicts
+        :return:
+        """
+        paths = sorted(statistics.keys())
+        self.setRowCount(len(paths))
+        for row, path in enumerate(paths):
+            for col, (_, key) in enumerate(self.COLUMNS):
+                if key is None:
+                    text = path
+                elif key == "count":
+                    text = str(statistics[path][key])
+                else:
+                    text = f"{statistics[path][key]*1e3:.3f}"
+                item = self.item(row, col)
+                if item is None:
+                    item = QTableWidgetItem()
+                    if key is not None:
+                        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    self.setItem(row, col, item)
+                item.setText(text)
+
 class Profiling(ProfilingService):
     """
     GUI part of the nexxT profiling service.
@@ -304,6 +434,21 @@ class Profiling(ProfilingService):
         self.spanDataUpdated.connect(self.spanDisplay.newSpanData)
         self.threadDeregistered.connect(self.spanDisplay.removeThread)
 
+        self.connectionsDockWidget = srv.newDockWidget("Connections", None, Qt.BottomDockWidgetArea)
+        self.connectionsDisplay = ConnectionMetricsWidget(self.connectionsDockWidget)
+        self.connectionsDockWidget.setWidget(self.connectionsDisplay)
+        self.connectionMetricsUpdated.connect(self.connectionsDisplay.newConnectionMetrics)
+
+        self.threadsDockWidget = srv.newDockWidget("Threads", None, Qt.BottomDockWidgetArea)
+        self.threadsDisplay = ThreadSettingsWidget(self.threadsDockWidget)
+        self.threadsDockWidget.setWidget(self.threadsDisplay)
+        self.threadSettingsUpdated.connect(self.threadsDisplay.newThreadSettings)
+
+        self.latencyDockWidget = srv.newDockWidget("Latencies", None, Qt.BottomDockWidgetArea)
+        self.latencyDisplay = LatencyStatisticsWidget(self.latencyDockWidget)
+        self.latencyDockWidget.setWidget(self.latencyDisplay)
+        self.latencyStatisticsUpdated.connect(self.latencyDisplay.newLatencyStatistics)
+
         self.actLoadEnabled = QAction("Enable Load Monitor")
         self.actLoadEnabled.setCheckable(True)
         self.actLoadEnabled.setChecked(True)
@@ -314,11 +459,24 @@ class Profiling(ProfilingService):
         self.actProfEnabled.setChecked(False)
         self.actProfEnabled.toggled.connect(self.setPortProfilingEnabled)
 
+        self.actLatencyEnabled = QAction("Enable Latency Tracing")
+        self.actLatencyEnabled.setCheckable(True)
+        self.actLatencyEnabled.setChecked(False)
+        self.actLatencyEnabled.toggled.connect(self.setLatencyTracingEnabled)
+
+        self.actTraceCapture = QAction("Capture Trace")
+        self.actTraceCapture.setCheckable(True)
+        self.actTraceCapture.setChecked(False)
+        self.actTraceCapture.toggled.connect(self.onTraceCaptureToggled)
+
         self.setLoadMonitorEnabled(True)
         self.setPortProfilingEnabled(False)
 
         profMenu.addAction(self.actLoadEnabled)
         profMenu.addAction(self.actProfEnabled)
+        profMenu.addAction(self.actLatencyEnabled)
+        profMenu.addSeparator()
+        profMenu.addAction(self.actTraceCapture)
 
     def setLoadMonitorEnabled(self, enabled):
         """
@@ -338,4 +496,19 @@ class Profiling(ProfilingService):
         :return:
         """
         self.actLoadEnabled.setEnabled(not enabled)
+        self.actProfEnabled.setChecked(enabled)
         super().setPortProfilingEnabled(enabled)
+
+    def onTraceCaptureToggled(self, enabled):
+        """
+        called when the corresponding QAction is toggled, asks for the trace file when the capture is stopped
+
+        :param enabled: boolean
+        :return:
+        """
+        if enabled:
+            self.startTraceCapture()
+        elif self.isTraceCaptureActive():
+            fn, _ = QFileDialog.getSaveFileName(Services.getService("MainWindow"), "Save trace", "trace.json",
+                                                filter="Chrome trace (*.json)")
+            self.stopTraceCapture(fn if fn != "" else None)
@@ -7,8 +7,19 @@
 
 #include "nexxT/DataSamples.hpp"
 #include "nexxT/Logger.hpp"
+#include <QtCore/QDeadlineTimer>
+#include <QtCore/QHash>
+#include <QtCore/QMap>
+#include <QtCore/QMutex>
+#include <QtCore/QReadWriteLock>
+#include <QtCore/QStringList>
+#include <QtCore/QThread>
+#include <QtCore/QWaitCondition>
+#include <QtCore/QVector>
+#include <algorithm>
 #include <chrono>
 #include <atomic>
+#include <stdexcept>
 
 using namespace nexxT;
 
@@ -17,6 +28,123 @@ const double DataSample::TIMESTAMP_RES = TIMESTAMP_RES_VALUE;
 static std::atomic_uint instanceCounter(0);
 static std::atomic_size_t memoryHeld(0);
 
+static constexpr int64_t MIN_POOL_CAPACITY = 4096;
+/* stale entries of acquired buffers which never made it into a DataSample are dropped above this limit */
+static constexpr int MAX_POOL_OUTSTANDING = 1024;
+
+namespace
+{
+    struct PayloadPoolState
+    {
+        QMutex mutex;
+        QMap<int64_t, QList<QByteArray> > idle;
+        QHash<const char *, int64_t> outstanding;
+        std::atomic_int numOutstanding{0};
+        int64_t bytesHeld = 0;
+        int64_t maxBytes = 256*1024*1024;
+        uint64_t hits = 0;
+        uint64_t misses = 0;
+    };
+
+    PayloadPoolState &poolState()
+    {
+        /* intentionally leaked, DataSample instances might be destroyed during static destruction */
+        static PayloadPoolState *state = new PayloadPoolState();
+        return *state;
+    }
+
+    /* returns the pool capacity if content has been acquired from the pool, 0 otherwise */
+    int64_t adoptPooled(const QByteArray &content)
+    {
+        PayloadPoolState &s = poolState();
+        if( s.numOutstanding.load(std::memory_order_relaxed) == 0 )
+        {
+            return 0;
+        }
+        QMutexLocker locker(&s.mutex);
+        auto it = s.outstanding.find(content.constData());
+        if( it == s.outstanding.end() || content.capacity() < it.value() )
+        {
+            return 0;
+        }
+        int64_t capacity = it.value();
+        s.outstanding.erase(it);
+        s.numOutstanding.store(s.outstanding.size(), std::memory_order_relaxed);
+        return capacity;
+    }
+
+    void recyclePooled(QByteArray &&content, int64_t capacity)
+    {
+        PayloadPoolState &s = poolState();
+        QMutexLocker locker(&s.mutex);
+        if( s.bytesHeld + capacity <= s.maxBytes )
+        {
+            s.idle[capacity].append(std::move(content));
+            s.bytesHeld += capacity;
+        }
+    }
+};
+
+namespace
+{
+    struct MemoryGovernorState
+    {
+        QMutex mutex;
+        std::atomic<int64_t> highWaterMark{0};
+        int64_t lowWaterMark = 0;
+        QString policy = "block";
+        double timeout = 1.0;
+        bool throttled = false;
+        uint64_t throttleEvents = 0;
+        uint64_t dropped = 0;
+        int64_t blockingNs = 0;
+        /* woken up when data samples are released while governed ports are blocked */
+        QWaitCondition released;
+        std::atomic_int waiting{0};
+    };
+
+    MemoryGovernorState &governorState()
+    {
+        static MemoryGovernorState *state = new MemoryGovernorState();
+        return *state;
+    }
+
+    /* called with the mutex held, returns whether the governed ports are throttled */
+    bool updateGovernor(MemoryGovernorState &s)
+    {
+        int64_t memory = int64_t(memoryHeld.load());
+        if( !s.throttled && memory > s.highWaterMark.load() )
+        {
+            s.throttled = true;
+            s.throttleEvents++;
+            NEXXT_LOG_WARN(QString("Memory governor: %1 MB held by data samples, throttling the governed sources.")
+                           .arg(double(memory)/(1024*1024), 0, 'f', 1));
+        } else if( s.throttled && memory < s.lowWaterMark )
+        {
+            s.throttled = false;
+            NEXXT_LOG_INFO(QString("Memory governor: %1 MB held by data samples, throttling finished.")
+                           .arg(double(memory)/(1024*1024), 0, 'f', 1));
+        }
+        return s.throttled;
+    }
+};
+
+namespace
+{
+    struct DatatypeRegistry
+    {
+        QReadWriteLock lock;
+        QHash<QString, int32_t> ids;
+        QList<QString> names;
+    };
+
+    DatatypeRegistry &datatypeRegistry()
+    {
+        static DatatypeRegistry *registry = new DatatypeRegistry();
+        return *registry;
+    }
+};
+
 namespace nexxT
 {
     struct DataSampleD
@@ -24,22 +152,108 @@ namespace nexxT
         QByteArray content;
         QString datatype;
         int64_t timestamp;
+        int64_t poolCapacity;
+        QMutex decodedMutex;
+        QHash<QString, std::shared_ptr<const void> > decoded;
+        /* interned lazily, -1 if not yet known */
+        std::atomic<int32_t> datatypeId{-1};
+        /* time of the first transmission (DataSample::currentTime()), -1 if not yet transmitted */
+        std::atomic<int64_t> transmitTime{-1};
+        /* the trace context of the LatencyTracer, protected by decodedMutex */
+        std::shared_ptr<const TraceContext> trace;
+        /* the content is shared with the instance this one has been created from and accounted there */
+        bool sharesContent = false;
+    };
+
+    struct TraceHop
+    {
+        QString port;
+        QString thread;
+        int64_t enterNs;
+        int64_t exitNs;
+    };
+
+    struct TraceContext
+    {
+        int64_t traceId;
+        QVector<TraceHop> hops;
+    };
+};
+
+namespace
+{
+    /* the number of recent latencies per path used for the statistics */
+    constexpr int LATENCY_WINDOW = 1000;
+    /* traces with more hops (e.g. in feedback loops) are restarted */
+    constexpr int MAX_TRACE_HOPS = 64;
+
+    struct LatencyPath
+    {
+        uint64_t count = 0;
+        QVector<int64_t> latencies;
+        int next = 0;
+    };
+
+    struct LatencyTracerState
+    {
+        std::atomic_bool enabled{false};
+        std::atomic<int64_t> nextTraceId{0};
+        QMutex mutex;
+        QHash<QString, LatencyPath> paths;
     };
+
+    LatencyTracerState &tracerState()
+    {
+        static LatencyTracerState *state = new LatencyTracerState();
+        return *state;
+    }
+
+    QList<std::shared_ptr<const TraceContext> > &traceStack()
+    {
+        static thread_local QList<std::shared_ptr<const TraceContext> > stack;
+        return stack;
+    }
+
+    int64_t traceNowNs()
+    {
+        return std::chrono::duration_cast<std::chrono::nanoseconds>(
+            std::chrono::steady_clock::now().time_since_epoch()).count();
+    }
 };
 
 DataSample::DataSample(const QByteArray &content, const QString &datatype, int64_t timestamp) :
-    d(new DataSampleD{content,datatype,timestamp})
+    d(new DataSampleD{content,datatype,timestamp,adoptPooled(content)})
 {
     instanceCounter++;
     memoryHeld += d->content.size();
     NEXXT_LOG_INTERNAL(QString("DataSample::DataSample (numInstances=%1, memory=%2 MB)").arg(instanceCounter).arg(memoryHeld/(1024*1024)));
 }
 
+DataSample::DataSample(const QByteArray &content, int32_t datatypeId, int64_t timestamp) :
+    DataSample(content, datatypeName(datatypeId), timestamp)
+{
+    d->datatypeId.store(datatypeId, std::memory_order_relaxed);
+}
+
 DataSample::~DataSample() 
 {
     instanceCounter--;
-    memoryHeld -= d->content.size();
+    if( !d->sharesContent )
+    {
+        memoryHeld -= d->content.size();
+        MemoryGovernorState &s = governorState();
+        if( s.waiting.load(std::memory_order_relaxed) > 0 )
+        {
+            QMutexLocker locker(&s.mutex);
+            s.released.wakeAll();
+        }
+    }
     NEXXT_LOG_INTERNAL(QString("DataSample::~DataSample (numInstances=%1, memory=%2 MB)").arg(instanceCounter).arg(memoryHeld/(1024*1024)));
+    d->decoded.clear();
+    if( d->poolCapacity > 0 )
+    {
+        recyclePooled(std::move(d->content), d->poolCapacity);
+    }
     delete d;
 }
         
@@ -47,7 +261,35 @@ QByteArray DataSample::getContent() const
 {
     return d->content;
 }
+
+QByteArrayView DataSample::getContentView() const
+{
+    /* use constData() to make sure that the shared data is not detached */
+    return QByteArrayView(d->content.constData(), d->content.size());
+}
+
+int64_t DataSample::getContentSize() const
+{
+    return d->content.size();
+}
     
+std::shared_ptr<const void> DataSample::cachedDecoding(const QString &key) const
+{
+    QMutexLocker locker(&d->decodedMutex);
+    return d->decoded.value(key);
+}
+
+std::shared_ptr<const void> DataSample::cacheDecoding(const QString &key, const std::shared_ptr<const void> &decoded) const
+{
+    QMutexLocker locker(&d->decodedMutex);
+    auto it = d->decoded.find(key);
+    if( it == d->decoded.end() )
+    {
+        it = d->decoded.insert(key, decoded);
+    }
+    return it.value();
+}
+
 int64_t DataSample::getTimestamp() const
 {
     return d->timestamp;
@@ -58,6 +300,56 @@ QString DataSample::getDatatype() const
     return d->datatype;
 }
 
+int32_t DataSample::getDatatypeId() const
+{
+    int32_t res = d->datatypeId.load(std::memory_order_relaxed);
+    if( res < 0 )
+    {
+        res = internDatatype(d->datatype);
+        d->datatypeId.store(res, std::memory_order_relaxed);
+    }
+    return res;
+}
+
+bool DataSample::hasDatatype(int32_t datatypeId) const
+{
+    return getDatatypeId() == datatypeId;
+}
+
+int32_t DataSample::internDatatype(const QString &datatype)
+{
+    DatatypeRegistry &r = datatypeRegistry();
+    {
+        QReadLocker locker(&r.lock);
+        auto it = r.ids.constFind(datatype);
+        if( it != r.ids.constEnd() )
+        {
+            return it.value();
+        }
+    }
+    QWriteLocker locker(&r.lock);
+    auto it = r.ids.constFind(datatype);
+    if( it != r.ids.constEnd() )
+    {
+        return it.value();
+    }
+    int32_t res = int32_t(r.names.size());
+    r.names.append(datatype);
+    r.ids.insert(datatype, res);
+    return res;
+}
+
+QString DataSample::datatypeName(int32_t datatypeId)
+{
+    DatatypeRegistry &r = datatypeRegistry();
+    QReadLocker locker(&r.lock);
+    if( datatypeId < 0 || datatypeId >= r.names.size() )
+    {
+        throw std::runtime_error(QString("Unknown datatype id %1").arg(datatypeId).toStdString());
+    }
+    return r.names[datatypeId];
+}
+
 SharedDataSamplePtr DataSample::copy(const SharedDataSamplePtr &src)
 {
     return SharedDataSamplePtr(new DataSample(src->d->content, src->d->datatype, src->d->timestamp));
@@ -73,9 +365,403 @@ void DataSample::registerMetaType()
     qRegisterMetaType<QSharedPointer<const nexxT::DataSample> >();
 }
 
+bool DataSample::markTransmitted() const
+{
+    int64_t expected = -1;
+    return d->transmitTime.compare_exchange_strong(expected, currentTime(), std::memory_order_relaxed);
+}
+
+int64_t DataSample::transmitTime() const
+{
+    return d->transmitTime.load(std::memory_order_relaxed);
+}
+
 int64_t DataSample::currentTime()
 {
     using namespace std;
     static_assert(TIMESTAMP_RES_VALUE == 1e-6, "Assuming timestamps to be in microseconds.");
     return chrono::duration_cast<chrono::microseconds>(chrono::system_clock::now().time_since_epoch()).count();
 }
+
+QVariantMap DataSample::getTrace() const
+{
+    std::shared_ptr<const TraceContext> t = trace();
+    QVariantMap res;
+    if( t )
+    {
+        QVariantList hops;
+        for(const TraceHop &hop : t->hops)
+        {
+            hops.append(QVariant(QVariantList{hop.port, hop.thread, qlonglong(hop.enterNs), qlonglong(hop.exitNs)}));
+        }
+        res["traceId"] = qlonglong(t->traceId);
+        res["hops"] = hops;
+    }
+    return res;
+}
+
+std::shared_ptr<const TraceContext> DataSample::trace() const
+{
+    QMutexLocker locker(&d->decodedMutex);
+    return d->trace;
+}
+
+void DataSample::setTrace(const std::shared_ptr<const TraceContext> &trace) const
+{
+    QMutexLocker locker(&d->decodedMutex);
+    d->trace = trace;
+}
+
+SharedDataSamplePtr DataSample::withTrace(const std::shared_ptr<const TraceContext> &trace) const
+{
+    DataSample *res = new DataSample(QByteArray(), d->datatype, d->timestamp);
+    /* QByteArray is implicitly shared, the content is not copied */
+    res->d->content = d->content;
+    res->d->sharesContent = true;
+    res->d->datatypeId.store(d->datatypeId.load(std::memory_order_relaxed), std::memory_order_relaxed);
+    res->d->transmitTime.store(transmitTime(), std::memory_order_relaxed);
+    {
+        QMutexLocker locker(&d->decodedMutex);
+        res->d->decoded = d->decoded;
+    }
+    res->d->trace = trace;
+    return make_shared(res);
+}
+
+int64_t DataSample::numInstances()
+{
+    return instanceCounter.load();
+}
+
+int64_t DataSample::memoryHeld()
+{
+    return int64_t(::memoryHeld.load());
+}
+
+int64_t PayloadPool::sizeClass(int64_t size)
+{
+    if( size <= MIN_POOL_CAPACITY )
+    {
+        return MIN_POOL_CAPACITY;
+    }
+    int64_t pow2 = MIN_POOL_CAPACITY;
+    while( pow2 < size )
+    {
+        pow2 <<= 1;
+    }
+    int64_t step = pow2 / 8;
+    return ((size + step - 1) / step) * step;
+}
+
+QByteArray PayloadPool::acquire(int64_t size)
+{
+    PayloadPoolState &s = poolState();
+    int64_t capacity = sizeClass(size);
+    QByteArray res;
+    {
+        QMutexLocker locker(&s.mutex);
+        auto it = s.idle.find(capacity);
+        if( it != s.idle.end() )
+        {
+            QList<QByteArray> &buffers = it.value();
+            for(auto bit = buffers.begin(); bit != buffers.end(); ++bit)
+            {
+                /* buffers still shared with other QByteArray instances must not be reused */
+                if( bit->isDetached() )
+                {
+                    res = std::move(*bit);
+                    buffers.erase(bit);
+                    break;
+                }
+            }
+        }
+        if( res.isNull() )
+        {
+            s.misses++;
+        } else
+        {
+            s.hits++;
+            s.bytesHeld -= capacity;
+        }
+    }
+    if( res.isNull() )
+    {
+        res.reserve(capacity);
+    }
+    res.resize(size);
+    {
+        QMutexLocker locker(&s.mutex);
+        if( s.outstanding.size() >= MAX_POOL_OUTSTANDING )
+        {
+            s.outstanding.clear();
+        }
+        s.outstanding.insert(res.constData(), capacity);
+        s.numOutstanding.store(s.outstanding.size(), std::memory_order_relaxed);
+    }
+    return res;
+}
+
+QVariantMap PayloadPool::statistics()
+{
+    PayloadPoolState &s = poolState();
+    QMutexLocker locker(&s.mutex);
+    int64_t buffersHeld = 0;
+    for(const auto &buffers : s.idle)
+    {
+        buffersHeld += buffers.size();
+    }
+    QVariantMap res;
+    res["hits"] = qulonglong(s.hits);
+    res["misses"] = qulonglong(s.misses);
+    res["buffersHeld"] = qlonglong(buffersHeld);
+    res["bytesHeld"] = qlonglong(s.bytesHeld);
+    return res;
+}
+
+void PayloadPool::setMaxBytes(int64_t maxBytes)
+{
+    PayloadPoolState &s = poolState();
+    QMutexLocker locker(&s.mutex);
+    s.maxBytes = maxBytes;
+}
+
+int64_t PayloadPool::maxBytes()
+{
+    PayloadPoolState &s = poolState();
+    QMutexLocker locker(&s.mutex);
+    return s.maxBytes;
+}
+
+void PayloadPool::clear()
+{
+    PayloadPoolState &s = poolState();
+    QMutexLocker locker(&s.mutex);
+    s.idle.clear();
+    s.bytesHeld = 0;
+    s.hits = 0;
+    s.misses = 0;
+}
+
+void MemoryGovernor::setLimits(int64_t highWaterMark, int64_t lowWaterMark, const QString &policy, double timeout)
+{
+    if( policy != "block" && policy != "drop" )
+    {
+        throw std::runtime_error((QString("Unknown memory governor policy '") + policy + "'.").toStdString());
+    }
+    if( lowWaterMark <= 0 || lowWaterMark > highWaterMark )
+    {
+        lowWaterMark = highWaterMark*4/5;
+    }
+    MemoryGovernorState &s = governorState();
+    QMutexLocker locker(&s.mutex);
+    s.highWaterMark.store(std::max(int64_t(0), highWaterMark));
+    s.lowWaterMark = std::max(int64_t(0), lowWaterMark);
+    s.policy = policy;
+    s.timeout = std::max(0.0, timeout);
+    s.throttled = false;
+}
+
+QVariantMap MemoryGovernor::limits()
+{
+    MemoryGovernorState &s = governorState();
+    QMutexLocker locker(&s.mutex);
+    QVariantMap res;
+    res["highWaterMark"] = qlonglong(s.highWaterMark.load());
+    res["lowWaterMark"] = qlonglong(s.lowWaterMark);
+    res["policy"] = s.policy;
+    res["timeout"] = s.timeout;
+    return res;
+}
+
+QVariantMap MemoryGovernor::statistics()
+{
+    MemoryGovernorState &s = governorState();
+    QMutexLocker locker(&s.mutex);
+    QVariantMap res;
+    res["memoryHeld"] = qlonglong(DataSample::memoryHeld());
+    res["numInstances"] = qlonglong(DataSample::numInstances());
+    res["throttled"] = s.throttled;
+    res["throttleEvents"] = qulonglong(s.throttleEvents);
+    res["dropped"] = qulonglong(s.dropped);
+    res["blockingTime"] = double(s.blockingNs)*1e-9;
+    return res;
+}
+
+bool MemoryGovernor::admit()
+{
+    MemoryGovernorState &s = governorState();
+    if( s.highWaterMark.load(std::memory_order_relaxed) <= 0 )
+    {
+        return true;
+    }
+    QMutexLocker locker(&s.mutex);
+    if( !updateGovernor(s) )
+    {
+        return true;
+    }
+    if( s.policy == "drop" )
+    {
+        s.dropped++;
+        return false;
+    }
+    int64_t timeoutNs = int64_t(s.timeout*1e9);
+    auto t0 = std::chrono::steady_clock::now();
+    int64_t elapsedNs = 0;
+    bool throttled = true;
+    s.waiting++;
+    /* the destructor of DataSample wakes us up when memory has been released */
+    while( throttled && elapsedNs < timeoutNs )
+    {
+        s.released.wait(&s.mutex, QDeadlineTimer(std::chrono::nanoseconds(timeoutNs - elapsedNs)));
+        throttled = updateGovernor(s);
+        elapsedNs = std::chrono::duration_cast<std::chrono::nanoseconds>(std::chrono::steady_clock::now() - t0).count();
+    }
+    s.waiting--;
+    s.blockingNs += elapsedNs;
+    if( throttled )
+    {
+        s.dropped++;
+    }
+    return !throttled;
+}
+
+void LatencyTracer::setEnabled(bool enabled)
+{
+    tracerState().enabled.store(enabled);
+}
+
+bool LatencyTracer::enabled()
+{
+    return tracerState().enabled.load(std::memory_order_relaxed);
+}
+
+QVariantMap LatencyTracer::statistics()
+{
+    LatencyTracerState &s = tracerState();
+    QHash<QString, LatencyPath> paths;
+    {
+        QMutexLocker locker(&s.mutex);
+        paths = s.paths;
+    }
+    QVariantMap res;
+    for(auto it = paths.begin(); it != paths.end(); ++it)
+    {
+        QVector<int64_t> latencies = it.value().latencies;
+        std::sort(latencies.begin(), latencies.end());
+        int n = latencies.size();
+        double sum = 0.0;
+        for(int64_t l : latencies)
+        {
+            sum += double(l);
+        }
+        /* nearest rank percentiles of the sorted latencies */
+        auto percentile = [&latencies, n](double q) { return double(latencies[std::min(n - 1, int(q*n))])*1e-9; };
+        QVariantMap stats;
+        stats["count"] = qulonglong(it.value().count);
+        stats["mean"] = sum/n*1e-9;
+        stats["min"] = double(latencies.first())*1e-9;
+        stats["max"] = double(latencies.last())*1e-9;
+        stats["p50"] = percentile(0.5);
+        stats["p90"] = percentile(0.9);
+        stats["p99"] = percentile(0.99);
+        res[it.key()] = stats;
+    }
+    return res;
+}
+
+void LatencyTracer::reset()
+{
+    LatencyTracerState &s = tracerState();
+    QMutexLocker locker(&s.mutex);
+    s.paths.clear();
+}
+
+SharedDataSamplePtr LatencyTracer::transmitted(const SharedDataSamplePtr &sample, const QString &port, bool first)
+{
+    int64_t now = traceNowNs();
+    QList<std::shared_ptr<const TraceContext> > &stack = traceStack();
+    std::shared_ptr<TraceContext> res;
+    if( !stack.isEmpty() && stack.last() )
+    {
+        /* derived from the input of the current onPortDataChanged(...) call */
+        res = std::make_shared<TraceContext>(*stack.last());
+        res->hops.last().exitNs = now;
+    } else
+    {
+        std::shared_ptr<const TraceContext> t = sample->trace();
+        if( t )
+        {
+            res = std::make_shared<TraceContext>(*t);
+        }
+    }
+    if( !res || res->hops.size() >= MAX_TRACE_HOPS )
+    {
+        res = std::make_shared<TraceContext>();
+        res->traceId = tracerState().nextTraceId.fetch_add(1);
+    }
+    res->hops.append(TraceHop{port, QThread::currentThread()->objectName(), now, now});
+    if( !first )
+    {
+        /* the sample might still be in flight to other receivers, its trace context must not change */
+        return sample->withTrace(res);
+    }
+    sample->setTrace(res);
+    return sample;
+}
+
+void LatencyTracer::enterPort(const DataSample &sample, const QString &port)
+{
+    std::shared_ptr<const TraceContext> t = sample.trace();
+    if( t )
+    {
+        int64_t now = traceNowNs();
+        std::shared_ptr<TraceContext> res = std::make_shared<TraceContext>(*t);
+        res->hops.append(TraceHop{port, QThread::currentThread()->objectName(), now, now});
+        t = res;
+    }
+    traceStack().append(t);
+}
+
+void LatencyTracer::exitPort()
+{
+    std::shared_ptr<const TraceContext> t = traceStack().takeLast();
+    if( !t )
+    {
+        return;
+    }
+    int64_t latency = traceNowNs() - t->hops.first().enterNs;
+    QStringList ports;
+    for(const TraceHop &hop : t->hops)
+    {
+        ports.append(hop.port);
+    }
+    QString path = ports.join(" -> ");
+    LatencyTracerState &s = tracerState();
+    QMutexLocker locker(&s.mutex);
+    LatencyPath &entry = s.paths[path];
+    entry.count++;
+    if( entry.latencies.size() < LATENCY_WINDOW )
+    {
+        entry.latencies.append(latency);
+    } else
+    {
+        entry.latencies[entry.next] = latency;
+        entry.next = (entry.next + 1) % LATENCY_WINDOW;
+    }
+}
+
+std::shared_ptr<const TraceContext> LatencyTracer::currentContext()
+{
+    QList<std::shared_ptr<const TraceContext> > &stack = traceStack();
+    return stack.isEmpty() ? std::shared_ptr<const TraceContext>() : stack.last();
+}
+
+void LatencyTracer::pushContext(const std::shared_ptr<const TraceContext> &context)
+{
+    traceStack().append(context);
+}
+
+void LatencyTracer::popContext()
+{
+    traceStack().removeLast();
+}
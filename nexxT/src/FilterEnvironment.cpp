@@ -9,15 +9,173 @@
 #include "nexxT/Filters.hpp"
 #include "nexxT/Logger.hpp" 
 #include "nexxT/PropertyCollection.hpp"
+#include "nexxT/InputPortInterface.hpp"
+#include "nexxT/OutputPortInterface.hpp"
+#include "nexxT/DataSamples.hpp"
+#include "WorkerTask.hpp"
 
 #include <QtCore/QThread>
+#include <QtCore/QThreadPool>
 #include <QtCore/QCoreApplication>
 #include <QtCore/QMutex>
+#include <QtCore/QWaitCondition>
+#include <QtCore/QMap>
+#include <QtCore/QScopedPointer>
+#include <QtCore/QPointer>
 
 using namespace nexxT;
 
 namespace nexxT
 {
+    /*
+     * Executes the onPortDataChanged(...) calls of a stateless filter in a pool of worker threads. Each call is
+     * executed with a snapshot of the input queues and the transmitted samples are collected. The collected samples
+     * are transmitted by the filter's thread in the order of the dispatched calls. The number of calls in flight is
+     * limited to twice the number of threads, afterwards the filter's thread is blocked, so that the inter-thread
+     * connections towards the filter provide back pressure as usual.
+     *
+     * The object lives in the filter's thread.
+     */
+    class WorkerPool : public QObject
+    {
+        BaseFilterEnvironment *env;
+        QThreadPool pool;
+        QMutex mutex;
+        QWaitCondition finishedCondition;
+        QMap<int64_t, WorkerTask*> finished;
+        int64_t nextSeq;
+        int64_t nextEmit;
+        int maxInFlight;
+        bool flushPosted;
+
+        static QEvent::Type flushEventType()
+        {
+            static QEvent::Type type = QEvent::Type(QEvent::registerEventType());
+            return type;
+        }
+
+        void run(WorkerTask *task)
+        {
+            WorkerTask::current() = task;
+            try
+            {
+                SharedFilterPtr plugin = env->getPlugin();
+                if( plugin )
+                {
+                    plugin->onPortDataChanged(*task->port);
+                }
+            } catch(std::exception &e)
+            {
+                NEXXT_LOG_ERROR(QString("Unexpected exception during onPortDataChanged from filter %1: %2").arg(env->propertyCollection()->objectName()).arg(e.what()));
+            }
+            WorkerTask::current() = nullptr;
+            QMutexLocker locker(&mutex);
+            finished.insert(task->seq, task);
+            if( !flushPosted )
+            {
+                flushPosted = true;
+                QCoreApplication::postEvent(this, new QEvent(flushEventType()));
+            }
+            finishedCondition.wakeAll();
+        }
+
+    public:
+        WorkerPool(BaseFilterEnvironment *env, int numThreads)
+            : env(env), nextSeq(0), nextEmit(0), maxInFlight(2*numThreads), flushPosted(false)
+        {
+            pool.setMaxThreadCount(numThreads);
+        }
+
+        virtual ~WorkerPool()
+        {
+            pool.waitForDone();
+            qDeleteAll(finished);
+        }
+
+        int numThreads() const
+        {
+            return pool.maxThreadCount();
+        }
+
+        void dispatch(const InputPortInterface &port)
+        {
+            while( nextSeq - nextEmit >= maxInFlight )
+            {
+                {
+                    QMutexLocker locker(&mutex);
+                    while( !finished.contains(nextEmit) )
+                    {
+                        finishedCondition.wait(&mutex);
+                    }
+                }
+                flush();
+            }
+            WorkerTask *task = new WorkerTask{nextSeq++, env, &port, {}, {}, LatencyTracer::currentContext()};
+            for(const SharedPortPtr &p : env->getAllInputPorts())
+            {
+                const InputPortInterface *ip = dynamic_cast<const InputPortInterface *>(p.data());
+                if( ip )
+                {
+                    task->inputs[ip] = ip->snapshotQueue();
+                }
+            }
+            pool.start([this, task]() { run(task); });
+        }
+
+        /* transmits the outputs of all finished tasks which are next in order */
+        void flush()
+        {
+            QList<WorkerTask*> ready;
+            {
+                QMutexLocker locker(&mutex);
+                flushPosted = false;
+                while( finished.contains(nextEmit) )
+                {
+                    ready.append(finished.take(nextEmit));
+                    nextEmit++;
+                }
+            }
+            for(WorkerTask *t : ready)
+            {
+                QScopedPointer<WorkerTask> task(t);
+                /* the trace context is removed also in case of exceptions */
+                struct ContextGuard
+                {
+                    ~ContextGuard() { LatencyTracer::popContext(); }
+                };
+                LatencyTracer::pushContext(task->trace);
+                ContextGuard guard;
+                for(auto &output : task->outputs)
+                {
+                    output.first->transmit(output.second);
+                }
+            }
+        }
+
+        void waitForDone()
+        {
+            {
+                QMutexLocker locker(&mutex);
+                while( nextEmit + finished.size() < nextSeq )
+                {
+                    finishedCondition.wait(&mutex);
+                }
+            }
+            flush();
+        }
+
+    protected:
+        virtual bool event(QEvent *e) override
+        {
+            if( e->type() == flushEventType() )
+            {
+                flush();
+                return true;
+            }
+            return QObject::event(e);
+        }
+    };
+
     struct BaseFilterEnvironmentD
     {
         SharedFilterPtr plugin;
@@ -26,11 +184,19 @@ namespace nexxT
         PropertyCollection *propertyCollection; 
         bool dynamicInputPortsSupported;
         bool dynamicOutputPortsSupported;
+        WorkerPool *workers;
+        QPointer<QObject> dispatcher;
     };
 };
 
+WorkerTask *&WorkerTask::current()
+{
+    static thread_local WorkerTask *task = nullptr;
+    return task;
+}
+
 BaseFilterEnvironment::BaseFilterEnvironment(PropertyCollection *propertyCollection)
-    : d(new BaseFilterEnvironmentD{SharedFilterPtr(), QThread::currentThread(), propertyCollection, false, false})
+    : d(new BaseFilterEnvironmentD{SharedFilterPtr(), QThread::currentThread(), propertyCollection, false, false, nullptr})
 {
     NEXXT_LOG_INTERNAL(QString("BaseFilterEnvironment::BaseFilterEnvironment %1").arg(uint64_t(this), 0, 16));
 }
@@ -38,6 +204,7 @@ BaseFilterEnvironment::BaseFilterEnvironment(PropertyCollection *propertyCollect
 BaseFilterEnvironment::~BaseFilterEnvironment()
 {
     NEXXT_LOG_INTERNAL(QString("BaseFilterEnvironment::~BaseFilterEnvironment %1").arg(uint64_t(this), 0, 16));
+    delete d->workers;
     delete d;
 }
 
@@ -100,7 +267,7 @@ void BaseFilterEnvironment::portDataChanged(const InputPortInterface &port)
             case FilterState::CONSTRUCTED:
                 if( QThread::currentThread() == QCoreApplication::instance()->thread() )
                 {
-                    /* this happens when the deinit() is executed during processEvents() in InputPortInterface::receiveAsync */
+                    /* this happens when samples queued for the main thread are delivered after deinit() */
                     NEXXT_LOG_INFO("DataSample discarded because application has been stopped already.");
                     break;
                 }
@@ -111,7 +278,14 @@ void BaseFilterEnvironment::portDataChanged(const InputPortInterface &port)
     {
         try
         {
-            if( getPlugin() )
+            if( d->workers )
+            {
+                d->workers->dispatch(port);
+            } else if( d->dispatcher )
+            {
+                QMetaObject::invokeMethod(d->dispatcher.data(), "dispatch", Qt::DirectConnection,
+                                          Q_ARG(QObject *, const_cast<InputPortInterface *>(&port)));
+            } else if( getPlugin() )
             {
                 getPlugin()->onPortDataChanged(port);
             } else
@@ -130,10 +304,47 @@ PropertyCollection *BaseFilterEnvironment::propertyCollection() const
     return d->propertyCollection;
 }
 
+void BaseFilterEnvironment::setWorkerThreads(int numThreads)
+{
+    if( d->workers )
+    {
+        d->workers->waitForDone();
+        delete d->workers;
+        d->workers = nullptr;
+    }
+    if( numThreads > 0 )
+    {
+        d->workers = new WorkerPool(this, numThreads);
+    }
+}
+
+int BaseFilterEnvironment::workerThreads() const
+{
+    return d->workers ? d->workers->numThreads() : 0;
+}
+
+void BaseFilterEnvironment::waitForWorkers()
+{
+    if( d->workers )
+    {
+        d->workers->waitForDone();
+    }
+}
+
+void BaseFilterEnvironment::setPortDataDispatcher(QObject *dispatcher)
+{
+    d->dispatcher = dispatcher;
+}
+
 void BaseFilterEnvironment::assertMyThread()
 {
     if( QThread::currentThread() != d->thread )
     {
-        throw std::runtime_error("Unexpected thread.");
+        WorkerTask *task = WorkerTask::current();
+        /* worker threads of stateless filters act on behalf of the filter's thread */
+        if( !task || task->env != this )
+        {
+            throw std::runtime_error("Unexpected thread.");
+        }
     }
 }
@@ -12,36 +12,448 @@
 #include "nexxT/Logger.hpp"
 #include "nexxT/Services.hpp"
 #include "nexxT/Logger.hpp"
+#include "WorkerTask.hpp"
 #include <atomic>
-#include <tuple>
+#include <chrono>
+#include <deque>
 
 #include <QtCore/QThread>
 #include <QtCore/QVariant>
 #include <QtCore/QCoreApplication>
+#include <QtCore/QMutex>
+#include <QtCore/QPointer>
 #include <map>
+#include <vector>
+#include <algorithm>
 #include <cstdio>
 
 using namespace nexxT;
 
 namespace nexxT
 {
+    /*
+     * Ring buffer holding the most recent samples of an input port. Index 0 relates to the most recent sample.
+     * Adding a sample and evicting the oldest sample are O(1), the capacity grows on demand if the number of
+     * samples is not limited. The sum of the content sizes of the stored samples is tracked incrementally.
+     */
+    class SampleQueue
+    {
+        std::vector<SharedDataSamplePtr> buffer;
+        size_t head; /* index of the most recent sample */
+        size_t count;
+        int maxSamples;
+        int64_t bytes;
+
+        void reallocate(size_t capacity)
+        {
+            std::vector<SharedDataSamplePtr> newBuffer(capacity);
+            size_t n = std::min(count, capacity);
+            /* oldest sample first */
+            for(size_t i = 0; i < n; i++)
+            {
+                newBuffer[i] = at(n - 1 - i);
+            }
+            buffer.swap(newBuffer);
+            count = n;
+            bytes = 0;
+            for(size_t i = 0; i < n; i++)
+            {
+                bytes += buffer[i]->getContentSize();
+            }
+            head = n > 0 ? n - 1 : 0;
+        }
+    public:
+        SampleQueue(int maxSamples) : buffer(1), head(0), count(0), maxSamples(-1), bytes(0)
+        {
+            setMaxSamples(maxSamples);
+        }
+
+        int size() const
+        {
+            return int(count);
+        }
+
+        int64_t contentBytes() const
+        {
+            return bytes;
+        }
+
+        const SharedDataSamplePtr &at(size_t idx) const
+        {
+            return buffer[(head + buffer.size() - idx) % buffer.size()];
+        }
+
+        void setMaxSamples(int newMaxSamples)
+        {
+            maxSamples = newMaxSamples > 0 ? newMaxSamples : -1;
+            if( maxSamples > 0 )
+            {
+                reallocate(size_t(maxSamples));
+            }
+        }
+
+        void push(const SharedDataSamplePtr &sample)
+        {
+            if( count == buffer.size() )
+            {
+                if( maxSamples > 0 )
+                {
+                    popOldest();
+                } else
+                {
+                    reallocate(2*buffer.size());
+                }
+            }
+            head = (head + 1) % buffer.size();
+            buffer[head] = sample;
+            count++;
+            bytes += sample->getContentSize();
+        }
+
+        void popOldest()
+        {
+            SharedDataSamplePtr &oldest = buffer[(head + buffer.size() - (count - 1)) % buffer.size()];
+            bytes -= oldest->getContentSize();
+            oldest.reset();
+            count--;
+        }
+
+        /* the most recent sample is always kept */
+        void evictBytes(int64_t maxBytes)
+        {
+            while( count > 1 && bytes > maxBytes )
+            {
+                popOldest();
+            }
+        }
+
+        void evictOlderThan(double maxAge)
+        {
+            if( count > 0 )
+            {
+                int64_t newest = at(0)->getTimestamp();
+                while( count > 0 && double(newest - at(count-1)->getTimestamp()) > maxAge )
+                {
+                    popOldest();
+                }
+            }
+        }
+
+        /* binary search assuming monotonically increasing timestamps, returns count if there is no such sample */
+        size_t indexOfDelay(double delayTime) const
+        {
+            if( count == 0 )
+            {
+                return 0;
+            }
+            int64_t newest = at(0)->getTimestamp();
+            size_t lo = 0;
+            size_t hi = count;
+            while( lo < hi )
+            {
+                size_t mid = (lo + hi) / 2;
+                if( double(newest - at(mid)->getTimestamp()) < delayTime )
+                {
+                    lo = mid + 1;
+                } else
+                {
+                    hi = mid;
+                }
+            }
+            return lo;
+        }
+    };
+
     struct InputPortD
     {
         int queueSizeSamples;
         double queueSizeSeconds;
         bool interthreadDynamicQueue;
-        QList<SharedDataSamplePtr> queue;
+        bool interthreadBatchNotification;
+        SampleQueue queue;
         std::map<QSemaphore*, uint32_t> semaphoreN;
         SharedQObjectPtr srvprof;
+        /* cached portProfilingEnabled property of srvprof, updated by its change notifications */
+        std::atomic_bool profilingEnabled{false};
         QString profname;
+        QString traceName;
+        /* max. sample age in microseconds, -1 if disabled */
+        int64_t maxSampleAgeUs = -1;
+        bool maxSampleAgeArrival = false;
+        std::atomic<int64_t> staleSamples{0};
+        /* byte budget of the queue, -1 if disabled */
+        int64_t queueSizeBytes = -1;
+    };
+
+    /*
+     * Schedules the delivery of inter-thread samples to input ports living in the main thread. Samples are
+     * delivered directly as long as the current time slice has budget left. Otherwise they are queued and drained
+     * in time-sliced batches by low-priority posted events, so that the GUI events are processed in between.
+     * Samples arriving while the queue is not empty or while a delivery is in progress (i.e. from nested event
+     * loops) are queued as well, so that the sample order is preserved. Samples of high-priority connections are
+     * queued in front of the samples of normal connections.
+     *
+     * All members except the queue are accessed from the main thread only. The queue is protected by a mutex,
+     * because it might be purged or inspected from other threads.
+     */
+    static qint64 nowNs()
+    {
+        return std::chrono::duration_cast<std::chrono::nanoseconds>(
+            std::chrono::steady_clock::now().time_since_epoch()).count();
+    }
+
+    class MainThreadDispatcher : public QObject
+    {
+        typedef std::chrono::steady_clock Clock;
+
+        struct Item
+        {
+            QPointer<InputPortInterface> port;
+            QList<SharedDataSamplePtr> samples;
+            QList<qint64> enqueueNs;
+            QSemaphore *semaphore;
+            Clock::time_point enqueued;
+            QPointer<InterThreadConnection> priorityConnection;
+            QPointer<InterThreadConnection> serviceConnection;
+        };
+
+        mutable QMutex mutex;
+        std::deque<Item> queue;
+        /* number of items of high-priority connections at the front of the queue */
+        size_t numPriority;
+        int64_t queuedSamples;
+        int busy;
+        bool drainPosted;
+        bool drainRequested;
+        Clock::time_point sliceStart;
+        Clock::time_point lastDelivery;
+
+        static std::atomic<MainThreadDispatcher*> theInstance;
+
+        static QEvent::Type drainEventType()
+        {
+            static QEvent::Type type = QEvent::Type(QEvent::registerEventType());
+            return type;
+        }
+
+        static Clock::duration budget()
+        {
+            return std::chrono::duration_cast<Clock::duration>(
+                std::chrono::nanoseconds(budgetNs.load(std::memory_order_relaxed)));
+        }
+
+        void scheduleDrain()
+        {
+            if( !drainPosted )
+            {
+                drainPosted = true;
+                QCoreApplication::postEvent(this, new QEvent(drainEventType()), Qt::LowEventPriority);
+            }
+        }
+
+        MainThreadDispatcher() : numPriority(0), queuedSamples(0), busy(0), drainPosted(false), drainRequested(false)
+        {
+        }
+
+    public:
+        static std::atomic<int64_t> budgetNs;
+
+        /*
+         * Returns the dispatcher instance. The instance is created on first use in the main thread and never
+         * deleted. If create is false, a nullptr is returned in case the instance hasn't been created yet.
+         */
+        static MainThreadDispatcher *instance(bool create = true)
+        {
+            MainThreadDispatcher *res = theInstance.load();
+            if( !res && create )
+            {
+                res = new MainThreadDispatcher();
+                theInstance.store(res);
+            }
+            return res;
+        }
+
+        /*
+         * Returns true if the given samples have been queued for later delivery, false if they shall be delivered
+         * directly (in that case the caller must wrap the delivery into beginDelivery() / endDelivery()).
+         */
+        bool defer(InputPortInterface *port, const SharedDataSamplePtr *samples, const qint64 *enqueueNs, int numSamples,
+                   QSemaphore *semaphore, InterThreadConnection *priorityConnection,
+                   InterThreadConnection *serviceConnection)
+        {
+            bool priority = priorityConnection != nullptr;
+            Clock::time_point now = Clock::now();
+            Clock::duration b = budget();
+            QMutexLocker locker(&mutex);
+            if( busy == 0 && (priority ? numPriority == 0 : queue.empty()) )
+            {
+                if( now - lastDelivery > b )
+                {
+                    /* the main thread has been idle in between, start a new time slice */
+                    sliceStart = now;
+                }
+                if( b <= Clock::duration::zero() || now - sliceStart <= b )
+                {
+                    return false;
+                }
+            }
+            Item item{QPointer<InputPortInterface>(port), QList<SharedDataSamplePtr>(), QList<qint64>(), semaphore, now,
+                      QPointer<InterThreadConnection>(priorityConnection),
+                      QPointer<InterThreadConnection>(serviceConnection)};
+            for(int i = 0; i < numSamples; i++)
+            {
+                item.samples.append(samples[i]);
+                item.enqueueNs.append(enqueueNs ? enqueueNs[i] : -1);
+            }
+            if( priority )
+            {
+                queue.insert(queue.begin() + numPriority, item);
+                numPriority++;
+            } else
+            {
+                queue.push_back(item);
+            }
+            queuedSamples += numSamples;
+            locker.unlock();
+            scheduleDrain();
+            return true;
+        }
+
+        void beginDelivery()
+        {
+            busy++;
+        }
+
+        void endDelivery()
+        {
+            busy--;
+            lastDelivery = Clock::now();
+            if( busy == 0 && drainRequested )
+            {
+                drainRequested = false;
+                scheduleDrain();
+            }
+        }
+
+        /*
+         * Removes all queued items of a connection, identified by the receiving port and the semaphore of the
+         * connection. For connections without semaphore, all queued items of the port without semaphore are
+         * removed. Called before the connection is deleted.
+         */
+        void purge(const InputPortInterface *port, const QSemaphore *semaphore)
+        {
+            QMutexLocker locker(&mutex);
+            for(auto it = queue.begin(); it != queue.end(); )
+            {
+                if( it->port.data() == port && it->semaphore == semaphore )
+                {
+                    queuedSamples -= it->samples.size();
+                    if( size_t(it - queue.begin()) < numPriority )
+                    {
+                        numPriority--;
+                    }
+                    it = queue.erase(it);
+                } else
+                {
+                    it++;
+                }
+            }
+        }
+
+        QVariantMap backlog() const
+        {
+            QMutexLocker locker(&mutex);
+            QVariantMap res;
+            res["samples"] = QVariant::fromValue<qint64>(queuedSamples);
+            double lag = 0.0;
+            if( !queue.empty() )
+            {
+                Clock::time_point oldest = queue.front().enqueued;
+                for(const Item &item : queue)
+                {
+                    oldest = std::min(oldest, item.enqueued);
+                }
+                lag = std::chrono::duration<double>(Clock::now() - oldest).count();
+            }
+            res["lag"] = lag;
+            return res;
+        }
+
+    protected:
+        virtual bool event(QEvent *e) override
+        {
+            if( e->type() != drainEventType() )
+            {
+                return QObject::event(e);
+            }
+            drainPosted = false;
+            if( busy > 0 )
+            {
+                /* a nested event loop inside a delivery, continue draining after the delivery has finished */
+                drainRequested = true;
+                return true;
+            }
+            sliceStart = Clock::now();
+            Clock::duration b = budget();
+            while(true)
+            {
+                Item item;
+                {
+                    QMutexLocker locker(&mutex);
+                    if( queue.empty() || (b > Clock::duration::zero() && Clock::now() - sliceStart > b) )
+                    {
+                        break;
+                    }
+                    item = queue.front();
+                    queue.pop_front();
+                    if( numPriority > 0 )
+                    {
+                        numPriority--;
+                    }
+                    queuedSamples -= item.samples.size();
+                }
+                if( item.port.isNull() )
+                {
+                    continue;
+                }
+                beginDelivery();
+                qint64 t0 = nowNs();
+                item.port->receiveAsyncSamples(item.samples.constData(), item.enqueueNs.constData(), item.samples.size(),
+                                               item.semaphore, true, nullptr, item.serviceConnection.data());
+                if( !item.priorityConnection.isNull() )
+                {
+                    item.priorityConnection->priorityDeliveryFinished(t0, nowNs());
+                }
+                endDelivery();
+            }
+            QMutexLocker locker(&mutex);
+            bool remaining = !queue.empty();
+            locker.unlock();
+            if( remaining )
+            {
+                /* yield to the event loop and continue with the next time slice afterwards */
+                scheduleDrain();
+            }
+            return true;
+        }
     };
+
+    std::atomic<MainThreadDispatcher*> MainThreadDispatcher::theInstance{nullptr};
+    std::atomic<int64_t> MainThreadDispatcher::budgetNs{20000000};
 };
 
 InputPortInterface::InputPortInterface(bool dynamic, const QString &name, BaseFilterEnvironment *env, int queueSizeSamples, double queueSizeSeconds) :
     Port(dynamic, name, env),
-    d(new InputPortD{queueSizeSamples, queueSizeSeconds, false})
+    d(new InputPortD{queueSizeSamples, queueSizeSeconds, false, false, SampleQueue(queueSizeSamples)})
 {
     d->srvprof = Services::getService("Profiling");
+    if( d->srvprof.data() )
+    {
+        /* the property is evaluated once, afterwards the flag is updated by the change notifications */
+        d->profilingEnabled.store(d->srvprof->property("portProfilingEnabled").toBool());
+        QObject::connect(d->srvprof.data(), SIGNAL(portProfilingEnabledChanged(bool)),
+                         this, SLOT(setPortProfilingEnabled(bool)), Qt::DirectConnection);
+    }
     d->profname = QString();
     setQueueSize(queueSizeSamples, queueSizeSeconds);
 }
@@ -53,9 +465,16 @@ InputPortInterface::~InputPortInterface()
 
 SharedDataSamplePtr InputPortInterface::getData(int delaySamples, double delaySeconds) const
 {
+    const SampleQueue *queue = &d->queue;
     if( QThread::currentThread() != thread() )
     {
-        throw std::runtime_error("InputPort.getData has been called from an unexpected thread.");
+        WorkerTask *task = WorkerTask::current();
+        if( !task || !task->inputs.contains(this) )
+        {
+            throw std::runtime_error("InputPort.getData has been called from an unexpected thread.");
+        }
+        /* called by a worker thread of a stateless filter, use the snapshot taken at dispatch time */
+        queue = task->inputs[this].data();
     }
     if( delaySamples >= 0 && delaySeconds >= 0. )
     {
@@ -63,28 +482,30 @@ SharedDataSamplePtr InputPortInterface::getData(int delaySamples, double delaySe
     }
     if( delaySamples >= 0 )
     {
-        if( delaySamples >= d->queue.size() )
+        if( delaySamples >= queue->size() )
         {
             throw std::out_of_range("delaySamples is out of range.");
         }
-        return d->queue[delaySamples];
+        return queue->at(size_t(delaySamples));
     }
     if( delaySeconds >= 0. )
     {
         double delayTime = delaySeconds / (double)DataSample::TIMESTAMP_RES;
-        int i;
-        for(i = 0; (i < d->queue.size()) && (double(d->queue[0]->getTimestamp() - d->queue[i]->getTimestamp()) < delayTime); i++)
-        {
-        }
-        if( i >= d->queue.size() )
+        size_t i = queue->indexOfDelay(delayTime);
+        if( i >= size_t(queue->size()) )
         {
             throw std::out_of_range("delaySeconds is out of range.");
         }
-        return d->queue[i];
+        return queue->at(i);
     }
     throw std::runtime_error("Both delaySamples and delaySeconds are negative");
 } 
 
+QSharedPointer<const SampleQueue> InputPortInterface::snapshotQueue() const
+{
+    return QSharedPointer<const SampleQueue>(new SampleQueue(d->queue));
+}
+
 void InputPortInterface::setQueueSize(int queueSizeSamples, double queueSizeSeconds)
 {
     if(queueSizeSamples <= 0 && queueSizeSeconds <= 0.0)
@@ -95,6 +516,7 @@ void InputPortInterface::setQueueSize(int queueSizeSamples, double queueSizeSeco
     }
     d->queueSizeSamples = queueSizeSamples;
     d->queueSizeSeconds = queueSizeSeconds;
+    d->queue.setMaxSamples(queueSizeSamples);
 }
 
 int InputPortInterface::queueSizeSamples()
@@ -107,6 +529,25 @@ double InputPortInterface::queueSizeSeconds()
     return d->queueSizeSeconds;
 }
 
+void InputPortInterface::setQueueSizeBytes(int64_t queueSizeBytes)
+{
+    d->queueSizeBytes = queueSizeBytes > 0 ? queueSizeBytes : -1;
+    if( d->queueSizeBytes > 0 )
+    {
+        d->queue.evictBytes(d->queueSizeBytes);
+    }
+}
+
+int64_t InputPortInterface::queueSizeBytes()
+{
+    return d->queueSizeBytes;
+}
+
+int64_t InputPortInterface::queuedBytes()
+{
+    return d->queue.contentBytes();
+}
+
 void InputPortInterface::setInterthreadDynamicQueue(bool enabled)
 {
     if(enabled != d->interthreadDynamicQueue)
@@ -131,9 +572,75 @@ bool InputPortInterface::interthreadDynamicQueue()
     return d->interthreadDynamicQueue;
 }
 
+void InputPortInterface::setInterthreadBatchNotification(bool enabled)
+{
+    if(enabled != d->interthreadBatchNotification)
+    {
+        switch(environment()->state())
+        {
+        case FilterState::CONSTRUCTING:
+        case FilterState::CONSTRUCTED:
+        case FilterState::INITIALIZING:
+        case FilterState::INITIALIZED:
+            d->interthreadBatchNotification = enabled;
+            break;
+        default:
+            NEXXT_LOG_ERROR(QString("Cannot change the interthreadBatchNotification setting in state %1.").arg(
+                             FilterState::state2str(environment()->state())));
+        }
+    }
+}
+
+bool InputPortInterface::interthreadBatchNotification()
+{
+    return d->interthreadBatchNotification;
+}
+
+void InputPortInterface::setMaxSampleAge(double seconds, const QString &reference)
+{
+    if( reference != "timestamp" && reference != "arrival" )
+    {
+        throw std::runtime_error(QString("Unknown sample age reference '%1'.").arg(reference).toStdString());
+    }
+    d->maxSampleAgeUs = seconds > 0.0 ? int64_t(seconds / DataSample::TIMESTAMP_RES) : -1;
+    d->maxSampleAgeArrival = reference == "arrival";
+}
+
+double InputPortInterface::maxSampleAge()
+{
+    return d->maxSampleAgeUs >= 0 ? double(d->maxSampleAgeUs) * DataSample::TIMESTAMP_RES : -1.0;
+}
+
+QString InputPortInterface::maxSampleAgeReference()
+{
+    return d->maxSampleAgeArrival ? "arrival" : "timestamp";
+}
+
+int64_t InputPortInterface::staleSamples()
+{
+    return d->staleSamples.load(std::memory_order_relaxed);
+}
+
+bool InputPortInterface::isStale(const SharedDataSamplePtr &sample)
+{
+    if( d->maxSampleAgeUs < 0 )
+    {
+        return false;
+    }
+    int64_t ref = d->maxSampleAgeArrival ? sample->transmitTime() : sample->getTimestamp();
+    if( ref < 0 || DataSample::currentTime() - ref <= d->maxSampleAgeUs )
+    {
+        return false;
+    }
+    d->staleSamples.fetch_add(1, std::memory_order_relaxed);
+    return true;
+}
+
 SharedPortPtr InputPortInterface::clone(BaseFilterEnvironment*env) const
 {
-    return SharedPortPtr(new InputPortInterface(dynamic(), name(), env, d->queueSizeSamples, d->queueSizeSeconds));
+    InputPortInterface *res = new InputPortInterface(dynamic(), name(), env, d->queueSizeSamples, d->queueSizeSeconds);
+    res->setQueueSizeBytes(d->queueSizeBytes);
+    return SharedPortPtr(res);
 }
 
 void InputPortInterface::addToQueue(const SharedDataSamplePtr &sample)
@@ -142,48 +649,105 @@ void InputPortInterface::addToQueue(const SharedDataSamplePtr &sample)
     {
         throw std::runtime_error("InputPort.getData has been called from an unexpected thread.");
     }
-    d->queue.prepend(sample);
-    if(d->queueSizeSamples > 0)
+    /* the queue size in samples is enforced by the ring buffer itself */
+    d->queue.push(sample);
+    if(d->queueSizeSeconds > 0)
     {
-        while(d->queue.size() > d->queueSizeSamples)
-        {
-            d->queue.removeLast();
-        }
+        d->queue.evictOlderThan(d->queueSizeSeconds / (double)DataSample::TIMESTAMP_RES);
     }
-    if(d->queueSizeSeconds > 0)
+    if(d->queueSizeBytes > 0)
     {
-        double queueSizeTime = d->queueSizeSeconds / (double)DataSample::TIMESTAMP_RES;
-        while( d->queue.size() > 0 && (double(d->queue.first()->getTimestamp() - d->queue.last()->getTimestamp()) > queueSizeTime) )
-        {
-            d->queue.removeLast();
-        }
+        d->queue.evictBytes(d->queueSizeBytes);
     }
 }
 
-void InputPortInterface::transmit()
+void InputPortInterface::transmit(const SharedDataSamplePtr &sample, qint64 enqueueNs)
 {
-    if(d->srvprof.data())
+    /* the profiling calls are skipped entirely while port profiling is disabled */
+    bool profiled = d->profilingEnabled.load(std::memory_order_relaxed) && d->srvprof.data();
+    if(profiled)
     {
         if( d->profname.isNull())
         {
             d->profname = environment()->getFullQualifiedName() + "/" + name();
         }
+        /* the queue wait is measured from the time the sample has been passed to the connection of this port,
+           samples of direct connections are not queued */
+        qint64 queueWaitNs = (enqueueNs >= 0) ? nowNs() - enqueueNs : 0;
         QMetaObject::invokeMethod(d->srvprof.data(), "beforePortDataChanged", Qt::DirectConnection,
-                                  Q_ARG(QString, d->profname));
+                                  Q_ARG(QString, d->profname), Q_ARG(qint64, queueWaitNs));
     }
-    environment()->portDataChanged(*this);
-    if(d->srvprof.data())
+    if( LatencyTracer::enabled() )
+    {
+        if( d->traceName.isNull() )
+        {
+            d->traceName = environment()->getFullQualifiedName() + "." + name();
+        }
+        /* the trace context is removed also in case of exceptions */
+        struct ExitGuard
+        {
+            ~ExitGuard() { LatencyTracer::exitPort(); }
+        };
+        LatencyTracer::enterPort(*sample, d->traceName);
+        ExitGuard guard;
+        environment()->portDataChanged(*this);
+    } else
+    {
+        environment()->portDataChanged(*this);
+    }
+    if(profiled)
     {
         QMetaObject::invokeMethod(d->srvprof.data(), "afterPortDataChanged", Qt::DirectConnection,
                                   Q_ARG(QString, d->profname));
     }
 }
 
+void InputPortInterface::setPortProfilingEnabled(bool enabled)
+{
+    d->profilingEnabled.store(enabled, std::memory_order_relaxed);
+}
+
 void InputPortInterface::receiveAsync(const QSharedPointer<const DataSample> &sample, QSemaphore *semaphore, bool isPending)
 {
-    /* pending receives from the main thread are stored here to be processed later */
-    typedef std::tuple<InputPortInterface*, QSharedPointer<const DataSample>, QSemaphore *> RcvArgs;
-    static std::vector<RcvArgs> pendingReceives;
+    receiveAsyncSamples(&sample, nullptr, 1, semaphore, isPending);
+}
+
+void InputPortInterface::receiveAsyncEnqueued(const QSharedPointer<const DataSample> &sample, QSemaphore *semaphore, qint64 enqueueNs)
+{
+    receiveAsyncSamples(&sample, &enqueueNs, 1, semaphore, false);
+}
+
+void InputPortInterface::receiveAsyncBatch(InterThreadConnection *itc, QSemaphore *semaphore)
+{
+    QList<qint64> enqueueNs;
+    QList<SharedDataSamplePtr> samples = itc->takePending(enqueueNs);
+    receiveAsyncSamples(samples.constData(), enqueueNs.constData(), samples.size(), semaphore, false,
+                        (itc->priority() == "high") ? itc : nullptr, itc->autoWidth() ? itc : nullptr);
+}
+
+bool InputPortInterface::event(QEvent *e)
+{
+    if( e->type() == InterThreadWakeupEvent::registeredType() )
+    {
+        InterThreadConnection *itc = static_cast<InterThreadWakeupEvent*>(e)->connection();
+        if( !itc )
+        {
+            /* the connection has been destroyed after posting the event */
+            return true;
+        }
+        qint64 t0 = nowNs();
+        receiveAsyncBatch(itc, itc->semaphore());
+        itc->priorityDeliveryFinished(t0, nowNs());
+        return true;
+    }
+    return Port::event(e);
+}
+
+void InputPortInterface::receiveAsyncSamples(const SharedDataSamplePtr *samples, const qint64 *enqueueNs, int numSamples,
+                                             QSemaphore *semaphore, bool isPending, InterThreadConnection *priorityConnection,
+                                             InterThreadConnection *serviceConnection)
+{
+    MainThreadDispatcher *dispatcher = nullptr;
     try
     {
         if( QThread::currentThread() != thread() )
@@ -192,92 +756,141 @@ void InputPortInterface::receiveAsync(const QSharedPointer<const DataSample> &sa
         }
         if( (!isPending) && (QThread::currentThread() == QCoreApplication::instance()->thread()) )
         {
-            /* avoid unresponsive main thread 
-            
-            It turned out that the main thread is getting unresponsive at high computational loads.
-            Therefore, we apply processEvents with some extra care here. Note that receiveAsync is
-            always called directly from the QT event loop, so processing events at this place should
-            be safe. However, we have to take care that other receiveAsync events are still in the 
-            correct order, that's why we have the buffering in pendingReceives.
+            /* avoid unresponsive main thread
+
+            Deliveries to the main thread are scheduled by the MainThreadDispatcher, which either delivers the
+            samples directly or queues them to be drained in time-sliced batches (isPending=true).
             */
-            static uint32_t stackDepth = 0;
-            if( stackDepth > 0 )
+            MainThreadDispatcher *instance = MainThreadDispatcher::instance();
+            if( instance->defer(this, samples, enqueueNs, numSamples, semaphore, priorityConnection,
+                                serviceConnection) )
             {
-                /* 
-                This sample was the result of an ongoing processEvents call. Store this sample for later
-                processing to preserve sample order. 
-                
-                note that there is no concurrency problem here because we apply this only in main thread 
-                */
-                pendingReceives.push_back(std::make_tuple(this, sample, semaphore));
                 return;
             }
-            stackDepth++;
-            QCoreApplication::instance()->thread()->setProperty("processEventsRunning", QVariant(true));
-            QCoreApplication::processEvents();
-            QCoreApplication::instance()->thread()->setProperty("processEventsRunning", QVariant(false));
-            stackDepth--;
+            instance->beginDelivery();
+            dispatcher = instance;
         }
-        addToQueue(sample);
-        if( (!d->interthreadDynamicQueue) || (!semaphore) )
+        qint64 startNs = serviceConnection ? nowNs() : 0;
+        int numReceived = numSamples;
+        QList<SharedDataSamplePtr> fresh;
+        QList<qint64> freshEnqueueNs;
+        if( d->maxSampleAgeUs >= 0 )
         {
-            transmit();
-            if(semaphore)
+            for(int i = 0; i < numSamples; i++)
             {
-                semaphore->release(1);
-            }
-        } else
-        {
-            if( d->semaphoreN.find(semaphore) == d->semaphoreN.end() )
-            {
-                d->semaphoreN[semaphore] = 1;
-            }
-            int32_t delta = d->semaphoreN[semaphore] - d->queue.size();
-            if (delta <= 0)
-            {
-                semaphore->release(1-delta);
-                d->semaphoreN[semaphore] += -delta;
-                NEXXT_LOG_INTERNAL(QString("delta = %1: semaphoreN = %2").arg(delta).arg(d->semaphoreN[semaphore]));
-                transmit();
-            } else
-            {
-                /* the first item is already acquired by the calling thread */
-                d->semaphoreN[semaphore]--;
-                for(int32_t i = 1; i < delta; i++)
+                if( isStale(samples[i]) )
                 {
-                    if(semaphore->tryAcquire(1))
+                    /* the stale sample is not added to the queue, but it still occupies a slot of the connection */
+                    if( semaphore )
                     {
-                        d->semaphoreN[semaphore]--;
-                    } else
-                    {
-                        break;
+                        semaphore->release(1);
                     }
+                } else
+                {
+                    fresh.append(samples[i]);
+                    freshEnqueueNs.append(enqueueNs ? enqueueNs[i] : -1);
                 }
-                NEXXT_LOG_INTERNAL(QString("delta = %1: semaphoreN = %2").arg(delta).arg(d->semaphoreN[semaphore]));
-                transmit();
             }
+            samples = fresh.constData();
+            enqueueNs = freshEnqueueNs.constData();
+            numSamples = fresh.size();
+        }
+        for(int i = 0; i < numSamples; i++)
+        {
+            /* in batch notification mode, the filter is notified after the last sample only */
+            bool notify = (!d->interthreadBatchNotification) || (i == numSamples - 1);
+            receiveAsyncSample(samples[i], semaphore, notify, enqueueNs ? enqueueNs[i] : -1);
+        }
+        if( serviceConnection )
+        {
+            serviceConnection->serviceFinished(numReceived, startNs, nowNs());
         }
     } catch(std::exception &e)
     {
         NEXXT_LOG_ERROR(QString("Unhandled exception in port data changed: %1").arg(e.what()));
     }
-    if( QThread::currentThread() == QCoreApplication::instance()->thread() )
-    {
-        /* 
-        process pending samples resulting from previous processEvents call 
-        again, thread safety is not an issue here, because this is done only in the
-        main thread.
-        */
-        std::vector<RcvArgs> pendingCopy = pendingReceives;
-        pendingReceives.clear();
-        for(auto c: pendingCopy)
-        {
-            InputPortInterface *pInstance;
-            QSharedPointer<const DataSample> pSample;
-            QSemaphore *pSemaphore;
-            std::tie(pInstance, pSample, pSemaphore) = c;
-            /* do not call processEvents again to save some performance (last argument is true) */
-            pInstance->receiveAsync(pSample, pSemaphore, true);
+    if( dispatcher )
+    {
+        dispatcher->endDelivery();
+    }
+}
+
+void InputPortInterface::setMainThreadBudget(double seconds)
+{
+    MainThreadDispatcher::budgetNs.store(int64_t(seconds*1e9));
+}
+
+double InputPortInterface::mainThreadBudget()
+{
+    return double(MainThreadDispatcher::budgetNs.load())*1e-9;
+}
+
+QVariantMap InputPortInterface::mainThreadBacklog()
+{
+    MainThreadDispatcher *dispatcher = MainThreadDispatcher::instance(false);
+    if( !dispatcher )
+    {
+        QVariantMap res;
+        res["samples"] = QVariant::fromValue<qint64>(0);
+        res["lag"] = 0.0;
+        return res;
+    }
+    return dispatcher->backlog();
+}
+
+void InputPortInterface::purgeMainThreadQueue(const InputPortInterface *port, const QSemaphore *semaphore)
+{
+    MainThreadDispatcher *dispatcher = MainThreadDispatcher::instance(false);
+    if( dispatcher && port )
+    {
+        dispatcher->purge(port, semaphore);
+    }
+}
+
+void InputPortInterface::receiveAsyncSample(const SharedDataSamplePtr &sample, QSemaphore *semaphore, bool notify, qint64 enqueueNs)
+{
+    addToQueue(sample);
+    if( (!d->interthreadDynamicQueue) || (!semaphore) )
+    {
+        if(notify)
+        {
+            transmit(sample, enqueueNs);
+        }
+        if(semaphore)
+        {
+            semaphore->release(1);
+        }
+    } else
+    {
+        if( d->semaphoreN.find(semaphore) == d->semaphoreN.end() )
+        {
+            d->semaphoreN[semaphore] = 1;
+        }
+        int32_t delta = d->semaphoreN[semaphore] - d->queue.size();
+        if (delta <= 0)
+        {
+            semaphore->release(1-delta);
+            d->semaphoreN[semaphore] += -delta;
+            NEXXT_LOG_INTERNAL(QString("delta = %1: semaphoreN = %2").arg(delta).arg(d->semaphoreN[semaphore]));
+        } else
+        {
+            /* the first item is already acquired by the calling thread */
+            d->semaphoreN[semaphore]--;
+            for(int32_t i = 1; i < delta; i++)
+            {
+                if(semaphore->tryAcquire(1))
+                {
+                    d->semaphoreN[semaphore]--;
+                } else
+                {
+                    break;
+                }
+            }
+            NEXXT_LOG_INTERNAL(QString("delta = %1: semaphoreN = %2").arg(delta).arg(d->semaphoreN[semaphore]));
+        }
+        if(notify)
+        {
+            transmit(sample, enqueueNs);
         }
     }
 }
@@ -290,8 +903,12 @@ void InputPortInterface::receiveSync (const QSharedPointer<const DataSample> &sa
         {
             throw std::runtime_error("InputPort.getData has been called from an unexpected thread.");
         }
+        if( isStale(sample) )
+        {
+            return;
+        }
         addToQueue(sample);
-        transmit();
+        transmit(sample, -1);
     } catch(std::exception &e)
     {
         NEXXT_LOG_ERROR(QString("Unhandled exception in port data changed: %1").arg(e.what()));
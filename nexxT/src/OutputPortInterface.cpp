@@ -12,6 +12,7 @@
 #include "nexxT/Filters.hpp"
 #include "nexxT/Logger.hpp"
 #include "nexxT/Services.hpp"
+#include "WorkerTask.hpp"
 #include <atomic>
 
 #include <QtCore/QThread>
@@ -20,23 +21,93 @@
 
 using namespace nexxT;
 
+namespace nexxT
+{
+    struct OutputPortD
+    {
+        std::atomic<qint64> samples;
+        std::atomic<qint64> bytes;
+        bool memoryGoverned;
+        QString traceName;
+        OutputPortD() : samples(0), bytes(0), memoryGoverned(false) {}
+    };
+};
+
 OutputPortInterface::OutputPortInterface(bool dynamic, const QString &name, BaseFilterEnvironment *env) :
-    Port(dynamic, name, env)
+    Port(dynamic, name, env),
+    d(new OutputPortD())
 {
 }
 
+OutputPortInterface::~OutputPortInterface()
+{
+    delete d;
+}
+
 void OutputPortInterface::transmit(const SharedDataSamplePtr &sample)
 {
     if( QThread::currentThread() != thread() )
     {
+        WorkerTask *task = WorkerTask::current();
+        if( task && task->env == environment() )
+        {
+            /* called by a worker thread of a stateless filter, the filter's thread transmits the samples in order */
+            task->outputs.append(qMakePair(this, sample));
+            return;
+        }
         throw std::runtime_error("OutputPort::transmit has been called from unexpected thread.");
     }
+    if( d->memoryGoverned && !MemoryGovernor::admit() )
+    {
+        return;
+    }
+    d->samples.fetch_add(1, std::memory_order_relaxed);
+    d->bytes.fetch_add(sample->getContentSize(), std::memory_order_relaxed);
+    bool first = sample->markTransmitted();
+    if( LatencyTracer::enabled() )
+    {
+        if( d->traceName.isNull() )
+        {
+            d->traceName = environment() ? environment()->getFullQualifiedName() + "." + name() : name();
+        }
+        emit transmitSample(LatencyTracer::transmitted(sample, d->traceName, first));
+        return;
+    }
     emit transmitSample(sample);
 }
 
+void OutputPortInterface::setMemoryGoverned(bool memoryGoverned)
+{
+    d->memoryGoverned = memoryGoverned;
+}
+
+bool OutputPortInterface::memoryGoverned() const
+{
+    return d->memoryGoverned;
+}
+
 SharedPortPtr OutputPortInterface::clone(BaseFilterEnvironment *env) const
 {
-    return SharedPortPtr(new OutputPortInterface(dynamic(), name(), env));
+    OutputPortInterface *res = new OutputPortInterface(dynamic(), name(), env);
+    res->setMemoryGoverned(d->memoryGoverned);
+    return SharedPortPtr(res);
+}
+
+QVariantMap OutputPortInterface::metrics() const
+{
+    QVariantMap res;
+    res["samples"] = d->samples.load();
+    res["bytes"] = d->bytes.load();
+    res["backlog"] = 0;
+    res["blockingTime"] = 0.0;
+    res["dropped"] = 0;
+    res["discarded"] = 0;
+    res["priority"] = "normal";
+    res["promoted"] = 0;
+    res["demoted"] = 0;
+    res["width"] = -1;
+    res["autoWidth"] = false;
+    return res;
 }
 
 void OutputPortInterface::setupDirectConnection(const SharedPortPtr &op, const SharedPortPtr &ip)
@@ -49,13 +120,28 @@ void OutputPortInterface::setupDirectConnection(const SharedPortPtr &op, const S
 
 QObject *OutputPortInterface::setupInterThreadConnection(const SharedPortPtr &op, const SharedPortPtr &ip, QThread &outputThread, int width)
 {
-    InterThreadConnection *itc = new InterThreadConnection(&outputThread, width);
     const OutputPortInterface *p0 = dynamic_cast<const OutputPortInterface *>(op.data());
-    const InputPortInterface *p1 = dynamic_cast<const InputPortInterface *>(ip.data());
+    InputPortInterface *p1 = dynamic_cast<InputPortInterface *>(ip.data());
+    InterThreadConnection *itc = new InterThreadConnection(&outputThread, width, p1);
     QObject::connect(p0, SIGNAL(transmitSample(const QSharedPointer<const nexxT::DataSample>&)),
                      itc, SLOT(receiveSample(const QSharedPointer<const nexxT::DataSample>&)));
-    QObject::connect(itc, SIGNAL(transmitInterThread(const QSharedPointer<const nexxT::DataSample> &, QSemaphore *)),
-                     p1, SLOT(receiveAsync(const QSharedPointer<const nexxT::DataSample> &, QSemaphore *)));
+    QObject::connect(itc, SIGNAL(transmitInterThread(const QSharedPointer<const nexxT::DataSample> &, QSemaphore *, qint64)),
+                     itc->receiver(), SLOT(receiveAsync(const QSharedPointer<const nexxT::DataSample> &, QSemaphore *, qint64)));
+    QObject::connect(itc, SIGNAL(transmitInterThreadBatch(nexxT::InterThreadConnection *, QSemaphore *)),
+                     itc->receiver(), SLOT(receiveAsyncBatch(nexxT::InterThreadConnection *, QSemaphore *)));
     return itc;
 }
 
+QObject *OutputPortInterface::setupInterThreadMulticast(const SharedPortPtr &op, QThread &outputThread, QThread &inputThread)
+{
+    const OutputPortInterface *p0 = dynamic_cast<const OutputPortInterface *>(op.data());
+    InterThreadMulticast *multicast = new InterThreadMulticast(&inputThread);
+    InterThreadConnection *itc = new InterThreadConnection(&outputThread, 0, multicast);
+    QObject::connect(p0, SIGNAL(transmitSample(const QSharedPointer<const nexxT::DataSample>&)),
+                     itc, SLOT(receiveSample(const QSharedPointer<const nexxT::DataSample>&)));
+    QObject::connect(itc, SIGNAL(transmitInterThread(const QSharedPointer<const nexxT::DataSample> &, QSemaphore *, qint64)),
+                     multicast, SLOT(receiveAsync(const QSharedPointer<const nexxT::DataSample> &, QSemaphore *, qint64)));
+    QObject::connect(itc, SIGNAL(transmitInterThreadBatch(nexxT::InterThreadConnection *, QSemaphore *)),
+                     multicast, SLOT(receiveAsyncBatch(nexxT::InterThreadConnection *, QSemaphore *)));
+    return itc;
+}
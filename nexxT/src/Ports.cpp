@@ -16,8 +16,13 @@
 #include <atomic>
 
 #include <QtCore/QThread>
+#include <QtCore/QMutex>
+#include <QtCore/QCoreApplication>
 #include <map>
 #include <cstdio>
+#include <cmath>
+#include <algorithm>
+#include <chrono>
 
 using namespace nexxT;
 
@@ -30,12 +35,159 @@ namespace nexxT
         BaseFilterEnvironment *environment;
     };
 
+    /*
+     * Unbounded lock-free single producer / single consumer queue. Consumed nodes are recycled by the producer,
+     * so that in steady state no memory allocations are necessary. See
+     * https://www.1024cores.net/home/lock-free-algorithms/queues/unbounded-spsc-queue
+     */
+    template<class T> class SpscQueue
+    {
+        struct Node
+        {
+            std::atomic<Node*> next;
+            T value;
+            Node() : next(nullptr) {}
+        };
+        /* consumer side */
+        std::atomic<Node*> tail;
+        /* producer side */
+        Node *head;
+        Node *first;
+        Node *tailCopy;
+
+        Node *allocNode()
+        {
+            if( first != tailCopy )
+            {
+                Node *n = first;
+                first = first->next.load(std::memory_order_relaxed);
+                return n;
+            }
+            tailCopy = tail.load(std::memory_order_acquire);
+            if( first != tailCopy )
+            {
+                Node *n = first;
+                first = first->next.load(std::memory_order_relaxed);
+                return n;
+            }
+            return new Node();
+        }
+    public:
+        SpscQueue()
+        {
+            Node *n = new Node();
+            tail.store(n);
+            head = first = tailCopy = n;
+        }
+
+        ~SpscQueue()
+        {
+            Node *n = first;
+            while( n )
+            {
+                Node *next = n->next.load();
+                delete n;
+                n = next;
+            }
+        }
+
+        /* called from producer thread only */
+        void push(const T &value)
+        {
+            Node *n = allocNode();
+            n->next.store(nullptr, std::memory_order_relaxed);
+            n->value = value;
+            head->next.store(n, std::memory_order_release);
+            head = n;
+        }
+
+        /* called from consumer thread only */
+        bool pop(T &value)
+        {
+            Node *t = tail.load(std::memory_order_relaxed);
+            Node *n = t->next.load(std::memory_order_acquire);
+            if( !n )
+            {
+                return false;
+            }
+            value = n->value;
+            /* don't keep a reference in the recycled node */
+            n->value = T();
+            tail.store(n, std::memory_order_release);
+            return true;
+        }
+    };
+
+    enum class Transport
+    {
+        Qt,
+        Spsc
+    };
+
+    enum class OverflowPolicy
+    {
+        Block,
+        DropNewest,
+        KeepLatest,
+        Timeout
+    };
+
     struct InterThreadConnectionD
     {
-        int width;
+        /* the width is changed by the producer thread in automatic width mode */
+        std::atomic<int> width;
         QSemaphore semaphore;
         std::atomic_bool stopped;
-        InterThreadConnectionD(int width) : width(width), semaphore(width), stopped(true) {}
+        std::atomic_bool batched;
+        QMutex pendingMutex;
+        QList<SharedDataSamplePtr> pending;
+        /* the times when the pending samples have been passed to the connection */
+        QList<qint64> pendingEnqueueNs;
+        bool batchPosted;
+        Transport transport;
+        /* the relay or multicast object owned by this connection */
+        QPointer<QObject> receiver;
+        InterThreadRelay *relay = nullptr;
+        SpscQueue<QPair<SharedDataSamplePtr, qint64> > spscQueue;
+        std::atomic_bool wakeupPending;
+        OverflowPolicy overflow;
+        int overflowTimeoutMs;
+        bool keepLatest;
+        std::atomic<qint64> dropped;
+        std::atomic<qint64> discarded;
+        std::atomic<qint64> samples;
+        std::atomic<qint64> bytes;
+        std::atomic<qint64> blockingNs;
+        InterThreadMulticast *multicast;
+        QList<QSemaphore*> multicastSemaphores;
+        QList<int> multicastWidths;
+        bool highPriority = false;
+        std::atomic<qint64> promoted{0};
+        std::atomic<qint64> demoted{0};
+        /* starvation protection, written by the consumer thread and read by the producer thread; the pair is not
+           updated atomically, which is acceptable for a heuristic */
+        std::atomic<qint64> priorityLastNs{0};
+        std::atomic<double> priorityBusyNs{0.0};
+        /* automatic width, only accessed by the producer thread after the connection has been started */
+        bool autoWidth = false;
+        int minWidth = 1;
+        int maxWidth = 1;
+        double targetLatency = 0.0;
+        bool tuneStarted = false;
+        qint64 tuneStartNs = 0;
+        qint64 tuneStartSamples = 0;
+        qint64 tuneStartBlockingNs = 0;
+        qint64 tuneStartDropped = 0;
+        qint64 tuneStartServed = 0;
+        qint64 tuneStartServiceNs = 0;
+        int peakBacklog = 0;
+        /* service time of the consumer, written by the consumer thread and read by the producer thread */
+        std::atomic<qint64> served{0};
+        std::atomic<qint64> serviceNs{0};
+        InterThreadConnectionD(int width, QObject *receiver) : width(width), semaphore(width), stopped(true),
+            batched(false), batchPosted(false), transport(Transport::Qt), receiver(receiver), wakeupPending(false),
+            overflow(OverflowPolicy::Block), overflowTimeoutMs(100), keepLatest(false), dropped(0),
+            discarded(0), samples(0), bytes(0), blockingNs(0), multicast(dynamic_cast<InterThreadMulticast*>(receiver)) {}
     };
 
 };
@@ -87,17 +239,39 @@ SharedPortPtr Port::make_shared(Port *port)
     return SharedPortPtr(port);
 }
 
-InterThreadConnection::InterThreadConnection(QThread *from_thread, int width)
-    : d(new InterThreadConnectionD(width))
+InterThreadConnection::InterThreadConnection(QThread *from_thread, int width, QObject *receiver)
+    : d(new InterThreadConnectionD(width, receiver))
 {
     moveToThread(from_thread);
+    InputPortInterface *inputPort = dynamic_cast<InputPortInterface*>(receiver);
+    if( inputPort )
+    {
+        /* deliveries to a single input port are posted to a relay owned by this connection */
+        d->relay = new InterThreadRelay(inputPort);
+        d->receiver = d->relay;
+    }
 }
 
 InterThreadConnection::~InterThreadConnection()
 {
+    /* samples still waiting for the main thread must not refer to the deleted connection; the samples of a
+       multicast are purged by the multicast object */
+    if( d->relay )
+    {
+        InputPortInterface::purgeMainThreadQueue(d->relay->inputPort(), semaphore());
+    }
+    /* the relay and multicast objects receive the deliveries and wakeups of this connection only, they remove the
+       events still pending on destruction */
+    delete d->relay;
+    delete d->multicast;
     delete d;
 }
 
+QObject *InterThreadConnection::receiver() const
+{
+    return d->receiver.data();
+}
+
 void InterThreadConnection::receiveSample(const QSharedPointer<const DataSample> &sample)
 {
     while(true)
@@ -105,14 +279,597 @@ void InterThreadConnection::receiveSample(const QSharedPointer<const DataSample>
         if( d->stopped.load() )
         {
             NEXXT_LOG_WARN("The inter-thread connection is set to stopped mode; data sample discarded.");
+            d->discarded++;
             break;
         }
-        if( (d->width == 0) || (d->semaphore.tryAcquire(1, 500)) )
+        if( d->width == 0 )
         {
-            emit transmitInterThread(sample, (d->width > 0) ? (&d->semaphore) : 0 );
-            break;
+            if( d->multicastSemaphores.empty() || acquireMulticast() )
+            {
+                deliver(sample);
+            }
+        } else if( d->keepLatest )
+        {
+            deliverKeepLatest(sample);
+        } else if( d->overflow == OverflowPolicy::Block )
+        {
+            if( !tryAcquire(&d->semaphore, 500) )
+            {
+                continue;
+            }
+            deliver(sample);
+        } else if( tryAcquire(&d->semaphore, d->overflow == OverflowPolicy::Timeout ? d->overflowTimeoutMs : 0) )
+        {
+            deliver(sample);
+        } else
+        {
+            d->dropped++;
+        }
+        break;
+    }
+    if( d->autoWidth )
+    {
+        tuneWidth();
+    }
+}
+
+/* see nexxT.core.PortImpl.InterThreadConnection.AUTO_WIDTH_INTERVAL */
+static constexpr qint64 AUTO_WIDTH_INTERVAL_NS = 250000000;
+
+void InterThreadConnection::tuneWidth()
+{
+    int backlog;
+    if( d->keepLatest )
+    {
+        QMutexLocker locker(&d->pendingMutex);
+        backlog = d->pending.size();
+    } else
+    {
+        backlog = d->width - d->semaphore.available();
+    }
+    d->peakBacklog = std::max(d->peakBacklog, backlog);
+    qint64 now = std::chrono::duration_cast<std::chrono::nanoseconds>(
+        std::chrono::steady_clock::now().time_since_epoch()).count();
+    if( d->tuneStarted && now - d->tuneStartNs < AUTO_WIDTH_INTERVAL_NS )
+    {
+        return;
+    }
+    if( d->tuneStarted )
+    {
+        int width = d->width;
+        if( d->targetLatency > 0 )
+        {
+            double rate = double(d->samples.load() - d->tuneStartSamples)/(double(now - d->tuneStartNs)*1e-9);
+            qint64 serviceNs = d->serviceNs.load();
+            if( serviceNs > d->tuneStartServiceNs )
+            {
+                /* the consumer can't process more samples within the target latency than its service rate allows */
+                rate = std::min(rate, double(d->served.load() - d->tuneStartServed)/
+                                      (double(serviceNs - d->tuneStartServiceNs)*1e-9));
+            }
+            width = int(std::ceil(rate*d->targetLatency));
+        } else if( d->blockingNs.load() > d->tuneStartBlockingNs || d->dropped.load() > d->tuneStartDropped )
+        {
+            width = 2*d->width;
+        } else if( 2*d->peakBacklog < d->width )
+        {
+            width = d->width - 1;
+        }
+        width = std::min(std::max(width, d->minWidth), d->maxWidth);
+        if( width != d->width )
+        {
+            int oldWidth = d->width;
+            resize(width);
+            if( d->width != oldWidth )
+            {
+                NEXXT_LOG_INFO(QString("Inter-thread connection %1: width %2 -> %3")
+                               .arg(objectName()).arg(oldWidth).arg(d->width.load()));
+            }
+        }
+    }
+    d->tuneStarted = true;
+    d->tuneStartNs = now;
+    d->tuneStartSamples = d->samples.load();
+    d->tuneStartBlockingNs = d->blockingNs.load();
+    d->tuneStartDropped = d->dropped.load();
+    d->tuneStartServed = d->served.load();
+    d->tuneStartServiceNs = d->serviceNs.load();
+    d->peakBacklog = 0;
+}
+
+void InterThreadConnection::resize(int width)
+{
+    /* slots in use can't be removed, so the width might be reduced only partially */
+    if( width > d->width )
+    {
+        d->semaphore.release(width - d->width);
+        d->width = width;
+    }
+    while( d->width > width && d->semaphore.tryAcquire(1) )
+    {
+        d->width--;
+    }
+}
+
+bool InterThreadConnection::tryAcquire(QSemaphore *semaphore, int timeoutMs)
+{
+    /* the blocking time is only measured if the slot is not immediately available */
+    if( semaphore->tryAcquire(1) )
+    {
+        return true;
+    }
+    if( timeoutMs <= 0 )
+    {
+        return false;
+    }
+    auto t0 = std::chrono::steady_clock::now();
+    bool res = semaphore->tryAcquire(1, timeoutMs);
+    d->blockingNs += std::chrono::duration_cast<std::chrono::nanoseconds>(std::chrono::steady_clock::now() - t0).count();
+    return res;
+}
+
+bool InterThreadConnection::acquireMulticast()
+{
+    int numAcquired = 0;
+    for(QSemaphore *semaphore : d->multicastSemaphores)
+    {
+        while( !tryAcquire(semaphore, 500) )
+        {
+            if( d->stopped.load() )
+            {
+                NEXXT_LOG_WARN("The inter-thread connection is set to stopped mode; data sample discarded.");
+                d->discarded++;
+                for(int i = 0; i < numAcquired; i++)
+                {
+                    d->multicastSemaphores[i]->release(1);
+                }
+                return false;
+            }
+        }
+        numAcquired++;
+    }
+    return true;
+}
+
+static qint64 nowNs()
+{
+    return std::chrono::duration_cast<std::chrono::nanoseconds>(
+        std::chrono::steady_clock::now().time_since_epoch()).count();
+}
+
+/* see nexxT.core.PortImpl.InterThreadConnection.PRIORITY_WINDOW and PRIORITY_SHARE */
+static constexpr double PRIORITY_WINDOW_NS = 1e8;
+static constexpr double PRIORITY_SHARE = 0.5;
+
+Qt::EventPriority InterThreadConnection::wakeupPriority()
+{
+    if( !d->highPriority )
+    {
+        return Qt::NormalEventPriority;
+    }
+    double decay = std::exp(-double(nowNs() - d->priorityLastNs.load())/PRIORITY_WINDOW_NS);
+    if( d->priorityBusyNs.load()*decay < PRIORITY_SHARE*PRIORITY_WINDOW_NS )
+    {
+        d->promoted++;
+        return Qt::HighEventPriority;
+    }
+    /* starvation protection: the connection has used up its share of the receiving thread */
+    d->demoted++;
+    return Qt::NormalEventPriority;
+}
+
+void InterThreadConnection::postWakeup()
+{
+    QCoreApplication::postEvent(d->receiver, new InterThreadWakeupEvent(this), wakeupPriority());
+}
+
+void InterThreadConnection::priorityDeliveryFinished(qint64 startNs, qint64 endNs)
+{
+    double decay = std::exp(-double(endNs - d->priorityLastNs.load())/PRIORITY_WINDOW_NS);
+    d->priorityBusyNs.store(d->priorityBusyNs.load()*decay + double(endNs - startNs));
+    d->priorityLastNs.store(endNs);
+}
+
+void InterThreadConnection::serviceFinished(int numSamples, qint64 startNs, qint64 endNs)
+{
+    d->served += numSamples;
+    d->serviceNs += endNs - startNs;
+}
+
+void InterThreadConnection::deliver(const SharedDataSamplePtr &sample)
+{
+    d->samples++;
+    d->bytes += sample->getContentSize();
+    QSemaphore *semaphore = (d->width > 0) ? (&d->semaphore) : 0;
+    /* the enqueue time is the reference of the queue wait measured by the profiling of the receiving port */
+    qint64 enqueueNs = nowNs();
+    if( d->transport == Transport::Spsc )
+    {
+        d->spscQueue.push(qMakePair(sample, enqueueNs));
+        /* only wake up the consumer if there is no wakeup pending */
+        if( !d->wakeupPending.exchange(true) )
+        {
+            postWakeup();
+        }
+    } else if( d->batched.load() || d->highPriority || d->autoWidth )
+    {
+        /* the receiving port reports the processing time of auto width connections, so they use the pending list */
+        bool post;
+        {
+            QMutexLocker locker(&d->pendingMutex);
+            d->pending.append(sample);
+            d->pendingEnqueueNs.append(enqueueNs);
+            post = !d->batchPosted;
+            d->batchPosted = true;
+        }
+        if( post )
+        {
+            if( d->highPriority )
+            {
+                postWakeup();
+            } else
+            {
+                emit transmitInterThreadBatch(this, semaphore);
+            }
+        }
+    } else
+    {
+        emit transmitInterThread(sample, semaphore, enqueueNs);
+    }
+}
+
+void InterThreadConnection::deliverKeepLatest(const SharedDataSamplePtr &sample)
+{
+    d->samples++;
+    d->bytes += sample->getContentSize();
+    bool post;
+    {
+        QMutexLocker locker(&d->pendingMutex);
+        if( d->pending.size() >= d->width )
+        {
+            d->pending.removeFirst();
+            d->pendingEnqueueNs.removeFirst();
+            d->dropped++;
+        }
+        d->pending.append(sample);
+        d->pendingEnqueueNs.append(nowNs());
+        post = !d->batchPosted;
+        d->batchPosted = true;
+    }
+    if( post )
+    {
+        if( d->highPriority )
+        {
+            postWakeup();
+        } else
+        {
+            /* the pending list is limited by the width, the semaphore is not used */
+            emit transmitInterThreadBatch(this, 0);
+        }
+    }
+}
+
+QList<SharedDataSamplePtr> InterThreadConnection::takePending(QList<qint64> &enqueueNs)
+{
+    QList<SharedDataSamplePtr> res;
+    enqueueNs.clear();
+    if( (d->transport == Transport::Spsc) && !d->keepLatest )
+    {
+        /* reset the flag before draining, samples pushed afterwards will cause a new wakeup */
+        d->wakeupPending.store(false);
+        QPair<SharedDataSamplePtr, qint64> item;
+        while( d->spscQueue.pop(item) )
+        {
+            res.append(item.first);
+            enqueueNs.append(item.second);
+        }
+        return res;
+    }
+    QMutexLocker locker(&d->pendingMutex);
+    res.swap(d->pending);
+    enqueueNs.swap(d->pendingEnqueueNs);
+    d->batchPosted = false;
+    return res;
+}
+
+void InterThreadConnection::addMulticastReceiver(const SharedPortPtr &inputPort, int width)
+{
+    if( !d->multicast || !dynamic_cast<InputPortInterface*>(inputPort.data()) )
+    {
+        throw std::runtime_error("addMulticastReceiver called for a non-multicast connection.");
+    }
+    QSemaphore *semaphore = d->multicast->addReceiver(inputPort, width);
+    if( semaphore )
+    {
+        d->multicastSemaphores.append(semaphore);
+        d->multicastWidths.append(width);
+    }
+}
+
+QSemaphore *InterThreadConnection::semaphore()
+{
+    /* in keep-latest mode, the pending list is limited by the width, the semaphore is not used */
+    return (d->width > 0 && !d->keepLatest) ? (&d->semaphore) : 0;
+}
+
+void InterThreadConnection::setBatched(bool batched)
+{
+    d->batched.store(batched);
+}
+
+bool InterThreadConnection::batched() const
+{
+    return d->batched.load();
+}
+
+void InterThreadConnection::setTransport(const QString &transport)
+{
+    if( transport == "qt" )
+    {
+        d->transport = Transport::Qt;
+    } else if( transport == "spsc" )
+    {
+        if( !d->receiver )
+        {
+            throw std::runtime_error("The spsc transport needs a receiver object.");
+        }
+        d->transport = Transport::Spsc;
+    } else
+    {
+        throw std::runtime_error(QString("Unknown inter-thread transport '%1'.").arg(transport).toStdString());
+    }
+}
+
+QString InterThreadConnection::transport() const
+{
+    return d->transport == Transport::Spsc ? "spsc" : "qt";
+}
+
+void InterThreadConnection::setOverflowPolicy(const QString &policy, double timeout)
+{
+    if( policy == "block" )
+    {
+        d->overflow = OverflowPolicy::Block;
+    } else if( policy == "drop-newest" )
+    {
+        d->overflow = OverflowPolicy::DropNewest;
+    } else if( policy == "keep-latest" )
+    {
+        d->overflow = OverflowPolicy::KeepLatest;
+    } else if( policy == "timeout" )
+    {
+        d->overflow = OverflowPolicy::Timeout;
+    } else
+    {
+        throw std::runtime_error(QString("Unknown overflow policy '%1'.").arg(policy).toStdString());
+    }
+    d->overflowTimeoutMs = std::max(0, int(std::lround(timeout*1000)));
+    d->keepLatest = (d->overflow == OverflowPolicy::KeepLatest) && (d->width > 0);
+}
+
+QString InterThreadConnection::overflowPolicy() const
+{
+    switch(d->overflow)
+    {
+    case OverflowPolicy::DropNewest: return "drop-newest";
+    case OverflowPolicy::KeepLatest: return "keep-latest";
+    case OverflowPolicy::Timeout: return "timeout";
+    default: return "block";
+    }
+}
+
+void InterThreadConnection::setPriority(const QString &priority)
+{
+    if( priority != "normal" && priority != "high" )
+    {
+        throw std::runtime_error(QString("Unknown connection priority '%1'.").arg(priority).toStdString());
+    }
+    if( priority == "high" && !d->receiver )
+    {
+        throw std::runtime_error("The high priority needs a receiver object.");
+    }
+    d->highPriority = priority == "high";
+}
+
+QString InterThreadConnection::priority() const
+{
+    return d->highPriority ? "high" : "normal";
+}
+
+void InterThreadConnection::setAutoWidth(int minWidth, int maxWidth, double targetLatency)
+{
+    if( d->width == 0 )
+    {
+        throw std::runtime_error("The automatic width needs a width-limited connection.");
+    }
+    if( minWidth < 1 || maxWidth < minWidth )
+    {
+        throw std::runtime_error(QString("Invalid bounds of the automatic width: [%1, %2].")
+                                 .arg(minWidth).arg(maxWidth).toStdString());
+    }
+    d->autoWidth = true;
+    d->minWidth = minWidth;
+    d->maxWidth = maxWidth;
+    d->targetLatency = std::max(0.0, targetLatency);
+    d->tuneStarted = false;
+    resize(std::min(std::max(int(d->width), minWidth), maxWidth));
+}
+
+bool InterThreadConnection::autoWidth() const
+{
+    return d->autoWidth;
+}
+
+int InterThreadConnection::width() const
+{
+    return d->width;
+}
+
+qint64 InterThreadConnection::droppedSamples() const
+{
+    return d->dropped.load();
+}
+
+QVariantMap InterThreadConnection::metrics() const
+{
+    int backlog = -1;
+    if( d->keepLatest || ((d->width == 0) && d->multicastSemaphores.empty() &&
+                          (d->batched.load() || d->highPriority) && (d->transport == Transport::Qt)) )
+    {
+        QMutexLocker locker(&d->pendingMutex);
+        backlog = d->pending.size();
+    } else if( d->width > 0 )
+    {
+        backlog = std::max(0, d->width - d->semaphore.available());
+    } else if( !d->multicastSemaphores.empty() )
+    {
+        for(int i = 0; i < d->multicastSemaphores.size(); i++)
+        {
+            backlog = std::max(backlog, d->multicastWidths[i] - d->multicastSemaphores[i]->available());
+        }
+    }
+    QVariantMap res;
+    res["samples"] = d->samples.load();
+    res["bytes"] = d->bytes.load();
+    res["backlog"] = backlog;
+    res["blockingTime"] = double(d->blockingNs.load())*1e-9;
+    res["dropped"] = d->dropped.load();
+    res["discarded"] = d->discarded.load();
+    res["priority"] = priority();
+    res["promoted"] = d->promoted.load();
+    res["demoted"] = d->demoted.load();
+    int width = d->width;
+    for(int w : d->multicastWidths)
+    {
+        width = std::max(width, w);
+    }
+    res["width"] = width;
+    res["autoWidth"] = d->autoWidth;
+    return res;
+}
+
+InterThreadWakeupEvent::InterThreadWakeupEvent(InterThreadConnection *itc)
+    : QEvent(registeredType()), itc(itc)
+{
+}
+
+InterThreadConnection *InterThreadWakeupEvent::connection() const
+{
+    return itc.data();
+}
+
+QEvent::Type InterThreadWakeupEvent::registeredType()
+{
+    static QEvent::Type type = QEvent::Type(QEvent::registerEventType());
+    return type;
+}
+
+InterThreadRelay::InterThreadRelay(InputPortInterface *inputPort)
+    : port(inputPort)
+{
+    moveToThread(inputPort->thread());
+}
+
+InterThreadRelay::~InterThreadRelay()
+{
+    /* pending deliveries and wakeups refer to the connection and its semaphore */
+    QCoreApplication::removePostedEvents(this);
+}
+
+InputPortInterface *InterThreadRelay::inputPort() const
+{
+    return port.data();
+}
+
+void InterThreadRelay::receiveAsync(const QSharedPointer<const DataSample> &sample, QSemaphore *semaphore, qint64 enqueueNs)
+{
+    if( port )
+    {
+        port->receiveAsyncEnqueued(sample, semaphore, enqueueNs);
+    }
+}
+
+void InterThreadRelay::receiveAsyncBatch(InterThreadConnection *itc, QSemaphore *semaphore)
+{
+    if( port )
+    {
+        port->receiveAsyncBatch(itc, semaphore);
+    }
+}
+
+bool InterThreadRelay::event(QEvent *e)
+{
+    if( e->type() == InterThreadWakeupEvent::registeredType() )
+    {
+        if( port )
+        {
+            QCoreApplication::sendEvent(port.data(), e);
+        }
+        return true;
+    }
+    return QObject::event(e);
+}
+
+InterThreadMulticast::InterThreadMulticast(QThread *qthread_to)
+{
+    moveToThread(qthread_to);
+}
+
+InterThreadMulticast::~InterThreadMulticast()
+{
+    /* pending wakeups and queued deliveries refer to the semaphores deleted below */
+    QCoreApplication::removePostedEvents(this);
+    for(auto &r : receivers)
+    {
+        InputPortInterface::purgeMainThreadQueue(static_cast<InputPortInterface*>(r.first.data()), r.second);
+        delete r.second;
+    }
+}
+
+QSemaphore *InterThreadMulticast::addReceiver(const SharedPortPtr &inputPort, int width)
+{
+    QSemaphore *semaphore = (width > 0) ? new QSemaphore(width) : 0;
+    receivers.append(qMakePair(inputPort, semaphore));
+    return semaphore;
+}
+
+void InterThreadMulticast::receiveAsync(const QSharedPointer<const DataSample> &sample, QSemaphore *, qint64 enqueueNs)
+{
+    for(auto &r : receivers)
+    {
+        static_cast<InputPortInterface*>(r.first.data())->receiveAsyncEnqueued(sample, r.second, enqueueNs);
+    }
+}
+
+void InterThreadMulticast::receiveAsyncBatch(InterThreadConnection *itc, QSemaphore *)
+{
+    QList<qint64> enqueueNs;
+    QList<SharedDataSamplePtr> samples = itc->takePending(enqueueNs);
+    InterThreadConnection *priorityConnection = (itc->priority() == "high") ? itc : nullptr;
+    for(auto &r : receivers)
+    {
+        static_cast<InputPortInterface*>(r.first.data())->receiveAsyncSamples(samples.constData(), enqueueNs.constData(),
+                                                                              samples.size(), r.second, false,
+                                                                              priorityConnection);
+    }
+}
+
+bool InterThreadMulticast::event(QEvent *e)
+{
+    if( e->type() == InterThreadWakeupEvent::registeredType() )
+    {
+        InterThreadConnection *itc = static_cast<InterThreadWakeupEvent*>(e)->connection();
+        if( !itc )
+        {
+            /* the connection has been destroyed after posting the event */
+            return true;
         }
+        qint64 t0 = nowNs();
+        receiveAsyncBatch(itc, 0);
+        itc->priorityDeliveryFinished(t0, nowNs());
+        return true;
     }
+    return QObject::event(e);
 }
 
 void InterThreadConnection::setStopped(bool stopped)
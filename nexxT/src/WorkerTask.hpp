@@ -0,0 +1,48 @@
+/*
+ * SPDX-License-Identifier: Apache-2.0
+ * Copyright (C) 2020 ifm electronic gmbh
+ *
+ * THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+ */
+
+#ifndef NEXXT_WORKER_TASK_HPP
+#define NEXXT_WORKER_TASK_HPP
+
+#include <QtCore/QHash>
+#include <QtCore/QList>
+#include <QtCore/QPair>
+#include <QtCore/QSharedPointer>
+#include <memory>
+#include "nexxT/SharedPointerTypes.hpp"
+
+namespace nexxT
+{
+    class BaseFilterEnvironment;
+    class InputPortInterface;
+    class OutputPortInterface;
+    class SampleQueue;
+    struct TraceContext;
+
+    /*
+     * Context of an onPortDataChanged(...) call executed by a worker thread of a stateless filter. The input ports
+     * of the filter read from a snapshot of their queues taken at dispatch time and the output ports collect the
+     * transmitted samples, which are transmitted in input order by the filter's thread afterwards.
+     *
+     * This header is internal to the nexxT library.
+     */
+    struct WorkerTask
+    {
+        int64_t seq;
+        BaseFilterEnvironment *env;
+        const InputPortInterface *port;
+        QHash<const InputPortInterface*, QSharedPointer<const SampleQueue> > inputs;
+        QList<QPair<OutputPortInterface*, SharedDataSamplePtr> > outputs;
+        /* the trace context of the LatencyTracer at dispatch time, inherited by the outputs */
+        std::shared_ptr<const TraceContext> trace;
+
+        /* the task executed by the calling thread or nullptr */
+        static WorkerTask *&current();
+    };
+};
+
+#endif
@@ -35,6 +35,12 @@ def simple_setup(multithread, sourceFreq, sinkTime, activeTime_s, dynamicFilter)
                 def propertyCollection(self):
                     return self.pc
 
+                def threadSettings(self, threadName):
+                    return {}
+
+                def memoryGovernorSettings(self):
+                    return {}
+
             def __init__(self):
                 self.dummyConfig = DummySubConfig.DummyConfig()
                 self.pc = PropertyCollectionImpl("root", None)
@@ -4,6 +4,7 @@
 # THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
 #
 
+import gc
 import json
 import logging
 from pathlib import Path
@@ -91,6 +92,70 @@ def simple_setup(activeTime_s):
         del t
         del t2
 
+def test_connectionProperties():
+    test_json = Path(__file__).parent / "test1.json"
+    config = Configuration()
+    ConfigFileLoader.load(config, test_json)
+    graph = config.applicationByName("testApp").getGraph()
+    conn = graph.allConnections()[0]
+    assert graph.getConnectionProperties(*conn) == graph.getDefaultConnectionProperties()
+    props = graph.getDefaultConnectionProperties()
+    props.update(width=3, batched=True, transport="spsc", overflow="timeout", overflowTimeout=0.5, maxAge=0.25,
+                 priority="high", autoWidth=True, maxWidth=8, targetLatency=0.1)
+    graph.setConnectionProperties(*conn, props)
+    cfg = config.save()
+    del cfg["CFGFILE"]
+    validator, _ = ConfigFileLoader._getValidator()
+    validator.validate(cfg)
+    cfg["CFGFILE"] = str(test_json)
+    config2 = Configuration()
+    config2.load(cfg)
+    graph2 = config2.applicationByName("testApp").getGraph()
+    assert graph2.getConnectionProperties(*conn) == props
+    for c in graph2.allConnections():
+        if c != conn:
+            assert graph2.getConnectionProperties(*c) == graph2.getDefaultConnectionProperties()
+    config.close(avoidSave=True)
+    config2.close(avoidSave=True)
+
+def test_workerThreads():
+    test_json = Path(__file__).parent / "test1.json"
+    config = Configuration()
+    ConfigFileLoader.load(config, test_json)
+    graph = config.applicationByName("testApp").getGraph()
+    node = graph.allNodes()[0]
+    pc = graph.getMockup(node).propertyCollection().getChildCollection("_nexxT")
+    assert pc.getProperty("workerThreads") == 0
+    assert pc.getProperty("workerProcesses") == 0
+    pc.setProperty("workerThreads", 4)
+    pc.setProperty("workerProcesses", 2)
+    pc.setProperty("memoryGoverned", True)
+    assert config.threadSettings("thread-2") == {}
+    config.setThreadSettings("thread-2", dict(affinity=[0, 1], priority="high", osName="worker"))
+    assert config.memoryGovernorSettings() == {}
+    config.setMemoryGovernorSettings(dict(highWaterMark=512*1024*1024, policy="drop"))
+    cfg = config.save()
+    del cfg["CFGFILE"]
+    validator, _ = ConfigFileLoader._getValidator()
+    validator.validate(cfg)
+    cfg["CFGFILE"] = str(test_json)
+    config2 = Configuration()
+    config2.load(cfg)
+    graph2 = config2.applicationByName("testApp").getGraph()
+    for n in graph2.allNodes():
+        pc2 = graph2.getMockup(n).propertyCollection().getChildCollection("_nexxT")
+        assert pc2.getProperty("workerThreads") == (4 if n == node else 0)
+        assert pc2.getProperty("workerProcesses") == (2 if n == node else 0)
+        assert pc2.getProperty("memoryGoverned") == (n == node)
+    assert config2.threadSettings("thread-2") == dict(affinity=[0, 1], priority="high", osName="worker")
+    assert config2.memoryGovernorSettings() == dict(highWaterMark=512*1024*1024, policy="drop")
+    assert config2.threadSettings("main") == {}
+    config.close(avoidSave=True)
+    config2.close(avoidSave=True)
+    # make sure that the property collections are not garbage collected in another thread
+    del pc, pc2, graph, graph2, config, config2
+    gc.collect()
+
 def test_smoke():
     simple_setup(2)
     simple_setup(4)
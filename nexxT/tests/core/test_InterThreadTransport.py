@@ -0,0 +1,507 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+from nexxT.core.ActiveApplication import ActiveApplication
+from nexxT.core.Graph import FilterGraph
+from nexxT.core.PropertyCollectionImpl import PropertyCollectionImpl
+from nexxT.core.PortConnections import MainThreadDispatcher, InterThreadConnection, InterThreadMulticast
+from nexxT.interface import FilterState, DataSample, InputPortInterface
+import os
+import time
+import nexxT.Qt
+from nexxT.Qt.QtCore import QCoreApplication, QTimer, QSemaphore, QThread
+
+def setup():
+    global app
+    app = QCoreApplication.instance()
+    if app is None:
+        app = QCoreApplication()
+
+class DummySubConfig(object):
+    class DummyConfig:
+        def __init__(self):
+            self.pc = PropertyCollectionImpl("root", None)
+            self.threads = {}
+            self.memoryGovernor = {}
+
+        def propertyCollection(self):
+            return self.pc
+
+        def threadSettings(self, threadName):
+            return dict(self.threads.get(threadName, {}))
+
+        def memoryGovernorSettings(self):
+            return dict(self.memoryGovernor)
+
+    def __init__(self):
+        self.dummyConfig = DummySubConfig.DummyConfig()
+        self.pc = PropertyCollectionImpl("root", None)
+
+    def getConfiguration(self):
+        return self.dummyConfig
+
+    def getPropertyCollection(self):
+        return self.pc
+
+    def getName(self):
+        return "dummy_subconfig"
+
+def transport_setup(connProps, numSamples, period_s=0.0, batchNotification=False, timeout_s=20, consumerDelay_s=0.0,
+                    portMaxAge=None):
+    """
+    Transmits numSamples samples from thread-2 to the main thread and returns the transmit and receive events, the
+    number of notifications, the number of dropped samples and the connection metrics. If period_s is 0, the samples
+    are transmitted in a single burst, otherwise with the given period. The consumer sleeps consumerDelay_s per
+    notification; portMaxAge is an optional (seconds, reference) tuple set as the max. sample age of the input port.
+    """
+    t = QTimer()
+    t.setSingleShot(True)
+    poll = QTimer()
+    poll.setInterval(20)
+    try:
+        fg = FilterGraph(DummySubConfig())
+        n1 = fg.addNode("pyfile://" + os.path.dirname(__file__) + "/../interface/SimpleStaticFilter.py", "SimpleSource")
+        p = fg.getMockup(n1).getPropertyCollectionImpl()
+        p.getChildCollection("_nexxT").setProperty("thread", "thread-2")
+        p.setProperty("frequency", 100.0)
+        p.setProperty("log_tr", False)
+        n2 = fg.addNode("pyfile://" + os.path.dirname(__file__) + "/../interface/SimpleStaticFilter.py",
+                        "SimpleStaticFilter")
+        p = fg.getMockup(n2).getPropertyCollectionImpl()
+        p.setProperty("log_rcv", False)
+        fg.addConnection(n1, "outPort", n2, "inPort")
+        fg.setConnectionProperties(n1, "outPort", n2, "inPort", connProps)
+        app.processEvents()
+
+        aa = ActiveApplication(fg)
+        transmitted = []
+        received = []
+        notifications = 0
+        finished = False
+
+        def shutdown():
+            nonlocal finished
+            if not finished:
+                finished = True
+                aa.stop()
+                aa.close()
+                aa.deinit()
+
+        def state_changed(state):
+            if state == FilterState.CONSTRUCTED and finished:
+                app.exit(0)
+        def dropped():
+            return sum(aa.getDroppedSamples().values())
+
+        def stale():
+            return f2.inPort.staleSamples()
+
+        def check_complete():
+            if len(received) + dropped() + stale() == numSamples:
+                QTimer.singleShot(0, shutdown)
+
+        aa.stateChanged.connect(state_changed)
+        t.timeout.connect(shutdown)
+        t.start(timeout_s*1000)
+        # the last samples might be dropped, so there is no notification of the input port
+        poll.timeout.connect(check_complete)
+        poll.start()
+
+        t1 = aa._filters2threads["/SimpleSource"]
+        f1 = aa._threads[t1]._filters["/SimpleSource"].getPlugin()
+        def newDataEvent():
+            if f1.counter >= numSamples:
+                return
+            if period_s > 0 and len(transmitted) > 0 and time.perf_counter() - transmitted[-1] < period_s:
+                return
+            n = numSamples if period_s == 0 else 1
+            for _ in range(n):
+                s = DataSample(b"", "test", f1.counter)
+                f1.counter += 1
+                transmitted.append(time.perf_counter())
+                f1.outPort.transmit(s)
+        f1.newDataEvent = newDataEvent
+
+        t2 = aa._filters2threads["/SimpleStaticFilter"]
+        f2 = aa._threads[t2]._filters["/SimpleStaticFilter"].getPlugin()
+        if batchNotification:
+            f2.inPort.setQueueSize(numSamples, -1)
+            f2.inPort.setInterthreadBatchNotification(True)
+        if portMaxAge is not None:
+            f2.inPort.setMaxSampleAge(*portMaxAge)
+        def onPortDataChanged(port):
+            nonlocal notifications
+            notifications += 1
+            # process all samples which have not been processed yet (more than one in batch notification mode)
+            newest = port.getData(0).getTimestamp()
+            n = newest - (len(received) - 1) if batchNotification else 1
+            for i in range(n - 1, -1, -1):
+                received.append((port.getData(i).getTimestamp(), time.perf_counter()))
+            if consumerDelay_s > 0:
+                time.sleep(consumerDelay_s)
+            check_complete()
+        f2.onPortDataChanged = onPortDataChanged
+
+        aa.init()
+        aa.open()
+        aa.start()
+
+        nexxT.Qt.call_exec(app)
+        poll.stop()
+        numDropped = dropped()
+        metrics = aa.getConnectionMetrics()
+        aa.cleanup()
+        return transmitted, received, notifications, numDropped, metrics
+    finally:
+        del t
+        del poll
+
+def check_and_report(name, numSamples, transmitted, received):
+    assert [ts for ts, _ in received] == list(range(numSamples))
+    duration = received[-1][1] - transmitted[0]
+    print("%s: %d samples in %.3f s -> %.0f samples/s" % (name, numSamples, duration, numSamples/duration))
+    return numSamples/duration
+
+def test_batched():
+    numSamples = 5000
+    transmitted, received, notifications, _, _ = transport_setup(dict(width=0, batched=False), numSamples)
+    assert notifications == numSamples
+    check_and_report("qt", numSamples, transmitted, received)
+    transmitted, received, notifications, _, _ = transport_setup(dict(width=0, batched=True), numSamples)
+    assert notifications == numSamples
+    check_and_report("batched", numSamples, transmitted, received)
+    transmitted, received, notifications, _, _ = transport_setup(dict(width=0, batched=True), numSamples,
+                                                       batchNotification=True)
+    assert notifications <= numSamples
+    check_and_report("batched (batch notification)", numSamples, transmitted, received)
+    print("batch notification: %d notifications for %d samples" % (notifications, numSamples))
+
+def test_batched_blocking():
+    # with a limited width, the batch sizes are limited by the width
+    numSamples = 500
+    transmitted, received, notifications, _, _ = transport_setup(dict(width=4, batched=True), numSamples,
+                                                       batchNotification=True)
+    check_and_report("batched width=4", numSamples, transmitted, received)
+    assert notifications >= numSamples // 4
+
+def test_spsc():
+    numSamples = 5000
+    for width in [0, 1, 4]:
+        transmitted, received, _, _, _ = transport_setup(dict(width=width, transport="spsc"), numSamples)
+        check_and_report("spsc width=%d" % width, numSamples, transmitted, received)
+
+def test_overflow():
+    numSamples = 2000
+    for transport in ["qt", "spsc"]:
+        # blocking connections don't drop samples
+        for props in [dict(overflow="block"), dict(overflow="timeout", overflowTimeout=5.0)]:
+            transmitted, received, _, dropped, _ = transport_setup(dict(width=1, transport=transport, **props),
+                                                                numSamples)
+            assert dropped == 0
+            check_and_report("%s %s" % (transport, props["overflow"]), numSamples, transmitted, received)
+        for overflow in ["drop-newest", "keep-latest"]:
+            _, received, _, dropped, _ = transport_setup(dict(width=1, transport=transport, overflow=overflow),
+                                                      numSamples)
+            timestamps = [ts for ts, _ in received]
+            print("%s %s: %d samples dropped" % (transport, overflow, dropped))
+            assert len(received) + dropped == numSamples
+            assert timestamps == sorted(set(timestamps))
+            if overflow == "keep-latest":
+                # the most recent sample is never dropped
+                assert timestamps[-1] == numSamples - 1
+
+def test_metrics():
+    numSamples = 1000
+    _, received, _, _, metrics = transport_setup(dict(width=1), numSamples)
+    assert list(metrics.keys()) == ["/SimpleSource.outPort -> /SimpleStaticFilter.inPort"]
+    m = list(metrics.values())[0]
+    print("metrics (block):", m)
+    assert m["samples"] == numSamples == len(received)
+    assert m["dropped"] == m["discarded"] == 0
+    assert m["backlog"] in [0, 1]
+    # the producer transmits in a burst, so it has to wait for the consumer
+    assert m["blockingTime"] > 0
+    _, received, _, dropped, metrics = transport_setup(dict(width=1, overflow="drop-newest"), numSamples)
+    m = list(metrics.values())[0]
+    print("metrics (drop-newest):", m)
+    assert m["dropped"] == dropped
+    assert m["samples"] + m["dropped"] == numSamples
+
+def test_maxAge():
+    numSamples = 500
+    # the consumer can't keep up with the burst, samples older than 50 ms are dropped by the input port
+    _, received, _, dropped, metrics = transport_setup(dict(width=0, maxAge=0.05), numSamples, consumerDelay_s=2e-3)
+    m = list(metrics.values())[0]
+    timestamps = [ts for ts, _ in received]
+    print("maxAge: %d samples received, %d samples stale" % (len(received), m["stale"]))
+    assert dropped == 0
+    assert m["stale"] > 0
+    assert len(received) + m["stale"] == numSamples
+    assert timestamps == sorted(set(timestamps))
+    assert timestamps[0] == 0
+    # a sufficiently large max. age doesn't drop any sample
+    _, received, _, _, metrics = transport_setup(dict(width=1, maxAge=60.0), numSamples)
+    assert [ts for ts, _ in received] == list(range(numSamples))
+    assert list(metrics.values())[0]["stale"] == 0
+    # the timestamps of the test samples are far in the past, so they are all stale with the timestamp reference
+    _, received, _, _, metrics = transport_setup(dict(width=1), numSamples, portMaxAge=(1.0, "timestamp"))
+    assert len(received) == 0
+    assert list(metrics.values())[0]["stale"] == numSamples
+
+def test_priority():
+    numSamples = 500
+    for transport in ["qt", "spsc"]:
+        for width in [0, 1]:
+            transmitted, received, _, _, metrics = transport_setup(
+                dict(width=width, transport=transport, priority="high"), numSamples)
+            check_and_report("priority=high %s width=%d" % (transport, width), numSamples, transmitted, received)
+            m = list(metrics.values())[0]
+            assert m["priority"] == "high"
+            assert m["promoted"] > 0
+    # a slow consumer uses up the share of the receiving thread, so the wakeups are demoted
+    _, received, _, _, metrics = transport_setup(dict(width=0, priority="high"), 300, period_s=1e-3,
+                                                 consumerDelay_s=2e-3)
+    assert [ts for ts, _ in received] == list(range(300))
+    m = list(metrics.values())[0]
+    print("priority metrics (slow consumer):", m)
+    assert m["demoted"] > 0
+    _, _, _, _, metrics = transport_setup(dict(width=1), 10)
+    m = list(metrics.values())[0]
+    assert m["priority"] == "normal" and m["promoted"] == m["demoted"] == 0
+
+def test_autoWidth():
+    numSamples = 1000
+    # the consumer is slower than the producer, so the producer blocks and the width grows up to the maximum
+    transmitted, received, _, _, metrics = transport_setup(
+        dict(width=1, autoWidth=True, minWidth=2, maxWidth=16), numSamples, period_s=1e-3, consumerDelay_s=2e-3)
+    check_and_report("autoWidth throughput", numSamples, transmitted, received)
+    m = list(metrics.values())[0]
+    print("metrics (autoWidth throughput):", m)
+    assert m["autoWidth"]
+    assert m["width"] == 16
+    # with a target latency, the width follows the throughput of the connection
+    transmitted, received, _, _, metrics = transport_setup(
+        dict(width=1, autoWidth=True, minWidth=1, maxWidth=1000, targetLatency=0.5), numSamples, period_s=1e-3)
+    check_and_report("autoWidth latency", numSamples, transmitted, received)
+    m = list(metrics.values())[0]
+    print("metrics (autoWidth latency):", m)
+    rate = numSamples/(transmitted[-1] - transmitted[0])
+    assert rate*0.5*0.5 <= m["width"] <= rate*0.5*2
+    # with the keep-latest policy the producer is never throttled, the width is limited by the service rate of a slow
+    # consumer (20 samples/s) instead of the rate of the producer
+    widths = []
+    for consumerDelay in [0.0, 0.05]:
+        transmitted, received, _, dropped, metrics = transport_setup(
+            dict(width=1, overflow="keep-latest", autoWidth=True, minWidth=1, maxWidth=1000, targetLatency=0.5),
+            numSamples, period_s=1e-3, consumerDelay_s=consumerDelay)
+        assert len(received) + dropped == numSamples
+        m = list(metrics.values())[0]
+        print("metrics (autoWidth keep-latest, consumer delay %.3f s):" % consumerDelay, m)
+        widths.append(m["width"])
+    rate = numSamples/(transmitted[-1] - transmitted[0])
+    assert rate*0.5*0.5 <= widths[0] <= rate*0.5*2
+    assert 20*0.5*0.5 <= widths[1] <= 20*0.5*2
+    _, _, _, _, metrics = transport_setup(dict(width=4), 10)
+    m = list(metrics.values())[0]
+    assert not m["autoWidth"] and m["width"] == 4
+
+def multicast_setup(connPropsList, numSamples, timeout_s=20):
+    """
+    Transmits numSamples samples from thread-2 to multiple filters in the main thread, the connections use the given
+    properties. Returns the received timestamps per filter and the number of inter-thread connections.
+    """
+    t = QTimer()
+    t.setSingleShot(True)
+    try:
+        fg = FilterGraph(DummySubConfig())
+        n1 = fg.addNode("pyfile://" + os.path.dirname(__file__) + "/../interface/SimpleStaticFilter.py", "SimpleSource")
+        p = fg.getMockup(n1).getPropertyCollectionImpl()
+        p.getChildCollection("_nexxT").setProperty("thread", "thread-2")
+        p.setProperty("frequency", 100.0)
+        p.setProperty("log_tr", False)
+        receivers = []
+        # lossy connections are not considered for the termination criterion
+        lossless = []
+        for connProps in connPropsList:
+            n2 = fg.addNode("pyfile://" + os.path.dirname(__file__) + "/../interface/SimpleStaticFilter.py",
+                            "SimpleStaticFilter")
+            fg.getMockup(n2).getPropertyCollectionImpl().setProperty("log_rcv", False)
+            fg.addConnection(n1, "outPort", n2, "inPort")
+            fg.setConnectionProperties(n1, "outPort", n2, "inPort", connProps)
+            receivers.append(n2)
+            if connProps.get("overflow", "block") == "block":
+                lossless.append(n2)
+        app.processEvents()
+
+        aa = ActiveApplication(fg)
+        received = {n: [] for n in receivers}
+        finished = False
+
+        def shutdown():
+            nonlocal finished
+            if not finished:
+                finished = True
+                aa.stop()
+                aa.close()
+                aa.deinit()
+
+        def state_changed(state):
+            if state == FilterState.CONSTRUCTED and finished:
+                app.exit(0)
+        aa.stateChanged.connect(state_changed)
+        t.timeout.connect(shutdown)
+        t.start(timeout_s*1000)
+
+        f1 = aa._threads[aa._filters2threads["/SimpleSource"]]._filters["/SimpleSource"].getPlugin()
+        def newDataEvent():
+            while f1.counter < numSamples:
+                s = DataSample(b"", "test", f1.counter)
+                f1.counter += 1
+                f1.outPort.transmit(s)
+        f1.newDataEvent = newDataEvent
+
+        for n in receivers:
+            f2 = aa._threads[aa._filters2threads["/" + n]]._filters["/" + n].getPlugin()
+            def onPortDataChanged(port, n=n):
+                received[n].append(port.getData(0).getTimestamp())
+                if all(len(received[r]) == numSamples for r in lossless):
+                    QTimer.singleShot(0, shutdown)
+            f2.onPortDataChanged = onPortDataChanged
+
+        aa.init()
+        aa.open()
+        aa.start()
+
+        nexxT.Qt.call_exec(app)
+        numConns = len(aa._interThreadConns)
+        aa.cleanup()
+        return list(received.values()), numConns
+    finally:
+        del t
+
+def test_multicast():
+    numSamples = 1000
+    for transport in ["qt", "spsc"]:
+        for batched in [False, True]:
+            # the widths of the individual connections are preserved
+            connProps = [dict(width=w, transport=transport, batched=batched) for w in [1, 4, 0, 1]]
+            received, numConns = multicast_setup(connProps, numSamples)
+            assert numConns == 1
+            for r in received:
+                assert r == list(range(numSamples))
+    # connections which might drop samples are not grouped
+    connProps = [dict(width=1), dict(width=1), dict(width=1, overflow="drop-newest")]
+    received, numConns = multicast_setup(connProps, numSamples)
+    assert numConns == 2
+    assert received[0] == received[1] == list(range(numSamples))
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p/100*len(values)))]
+
+def test_latency():
+    numSamples = 1000
+    for transport in ["qt", "spsc"]:
+        transmitted, received, _, _, _ = transport_setup(dict(width=1, transport=transport), numSamples, period_s=1e-3)
+        check_and_report(transport, numSamples, transmitted, received)
+        latencies = [(tr - tt)*1e6 for tt, (_, tr) in zip(transmitted, received)]
+        print("%s: hop latency p50=%.1f us p99=%.1f us" %
+              (transport, percentile(latencies, 50), percentile(latencies, 99)))
+
+def test_mainThreadBudget():
+    budget = InputPortInterface.mainThreadBudget()
+    assert abs(budget - 0.02) < 1e-9
+    backlog = []
+    t = QTimer()
+    t.setInterval(1)
+    t.timeout.connect(lambda: backlog.append(InputPortInterface.mainThreadBacklog()))
+    try:
+        numSamples = 2000
+        for newBudget in [1e-3, 0.0]:
+            InputPortInterface.setMainThreadBudget(newBudget)
+            assert abs(InputPortInterface.mainThreadBudget() - newBudget) < 1e-9
+            t.start()
+            # the order of the samples is preserved, regardless of the time slicing
+            transmitted, received, _, _, _ = transport_setup(dict(width=100), numSamples)
+            t.stop()
+            check_and_report("budget=%.3f" % newBudget, numSamples, transmitted, received)
+            assert InputPortInterface.mainThreadBacklog()["samples"] == 0
+        assert len(backlog) > 0
+        for b in backlog:
+            assert set(b.keys()) == {"samples", "lag"}
+            assert b["samples"] >= 0 and b["lag"] >= 0
+        print("max backlog: %d samples, %.3f s" % (max(b["samples"] for b in backlog), max(b["lag"] for b in backlog)))
+    finally:
+        InputPortInterface.setMainThreadBudget(budget)
+        del t
+
+def test_mainThreadPurge():
+    dispatcher = MainThreadDispatcher()
+    # simulate a nested event loop, so that all samples are queued
+    dispatcher._busy = 1
+    port = object()
+    s1 = QSemaphore(10)
+    s2 = QSemaphore(10)
+    dispatcher.dispatch(port, [(DataSample(b"1", "text", 1), None)], s1)
+    dispatcher.dispatch(port, [(DataSample(b"2", "text", 2), None)]*2, s2)
+    dispatcher.dispatch(port, [(DataSample(b"3", "text", 3), None)], s1, priorityConnection=object())
+    dispatcher.dispatch(port, [(DataSample(b"4", "text", 4), None)], s2, priorityConnection=object())
+    assert dispatcher.backlog()["samples"] == 5 and dispatcher._numPriority == 2
+    dispatcher.purge(port, s1)
+    assert dispatcher.backlog()["samples"] == 3 and dispatcher._numPriority == 1
+    assert [item[2] for item in dispatcher._queue] == [s2, s2]
+    dispatcher.purge(port, s2)
+    assert dispatcher.backlog() == dict(samples=0, lag=0.0) and dispatcher._numPriority == 0
+
+def test_mainThreadPurgeUnlimited():
+    dispatcher = MainThreadDispatcher()
+    dispatcher._busy = 1
+    oldInstance = MainThreadDispatcher._instance
+    MainThreadDispatcher._instance = dispatcher
+    try:
+        port1 = object()
+        port2 = object()
+        port3 = object()
+        # connections of width 0 and a multicast with a width-0 receiver
+        itc1 = InterThreadConnection(QThread.currentThread(), 0, port1)
+        itc2 = InterThreadConnection(QThread.currentThread(), 0, port2)
+        multicast = InterThreadMulticast(QThread.currentThread())
+        itc3 = InterThreadConnection(QThread.currentThread(), 0, multicast)
+        itc3.addMulticastReceiver(port3, 0)
+        itc3.addMulticastReceiver(port1, 5)
+        s3 = multicast.receivers()[1][1]
+        assert itc1.semaphore() is None and itc2.semaphore() is None
+        dispatcher.dispatch(port1, [(DataSample(b"1", "text", 1), None)]*2, None)
+        dispatcher.dispatch(port2, [(DataSample(b"2", "text", 2), None)], None)
+        dispatcher.dispatch(port3, [(DataSample(b"3", "text", 3), None)]*3, None)
+        dispatcher.dispatch(port1, [(DataSample(b"3", "text", 3), None)], s3)
+        assert dispatcher.backlog()["samples"] == 7
+        itc1.cleanup()
+        assert dispatcher.backlog()["samples"] == 5
+        assert [item[0] for item in dispatcher._queue] == [port2, port3, port1]
+        itc3.cleanup()
+        assert dispatcher.backlog()["samples"] == 1
+        assert [item[0] for item in dispatcher._queue] == [port2]
+        itc2.cleanup()
+        assert dispatcher.backlog() == dict(samples=0, lag=0.0)
+    finally:
+        MainThreadDispatcher._instance = oldInstance
+
+if __name__ == "__main__":
+    setup()
+    test_batched()
+    test_batched_blocking()
+    test_spsc()
+    test_overflow()
+    test_metrics()
+    test_maxAge()
+    test_priority()
+    test_autoWidth()
+    test_multicast()
+    test_latency()
+    test_mainThreadBudget()
+    test_mainThreadPurge()
+    test_mainThreadPurgeUnlimited()
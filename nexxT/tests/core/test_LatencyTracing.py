@@ -0,0 +1,139 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+from nexxT.core.ActiveApplication import ActiveApplication
+from nexxT.core.Application import Application
+from nexxT.core.Graph import FilterGraph
+from nexxT.interface import FilterState, DataSample, LatencyTracer
+from nexxT.tests.core.test_InterThreadTransport import DummySubConfig
+import os
+import pytest
+import nexxT.Qt
+from nexxT.Qt.QtCore import QCoreApplication, QTimer
+
+def setup():
+    global app
+    app = QCoreApplication.instance()
+    if app is None:
+        app = QCoreApplication()
+
+def trace_setup(workerThreads, numSamples=20):
+    """
+    Transmits numSamples samples from thread-2 through a filter in thread-3 to the main thread with latency tracing
+    enabled and returns the traces of the received samples, the traces of the transmitted samples and the latency
+    statistics.
+    """
+    t = QTimer()
+    t.setSingleShot(True)
+    LatencyTracer.reset()
+    LatencyTracer.setEnabled(True)
+    try:
+        fg = FilterGraph(DummySubConfig())
+        filterFile = "pyfile://" + os.path.dirname(__file__) + "/../interface/SimpleStaticFilter.py"
+        n1 = fg.addNode(filterFile, "SimpleSource")
+        p = fg.getMockup(n1).getPropertyCollectionImpl()
+        p.getChildCollection("_nexxT").setProperty("thread", "thread-2")
+        p.setProperty("log_tr", False)
+        n2 = fg.addNode(filterFile, "SimpleStaticFilter")
+        p = fg.getMockup(n2).getPropertyCollectionImpl()
+        p.getChildCollection("_nexxT").setProperty("thread", "thread-3")
+        p.getChildCollection("_nexxT").setProperty("workerThreads", workerThreads)
+        p.setProperty("log_rcv", False)
+        n3 = fg.addNode(filterFile, "SimpleStaticFilter")
+        p = fg.getMockup(n3).getPropertyCollectionImpl()
+        p.setProperty("log_rcv", False)
+        fg.addConnection(n1, "outPort", n2, "inPort")
+        fg.addConnection(n2, "outPort", n3, "inPort")
+        app.processEvents()
+
+        aa = ActiveApplication(fg)
+        # the port names of the traces are the fully qualified filter names of the active application
+        Application.activeApplication = aa
+        traces = []
+        sentSamples = []
+        finished = False
+
+        def shutdown():
+            nonlocal finished
+            if not finished:
+                finished = True
+                aa.stop()
+                aa.close()
+                aa.deinit()
+
+        def state_changed(state):
+            if state == FilterState.CONSTRUCTED and finished:
+                app.exit(0)
+
+        aa.stateChanged.connect(state_changed)
+        t.timeout.connect(shutdown)
+        t.start(20000)
+
+        t1 = aa._filters2threads["/" + n1]
+        f1 = aa._threads[t1]._filters["/" + n1].getPlugin()
+        sent = False
+        def newDataEvent():
+            nonlocal sent
+            if sent:
+                return
+            sent = True
+            for i in range(numSamples):
+                sentSamples.append(DataSample(b"", "test", i))
+                f1.outPort.transmit(sentSamples[-1])
+        f1.newDataEvent = newDataEvent
+
+        t3 = aa._filters2threads["/" + n3]
+        f3 = aa._threads[t3]._filters["/" + n3].getPlugin()
+        def onPortDataChanged(port):
+            traces.append(port.getData().getTrace())
+            if len(traces) == numSamples:
+                QTimer.singleShot(0, shutdown)
+        f3.onPortDataChanged = onPortDataChanged
+
+        aa.init()
+        aa.open()
+        aa.start()
+
+        nexxT.Qt.call_exec(app)
+        aa.cleanup()
+        return n1, n2, n3, traces, [s.getTrace() for s in sentSamples], LatencyTracer.statistics()
+    finally:
+        Application.activeApplication = None
+        LatencyTracer.setEnabled(False)
+        del t
+
+@pytest.mark.parametrize("workerThreads", [0, 2])
+def test_latencyTracing(workerThreads):
+    n1, n2, n3, traces, sentTraces, statistics = trace_setup(workerThreads)
+    assert len(traces) == 20
+    # forwarding the samples doesn't change the trace context of the transmitted samples
+    assert [[h[0] for h in tr["hops"]] for tr in sentTraces] == [["/" + n1 + ".outPort"]]*20
+    assert len(set(tr["traceId"] for tr in traces)) == 20
+    for tr in traces:
+        hops = tr["hops"]
+        # the forwarding filter adds its input and output hops to the trace of the sample
+        assert [h[0] for h in hops] == ["/" + n1 + ".outPort", "/" + n2 + ".inPort", "/" + n2 + ".outPort"]
+        assert [h[1] for h in hops] == ["thread-2", "thread-3", "thread-3"]
+        enterExit = [ns for h in hops for ns in h[2:]]
+        assert enterExit == sorted(enterExit)
+    sinkPath = " -> ".join(["/" + n1 + ".outPort", "/" + n2 + ".inPort", "/" + n2 + ".outPort", "/" + n3 + ".inPort"])
+    assert set(statistics.keys()) == {" -> ".join(["/" + n1 + ".outPort", "/" + n2 + ".inPort"]), sinkPath}
+    stats = statistics[sinkPath]
+    assert stats["count"] == 20
+    assert 0 < stats["min"] <= stats["p50"] <= stats["p90"] <= stats["p99"] <= stats["max"]
+    assert stats["min"] <= stats["mean"] <= stats["max"]
+
+def test_disabled():
+    LatencyTracer.reset()
+    assert not LatencyTracer.enabled()
+    assert LatencyTracer.statistics() == {}
+    assert DataSample(b"", "test", 0).getTrace() == {}
+
+if __name__ == "__main__":
+    setup()
+    test_latencyTracing(0)
+    test_latencyTracing(2)
+    test_disabled()
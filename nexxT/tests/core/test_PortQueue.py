@@ -0,0 +1,140 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+from nexxT.core.FilterEnvironment import FilterEnvironment
+from nexxT.core.PropertyCollectionImpl import PropertyCollectionImpl
+from nexxT.core.PortConnections import SampleQueue
+from nexxT.interface import DataSample
+from nexxT import useCImpl
+import os
+
+def expect_exception(f, *args, **kw):
+    ok = False
+    try:
+        f(*args, **kw)
+    except:
+        ok = True
+    assert ok
+
+def delayed(port, delaySeconds):
+    return port.getData(delaySamples=-1 if useCImpl else None, delaySeconds=delaySeconds)
+
+def sample(ts):
+    return DataSample(b"", "test", ts)
+
+def active_port(test):
+    with FilterEnvironment("pyfile://" + os.path.dirname(__file__) + "/../interface/SimpleStaticFilter.py",
+                           "SimpleStaticFilter", PropertyCollectionImpl("root", None)) as env:
+        f = env.getPlugin()
+        f.onPortDataChanged = lambda port: None
+        env.init()
+        env.open()
+        env.start()
+        test(env.getInputPort("inPort"))
+
+def test_queueSizeSamples():
+    def test(port):
+        port.setQueueSize(5, -1)
+        for ts in range(12):
+            port.receiveSync(sample(ts))
+        assert [port.getData(i).getTimestamp() for i in range(5)] == [11, 10, 9, 8, 7]
+        expect_exception(port.getData, 5)
+        # shrinking the queue keeps the most recent samples
+        port.setQueueSize(2, -1)
+        assert [port.getData(i).getTimestamp() for i in range(2)] == [11, 10]
+        expect_exception(port.getData, 2)
+        # growing the queue keeps the stored samples
+        port.setQueueSize(4, -1)
+        port.receiveSync(sample(12))
+        assert [port.getData(i).getTimestamp() for i in range(3)] == [12, 11, 10]
+        expect_exception(port.getData, 3)
+    active_port(test)
+
+def test_queueSizeSeconds():
+    def test(port):
+        step = round(0.1/DataSample.TIMESTAMP_RES)
+        port.setQueueSize(0, 1.0)
+        # 0.1 s spacing, more samples than the initial capacity of the ring buffer
+        for i in range(50):
+            port.receiveSync(sample(i*step))
+        assert port.getData(0).getTimestamp() == 49*step
+        # samples which are at most 1.0 s older than the current sample are kept
+        assert port.getData(10).getTimestamp() == 39*step
+        expect_exception(port.getData, 11)
+        assert delayed(port, 0.0).getTimestamp() == 49*step
+        assert delayed(port, 0.05).getTimestamp() == 48*step
+        assert delayed(port, 0.3).getTimestamp() == 46*step
+        assert delayed(port, 0.95).getTimestamp() == 39*step
+        expect_exception(delayed, port, 1.5)
+        # combination of both limits
+        port.setQueueSize(3, 1.0)
+        assert port.getData(2).getTimestamp() == 47*step
+        expect_exception(port.getData, 3)
+    active_port(test)
+
+def test_queueSizeBytes():
+    def test(port):
+        port.setQueueSize(0, 100.0)
+        assert port.queueSizeBytes() in [None, -1]
+        for ts in range(10):
+            port.receiveSync(DataSample(b"x"*1000, "test", ts))
+        assert port.queuedBytes() == 10000
+        # the oldest samples are evicted to fit into the budget
+        port.setQueueSizeBytes(3500)
+        assert port.queueSizeBytes() == 3500
+        assert port.queuedBytes() == 3000
+        assert [port.getData(i).getTimestamp() for i in range(3)] == [9, 8, 7]
+        expect_exception(port.getData, 3)
+        port.receiveSync(DataSample(b"x"*2000, "test", 10))
+        assert port.queuedBytes() == 3000
+        assert [port.getData(i).getTimestamp() for i in range(2)] == [10, 9]
+        expect_exception(port.getData, 2)
+        # the most recent sample is always kept
+        port.receiveSync(DataSample(b"x"*5000, "test", 11))
+        assert port.queuedBytes() == 5000
+        assert port.getData(0).getTimestamp() == 11
+        expect_exception(port.getData, 1)
+        # the byte count follows the evictions of the other limits
+        port.setQueueSizeBytes(0)
+        assert port.queueSizeBytes() in [None, -1]
+        port.setQueueSize(2, -1)
+        for ts in range(12, 15):
+            port.receiveSync(DataSample(b"x"*100, "test", ts))
+        assert port.queuedBytes() == 200
+    active_port(test)
+
+def test_ringBuffer():
+    # the structural properties behind the O(1) cost per received sample
+    q = SampleQueue(100)
+    for ts in range(100):
+        q.push(sample(ts))
+    buffer = q._buffer
+    for ts in range(100, 10000):
+        q.push(sample(ts))
+    # a full queue overwrites the oldest slot in place, the storage is neither grown nor copied
+    assert q._buffer is buffer and len(buffer) == 100
+    assert len(q) == 100 and q[0].getTimestamp() == 9999 and q[99].getTimestamp() == 9900
+    # an unlimited queue grows geometrically (amortized O(1))
+    q = SampleQueue()
+    reallocations = []
+    reallocate = q._reallocate
+    q._reallocate = lambda capacity: (reallocations.append(capacity), reallocate(capacity))
+    for ts in range(10000):
+        q.push(sample(ts))
+    assert len(q) == 10000 and len(reallocations) == 14
+    # the delayed access uses a binary search
+    accesses = []
+    getitem = SampleQueue.__getitem__
+    class CountingQueue(SampleQueue):
+        def __getitem__(self, idx):
+            accesses.append(idx)
+            return getitem(self, idx)
+    q.__class__ = CountingQueue
+    assert q.indexOfDelay(5000) == 5000
+    assert len(accesses) <= 16
+
+if __name__ == "__main__":
+    test_ringBuffer()
@@ -0,0 +1,107 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+from nexxT.core.ActiveApplication import ActiveApplication
+from nexxT.core.Graph import FilterGraph
+from nexxT.interface import FilterState, DataSample
+from nexxT.tests.core.test_InterThreadTransport import DummySubConfig
+import os
+import time
+import nexxT.Qt
+from nexxT.Qt.QtCore import QCoreApplication, QTimer
+
+def setup():
+    global app
+    app = QCoreApplication.instance()
+    if app is None:
+        app = QCoreApplication()
+
+def test_processPool():
+    numSamples = 40
+    sleepTime = 0.05
+    t = QTimer()
+    t.setSingleShot(True)
+    try:
+        fg = FilterGraph(DummySubConfig())
+        filterFile = "pyfile://" + os.path.dirname(__file__) + "/../interface/SimpleStaticFilter.py"
+        n1 = fg.addNode(filterFile, "SimpleSource")
+        p = fg.getMockup(n1).getPropertyCollectionImpl()
+        p.getChildCollection("_nexxT").setProperty("thread", "thread-2")
+        p.setProperty("frequency", 100.0)
+        p.setProperty("log_tr", False)
+        n2 = fg.addNode(filterFile, "SimpleStaticFilter")
+        p = fg.getMockup(n2).getPropertyCollectionImpl()
+        p.getChildCollection("_nexxT").setProperty("thread", "thread-3")
+        p.getChildCollection("_nexxT").setProperty("workerProcesses", 2)
+        p.setProperty("sleep_time", sleepTime)
+        p.setProperty("log_rcv", False)
+        n3 = fg.addNode(filterFile, "SimpleStaticFilter")
+        p = fg.getMockup(n3).getPropertyCollectionImpl()
+        p.setProperty("log_rcv", False)
+        fg.addConnection(n1, "outPort", n2, "inPort")
+        fg.addConnection(n2, "outPort", n3, "inPort")
+        app.processEvents()
+
+        aa = ActiveApplication(fg)
+        received = []
+        finished = False
+        tstart = None
+
+        def shutdown():
+            nonlocal finished
+            if not finished:
+                finished = True
+                aa.stop()
+                aa.close()
+                aa.deinit()
+
+        def state_changed(state):
+            if state == FilterState.CONSTRUCTED and finished:
+                app.exit(0)
+
+        aa.stateChanged.connect(state_changed)
+        t.timeout.connect(shutdown)
+        t.start(30000)
+
+        t1 = aa._filters2threads["/" + n1]
+        f1 = aa._threads[t1]._filters["/" + n1].getPlugin()
+        def newDataEvent():
+            nonlocal tstart
+            if tstart is not None:
+                return
+            tstart = time.perf_counter()
+            for i in range(numSamples):
+                # every 8th sample is large enough to be transported through shared memory
+                f1.outPort.transmit(DataSample(bytes([i])*(10000 if i % 8 == 0 else 10), "test", i))
+        f1.newDataEvent = newDataEvent
+
+        t3 = aa._filters2threads["/" + n3]
+        f3 = aa._threads[t3]._filters["/" + n3].getPlugin()
+        def onPortDataChanged(port):
+            s = port.getData()
+            received.append((s.getTimestamp(), s.getContent().data()))
+            if len(received) == numSamples:
+                QTimer.singleShot(0, shutdown)
+        f3.onPortDataChanged = onPortDataChanged
+
+        aa.init()
+        aa.open()
+        aa.start()
+
+        nexxT.Qt.call_exec(app)
+        duration = time.perf_counter() - tstart
+        aa.cleanup()
+        print("%d samples in %.3f s" % (numSamples, duration))
+        # the outputs of the worker processes are transmitted in input order
+        assert [r[0] for r in received] == list(range(numSamples))
+        assert all(c == bytes([i])*(10000 if i % 8 == 0 else 10) for i, c in received)
+        assert duration < 0.75*numSamples*sleepTime
+    finally:
+        del t
+
+if __name__ == "__main__":
+    setup()
+    test_processPool()
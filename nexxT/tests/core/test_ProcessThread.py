@@ -0,0 +1,202 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+from nexxT.core.ActiveApplication import ActiveApplication
+from nexxT.core.Graph import FilterGraph
+from nexxT.core.ProcessThread import isProcessThread, SharedRing, propertyUpdate, applyPropertyUpdate
+from nexxT.core.PropertyCollectionImpl import PropertyCollectionImpl, PropertyCollectionProxy
+from nexxT.core.Variables import Variables
+from nexxT.interface import FilterState, DataSample
+from nexxT.tests.core.test_InterThreadTransport import DummySubConfig
+import logging
+import os
+import threading
+import nexxT.Qt
+from nexxT.Qt.QtCore import QCoreApplication, QTimer
+
+def setup():
+    global app
+    app = QCoreApplication.instance()
+    if app is None:
+        app = QCoreApplication()
+
+class _RecordCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+def test_processThread():
+    numSamples = 50
+    t = QTimer()
+    t.setSingleShot(True)
+    collector = _RecordCollector()
+    logger = logging.getLogger("nexxT")
+    logger.addHandler(collector)
+    try:
+        fg = FilterGraph(DummySubConfig())
+        filterFile = "pyfile://" + os.path.dirname(__file__) + "/../interface/SimpleStaticFilter.py"
+        n1 = fg.addNode(filterFile, "SimpleSource")
+        p = fg.getMockup(n1).getPropertyCollectionImpl()
+        p.getChildCollection("_nexxT").setProperty("thread", "thread-2")
+        p.setProperty("frequency", 100.0)
+        p.setProperty("log_tr", False)
+        n2 = fg.addNode(filterFile, "SimpleStaticFilter")
+        p = fg.getMockup(n2).getPropertyCollectionImpl()
+        p.getChildCollection("_nexxT").setProperty("thread", "process:p1")
+        p.setProperty("log_prefix", "child:")
+        n3 = fg.addNode(filterFile, "SimpleStaticFilter")
+        p = fg.getMockup(n3).getPropertyCollectionImpl()
+        p.setProperty("log_rcv", False)
+        fg.addConnection(n1, "outPort", n2, "inPort")
+        fg.addConnection(n2, "outPort", n3, "inPort")
+        app.processEvents()
+
+        aa = ActiveApplication(fg)
+        assert isProcessThread(aa._filters2threads["/" + n2])
+        received = []
+        finished = False
+
+        def shutdown():
+            nonlocal finished
+            if not finished:
+                finished = True
+                aa.stop()
+                aa.close()
+                aa.deinit()
+
+        def state_changed(state):
+            if state == FilterState.CONSTRUCTED and finished:
+                app.exit(0)
+
+        aa.stateChanged.connect(state_changed)
+        t.timeout.connect(shutdown)
+        t.start(30000)
+
+        t1 = aa._filters2threads["/" + n1]
+        f1 = aa._threads[t1]._filters["/" + n1].getPlugin()
+        sent = False
+        def newDataEvent():
+            nonlocal sent
+            if sent:
+                return
+            sent = True
+            for i in range(numSamples):
+                if i % 10 == 0:
+                    # large payloads are transported through the shared memory ring
+                    f1.outPort.transmit(DataSample(bytes([i % 256])*100000, "bytes", i))
+                else:
+                    f1.outPort.transmit(DataSample(("%d" % i).encode("utf8"), "text/utf8", i))
+        f1.newDataEvent = newDataEvent
+
+        t3 = aa._filters2threads["/" + n3]
+        f3 = aa._threads[t3]._filters["/" + n3].getPlugin()
+        def onPortDataChanged(port):
+            s = port.getData()
+            received.append((s.getTimestamp(), s.getDatatype(), s.getContent().data()))
+            if len(received) == numSamples:
+                QTimer.singleShot(0, shutdown)
+        f3.onPortDataChanged = onPortDataChanged
+
+        processThread = aa._threads[aa._filters2threads["/" + n2]]
+        assert list(processThread._propertySlots.keys()) == ["/" + n2]
+
+        aa.init()
+        aa.open()
+        aa.start()
+
+        nexxT.Qt.call_exec(app)
+        aa.cleanup()
+        # the property collection of the proxy is disconnected on destruct
+        assert processThread._propertySlots == {}
+
+        assert [r[0] for r in received] == list(range(numSamples))
+        for i, dtype, content in received:
+            if i % 10 == 0:
+                assert dtype == "bytes" and content == bytes([i % 256])*100000
+            else:
+                assert dtype == "text/utf8" and content == ("%d" % i).encode("utf8")
+        # log records of the worker process are forwarded to the nexxT process
+        childRecords = [r for r in collector.records if r.getMessage().startswith("child:received:")]
+        assert len(childRecords) == numSamples - numSamples//10
+        assert all(r.process != os.getpid() for r in childRecords)
+    finally:
+        logger.removeHandler(collector)
+        del t
+
+def test_sharedRing():
+    ring = SharedRing(1024)
+    consumer = SharedRing(1024, ring.handle())
+    try:
+        alive = True
+        messages = [ring.write(memoryview(bytes([i])*400), lambda: alive) for i in range(2)]
+        results = []
+        # the third payload doesn't fit, the producer blocks until the consumer has released space
+        t = threading.Thread(target=lambda: results.append(ring.write(memoryview(bytes([2])*400), lambda: alive)))
+        t.start()
+        t.join(0.2)
+        assert t.is_alive() and results == []
+        assert bytes(consumer.read(*messages[0])) == bytes([0])*400
+        t.join(5)
+        assert not t.is_alive()
+        assert bytes(consumer.read(*messages[1])) == bytes([1])*400
+        assert bytes(consumer.read(*results[0])) == bytes([2])*400
+        # a producer waiting for a consumer which has gone is woken up
+        messages = [ring.write(memoryview(bytes([i])*400), lambda: alive) for i in range(2)]
+        t = threading.Thread(target=lambda: results.append(ring.write(memoryview(bytes([2])*400), lambda: alive)))
+        t.start()
+        t.join(0.2)
+        assert t.is_alive()
+        alive = False
+        ring.wakeup()
+        t.join(5)
+        assert not t.is_alive() and results[-1] is None
+    finally:
+        consumer.close()
+        ring.close()
+
+def test_propertyUpdate():
+    # the nexxT process, the filter uses a proxied collection with its own variables
+    root = PropertyCollectionImpl("root", None, variables=Variables())
+    pc = PropertyCollectionImpl("filter", root)
+    pc.defineProperty("prefix", "", "a prefix")
+    pc.defineProperty("count", 1, "a count")
+    variables = Variables(parent=pc.getVariables())
+    variables["NAME"] = "parent"
+    proxy = PropertyCollectionProxy(pc, variables)
+    # the worker process
+    workerRoot = PropertyCollectionImpl("root", None, variables=Variables())
+    workerPc = PropertyCollectionImpl("filter", workerRoot)
+    workerPc.defineProperty("prefix", "", "a prefix")
+    workerPc.defineProperty("count", 1, "a count")
+    workerPc.getVariables()["NAME"] = "worker"
+
+    pc.setVarProperty("prefix", "${NAME}:")
+    assert proxy.getProperty("prefix") == "parent:"
+    update = propertyUpdate(proxy, "prefix")
+    assert update == ("${NAME}:", True)
+    applyPropertyUpdate(workerPc, "prefix", *update)
+    assert workerPc.getPropertyDetails("prefix").useEnvironment
+    assert workerPc.getProperty("prefix") == "worker:"
+    # switching back to a plain value is mirrored as well
+    pc.setProperty("prefix", "plain")
+    applyPropertyUpdate(workerPc, "prefix", *propertyUpdate(proxy, "prefix"))
+    assert not workerPc.getPropertyDetails("prefix").useEnvironment
+    assert workerPc.getProperty("prefix") == "plain"
+    pc.setProperty("count", 5)
+    applyPropertyUpdate(workerPc, "count", *propertyUpdate(proxy, "count"))
+    assert workerPc.getProperty("count") == 5
+    # unknown properties are ignored
+    assert propertyUpdate(proxy, "unknown") is None
+    applyPropertyUpdate(workerPc, "unknown", 1, False)
+
+if __name__ == "__main__":
+    setup()
+    test_processThread()
+    test_sharedRing()
+    test_propertyUpdate()
@@ -0,0 +1,177 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from nexxT.services.SrvProfiling import ProfilingService, ProfilingServiceDummy
+from nexxT.services.ProfilingData import SpanRingBuffer, ThreadSpecificProfItem, LogHistogram
+from nexxT.Qt.QtCore import QCoreApplication
+
+def setup():
+    global app
+    app = QCoreApplication.instance()
+    if app is None:
+        app = QCoreApplication()
+
+def test_nestedSpans():
+    tsp = ThreadSpecificProfItem()
+    tsp.buffer.record("a", SpanRingBuffer.EVENT_STARTED)
+    tsp.buffer.record("b", SpanRingBuffer.EVENT_STARTED)
+    tsp.buffer.record("b", SpanRingBuffer.EVENT_FINISHED)
+    tsp.buffer.record("a", SpanRingBuffer.EVENT_FINISHED)
+    t = tsp.buffer._events[:4, 2].tolist()
+    spans = tsp.getSpans()
+    assert tsp.buffer.overruns == 0
+    # the first span of a port is the total time, the others are the times not paused by nested calls
+    assert spans["b"] == [(t[1], t[2]), (t[1], t[2])]
+    assert spans["a"] == [(t[0], t[3]), (t[0], t[1]), (t[2], t[3])]
+    assert tsp.getSpans() == dict(a=[], b=[])
+
+def test_overrun():
+    buffer = SpanRingBuffer()
+    for _ in range(SpanRingBuffer.CAPACITY + 10):
+        buffer.record("a", SpanRingBuffer.EVENT_STARTED)
+    events, complete = buffer.drain()
+    assert not complete
+    assert events.shape[0] == SpanRingBuffer.CAPACITY
+    assert buffer.overruns == 10
+    assert np.all(np.diff(events[:, 2]) >= 0)
+    events, complete = buffer.drain()
+    assert complete and events.shape[0] == 0
+
+def test_profilingService():
+    srv = ProfilingService()
+    assert not srv.portProfilingEnabled
+    assert not ProfilingServiceDummy().portProfilingEnabled
+    spans = {}
+    srv.spanDataUpdated.connect(
+        lambda thread, port, data: spans.setdefault(port, []).append(np.frombuffer(memoryview(data), np.int64)))
+    changes = []
+    srv.portProfilingEnabledChanged.connect(changes.append)
+    srv.registerThread()
+    # events are ignored while port profiling is disabled
+    srv.beforePortDataChanged("port")
+    srv.setPortProfilingEnabled(True)
+    srv.setPortProfilingEnabled(True)
+    assert changes == [True]
+    assert srv.portProfilingEnabled
+    assert srv.property("portProfilingEnabled")
+    for _ in range(3):
+        srv.beforePortDataChanged("port")
+        srv.afterPortDataChanged("port")
+    srv._emitData()
+    assert len(spans["port"]) == 1 and spans["port"][0].shape == (12,)
+    srv.setPortProfilingEnabled(False)
+    srv.deregisterThread()
+
+def test_traceCapture():
+    srv = ProfilingService()
+    srv.registerThread()
+    srv.startTraceCapture()
+    assert srv.isTraceCaptureActive()
+    assert srv.portProfilingEnabled
+    srv.beforePortDataChanged("outer")
+    srv.beforePortDataChanged("inner")
+    srv.afterPortDataChanged("inner")
+    srv.afterPortDataChanged("outer")
+    with tempfile.TemporaryDirectory() as d:
+        fn = os.path.join(d, "trace.json")
+        srv.stopTraceCapture(fn)
+        with open(fn, encoding="utf-8") as f:
+            trace = json.load(f)
+    assert not srv.isTraceCaptureActive()
+    assert not srv.portProfilingEnabled
+    srv.deregisterThread()
+    events = trace["traceEvents"]
+    calls = {e["name"]: e for e in events if e["ph"] == "X"}
+    assert set(calls.keys()) == {"outer", "inner"}
+    # the nested call is enclosed by the outer call of the same thread
+    assert calls["outer"]["tid"] == calls["inner"]["tid"]
+    assert calls["outer"]["ts"] <= calls["inner"]["ts"]
+    assert calls["inner"]["ts"] + calls["inner"]["dur"] <= calls["outer"]["ts"] + calls["outer"]["dur"]
+    threadNames = [e for e in events if e["ph"] == "M" and e["name"] == "thread_name"]
+    assert [e["tid"] for e in threadNames] == [calls["outer"]["tid"]]
+
+def test_logHistogram():
+    h = LogHistogram()
+    assert h.statistics() == dict(count=0, mean=0.0, p50=0.0, p90=0.0, p99=0.0, max=0.0)
+    values = np.arange(1, 1001, dtype=np.int64)*1000
+    h.add(np.concatenate([values, [-1]]))
+    st = h.statistics()
+    assert st["count"] == 1000
+    assert st["max"] == 1e-3
+    assert abs(st["mean"] - 500.5e-6) < 1e-12
+    # the percentiles are upper bounds of the buckets with a resolution of about 9%
+    for key, expected in [("p50", 500e-6), ("p90", 900e-6), ("p99", 990e-6)]:
+        assert expected <= st[key] <= expected*1.1
+    h.add(np.array([10, 10**15], dtype=np.int64))
+    assert abs(h.statistics()["max"] - 1e6) < 1e-3
+
+def test_portStatistics():
+    srv = ProfilingService()
+    srv.registerThread()
+    srv.setPortProfilingEnabled(True)
+    for _ in range(10):
+        srv.beforePortDataChanged("outer", 2000000)
+        srv.beforePortDataChanged("inner")
+        srv.afterPortDataChanged("inner")
+        srv.afterPortDataChanged("outer")
+    statistics = srv.getPortStatistics()
+    srv.setPortProfilingEnabled(False)
+    srv.deregisterThread()
+    assert set(statistics.keys()) == {"outer", "inner"}
+    outer = statistics["outer"]
+    assert outer["serviceTime"]["count"] == 10
+    assert outer["interArrival"]["count"] == 9
+    assert 2e-3 <= outer["queueWait"]["p50"] <= 2.2e-3
+    assert statistics["inner"]["queueWait"]["count"] == 0
+    for st in outer["serviceTime"], statistics["inner"]["serviceTime"]:
+        assert 0 <= st["p50"] <= st["p90"] <= st["p99"] <= st["max"]
+    srv.resetPortStatistics()
+    assert srv.getPortStatistics() == {}
+
+def test_filterStatistics():
+    srv = ProfilingService()
+    srv.registerThread()
+    srv.setPortProfilingEnabled(True)
+    srv.beforeLifecycleCallback("/compute/onStart")
+    srv.afterLifecycleCallback("/compute/onStart")
+    for _ in range(5):
+        srv.beforePortDataChanged("/compute/inPort")
+        # burn CPU in the compute filter
+        sum(range(20000))
+        srv.beforePortDataChanged("/wait/inPort")
+        time.sleep(0.01)
+        srv.afterPortDataChanged("/wait/inPort")
+        srv.afterPortDataChanged("/compute/inPort")
+    portStatistics = srv.getPortStatistics()
+    statistics = srv.getFilterStatistics()
+    srv.setPortProfilingEnabled(False)
+    srv.deregisterThread()
+    # the lifecycle callbacks are not reported as ports
+    assert set(portStatistics.keys()) == {"/compute/inPort", "/wait/inPort"}
+    assert set(statistics.keys()) == {"/compute", "/wait"}
+    compute, wait = statistics["/compute"], statistics["/wait"]
+    assert compute["calls"] == 5 and wait["calls"] == 5
+    assert wait["wallTime"] >= 0.05
+    # the sleeping filter is waiting, the nested call is not accounted to the compute filter
+    assert wait["cpuRatio"] < 0.5
+    assert compute["wallTime"] < wait["wallTime"]
+    assert 0 < compute["cpuTime"] <= compute["wallTime"]*1.1
+    assert compute["lifecycleWallTime"] > 0 and wait["lifecycleWallTime"] == 0
+
+if __name__ == "__main__":
+    setup()
+    test_nestedSpans()
+    test_overrun()
+    test_profilingService()
+    test_traceCapture()
+    test_logHistogram()
+    test_portStatistics()
+    test_filterStatistics()
@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2020 ifm electronic gmbh
+#
+# THE PROGRAM IS PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND.
+#
+
+from nexxT.core.ActiveApplication import ActiveApplication
+from nexxT.core.Thread import effectiveThreadSettings
+from nexxT.core.Graph import FilterGraph
+from nexxT.interface import FilterState
+from nexxT.tests.core.test_InterThreadTransport import DummySubConfig
+import os
+import platform
+import pytest
+import nexxT.Qt
+from nexxT.Qt.QtCore import QCoreApplication, QTimer
+
+def setup():
+    global app
+    app = QCoreApplication.instance()
+    if app is None:
+        app = QCoreApplication()
+
+@pytest.mark.skipif(platform.system() != "Linux", reason="thread settings are tested on linux only")
+def test_threadSettings():
+    t = QTimer()
+    t.setSingleShot(True)
+    try:
+        sc = DummySubConfig()
+        sc.dummyConfig.threads["thread-2"] = dict(affinity=[0], osName="nexxT-source-thread", priority="high",
+                                                  policy="batch")
+        sc.dummyConfig.threads["main"] = dict(affinity=[0], osName="nexxT-main", policy="batch")
+        original = effectiveThreadSettings(app.thread())
+        fg = FilterGraph(sc)
+        filterFile = "pyfile://" + os.path.dirname(__file__) + "/../interface/SimpleStaticFilter.py"
+        n1 = fg.addNode(filterFile, "SimpleSource")
+        p = fg.getMockup(n1).getPropertyCollectionImpl()
+        p.getChildCollection("_nexxT").setProperty("thread", "thread-2")
+        p.setProperty("log_tr", False)
+        n2 = fg.addNode(filterFile, "SimpleStaticFilter")
+        p = fg.getMockup(n2).getPropertyCollectionImpl()
+        p.setProperty("log_rcv", False)
+        fg.addConnection(n1, "outPort", n2, "inPort")
+        app.processEvents()
+
+        aa = ActiveApplication(fg)
+        settings = None
+        finished = False
+
+        def shutdown():
+            nonlocal finished, settings
+            if not finished:
+                finished = True
+                settings = aa.getThreadSettings()
+                aa.stop()
+                aa.close()
+                aa.deinit()
+
+        def state_changed(state):
+            if state == FilterState.ACTIVE:
+                QTimer.singleShot(200, shutdown)
+            elif state == FilterState.CONSTRUCTED and finished:
+                app.exit(0)
+
+        aa.stateChanged.connect(state_changed)
+        t.timeout.connect(shutdown)
+        t.start(10000)
+
+        aa.init()
+        aa.open()
+        aa.start()
+
+        nexxT.Qt.call_exec(app)
+        aa.cleanup()
+        restored = effectiveThreadSettings(app.thread())
+
+        assert set(settings.keys()) == {"main", "thread-2"}
+        s2 = settings["thread-2"]
+        assert s2["affinity"] == [0]
+        # the OS thread names are truncated to 15 characters
+        assert s2["osName"] == "nexxT-source-th"
+        assert s2["priority"] == "high"
+        assert s2["policy"] == "batch"
+        assert s2["nativeId"] != settings["main"]["nativeId"]
+        # the main thread is not affected by the settings of thread-2
+        assert settings["main"]["policy"] == "batch"
+        assert settings["main"]["osName"] == "nexxT-main"
+        # the original settings of the main thread are restored after the application has been cleaned up
+        for key in ["affinity", "policy", "schedPriority", "osName", "priority"]:
+            assert restored[key] == original[key]
+    finally:
+        del t
+
+if __name__ == "__main__":
+    setup()
+    test_threadSettings()
@@ -7,10 +7,14 @@
 import logging
 import math
 import platform
+import threading
 import time
+import weakref
 import pytest
+import numpy as np
 import nexxT
-from nexxT.interface import DataSample
+from nexxT.Qt.QtCore import QByteArray
+from nexxT.interface import DataSample, PayloadPool, MemoryGovernor, OutputPort
 
 logging.getLogger(__name__).debug("executing test_dataSample.py")
 
@@ -25,6 +29,212 @@ def test_basic():
     # but the modification is not affecting the original data
     assert dataSample.getContent().data() == b'Hello'
 
+def test_contentView():
+    dataSample = DataSample(QByteArray(b"Hello"), "String", 38)
+    view = dataSample.getContentView()
+    assert view.readonly
+    assert bytes(view) == b"Hello"
+    assert dataSample.getContentSize() == 5
+    with pytest.raises(TypeError):
+        view[0] = 0
+
+    # other buffers are copied by the constructor
+    buffer = bytearray(b"Hello")
+    dataSample = DataSample(buffer, "String", 38)
+    buffer[0:1] = b"J"
+    assert bytes(dataSample.getContentView()) == b"Hello"
+    assert dataSample.getContent().data() == b"Hello"
+
+def test_fromBuffer():
+    arr = np.arange(4096, dtype=np.uint16)
+    dataSample = DataSample.fromBuffer(arr, "uint16", 38)
+    assert dataSample.getContentSize() == arr.nbytes
+    assert dataSample.getContentView().readonly
+    assert np.array_equal(np.frombuffer(dataSample.getContentView(), dtype=np.uint16), arr)
+    assert dataSample.getContent().data() == arr.tobytes()
+    if not nexxT.useCImpl:
+        # the python implementation adopts the buffer without copying
+        assert np.shares_memory(np.frombuffer(dataSample.getContentView(), dtype=np.uint16), arr)
+    else:
+        # the C++ implementation copies the buffer once into a buffer of the payload pool
+        assert not np.shares_memory(np.frombuffer(dataSample.getContentView(), dtype=np.uint16), arr)
+        misses = PayloadPool.statistics()["misses"]
+        del dataSample
+        dataSample = DataSample.fromBuffer(arr, "uint16", 38)
+        assert PayloadPool.statistics()["misses"] == misses
+    # non-contiguous buffers are supported as well
+    dataSample = DataSample.fromBuffer(arr[::2], "uint16", 38)
+    assert np.array_equal(np.frombuffer(dataSample.getContentView(), dtype=np.uint16), arr[::2])
+    dataSample = DataSample.fromBuffer(QByteArray(b"Hello"), "String", 38)
+    assert bytes(dataSample.getContentView()) == b"Hello"
+
+def test_payloadPool():
+    PayloadPool.clear()
+    size = 1000*1000
+    assert PayloadPool.sizeClass(size) >= size
+    assert PayloadPool.sizeClass(size) < 1.25*size
+    buffer = PayloadPool.acquire(size)
+    np.frombuffer(buffer, dtype=np.uint8)[...] = 42
+    dataSample = DataSample.fromBuffer(buffer, "bytes", 38)
+    del buffer
+    assert PayloadPool.statistics()["misses"] == 1
+    assert PayloadPool.statistics()["buffersHeld"] == 0
+    view = np.frombuffer(dataSample.getContentView(), dtype=np.uint8)
+    assert np.all(view == 42)
+    if nexxT.useCImpl:
+        # views of the C++ implementation are valid only as long as the sample exists
+        del view
+    del dataSample
+    if not nexxT.useCImpl:
+        # in python, the view keeps the buffer alive
+        assert PayloadPool.statistics()["buffersHeld"] == 0
+        del view
+    assert PayloadPool.statistics()["buffersHeld"] == 1
+    # a slightly smaller buffer is served from the same size class
+    buffer = PayloadPool.acquire(size - 10)
+    assert len(memoryview(buffer)) == size - 10
+    stats = PayloadPool.statistics()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["buffersHeld"] == 0
+    del buffer
+    PayloadPool.clear()
+
+def test_memoryGovernor():
+    numInstances = DataSample.numInstances()
+    memoryHeld = DataSample.memoryHeld()
+    large = DataSample(bytes(2*1024*1024), "bytes", 0)
+    assert DataSample.numInstances() == numInstances + 1
+    assert DataSample.memoryHeld() == memoryHeld + 2*1024*1024
+    del large
+    assert DataSample.numInstances() == numInstances
+    assert DataSample.memoryHeld() == memoryHeld
+    # samples may be released by other threads than the creating thread
+    created = []
+    t = threading.Thread(target=lambda: created.append(DataSample(bytes(1024), "bytes", 0)))
+    t.start()
+    t.join()
+    assert DataSample.numInstances() == numInstances + 1
+    assert DataSample.memoryHeld() == memoryHeld + 1024
+    created.clear()
+    assert DataSample.numInstances() == numInstances
+    assert DataSample.memoryHeld() == memoryHeld
+    # the counters of finished threads are folded into a common total
+    if not nexxT.useCImpl:
+        from nexxT.interface.DataSamples import _InstanceCounter
+        numCounters = _InstanceCounter.numCounters()
+        threads = [threading.Thread(target=lambda: created.append(DataSample(bytes(1024), "bytes", 0)))
+                   for _ in range(20)]
+        for t in threads:
+            t.start()
+            t.join()
+        assert _InstanceCounter.numCounters() == numCounters
+        assert DataSample.numInstances() == numInstances + 20
+        assert DataSample.memoryHeld() == memoryHeld + 20*1024
+        created.clear()
+        assert DataSample.numInstances() == numInstances
+        assert DataSample.memoryHeld() == memoryHeld
+
+    with pytest.raises(RuntimeError):
+        MemoryGovernor.setLimits(1024, policy="unknown")
+    try:
+        MemoryGovernor.setLimits(memoryHeld + 1024*1024, policy="drop")
+        assert MemoryGovernor.limits()["lowWaterMark"] == (memoryHeld + 1024*1024)*4//5
+        MemoryGovernor.setLimits(memoryHeld + 1024*1024, memoryHeld + 512*1024, policy="drop")
+        assert MemoryGovernor.admit()
+        port = OutputPort(False, "out", None)
+        transmitted = []
+        port.transmitSample.connect(transmitted.append)
+        port.setMemoryGoverned(True)
+        assert port.memoryGoverned()
+        large = DataSample(bytes(2*1024*1024), "bytes", 0)
+        assert not MemoryGovernor.admit()
+        stats = MemoryGovernor.statistics()
+        assert stats["throttled"] and stats["throttleEvents"] == 1 and stats["dropped"] == 1
+        # governed ports drop the sample, other ports are not affected
+        port.transmit(DataSample(b"governed", "text", 1))
+        assert len(transmitted) == 0
+        port.setMemoryGoverned(False)
+        port.transmit(DataSample(b"not governed", "text", 2))
+        assert len(transmitted) == 1
+        transmitted.clear()
+        port.setMemoryGoverned(True)
+        del large
+        assert MemoryGovernor.admit()
+        assert not MemoryGovernor.statistics()["throttled"]
+
+        # the block policy waits until the memory has been released
+        MemoryGovernor.setLimits(memoryHeld + 1024*1024, memoryHeld + 512*1024, policy="block", timeout=0.05)
+        large = DataSample(bytes(2*1024*1024), "bytes", 0)
+        t0 = time.perf_counter()
+        assert not MemoryGovernor.admit()
+        assert time.perf_counter() - t0 >= 0.05
+        MemoryGovernor.setLimits(memoryHeld + 1024*1024, memoryHeld + 512*1024, policy="block", timeout=10.0)
+        def release():
+            nonlocal large
+            time.sleep(0.1)
+            large = None
+        t = threading.Thread(target=release)
+        t.start()
+        port.transmit(DataSample(b"governed", "text", 3))
+        t.join()
+        assert [s.getTimestamp() for s in transmitted] == [3]
+        assert MemoryGovernor.statistics()["blockingTime"] > 0.1
+    finally:
+        MemoryGovernor.setLimits(0)
+
+def test_datatypeIds():
+    imageId = DataSample.internDatatype("test/image")
+    textId = DataSample.internDatatype("test/text")
+    assert imageId != textId
+    assert DataSample.internDatatype("test/image") == imageId
+    assert DataSample.datatypeName(imageId) == "test/image"
+    with pytest.raises(RuntimeError):
+        DataSample.datatypeName(-1)
+    # the string API keeps working
+    dataSample = DataSample(b"Hello", "test/image", 38)
+    assert dataSample.getDatatype() == "test/image"
+    assert dataSample.getDatatypeId() == imageId
+    assert dataSample.hasDatatype(imageId)
+    assert not dataSample.hasDatatype(textId)
+    # construction with an id
+    dataSample = DataSample(b"Hello", textId, 38)
+    assert dataSample.getDatatype() == "test/text"
+    assert dataSample.hasDatatype(textId)
+    dataSample = DataSample.fromBuffer(np.zeros(4, dtype=np.uint8), textId, 38)
+    assert dataSample.getDatatype() == "test/text"
+
+class Decoded:
+    def __init__(self, content):
+        self.content = content
+
+def test_decodeCache():
+    numCalls = 0
+    def decoder(sample):
+        nonlocal numCalls
+        numCalls += 1
+        time.sleep(0.01)
+        return Decoded(bytes(sample.getContentView()))
+    dataSample = DataSample(b"Hello", "String", 38)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(dataSample.getDecoded(decoder))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # all consumers get the same object, even if some of them decoded concurrently
+    assert all(r is results[0] for r in results)
+    assert results[0].content == b"Hello"
+    calls = numCalls
+    assert dataSample.getDecoded(decoder) is results[0]
+    assert numCalls == calls
+    # different decoders have separate cache entries
+    assert dataSample.getDecoded(lambda s: s.getTimestamp()) == 38
+    # the cache is dropped with the sample
+    ref = weakref.ref(results[0])
+    del results
+    del threads
+    del dataSample
+    assert ref() is None
+
 @pytest.mark.skipif(platform.system() == "Windows" and platform.release() == "7", 
                     reason="windows 10 or higher, windows 7 seems to have millisecond resolution on timestamps.")
 @pytest.mark.skipif(platform.system() == "Windows" and not nexxT.useCImpl,
@@ -52,4 +262,10 @@ def test_currentTime():
 
 if __name__ == "__main__":
     test_basic()
+    test_contentView()
+    test_fromBuffer()
+    test_payloadPool()
+    test_memoryGovernor()
+    test_datatypeIds()
+    test_decodeCache()
     test_currentTime()
\ No newline at end of file
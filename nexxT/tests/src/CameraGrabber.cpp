@@ -55,9 +55,6 @@ void CameraGrabber::newImage(const QImage &_img)
 {
     QImage img = _img; /* we need a writable img */
     ImageHeader hdr;
-    QByteArray data;
-    /* reserve size for the image in the QByteArray for efficiency reasons */
-    data.reserve(int(sizeof(ImageHeader)) + (img.height() * img.bytesPerLine()));
     /* determine the format */
     QString format;
     switch(img.format())
@@ -81,9 +78,10 @@ void CameraGrabber::newImage(const QImage &_img)
     hdr.height = uint32_t(img.height());
     hdr.lineInc = uint32_t(img.bytesPerLine());
     std::strncpy(hdr.format, format.toLocal8Bit().constData(), sizeof(hdr.format)-1);
-    /* fill the QByteArray instance */
-    data = data.append((const char *)&hdr, sizeof(hdr));
-    data = data.append((const char *)img.constBits(), hdr.lineInc*hdr.height);
+    /* acquire a reusable buffer from the payload pool for efficiency reasons and fill it */
+    QByteArray data = PayloadPool::acquire(int64_t(sizeof(hdr)) + int64_t(hdr.lineInc)*hdr.height);
+    std::memcpy(data.data(), &hdr, sizeof(hdr));
+    std::memcpy(data.data() + sizeof(hdr), img.constBits(), size_t(hdr.lineInc)*hdr.height);
     /* transmit over the port */
     video_out->transmit(
          SharedDataSamplePtr(new DataSample(data, "example/image", DataSample::currentTime()))